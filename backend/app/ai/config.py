@@ -25,6 +25,7 @@ class AIConfig(BaseSettings):
     # API Keys (loaded from environment)
     openai_api_key: Optional[str] = Field(None, env="OPENAI_API_KEY")
     anthropic_api_key: Optional[str] = Field(None, env="ANTHROPIC_API_KEY")
+    api_key_validation_ttl_seconds: int = 300  # Reuse of a provider key check
     
     # Model Configuration
     openai_model: str = "gpt-4-turbo-preview"
@@ -63,6 +64,14 @@ class AIConfig(BaseSettings):
     max_requests_per_minute: int = 60
     max_requests_per_hour: int = 1000
     
+    # LLM gateway (per provider)
+    llm_max_concurrency: int = 8
+    llm_tokens_per_minute: int = 90000
+    
+    # Semantic cache: templated prompts keyed by bucketed data
+    semantic_cache_size: int = 5000
+    semantic_cache_precision: float = 0.005  # Relative width of numeric buckets
+    
     # Template settings
     template_version: str = "v1.0.0"
     strict_template_mode: bool = True  # Enforce template-only responses
@@ -4,6 +4,7 @@ import asyncio
 import hashlib
 import json
 import logging
+import time
 from abc import ABC, abstractmethod
 from enum import Enum
 from typing import Any, Dict, List, Optional, Tuple
@@ -18,6 +19,7 @@ from pydantic import BaseModel, Field
 
 from .config import AIConfig, LLMProvider, Language
 from .audit_logger import AuditLogger
+from .llm_gateway import LLMGateway
 
 logger = logging.getLogger(__name__)
 
@@ -335,10 +337,15 @@ class FallbackClient(BaseLLMClient):
 class LLMClientManager:
     """Manages multiple LLM clients with fallback and caching."""
     
-    def __init__(self, config: AIConfig, audit_logger: AuditLogger):
+    def __init__(self, config: AIConfig, audit_logger: AuditLogger,
+                 gateway: Optional[LLMGateway] = None):
         self.config = config
         self.audit_logger = audit_logger
         
+        # Request coalescing and per-provider rate limits (shareable across managers)
+        self.gateway = gateway or LLMGateway.from_config(config)
+        self._key_validation: Dict[LLMProvider, Tuple[bool, float]] = {}
+        
         # Initialize clients
         self.clients: Dict[LLMProvider, BaseLLMClient] = {
             LLMProvider.OPENAI: OpenAIClient(config, audit_logger),
@@ -377,7 +384,39 @@ class LLMClientManager:
         use_cache: bool = True,
         **kwargs
     ) -> LLMResponse:
-        """Generate narrative with automatic fallback and caching."""
+        """Generate narrative with automatic fallback and caching.
+        
+        Identical concurrent requests share a single provider call, and
+        provider responses are kept in the gateway's in-process cache in
+        front of Redis.
+        """
+        temperature = kwargs.get('temperature', self.config.narrative_temperature)
+        max_tokens = kwargs.get('max_tokens', self.config.max_output_tokens)
+        key = LLMGateway.prompt_key(prompt, provider, narrative_type, language, temperature, max_tokens)
+        
+        async def generate() -> Tuple[LLMResponse, bool]:
+            response = await self._generate(
+                prompt, provider, narrative_type, language, use_cache, temperature, max_tokens
+            )
+            # Template fallbacks are cheap and should not outlive a provider outage
+            return response, response.provider != LLMProvider.FALLBACK
+        
+        response, _ = await self.gateway.coalesce(
+            key, generate, use_cache=use_cache and self.config.enable_response_caching
+        )
+        return response
+    
+    async def _generate(
+        self,
+        prompt: str,
+        provider: Optional[LLMProvider],
+        narrative_type: NarrativeType,
+        language: Language,
+        use_cache: bool,
+        temperature: float,
+        max_tokens: int
+    ) -> LLMResponse:
+        """Generate with Redis cache lookup and provider fallback."""
         
         # Check cache first
         if use_cache and self.redis_client:
@@ -403,17 +442,28 @@ class LLMClientManager:
             try:
                 # Validate API key first
                 if attempt_provider != LLMProvider.FALLBACK:
-                    if not await client.validate_api_key():
+                    if not await self._is_provider_available(attempt_provider):
                         logger.warning(f"{attempt_provider} API key validation failed")
                         continue
                 
                 # Generate response
-                response = await client.generate(
-                    prompt=prompt,
-                    temperature=kwargs.get('temperature', self.config.narrative_temperature),
-                    max_tokens=kwargs.get('max_tokens', self.config.max_output_tokens),
-                    narrative_type=narrative_type
-                )
+                if attempt_provider == LLMProvider.FALLBACK:
+                    response = await client.generate(
+                        prompt=prompt,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        narrative_type=narrative_type
+                    )
+                else:
+                    estimated_tokens = len(prompt) // 4 + max_tokens
+                    async with self.gateway.limit(attempt_provider.value, estimated_tokens) as limiter:
+                        response = await client.generate(
+                            prompt=prompt,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            narrative_type=narrative_type
+                        )
+                        limiter.reconcile(estimated_tokens, response.tokens_used)
                 
                 # Cache successful response
                 if use_cache and self.redis_client and response:
@@ -431,13 +481,29 @@ class LLMClientManager:
         
         return response
     
+    async def _is_provider_available(self, provider: LLMProvider) -> bool:
+        """Validate a provider's API key, reusing the result for a short TTL.
+        
+        Validation issues a real (minimal) completion request, so it is not
+        repeated for every generation.
+        """
+        cached = self._key_validation.get(provider)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        
+        is_valid = await self.clients[provider].validate_api_key()
+        self._key_validation[provider] = (
+            is_valid, time.monotonic() + self.config.api_key_validation_ttl_seconds
+        )
+        return is_valid
+    
     async def _select_provider(self) -> LLMProvider:
         """Select provider with A/B testing logic."""
         if not self.config.enable_ab_testing:
             # Default to OpenAI if available, else Anthropic
-            if await self.clients[LLMProvider.OPENAI].validate_api_key():
+            if await self._is_provider_available(LLMProvider.OPENAI):
                 return LLMProvider.OPENAI
-            elif await self.clients[LLMProvider.ANTHROPIC].validate_api_key():
+            elif await self._is_provider_available(LLMProvider.ANTHROPIC):
                 return LLMProvider.ANTHROPIC
             else:
                 return LLMProvider.FALLBACK
@@ -446,13 +512,13 @@ class LLMClientManager:
         self.ab_test_counter += 1
         if self.ab_test_counter % 10 < self.config.ab_test_percentage * 10:
             # Use alternative provider for A/B test
-            if await self.clients[LLMProvider.ANTHROPIC].validate_api_key():
+            if await self._is_provider_available(LLMProvider.ANTHROPIC):
                 return LLMProvider.ANTHROPIC
         
         # Default provider
-        if await self.clients[LLMProvider.OPENAI].validate_api_key():
+        if await self._is_provider_available(LLMProvider.OPENAI):
             return LLMProvider.OPENAI
-        elif await self.clients[LLMProvider.ANTHROPIC].validate_api_key():
+        elif await self._is_provider_available(LLMProvider.ANTHROPIC):
             return LLMProvider.ANTHROPIC
         else:
             return LLMProvider.FALLBACK
@@ -0,0 +1,313 @@
+"""Gateway layer between narrative generation and the LLM providers.
+
+Provides request coalescing, a semantic response cache keyed by template and
+bucketed data, per-provider concurrency and token-rate limits with queueing,
+and per-provider latency histograms.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+def bucket_value(value: Any, precision: float) -> Any:
+    """Map a template value onto a coarse bucket.
+
+    Numbers fall into logarithmic buckets of relative width ``precision``, so
+    values within that relative distance share a bucket. Strings have their
+    whitespace collapsed; containers are bucketed recursively.
+    """
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        if value == 0 or not math.isfinite(value):
+            return value
+        magnitude = round(math.log(abs(value)) / math.log1p(precision))
+        return ["n", int(math.copysign(1, value)), magnitude]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(k): bucket_value(v, precision) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [bucket_value(v, precision) for v in value]
+    return str(value)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    def __init__(self, bounds_ms: Optional[List[float]] = None):
+        self.bounds_ms = list(bounds_ms or LATENCY_BUCKETS_MS)
+        self.counts = [0] * (len(self.bounds_ms) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, latency_ms: float):
+        self.counts[bisect.bisect_left(self.bounds_ms, latency_ms)] += 1
+        self.total += 1
+        self.sum_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        if self.total == 0:
+            return 0.0
+        rank = math.ceil(self.total * q / 100)
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return float(self.bounds_ms[index]) if index < len(self.bounds_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.total,
+            "mean_ms": self.sum_ms / self.total if self.total else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "buckets": dict(zip([str(b) for b in self.bounds_ms] + ["+inf"], self.counts))
+        }
+
+
+@dataclass
+class ProviderLimits:
+    """Concurrency and rate limits for one provider."""
+    max_concurrency: int = 8
+    tokens_per_minute: int = 90000
+    requests_per_minute: int = 60
+
+
+class ProviderLimiter:
+    """Queues calls to one provider behind concurrency and rate limits.
+
+    Waiters acquire in FIFO order: a token and request bucket refilled
+    continuously at the per-minute rates, then a concurrency slot.
+    """
+
+    def __init__(self, limits: ProviderLimits):
+        self.limits = limits
+        self._semaphore = asyncio.Semaphore(limits.max_concurrency)
+        self._queue_lock = asyncio.Lock()
+        self._tokens = float(limits.tokens_per_minute)
+        self._requests = float(limits.requests_per_minute)
+        self._updated = time.monotonic()
+        self.waiting = 0
+        self.in_flight = 0
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.tokens_used = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(
+            float(self.limits.tokens_per_minute),
+            self._tokens + elapsed * self.limits.tokens_per_minute / 60
+        )
+        self._requests = min(
+            float(self.limits.requests_per_minute),
+            self._requests + elapsed * self.limits.requests_per_minute / 60
+        )
+
+    async def _reserve(self, tokens: int):
+        # A request larger than the whole budget waits for a full bucket
+        tokens = min(tokens, self.limits.tokens_per_minute)
+        async with self._queue_lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens and self._requests >= 1:
+                    self._tokens -= tokens
+                    self._requests -= 1
+                    return
+                token_wait = (tokens - self._tokens) * 60 / self.limits.tokens_per_minute
+                request_wait = (1 - self._requests) * 60 / self.limits.requests_per_minute
+                await asyncio.sleep(max(token_wait, request_wait, 0.01))
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Charge the difference between the estimate and actual usage."""
+        self._tokens -= actual_tokens - estimated_tokens
+        self.tokens_used += actual_tokens
+
+    @asynccontextmanager
+    async def acquire(self, estimated_tokens: int) -> AsyncIterator["ProviderLimiter"]:
+        self.waiting += 1
+        try:
+            await self._reserve(estimated_tokens)
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield self
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.latency.observe((time.perf_counter() - start) * 1000)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "tokens_used": self.tokens_used,
+            "latency": self.latency.snapshot()
+        }
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    expires_at: float
+
+
+class LLMGateway:
+    """Coalescing, caching and rate-limiting layer for LLM calls."""
+
+    def __init__(self,
+                 limits: Optional[Dict[str, ProviderLimits]] = None,
+                 default_limits: Optional[ProviderLimits] = None,
+                 cache_size: int = 5000,
+                 cache_ttl_seconds: int = 3600,
+                 bucket_precision: float = 0.005):
+        """Initialize gateway.
+
+        Args:
+            limits: Limits per provider name
+            default_limits: Limits for providers not listed in ``limits``
+            cache_size: Maximum semantic cache entries (LRU)
+            cache_ttl_seconds: Lifetime of cached responses
+            bucket_precision: Relative width of numeric data buckets
+        """
+        self.limits = dict(limits or {})
+        self.default_limits = default_limits or ProviderLimits()
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.bucket_precision = bucket_precision
+
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {"cache_hits": 0, "cache_misses": 0, "coalesced": 0, "origin_calls": 0}
+
+    def semantic_key(self, template: str, data: Dict[str, Any], language: str = "en",
+                     version: str = "") -> str:
+        """Cache key for a templated prompt: template plus bucketed data."""
+        payload = json.dumps(
+            [template, language, version, bucket_value(data, self.bucket_precision)],
+            sort_keys=True, default=str
+        )
+        return "semantic:" + hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def prompt_key(*parts: Any) -> str:
+        """Exact key for a raw prompt and its generation parameters."""
+        return "prompt:" + hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        if provider not in self._limiters:
+            self._limiters[provider] = ProviderLimiter(self.limits.get(provider, self.default_limits))
+        return self._limiters[provider]
+
+    def limit(self, provider: str, estimated_tokens: int = 0):
+        """Async context manager holding a rate-limited slot for ``provider``."""
+        return self.limiter(provider).acquire(estimated_tokens)
+
+    def get_cached(self, key: str) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry.value
+
+    def put_cached(self, key: str, value: Any):
+        self._cache[key] = _CacheEntry(value, time.monotonic() + self.cache_ttl_seconds)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, key: str):
+        self._cache.pop(key, None)
+
+    async def coalesce(self,
+                       key: str,
+                       factory: Callable[[], Awaitable[Tuple[Any, bool]]],
+                       use_cache: bool = True) -> Tuple[Any, str]:
+        """Serve ``key`` from cache, join an identical in-flight call, or run ``factory``.
+
+        ``factory`` returns ``(value, cacheable)``. Returns ``(value, source)``
+        where source is "cache", "coalesced" or "origin".
+        """
+        if use_cache:
+            cached = self.get_cached(key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return cached, "cache"
+            self.stats["cache_misses"] += 1
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.stats["coalesced"] += 1
+            value, _ = await asyncio.shield(in_flight)
+            return value, "coalesced"
+
+        self.stats["origin_calls"] += 1
+        future = asyncio.ensure_future(factory())
+        self._in_flight[key] = future
+        try:
+            value, cacheable = await asyncio.shield(future)
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        if use_cache and cacheable:
+            self.put_cached(key, value)
+        return value, "origin"
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "cache_size": len(self._cache),
+            "in_flight": len(self._in_flight),
+            "providers": {name: limiter.snapshot() for name, limiter in self._limiters.items()}
+        }
+
+    @classmethod
+    def from_config(cls, config: Any) -> "LLMGateway":
+        """Build a gateway from AIConfig settings."""
+        limits = ProviderLimits(
+            max_concurrency=config.llm_max_concurrency,
+            tokens_per_minute=config.llm_tokens_per_minute,
+            requests_per_minute=config.max_requests_per_minute
+        )
+        return cls(
+            default_limits=limits,
+            cache_size=config.semantic_cache_size,
+            cache_ttl_seconds=config.cache_ttl_seconds,
+            bucket_precision=config.semantic_cache_precision
+        )
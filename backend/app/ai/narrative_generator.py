@@ -1,15 +1,12 @@
 """Main narrative generator with dual LLM integration."""
 
 import asyncio
-import json
-import hashlib
 import time
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
 import openai
 import anthropic
-from langchain.cache import InMemoryCache
 import logging
 import random
 
@@ -17,6 +14,7 @@ from .config import AIConfig, LLMProvider, Language
 from .template_manager import TemplateManager, TemplateType
 from .safety_controller import SafetyController
 from .audit_logger import AuditLogger
+from .llm_gateway import LLMGateway
 
 
 class NarrativeGenerator:
@@ -39,8 +37,8 @@ class NarrativeGenerator:
         # Initialize LLM clients
         self._initialize_llm_clients()
         
-        # Initialize cache
-        self.cache = InMemoryCache() if self.config.enable_response_caching else None
+        # Coalescing, semantic cache and per-provider rate limits
+        self.gateway = LLMGateway.from_config(self.config)
         
         # Track metrics for A/B testing
         self.ab_test_metrics = {
@@ -93,15 +91,8 @@ class NarrativeGenerator:
                 template_type, data, language.value
             )
             
-            # Step 2: Check cache
+            # Step 2: Cache key over the template and bucketed data
             cache_key = self._generate_cache_key(template_type, data, language)
-            if self.cache:
-                cached_response = await self._check_cache(cache_key)
-                if cached_response:
-                    await self.audit_logger.log_cache_event(True, cache_key)
-                    return cached_response
-                else:
-                    await self.audit_logger.log_cache_event(False, cache_key)
             
             # Step 3: Validate prompt safety
             is_valid, error = self.safety_controller.validate_prompt(template_text)
@@ -120,15 +111,26 @@ class NarrativeGenerator:
             if not provider:
                 provider = self._select_provider()
             
-            # Step 6: Generate narrative with LLM
-            narrative, tokens_used, latency = await self._generate_with_llm(
-                provider, template_text, template_type
+            # Step 6: Generate narrative through the gateway (cached, coalesced
+            # with identical in-flight requests, rate limited per provider)
+            narrative, tokens_used, latency, source = await self._generate_through_gateway(
+                cache_key, provider, template_text, template_type
             )
             
             # Step 7: Validate output safety
             is_valid, error = self.safety_controller.validate_output(
                 narrative, template_type.value, data
             )
+            if not is_valid and source == "cache":
+                # Output reused from a neighbouring data bucket no longer
+                # matches this data; regenerate instead of sanitizing
+                self.gateway.invalidate(cache_key)
+                narrative, tokens_used, latency, source = await self._generate_through_gateway(
+                    cache_key, provider, template_text, template_type
+                )
+                is_valid, error = self.safety_controller.validate_output(
+                    narrative, template_type.value, data
+                )
             if not is_valid:
                 await self.audit_logger.log_safety_violation(
                     "output_validation", narrative, user_id
@@ -151,7 +153,7 @@ class NarrativeGenerator:
                 session_id
             )
             
-            # Step 10: Cache response
+            # Step 10: Build response
             response = {
                 "narrative": narrative_with_disclaimers,
                 "template_type": template_type.value,
@@ -162,11 +164,8 @@ class NarrativeGenerator:
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            if self.cache:
-                await self._cache_response(cache_key, response)
-            
-            # Step 11: Track A/B test metrics
-            if self.config.enable_ab_testing:
+            # Step 11: Track A/B test metrics (provider calls only)
+            if self.config.enable_ab_testing and source == "origin":
                 await self._track_ab_metrics(provider, latency, False)
             
             return response
@@ -181,6 +180,41 @@ class NarrativeGenerator:
             # Return fallback response
             return self._create_fallback_response(template_type, data, str(e))
     
+    async def _generate_through_gateway(self,
+                                        cache_key: str,
+                                        provider: LLMProvider,
+                                        prompt: str,
+                                        template_type: TemplateType) -> Tuple[str, int, float, str]:
+        """Generate via the gateway cache and request coalescing.
+        
+        Args:
+            cache_key: Semantic cache key for the request
+            provider: LLM provider to use
+            prompt: Rendered template prompt
+            template_type: Type of template
+            
+        Returns:
+            Tuple of (narrative, tokens_used, latency_seconds, source) where
+            source is "cache", "coalesced" or "origin"
+        """
+        async def generate() -> Tuple[Tuple[str, int, float], bool]:
+            result = await self._generate_with_llm(provider, prompt, template_type)
+            # Template fallbacks use no tokens and are not worth caching
+            return result, result[1] > 0
+        
+        (narrative, tokens_used, latency), source = await self.gateway.coalesce(
+            cache_key, generate, use_cache=self.config.enable_response_caching
+        )
+        
+        if self.config.enable_response_caching:
+            await self.audit_logger.log_cache_event(source != "origin", cache_key)
+        
+        if source != "origin":
+            # Tokens were spent once, by the originating request
+            tokens_used, latency = 0, 0.0
+        
+        return narrative, tokens_used, latency, source
+    
     async def _generate_with_llm(self,
                                 provider: LLMProvider,
                                 prompt: str,
@@ -201,10 +235,15 @@ class NarrativeGenerator:
         system_prompt = self._create_system_prompt(template_type)
         
         try:
+            estimated_tokens = self._estimate_tokens(system_prompt, prompt)
             if provider == LLMProvider.OPENAI and self.openai_client:
-                narrative, tokens = await self._call_openai(system_prompt, prompt)
+                async with self.gateway.limit(provider.value, estimated_tokens) as limiter:
+                    narrative, tokens = await self._call_openai(system_prompt, prompt)
+                    limiter.reconcile(estimated_tokens, int(tokens))
             elif provider == LLMProvider.ANTHROPIC and self.anthropic_client:
-                narrative, tokens = await self._call_anthropic(system_prompt, prompt)
+                async with self.gateway.limit(provider.value, estimated_tokens) as limiter:
+                    narrative, tokens = await self._call_anthropic(system_prompt, prompt)
+                    limiter.reconcile(estimated_tokens, int(tokens))
             else:
                 # Use fallback
                 return self._generate_fallback_narrative(template_type, prompt), 0, 0
@@ -243,6 +282,18 @@ class NarrativeGenerator:
             else:
                 return self._generate_fallback_narrative(template_type, prompt), 0, latency
     
+    def _estimate_tokens(self, system_prompt: str, user_prompt: str) -> int:
+        """Rough token reservation for rate limiting (about 4 characters per token).
+        
+        Args:
+            system_prompt: System instructions
+            user_prompt: User prompt
+            
+        Returns:
+            Estimated prompt plus maximum completion tokens
+        """
+        return (len(system_prompt) + len(user_prompt)) // 4 + self.config.max_output_tokens
+    
     async def _call_openai(self, system_prompt: str, user_prompt: str) -> Tuple[str, int]:
         """Call OpenAI API.
         
@@ -354,40 +405,11 @@ placeholders with actual values. Do not deviate from the template format."""
             language: Language
             
         Returns:
-            Cache key string
-        """
-        key_data = {
-            "template": template_type.value,
-            "data_hash": hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest(),
-            "language": language.value,
-            "version": self.config.template_version
-        }
-        
-        return hashlib.sha256(json.dumps(key_data).encode()).hexdigest()
-    
-    async def _check_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """Check cache for existing response.
-        
-        Args:
-            cache_key: Cache key
-            
-        Returns:
-            Cached response or None
+            Cache key string (shared by data within the same numeric buckets)
         """
-        # Simple in-memory cache check
-        # In production, this would use Redis or similar
-        return None  # Placeholder
-    
-    async def _cache_response(self, cache_key: str, response: Dict[str, Any]):
-        """Cache a response.
-        
-        Args:
-            cache_key: Cache key
-            response: Response to cache
-        """
-        # Simple in-memory cache storage
-        # In production, this would use Redis with TTL
-        pass  # Placeholder
+        return self.gateway.semantic_key(
+            template_type.value, data, language.value, self.config.template_version
+        )
     
     def _generate_fallback_narrative(self,
                                     template_type: TemplateType,
@@ -460,6 +482,14 @@ placeholders with actual values. Do not deviate from the template format."""
             else:
                 metrics["latency"].append(latency)
     
+    def get_gateway_metrics(self) -> Dict[str, Any]:
+        """Get gateway cache, coalescing and per-provider latency metrics.
+        
+        Returns:
+            Gateway metrics
+        """
+        return self.gateway.metrics()
+    
     async def get_ab_test_results(self) -> Dict[str, Any]:
         """Get A/B test results.
         
@@ -486,6 +516,10 @@ placeholders with actual values. Do not deviate from the template format."""
                                        user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Generate multiple narratives in batch.
         
+        Duplicate requests share one provider call and provider calls queue
+        behind the gateway's concurrency and rate limits, so large batches do
+        not burst against the APIs.
+        
         Args:
             requests: List of narrative requests
             user_id: User identifier
@@ -570,6 +570,39 @@ async def analyze_spending_patterns(
         )
 
 
+@router.get("/analysis/spending-patterns/summary")
+async def get_spending_pattern_summary(
+    lookback_days: int = 90,
+    current_user: User = Depends(get_current_verified_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get precomputed spending patterns and recent anomalies
+    
+    Reads the rolling aggregates maintained as transactions sync,
+    without fetching or re-analyzing the transaction history.
+    """
+    try:
+        if not 1 <= lookback_days <= 120:
+            raise ValidationError("lookback_days must be between 1 and 120")
+        
+        analysis = await spending_pattern_detector.get_incremental_analysis(
+            db, str(current_user.id), lookback_days=lookback_days
+        )
+        
+        return {
+            "success": True,
+            "analysis": analysis
+        }
+        
+    except Exception as e:
+        logger.error(f"Error reading spending pattern summary: {str(e)}")
+        raise HTTPException(
+            status_code=400 if isinstance(e, ValidationError) else 500,
+            detail=f"Spending pattern summary failed: {str(e)}"
+        )
+
+
 @router.post("/categorization/feedback")
 async def submit_categorization_feedback(
     request: CategorizationFeedbackRequest,
@@ -150,11 +150,15 @@ async def get_risk_assessment(
         if not target_user or not target_user.financial_profile:
             raise HTTPException(status_code=404, detail="User or financial profile not found")
         
-        # Get risk tolerance prediction
-        risk_prediction = recommendation_engine.risk_predictor.predict_actual_risk_tolerance(user_id)
+        # Run inference off the event loop so concurrent requests share classifier calls
+        risk_prediction = await recommendation_engine.run_blocking(
+            recommendation_engine.risk_predictor.predict_actual_risk_tolerance, user_id
+        )
         
         # Get risk capacity analysis
-        capacity_analysis = recommendation_engine.risk_predictor.analyze_risk_capacity_vs_tolerance(user_id)
+        capacity_analysis = await recommendation_engine.run_blocking(
+            recommendation_engine.risk_predictor.analyze_risk_capacity_vs_tolerance, user_id
+        )
         
         return {
             "risk_prediction": risk_prediction,
@@ -283,7 +287,9 @@ async def get_life_event_predictions(
         if not target_user or not target_user.financial_profile:
             raise HTTPException(status_code=404, detail="User or financial profile not found")
         
-        life_predictions = recommendation_engine.life_event_predictor.predict_life_events(user_id)
+        life_predictions = await recommendation_engine.run_blocking(
+            recommendation_engine.life_event_predictor.predict_life_events, user_id
+        )
         
         if "error" in life_predictions:
             raise HTTPException(status_code=500, detail=life_predictions["error"])
@@ -335,6 +341,7 @@ async def get_goal_success_probability(
 @router.post("/admin/models/train")
 async def train_all_models(
     retrain: bool = Query(False, description="Force retrain existing models"),
+    incremental: bool = Query(False, description="Only fold in users changed since the last run"),
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -347,12 +354,14 @@ async def train_all_models(
         # Run training in background
         background_tasks.add_task(
             _train_models_background,
-            retrain=retrain
+            retrain=retrain,
+            incremental=incremental
         )
         
         return {
             "message": "Model training initiated",
             "retrain": retrain,
+            "incremental": incremental,
             "estimated_completion": "2-4 hours"
         }
         
@@ -420,6 +429,26 @@ async def get_monitoring_report(
         raise HTTPException(status_code=500, detail="Failed to generate monitoring report")
 
 
+@router.post("/admin/monitoring/drift/live")
+async def run_live_drift_checks(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Score sampled live inference inputs against reference data (Admin only)."""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        # Live windows are sampled by the engine's monitor in this process
+        return await recommendation_engine.run_blocking(
+            recommendation_engine.model_monitor.run_live_drift_checks
+        )
+        
+    except Exception as e:
+        logger.error(f"Failed to run live drift checks: {e}")
+        raise HTTPException(status_code=500, detail="Failed to run live drift checks")
+
+
 @router.post("/admin/models/{model_name}/retrain")
 async def trigger_model_retrain(
     model_name: str,
@@ -481,11 +510,14 @@ async def get_model_feature_importance(
         raise HTTPException(status_code=500, detail="Failed to get feature importance")
 
 
-async def _train_models_background(retrain: bool = False):
+async def _train_models_background(retrain: bool = False, incremental: bool = False):
     """Background task for training models."""
     try:
         logger.info("Starting background model training...")
-        result = recommendation_engine.train_all_models(retrain=retrain)
+        # Off the event loop, so requests keep being served while models train
+        result = await recommendation_engine.run_blocking(
+            recommendation_engine.train_all_models, retrain, incremental
+        )
         logger.info(f"Background model training completed: {result}")
     except Exception as e:
         logger.error(f"Background model training failed: {e}")
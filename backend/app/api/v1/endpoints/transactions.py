@@ -3,54 +3,39 @@ Transaction and import API endpoints
 """
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
+import json
 import logging
 
 from app.api.v1.deps import get_db, get_current_user
 from app.models.user import User
 from app.models.all_models import Transaction, Account, Position
 from app.schemas.transaction import TransactionResponse, ImportResponse
-from app.services.transaction_import import CSVParser, BrokerFormat, TransactionProcessor
+from app.services.transaction_import import CSVParser, BrokerFormat, TransactionProcessor, iter_upload
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-@router.post("/import", response_model=ImportResponse)
-async def import_transactions(
-    file: UploadFile = File(...),
-    broker_format: str = Form(...),
-    account_name: str = Form(...),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """Import transactions from CSV file"""
-    
-    # Validate broker format
+def _parse_broker_format(broker_format: Optional[str]) -> Optional[BrokerFormat]:
+    """Broker format from the form field; None selects detection from the header"""
+    if not broker_format or broker_format.lower() == "auto":
+        return None
     try:
-        broker = BrokerFormat(broker_format.lower())
+        return BrokerFormat(broker_format.lower())
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid broker format. Must be one of: {[b.value for b in BrokerFormat]}"
         )
-    
-    # Validate file type
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File must be a CSV"
-        )
-    
-    # Read file content
-    content = await file.read()
-    csv_content = content.decode('utf-8')
-    
-    # Get or create account
+
+
+async def _get_or_create_account(db: AsyncSession, user: User, account_name: str) -> Account:
     account_query = select(Account).where(
         and_(
-            Account.user_id == current_user.id,
+            Account.user_id == user.id,
             Account.name == account_name
         )
     )
@@ -60,7 +45,7 @@ async def import_transactions(
     if not account:
         # Create new account
         account = Account(
-            user_id=current_user.id,
+            user_id=user.id,
             name=account_name,
             type="BROKERAGE",
             currency="USD",
@@ -69,23 +54,50 @@ async def import_transactions(
         db.add(account)
         await db.flush()
     
-    # Parse CSV
-    parser = CSVParser()
-    parsed_transactions = parser.parse(csv_content, broker)
+    return account
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_transactions(
+    file: UploadFile = File(...),
+    broker_format: Optional[str] = Form(None),
+    account_name: str = Form(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Import transactions from CSV file"""
     
-    if not parsed_transactions:
+    broker = _parse_broker_format(broker_format)
+    
+    # Validate file type
+    if not file.filename.endswith('.csv'):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"No valid transactions found. Errors: {parser.errors[:5]}"
+            detail="File must be a CSV"
         )
     
-    # Process transactions
+    account = await _get_or_create_account(db, current_user, account_name)
+    
+    # Parse the upload incrementally and insert each batch as it is parsed
+    parser = CSVParser()
     processor = TransactionProcessor(db)
-    results = await processor.process_transactions(
-        parsed_transactions,
-        account_id=str(account.id),
-        user_id=str(current_user.id)
-    )
+    try:
+        results = await processor.process_stream(
+            parser.parse_stream(iter_upload(file), broker),
+            account_id=str(account.id),
+            user_id=str(current_user.id)
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read CSV: {e}"
+        )
+    
+    if not (results["processed"] or results["duplicates"] or results["skipped"]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No valid transactions found. Errors: {parser.errors[:5]}"
+        )
     
     return ImportResponse(
         success=True,
@@ -97,6 +109,58 @@ async def import_transactions(
     )
 
 
+@router.post("/import/stream")
+async def import_transactions_stream(
+    file: UploadFile = File(...),
+    broker_format: Optional[str] = Form(None),
+    account_name: str = Form(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import a large CSV file, reporting progress as newline-delimited JSON.
+    
+    One line is sent per committed batch and a final line once positions
+    are updated; a failure ends the stream with a "failed" line.
+    """
+    
+    broker = _parse_broker_format(broker_format)
+    
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be a CSV"
+        )
+    
+    account = await _get_or_create_account(db, current_user, account_name)
+    parser = CSVParser()
+    processor = TransactionProcessor(db)
+    
+    async def progress():
+        try:
+            async for results in processor.import_stream(
+                parser.parse_stream(iter_upload(file), broker),
+                account_id=str(account.id),
+                user_id=str(current_user.id)
+            ):
+                yield json.dumps({
+                    "status": "complete" if results["complete"] else "running",
+                    "broker_format": parser.broker_format.value if parser.broker_format else None,
+                    "bytes_read": parser.bytes_read,
+                    "rows_read": parser.rows_read,
+                    "parse_errors": parser.error_count,
+                    "processed": results["processed"],
+                    "duplicates": results["duplicates"],
+                    "skipped": results["skipped"],
+                    "errors": results["errors"]
+                }) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming import failed: {e}")
+            yield json.dumps({"status": "failed", "detail": str(e), "rows_read": parser.rows_read}) + "\n"
+    
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+
 @router.get("/transactions", response_model=List[TransactionResponse])
 async def get_transactions(
     account_id: Optional[str] = None,
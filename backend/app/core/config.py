@@ -85,6 +85,15 @@ class Settings(BaseSettings):
     job_max_retries: int = Field(default=3)
     job_retry_delay_seconds: int = Field(default=60)
     
+    # Banking Webhooks
+    webhook_dedup_backend: str = Field(default="memory")  # "memory" or "redis"
+    webhook_dedup_ttl_seconds: int = Field(default=3600)
+    bank_sync_coalesce_seconds: float = Field(default=2.0)
+    bank_sync_plaid_concurrency: int = Field(default=4)
+    bank_sync_yodlee_concurrency: int = Field(default=2)
+    balance_alert_debounce_seconds: int = Field(default=21600)
+    balance_forecast_days: int = Field(default=14)
+    
     # Logging
     log_level: str = Field(default="INFO")
     log_format: str = Field(default="json")
@@ -10,7 +10,7 @@ from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, Text, JSON, 
+    Column, String, Integer, Date, DateTime, Boolean, Text, JSON, 
     ForeignKey, Index, CheckConstraint, DECIMAL, BigInteger,
     UniqueConstraint
 )
@@ -72,6 +72,7 @@ class BankingCredential(Base, AuditMixin):
     # Status and metadata
     status = Column(String(50), default="active", nullable=False)  # active, expired, error, revoked
     last_sync = Column(TIMESTAMP(timezone=True))
+    sync_cursor = Column(Text)  # Provider cursor for incremental transaction sync
     expires_at = Column(TIMESTAMP(timezone=True))
     
     # Error tracking
@@ -457,6 +458,50 @@ class SpendingAnomaly(Base, AuditMixin):
         return f"<SpendingAnomaly(anomaly_type={self.anomaly_type}, severity={self.severity}, score={self.anomaly_score})>"
 
 
+class SpendingAggregate(Base, AuditMixin):
+    """Rolling per-user spending aggregates, updated as transactions sync"""
+    __tablename__ = "spending_aggregates"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    
+    # Daily/monthly category buckets, merchant and running amount statistics
+    data = Column(JSONB, nullable=False, default=dict)
+    
+    def __repr__(self):
+        return f"<SpendingAggregate(user_id={self.user_id})>"
+
+
+class SpendingSummary(Base, AuditMixin):
+    """Per-user spending and cash flow summary written by the cohort analytics job"""
+    __tablename__ = "spending_summaries"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    
+    # Analysis window
+    period_end = Column(Date, nullable=False)
+    lookback_days = Column(Integer, nullable=False)
+    
+    # Headline metrics
+    total_income = Column(NUMERIC(15, 2))
+    total_expenses = Column(NUMERIC(15, 2))
+    net_cash_flow = Column(NUMERIC(15, 2))
+    savings_rate = Column(NUMERIC(7, 4))
+    top_category = Column(String(100))
+    anomaly_count = Column(Integer, default=0)
+    
+    # All computed metrics
+    metrics = Column(JSONB, nullable=False, default=dict)
+    
+    __table_args__ = (
+        Index('idx_spending_summary_period', 'period_end'),
+        UniqueConstraint('user_id', 'period_end', name='unique_user_spending_summary'),
+    )
+    
+    def __repr__(self):
+        return f"<SpendingSummary(user_id={self.user_id}, period_end={self.period_end})>"
+
+
 class CashFlowAnalysis(Base, AuditMixin):
     """Stored cash flow analysis results"""
     __tablename__ = "cash_flow_analyses"
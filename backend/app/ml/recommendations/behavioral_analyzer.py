@@ -23,10 +23,10 @@ import joblib
 import json
 from pathlib import Path
 
-from app.models.user import User
 from app.models.financial_profile import FinancialProfile
 from app.models.goal import Goal
-from app.database.base import SessionLocal
+from .user_snapshot import UserSnapshot, user_scope
+from .model_server import model_registry
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +34,14 @@ logger = logging.getLogger(__name__)
 class BehavioralPatternAnalyzer:
     """Advanced behavioral pattern analysis for financial habits."""
     
+    MODEL_FILES = {'scaler': 'scaler.pkl'}
+    OPTIONAL_MODEL_FILES = {
+        'spending_classifier': 'spending_classifier.pkl',
+        'behavior_clusterer': 'behavior_clusterer.pkl',
+        'trend_predictor': 'trend_predictor.pkl',
+        'bias_detector': 'bias_detector.pkl'
+    }
+    
     def __init__(self, model_path: Optional[str] = None):
         self.model_path = model_path or "/app/ml/models/behavioral_analyzer"
         self.spending_classifier = None
@@ -41,6 +49,7 @@ class BehavioralPatternAnalyzer:
         self.trend_predictor = None
         self.bias_detector = None
         self.scaler = StandardScaler()
+        self._model_version = None
         
         # Behavioral patterns and biases
         self.spending_categories = [
@@ -56,18 +65,17 @@ class BehavioralPatternAnalyzer:
         self._load_models()
     
     def _load_models(self) -> None:
-        """Load pre-trained behavioral analysis models."""
-        try:
-            model_dir = Path(self.model_path)
-            if model_dir.exists():
-                self.spending_classifier = joblib.load(model_dir / "spending_classifier.pkl")
-                self.behavior_clusterer = joblib.load(model_dir / "behavior_clusterer.pkl")
-                self.trend_predictor = joblib.load(model_dir / "trend_predictor.pkl")
-                self.bias_detector = joblib.load(model_dir / "bias_detector.pkl")
-                self.scaler = joblib.load(model_dir / "scaler.pkl")
-                logger.info("Loaded pre-trained behavioral analysis models")
-        except Exception as e:
-            logger.warning(f"Could not load pre-trained models: {e}")
+        """Use the process-wide copy of the pre-trained models, reloaded when files change."""
+        bundle = model_registry.load_bundle(self.model_path, self.MODEL_FILES, self.OPTIONAL_MODEL_FILES)
+        if bundle is None or bundle.version == self._model_version:
+            return
+        
+        self.spending_classifier = bundle.get('spending_classifier')
+        self.behavior_clusterer = bundle.get('behavior_clusterer')
+        self.trend_predictor = bundle.get('trend_predictor')
+        self.bias_detector = bundle.get('bias_detector')
+        self.scaler = bundle.get('scaler')
+        self._model_version = bundle.version
     
     def _save_models(self) -> None:
         """Save trained models."""
@@ -86,14 +94,15 @@ class BehavioralPatternAnalyzer:
             
             joblib.dump(self.scaler, model_dir / "scaler.pkl")
             logger.info("Saved behavioral analysis models")
+            model_registry.invalidate(self.model_path)
         except Exception as e:
             logger.error(f"Failed to save models: {e}")
     
-    def analyze_spending_patterns(self, user_id: str) -> Dict[str, Any]:
+    def analyze_spending_patterns(self, user_id: str, snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Analyze user's spending patterns and behavior."""
+        self._load_models()
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
+            with user_scope(user_id, snapshot) as user:
                 if not user or not user.financial_profile:
                     return {"error": "User or financial profile not found"}
                 
@@ -560,11 +569,12 @@ class BehavioralPatternAnalyzer:
         
         return recommendations
     
-    def predict_future_spending(self, user_id: str, months_ahead: int = 6) -> Dict[str, Any]:
+    def predict_future_spending(self, user_id: str, months_ahead: int = 6,
+                                snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Predict future spending patterns."""
+        self._load_models()
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
+            with user_scope(user_id, snapshot) as user:
                 if not user or not user.financial_profile:
                     return {"error": "User or financial profile not found"}
                 
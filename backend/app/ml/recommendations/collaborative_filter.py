@@ -6,9 +6,14 @@ This module provides:
 - Peer group identification
 - Success pattern discovery from similar users
 - Benchmarking against peer groups
+- Memory-mapped feature store for database-free peer lookups
+- Incremental retraining from users changed since the last run
 """
 
+import copy
 import logging
+import os
+import threading
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -16,7 +21,7 @@ from typing import Dict, List, Optional, Tuple, Any
 from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
 from sklearn.metrics.pairwise import cosine_similarity
 import scipy.sparse as sp
 from scipy.spatial.distance import pdist, squareform
@@ -24,11 +29,13 @@ import joblib
 import json
 from pathlib import Path
 
-from app.models.user import User
-from app.models.financial_profile import FinancialProfile
-from app.models.goal import Goal
-from app.models.investment import Investment
 from app.database.base import SessionLocal
+from .feature_store import UserFeatureStore
+from .model_server import model_registry
+from .peer_features import (
+    ENCODED_COLUMNS, PEER_LABEL_COLUMNS, PEER_METRIC_COLUMNS,
+    peer_feature_frame, peer_metric_frame, prepare_peer_frame, query_peer_rows, query_peer_user_ids
+)
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +43,18 @@ logger = logging.getLogger(__name__)
 class CollaborativeFilter:
     """Collaborative filtering system for peer-based financial recommendations."""
     
+    MODEL_FILES = {
+        'feature_scaler': 'feature_scaler.pkl',
+        'label_encoders': 'label_encoders.pkl'
+    }
+    OPTIONAL_MODEL_FILES = {
+        'similarity_model': 'similarity_model.pkl',
+        'peer_clusterer': 'peer_clusterer.pkl',
+        'success_predictor': 'success_predictor.pkl'
+    }
+    
+    TRAINING_STATE_FILE = "training_state.json"
+    
     def __init__(self, model_path: Optional[str] = None):
         self.model_path = model_path or "/app/ml/models/collaborative_filter"
         self.similarity_model = None
@@ -43,6 +62,13 @@ class CollaborativeFilter:
         self.success_predictor = None
         self.feature_scaler = StandardScaler()
         self.label_encoders = {}
+        self.feature_columns: List[str] = []
+        self._model_version = None
+        self.feature_store = UserFeatureStore(
+            str(Path(self.model_path) / "feature_store"),
+            PEER_METRIC_COLUMNS,
+            PEER_LABEL_COLUMNS
+        )
         
         # Similarity metrics
         self.similarity_weights = {
@@ -53,205 +79,182 @@ class CollaborativeFilter:
             'outcomes': 0.1
         }
         
+        # Incremental training
+        self.training_config = {
+            'full_rebuild_days': 7,
+            'max_incremental_fraction': 0.2,
+            'batch_size': 1024
+        }
+        self._train_lock = threading.Lock()
+        
         self._load_models()
+        self._cluster_batcher = model_registry.batcher(
+            f"peer_clusterer:{Path(self.model_path).resolve()}", self._predict_peer_clusters
+        )
     
     def _load_models(self) -> None:
-        """Load pre-trained collaborative filtering models."""
-        try:
-            model_dir = Path(self.model_path)
-            if model_dir.exists():
-                self.similarity_model = joblib.load(model_dir / "similarity_model.pkl")
-                self.peer_clusterer = joblib.load(model_dir / "peer_clusterer.pkl")
-                self.success_predictor = joblib.load(model_dir / "success_predictor.pkl")
-                self.feature_scaler = joblib.load(model_dir / "feature_scaler.pkl")
-                self.label_encoders = joblib.load(model_dir / "label_encoders.pkl")
-                logger.info("Loaded pre-trained collaborative filtering models")
-        except Exception as e:
-            logger.warning(f"Could not load pre-trained models: {e}")
+        """
+        Use the process-wide copy of the pre-trained models, reloaded when files change.
+        
+        The feature store files count towards the bundle version, so a retrain
+        that only rewrites the store still reloads it here.
+        """
+        bundle = model_registry.load_bundle(
+            self.model_path, self.MODEL_FILES, self.OPTIONAL_MODEL_FILES,
+            watched=self._feature_store_files()
+        )
+        if bundle is None or bundle.version == self._model_version:
+            return
+        
+        self.similarity_model = bundle.get('similarity_model')
+        self.peer_clusterer = bundle.get('peer_clusterer')
+        self.success_predictor = bundle.get('success_predictor')
+        self.feature_scaler = bundle.get('feature_scaler')
+        self.label_encoders = bundle.get('label_encoders')
+        self.feature_columns = list(getattr(self.feature_scaler, 'feature_names_in_', []))
+        self._model_version = bundle.version
+        if not self.feature_store.load():
+            logger.warning("No feature store found - retrain to enable peer lookups")
     
-    def _save_models(self) -> None:
-        """Save trained models."""
-        try:
-            model_dir = Path(self.model_path)
-            model_dir.mkdir(parents=True, exist_ok=True)
-            
-            if self.similarity_model:
-                joblib.dump(self.similarity_model, model_dir / "similarity_model.pkl")
-            if self.peer_clusterer:
-                joblib.dump(self.peer_clusterer, model_dir / "peer_clusterer.pkl")
-            if self.success_predictor:
-                joblib.dump(self.success_predictor, model_dir / "success_predictor.pkl")
-            
-            joblib.dump(self.feature_scaler, model_dir / "feature_scaler.pkl")
-            joblib.dump(self.label_encoders, model_dir / "label_encoders.pkl")
-            logger.info("Saved collaborative filtering models")
-        except Exception as e:
-            logger.error(f"Failed to save models: {e}")
+    def _feature_store_files(self) -> Tuple[str, ...]:
+        store_dir = self.feature_store.store_path.relative_to(self.model_path)
+        return tuple(
+            str(store_dir / name) for name in (
+                UserFeatureStore.FEATURES_FILE, UserFeatureStore.METRICS_FILE,
+                UserFeatureStore.USER_IDS_FILE, UserFeatureStore.META_FILE
+            )
+        )
     
-    def _extract_user_features(self, user_data: Dict) -> Dict[str, float]:
-        """Extract features for similarity calculation."""
-        profile = user_data['profile']
-        goals = user_data.get('goals', [])
-        investments = user_data.get('investments', [])
-        
-        features = {
-            # Demographics
-            'age': profile.age,
-            'income_bracket': self._categorize_income(profile.annual_income),
-            'dependents': profile.dependents,
-            'marital_status_encoded': self._encode_categorical('marital_status', profile.marital_status),
-            
-            # Financial profile
-            'income_log': np.log1p(float(profile.annual_income)),
-            'net_worth_log': np.log1p(max(0, profile.net_worth)),
-            'debt_to_income': profile.debt_to_income_ratio,
-            'savings_rate': self._calculate_savings_rate(profile),
-            'liquid_assets_ratio': float(profile.liquid_assets or 0) / float(profile.annual_income),
-            
-            # Risk and investment profile
-            'risk_tolerance_encoded': self._encode_categorical('risk_tolerance', profile.risk_tolerance),
-            'investment_experience_encoded': self._encode_categorical('investment_experience', profile.investment_experience),
-            'employment_status_encoded': self._encode_categorical('employment_status', profile.employment_status),
-            
-            # Goals profile
-            'num_goals': len(goals),
-            'avg_goal_timeline': np.mean([g.months_remaining for g in goals]) if goals else 0,
-            'total_goal_amount_ratio': sum(float(g.target_amount) for g in goals) / float(profile.annual_income) if goals else 0,
-            'goal_diversity': len(set(g.goal_type for g in goals)),
-            
-            # Investment behavior
-            'num_investments': len(investments),
-            'portfolio_value_ratio': sum(float(inv.current_value or 0) for inv in investments) / float(profile.annual_income),
-            
-            # Success metrics
-            'goal_completion_rate': self._calculate_goal_completion_rate(goals),
-            'financial_health_score': self._calculate_financial_health_score(profile, goals)
-        }
+    def _save_models(self, models: Dict[str, Any]) -> None:
+        """
+        Save trained models and the training state.
+        
+        Every file is written next to its target first and then renamed into
+        place, so readers see either the old or the new models.
+        """
+        model_dir = Path(self.model_path)
+        model_dir.mkdir(parents=True, exist_ok=True)
+        files = {**self.MODEL_FILES, **self.OPTIONAL_MODEL_FILES, 'training_state': self.TRAINING_STATE_FILE}
+        
+        written = []
+        for name, obj in models.items():
+            if obj is None:
+                continue
+            tmp_path = model_dir / f"{files[name]}.tmp"
+            if name == 'training_state':
+                with open(tmp_path, 'w') as f:
+                    json.dump(obj, f)
+            else:
+                joblib.dump(obj, tmp_path)
+            written.append((tmp_path, model_dir / files[name]))
         
-        return features
+        for tmp_path, path in written:
+            os.replace(tmp_path, path)
+        logger.info("Saved collaborative filtering models")
+        model_registry.invalidate(self.model_path)
+        self._load_models()
     
-    def _categorize_income(self, income: float) -> int:
-        """Categorize income into brackets."""
-        if income < 30000:
-            return 0
-        elif income < 50000:
-            return 1
-        elif income < 75000:
-            return 2
-        elif income < 100000:
-            return 3
-        elif income < 150000:
-            return 4
-        else:
-            return 5
+    def _training_state(self) -> Dict[str, Any]:
+        """Timestamps of the last full and incremental training runs."""
+        state_file = Path(self.model_path) / self.TRAINING_STATE_FILE
+        if not state_file.exists():
+            return {}
+        with open(state_file, 'r') as f:
+            return json.load(f)
     
-    def _encode_categorical(self, feature_name: str, value: str) -> int:
-        """Encode categorical features."""
-        if feature_name not in self.label_encoders:
-            self.label_encoders[feature_name] = LabelEncoder()
+    def train_collaborative_models(self, retrain: bool = False, incremental: bool = False) -> Dict[str, Any]:
+        """
+        Train collaborative filtering models.
+        
+        With ``incremental`` only users changed since the last run are
+        scaled, folded into the peer clusters with ``partial_fit`` and
+        upserted into the feature store. A full rebuild runs instead when
+        none exists yet, the last one is older than ``full_rebuild_days`` or
+        too many users changed. Serving keeps using the current models until
+        the new files are swapped in.
+        """
+        if not self._train_lock.acquire(blocking=False):
+            logger.info("Collaborative filtering training already in progress")
+            return {"message": "Training already in progress"}
         
         try:
-            return self.label_encoders[feature_name].transform([value])[0]
-        except ValueError:
-            # Handle unseen categories
-            return -1
-    
-    def _calculate_savings_rate(self, profile: FinancialProfile) -> float:
-        """Calculate savings rate."""
-        if not profile.annual_income or profile.annual_income <= 0:
-            return 0.0
-        
-        annual_expenses = float(profile.monthly_expenses) * 12
-        savings_rate = max(0, (float(profile.annual_income) - annual_expenses) / float(profile.annual_income))
-        return min(1.0, savings_rate)
+            self._load_models()
+            if incremental:
+                return self._train_incremental()
+            if not retrain and all([self.similarity_model, self.peer_clusterer]):
+                logger.info("Collaborative models already trained. Use retrain=True to retrain.")
+                return {}
+            return self._train_full()
+        finally:
+            self._train_lock.release()
     
-    def _calculate_goal_completion_rate(self, goals: List) -> float:
-        """Calculate goal completion rate."""
-        if not goals:
-            return 0.0
-        
-        completed_goals = sum(1 for g in goals if g.status == 'completed')
-        return completed_goals / len(goals)
-    
-    def _calculate_financial_health_score(self, profile: FinancialProfile, goals: List) -> float:
-        """Calculate overall financial health score."""
-        factors = []
-        
-        # Emergency fund
-        emergency_fund_months = float(profile.liquid_assets or 0) / float(profile.monthly_expenses)
-        factors.append(min(1.0, emergency_fund_months / 6))
-        
-        # Debt levels
-        factors.append(max(0, 1.0 - profile.debt_to_income_ratio))
-        
-        # Savings rate
-        factors.append(self._calculate_savings_rate(profile))
-        
-        # Goal progress
-        if goals:
-            avg_progress = np.mean([g.progress_percentage for g in goals]) / 100
-            factors.append(avg_progress)
-        
-        return np.mean(factors)
-    
-    def train_collaborative_models(self, retrain: bool = False) -> Dict[str, Any]:
-        """Train collaborative filtering models."""
-        if not retrain and all([self.similarity_model, self.peer_clusterer]):
-            logger.info("Collaborative models already trained. Use retrain=True to retrain.")
-            return {}
-        
+    def _train_full(self) -> Dict[str, Any]:
+        """Rebuild scaler, encoders, similarity model, clusters and feature store from all users."""
         logger.info("Training collaborative filtering models...")
+        started_at = datetime.utcnow()
         
-        # Load user data
-        user_data = self._load_user_data()
-        if len(user_data) < 50:
+        with SessionLocal() as db:
+            frame = prepare_peer_frame(query_peer_rows(db))
+        if len(frame) < 50:
             logger.warning("Insufficient user data for collaborative filtering. Need at least 50 users.")
             return {}
         
-        # Extract features
-        features_list = []
-        for data in user_data:
-            features = self._extract_user_features(data)
-            features_list.append(features)
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(features_list)
+        label_encoders = {
+            column: LabelEncoder().fit(frame[column].dropna().astype(str).unique())
+            for column in ENCODED_COLUMNS
+        }
+        df = peer_feature_frame(frame, label_encoders)
         df = df.fillna(df.median())
         
-        # Fit label encoders
-        categorical_cols = ['marital_status_encoded', 'risk_tolerance_encoded', 
-                           'investment_experience_encoded', 'employment_status_encoded']
-        for col in categorical_cols:
-            if col in df.columns:
-                unique_values = df[col].unique()
-                if col.replace('_encoded', '') not in self.label_encoders:
-                    self.label_encoders[col.replace('_encoded', '')] = LabelEncoder()
-                    self.label_encoders[col.replace('_encoded', '')].fit(unique_values)
-        
         # Scale features
-        X_scaled = self.feature_scaler.fit_transform(df)
+        feature_scaler = StandardScaler()
+        X_scaled = feature_scaler.fit_transform(df)
         
         # Train similarity model (Nearest Neighbors)
-        self.similarity_model = NearestNeighbors(
-            n_neighbors=min(20, len(user_data)//2),
+        similarity_model = NearestNeighbors(
+            n_neighbors=min(20, len(df)//2),
             metric='cosine',
             algorithm='ball_tree'
         )
-        self.similarity_model.fit(X_scaled)
+        similarity_model.fit(X_scaled)
         
-        # Train peer clustering
-        n_clusters = min(8, len(user_data)//10)
-        self.peer_clusterer = KMeans(n_clusters=n_clusters, random_state=42)
-        cluster_labels = self.peer_clusterer.fit_predict(X_scaled)
+        # Train peer clustering; mini-batch k-means can later be updated in place
+        n_clusters = min(8, len(df)//10)
+        peer_clusterer = MiniBatchKMeans(
+            n_clusters=n_clusters, random_state=42,
+            batch_size=self.training_config['batch_size'], n_init=3
+        )
+        cluster_labels = peer_clusterer.fit_predict(X_scaled)
         
         # Analyze clusters
         cluster_analysis = self._analyze_clusters(df, cluster_labels)
         
-        # Save models
-        self._save_models()
+        # Persist the serving matrix before the models that match it, so a
+        # worker that picks up the new scaler also finds the new vectors
+        peer_metrics = peer_metric_frame(frame)
+        self.feature_store.build(
+            list(df.index),
+            X_scaled,
+            peer_metrics[PEER_METRIC_COLUMNS].to_numpy(dtype=np.float32),
+            peer_metrics[PEER_LABEL_COLUMNS].to_dict('records')
+        )
+        
+        self._save_models({
+            'similarity_model': similarity_model,
+            'peer_clusterer': peer_clusterer,
+            'success_predictor': self.success_predictor,
+            'feature_scaler': feature_scaler,
+            'label_encoders': label_encoders,
+            'training_state': {
+                'last_full_train': started_at.isoformat(),
+                'last_update': started_at.isoformat(),
+                'num_users': len(df)
+            }
+        })
         
         metrics = {
-            'num_users': len(user_data),
+            'mode': 'full',
+            'num_users': len(df),
             'num_features': len(df.columns),
             'num_clusters': n_clusters,
             'cluster_analysis': cluster_analysis
@@ -260,30 +263,75 @@ class CollaborativeFilter:
         logger.info(f"Collaborative filtering models trained successfully: {metrics}")
         return metrics
     
-    def _load_user_data(self) -> List[Dict]:
-        """Load user data for collaborative filtering."""
-        user_data = []
-        
-        try:
-            with SessionLocal() as db:
-                users = db.query(User).join(FinancialProfile).filter(
-                    FinancialProfile.annual_income.isnot(None)
-                ).all()
-                
-                for user in users:
-                    if user.financial_profile:
-                        data = {
-                            'user_id': str(user.id),
-                            'profile': user.financial_profile,
-                            'goals': user.goals or [],
-                            'investments': user.investments or []
-                        }
-                        user_data.append(data)
-                        
-        except Exception as e:
-            logger.error(f"Failed to load user data: {e}")
+    def _train_incremental(self) -> Dict[str, Any]:
+        """Fold users changed since the last run into the current models and evict departed ones."""
+        state = self._training_state()
+        if (self.peer_clusterer is None or not hasattr(self.peer_clusterer, 'partial_fit')
+                or not hasattr(self.feature_scaler, 'mean_') or 'last_full_train' not in state):
+            logger.info("No incrementally trainable models - running a full rebuild")
+            return self._train_full()
+        
+        last_full_train = datetime.fromisoformat(state['last_full_train'])
+        if datetime.utcnow() - last_full_train > timedelta(days=self.training_config['full_rebuild_days']):
+            logger.info("Periodic full rebuild of collaborative filtering models")
+            return self._train_full()
+        
+        started_at = datetime.utcnow()
+        with SessionLocal() as db:
+            frame = prepare_peer_frame(query_peer_rows(
+                db, changed_since=datetime.fromisoformat(state['last_update'])
+            ))
+            # Deleted users, or users whose income was cleared, never show up as changed
+            departed = set(self.feature_store.user_ids()).difference(query_peer_user_ids(db))
+        
+        max_changed = self.training_config['max_incremental_fraction'] * max(len(self.feature_store), 1)
+        if len(frame) + len(departed) > max_changed:
+            logger.info(f"{len(frame)} users changed and {len(departed)} departed - running a full rebuild")
+            return self._train_full()
+        
+        for user_id in departed:
+            self.feature_store.remove(user_id)
+        
+        if len(frame):
+            X_scaled = self._scale_peer_features(frame)
+            peer_clusterer = copy.deepcopy(self.peer_clusterer)
+            batch_size = self.training_config['batch_size']
+            for start in range(0, len(X_scaled), batch_size):
+                peer_clusterer.partial_fit(X_scaled[start:start + batch_size])
+            # Scaler and encoders stay fixed until the next full rebuild
+            self._upsert_peer_rows(frame, X_scaled)
+            self.feature_store.compact()
+            self._save_models({
+                'peer_clusterer': peer_clusterer,
+                'training_state': {**state, 'last_update': started_at.isoformat()}
+            })
+        else:
+            self.feature_store.compact()
+            self._save_models({'training_state': {**state, 'last_update': started_at.isoformat()}})
         
-        return user_data
+        metrics = {
+            'mode': 'incremental', 'num_users': len(frame),
+            'num_evicted': len(departed), 'since': state['last_update']
+        }
+        logger.info(f"Collaborative filtering models updated incrementally: {metrics}")
+        return metrics
+    
+    def _scale_peer_features(self, frame: pd.DataFrame) -> np.ndarray:
+        """Scaled feature matrix in the training column order."""
+        feature_df = peer_feature_frame(frame, self.label_encoders)
+        if self.feature_columns:
+            feature_df = feature_df[self.feature_columns]
+        feature_df = feature_df.fillna(pd.Series(self.feature_scaler.mean_, index=feature_df.columns))
+        return self.feature_scaler.transform(feature_df)
+    
+    def _upsert_peer_rows(self, frame: pd.DataFrame, X_scaled: np.ndarray) -> None:
+        peer_metrics = peer_metric_frame(frame)
+        self.feature_store.upsert_many(
+            list(frame.index),
+            X_scaled,
+            peer_metrics[PEER_METRIC_COLUMNS].to_numpy(dtype=np.float32),
+            peer_metrics[PEER_LABEL_COLUMNS].to_dict('records')
+        )
     
     def _analyze_clusters(self, df: pd.DataFrame, cluster_labels: np.ndarray) -> Dict[str, Any]:
         """Analyze characteristics of each cluster."""
@@ -320,106 +368,105 @@ class CollaborativeFilter:
         
         return cluster_analysis
     
+    def update_user_features(self, user_id: str) -> bool:
+        """
+        Refresh one user's stored vector after a profile change.
+        
+        Upserts are served immediately and merged into the mapped matrix
+        by compact_feature_store().
+        """
+        if not hasattr(self.feature_scaler, 'mean_'):
+            return False
+        
+        with SessionLocal() as db:
+            frame = prepare_peer_frame(query_peer_rows(db, user_ids=[user_id]))
+        if frame.empty:
+            self.feature_store.remove(user_id)
+            return False
+        
+        self._upsert_peer_rows(frame, self._scale_peer_features(frame))
+        return True
+    
+    def compact_feature_store(self) -> None:
+        """Merge incremental feature updates into the persisted store."""
+        self.feature_store.compact()
+    
+    def _peer_entry(self, record: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Split a stored record into profile summary and success metrics."""
+        return {
+            'profile_summary': {
+                'age': int(record['age']),
+                'income_bracket': int(record['income_bracket']),
+                'marital_status': record['marital_status'],
+                'dependents': int(record['dependents']),
+                'risk_tolerance': record['risk_tolerance'],
+                'num_goals': int(record['num_goals']),
+                'savings_rate': record['savings_rate'],
+                'financial_health_score': record['financial_health_score']
+            },
+            'success_metrics': {
+                'goal_completion_rate': record['goal_completion_rate'],
+                'net_worth_to_income': record['net_worth_to_income'],
+                'debt_to_income': record['debt_to_income'],
+                'emergency_fund_months': record['emergency_fund_months'],
+                'investment_portfolio_value': record['investment_portfolio_value']
+            }
+        }
+    
     def find_similar_users(self, user_id: str, n_similar: int = 10) -> Dict[str, Any]:
         """Find similar users for collaborative recommendations."""
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
-                if not user or not user.financial_profile:
-                    return {"error": "User or financial profile not found"}
-                
-                # Extract user features
-                user_data = {
-                    'profile': user.financial_profile,
-                    'goals': user.goals or [],
-                    'investments': user.investments or []
-                }
-                
-                user_features = self._extract_user_features(user_data)
-                
-                # Convert to array and scale
-                feature_df = pd.DataFrame([user_features])
-                feature_df = feature_df.fillna(feature_df.median())
-                
-                if hasattr(self.feature_scaler, 'mean_'):
-                    X_scaled = self.feature_scaler.transform(feature_df)
-                else:
-                    return {"error": "Similarity model not trained"}
-                
-                # Find similar users
-                if self.similarity_model:
-                    distances, indices = self.similarity_model.kneighbors(X_scaled, n_neighbors=n_similar+1)
-                    
-                    # Get similar user profiles
-                    all_users = self._load_user_data()
-                    similar_users = []
-                    
-                    for i, idx in enumerate(indices[0][1:]):  # Skip first (self)
-                        if idx < len(all_users):
-                            similar_user = all_users[idx]
-                            similarity_score = 1 - distances[0][i+1]  # Convert distance to similarity
-                            
-                            similar_users.append({
-                                'user_id': similar_user['user_id'],
-                                'similarity_score': float(similarity_score),
-                                'profile_summary': self._create_profile_summary(similar_user),
-                                'success_metrics': self._extract_success_metrics(similar_user)
-                            })
-                    
-                    return {
-                        'user_id': user_id,
-                        'similar_users': similar_users,
-                        'peer_group': self._identify_peer_group(user_data),
-                        'recommendations': self._generate_peer_recommendations(similar_users, user_data)
-                    }
-                else:
-                    return {"error": "Similarity model not available"}
+            self._load_models()
+            if not hasattr(self.feature_scaler, 'mean_'):
+                return {"error": "Similarity model not trained"}
+            
+            # Users added since training are scored once and upserted
+            if user_id not in self.feature_store and not self.update_user_features(user_id):
+                return {"error": "User or financial profile not found"}
+            
+            user_vector = self.feature_store.get_vector(user_id)
+            user_record = self.feature_store.get_record(user_id)
+            
+            similar_users = []
+            for similar_id, similarity_score in self.feature_store.nearest(
+                user_vector, n_similar, exclude=[user_id]
+            ):
+                similar_users.append({
+                    'user_id': similar_id,
+                    'similarity_score': float(similarity_score),
+                    **self._peer_entry(self.feature_store.get_record(similar_id))
+                })
+            
+            return {
+                'user_id': user_id,
+                'similar_users': similar_users,
+                'peer_group': self._identify_peer_group(user_vector),
+                'recommendations': self._generate_peer_recommendations(
+                    similar_users, self._peer_entry(user_record)
+                )
+            }
                     
         except Exception as e:
             logger.error(f"Failed to find similar users for {user_id}: {e}")
             return {"error": str(e)}
     
-    def _create_profile_summary(self, user_data: Dict) -> Dict[str, Any]:
-        """Create a summary of user profile for comparison."""
-        profile = user_data['profile']
-        goals = user_data.get('goals', [])
-        
-        return {
-            'age': profile.age,
-            'income_bracket': self._categorize_income(profile.annual_income),
-            'marital_status': profile.marital_status,
-            'dependents': profile.dependents,
-            'risk_tolerance': profile.risk_tolerance,
-            'num_goals': len(goals),
-            'savings_rate': self._calculate_savings_rate(profile),
-            'financial_health_score': self._calculate_financial_health_score(profile, goals)
-        }
-    
-    def _extract_success_metrics(self, user_data: Dict) -> Dict[str, Any]:
-        """Extract success metrics for peer comparison."""
-        profile = user_data['profile']
-        goals = user_data.get('goals', [])
-        
-        return {
-            'goal_completion_rate': self._calculate_goal_completion_rate(goals),
-            'net_worth_to_income': profile.net_worth / float(profile.annual_income) if profile.annual_income > 0 else 0,
-            'debt_to_income': profile.debt_to_income_ratio,
-            'emergency_fund_months': float(profile.liquid_assets or 0) / float(profile.monthly_expenses),
-            'investment_portfolio_value': sum(float(inv.current_value or 0) for inv in user_data.get('investments', []))
-        }
+    def _predict_peer_clusters(self, vector_frame: pd.DataFrame) -> np.ndarray:
+        """Peer cluster ids for a batch of scaled feature vectors."""
+        if self._model_version is not None:
+            self._load_models()
+        return self.peer_clusterer.predict(vector_frame.to_numpy())
     
-    def _identify_peer_group(self, user_data: Dict) -> Dict[str, Any]:
-        """Identify user's peer group cluster."""
+    def _identify_peer_group(self, user_vector: np.ndarray) -> Dict[str, Any]:
+        """Identify user's peer group cluster from their scaled features."""
         try:
             if not self.peer_clusterer:
                 return {"error": "Peer clustering model not available"}
             
-            user_features = self._extract_user_features(user_data)
-            feature_df = pd.DataFrame([user_features])
-            feature_df = feature_df.fillna(feature_df.median())
-            
-            X_scaled = self.feature_scaler.transform(feature_df)
-            cluster_id = self.peer_clusterer.predict(X_scaled)[0]
+            vector_frame = pd.DataFrame(np.asarray(user_vector).reshape(1, -1))
+            if self._model_version is not None:
+                cluster_id = self._cluster_batcher.predict(vector_frame)[0]
+            else:
+                cluster_id = self._predict_peer_clusters(vector_frame)[0]
             
             return {
                 'cluster_id': int(cluster_id),
@@ -457,7 +504,7 @@ class CollaborativeFilter:
         }
     
     def _generate_peer_recommendations(self, similar_users: List[Dict], 
-                                     user_data: Dict) -> List[str]:
+                                     user_entry: Dict) -> List[str]:
         """Generate recommendations based on similar users' success patterns."""
         recommendations = []
         
@@ -466,12 +513,12 @@ class CollaborativeFilter:
         
         # Analyze successful patterns from similar users
         successful_users = [u for u in similar_users 
-                           if u['success_metrics']['financial_health_score'] > 0.7]
+                           if u['profile_summary']['financial_health_score'] > 0.7]
         
         if successful_users:
             # Savings rate recommendations
             avg_savings_rate = np.mean([u['profile_summary']['savings_rate'] for u in successful_users])
-            user_savings_rate = self._calculate_savings_rate(user_data['profile'])
+            user_savings_rate = user_entry['profile_summary']['savings_rate']
             
             if avg_savings_rate > user_savings_rate + 0.05:
                 recommendations.append(
@@ -481,7 +528,7 @@ class CollaborativeFilter:
             
             # Goal patterns
             avg_goals = np.mean([u['profile_summary']['num_goals'] for u in successful_users])
-            if avg_goals > len(user_data['goals']) + 1:
+            if avg_goals > user_entry['profile_summary']['num_goals'] + 1:
                 recommendations.append(
                     f"Users similar to you typically have {avg_goals:.0f} active goals - "
                     f"consider setting additional financial goals"
@@ -490,7 +537,7 @@ class CollaborativeFilter:
             # Investment patterns
             investing_users = [u for u in successful_users 
                              if u['success_metrics']['investment_portfolio_value'] > 0]
-            if investing_users and not user_data.get('investments'):
+            if investing_users and user_entry['success_metrics']['investment_portfolio_value'] <= 0:
                 recommendations.append(
                     "Similar successful users typically have investment portfolios - "
                     "consider starting to invest"
@@ -499,8 +546,7 @@ class CollaborativeFilter:
             # Emergency fund
             avg_emergency_months = np.mean([u['success_metrics']['emergency_fund_months'] 
                                           for u in successful_users])
-            user_emergency_months = (float(user_data['profile'].liquid_assets or 0) / 
-                                   float(user_data['profile'].monthly_expenses))
+            user_emergency_months = user_entry['success_metrics']['emergency_fund_months']
             
             if avg_emergency_months > user_emergency_months + 1:
                 recommendations.append(
@@ -512,61 +558,43 @@ class CollaborativeFilter:
     def get_peer_benchmarks(self, user_id: str) -> Dict[str, Any]:
         """Get peer benchmarks for comparison."""
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
-                if not user or not user.financial_profile:
-                    return {"error": "User or financial profile not found"}
-                
-                # Find peer group
-                user_data = {
-                    'profile': user.financial_profile,
-                    'goals': user.goals or [],
-                    'investments': user.investments or []
-                }
-                
-                peer_group = self._identify_peer_group(user_data)
-                similar_users_result = self.find_similar_users(user_id, n_similar=20)
-                
-                if 'similar_users' not in similar_users_result:
-                    return {"error": "Could not find similar users"}
-                
-                similar_users = similar_users_result['similar_users']
-                
-                # Calculate benchmarks
-                benchmarks = {
-                    'savings_rate': {
-                        'user_value': self._calculate_savings_rate(user.financial_profile),
-                        'peer_median': np.median([u['profile_summary']['savings_rate'] for u in similar_users]),
-                        'peer_75th_percentile': np.percentile([u['profile_summary']['savings_rate'] for u in similar_users], 75)
-                    },
-                    'net_worth_to_income': {
-                        'user_value': user.financial_profile.net_worth / float(user.financial_profile.annual_income),
-                        'peer_median': np.median([u['success_metrics']['net_worth_to_income'] for u in similar_users]),
-                        'peer_75th_percentile': np.percentile([u['success_metrics']['net_worth_to_income'] for u in similar_users], 75)
-                    },
-                    'emergency_fund_months': {
-                        'user_value': float(user.financial_profile.liquid_assets or 0) / float(user.financial_profile.monthly_expenses),
-                        'peer_median': np.median([u['success_metrics']['emergency_fund_months'] for u in similar_users]),
-                        'peer_75th_percentile': np.percentile([u['success_metrics']['emergency_fund_months'] for u in similar_users], 75)
-                    },
-                    'goal_completion_rate': {
-                        'user_value': self._calculate_goal_completion_rate(user.goals),
-                        'peer_median': np.median([u['success_metrics']['goal_completion_rate'] for u in similar_users]),
-                        'peer_75th_percentile': np.percentile([u['success_metrics']['goal_completion_rate'] for u in similar_users], 75)
-                    }
-                }
-                
-                # Generate performance analysis
-                performance_analysis = self._analyze_performance_vs_peers(benchmarks)
-                
-                return {
-                    'user_id': user_id,
-                    'peer_group': peer_group,
-                    'benchmarks': benchmarks,
-                    'performance_analysis': performance_analysis,
-                    'improvement_areas': self._identify_improvement_areas(benchmarks),
-                    'strength_areas': self._identify_strength_areas(benchmarks)
+            similar_users_result = self.find_similar_users(user_id, n_similar=20)
+            
+            if 'similar_users' not in similar_users_result:
+                return {"error": similar_users_result.get('error', "Could not find similar users")}
+            
+            similar_users = similar_users_result['similar_users']
+            if not similar_users:
+                return {"error": "Could not find similar users"}
+            
+            user_record = self.feature_store.get_record(user_id)
+            
+            # Calculate benchmarks
+            benchmarks = {}
+            for metric, section in (
+                ('savings_rate', 'profile_summary'),
+                ('net_worth_to_income', 'success_metrics'),
+                ('emergency_fund_months', 'success_metrics'),
+                ('goal_completion_rate', 'success_metrics')
+            ):
+                peer_values = [u[section][metric] for u in similar_users]
+                benchmarks[metric] = {
+                    'user_value': user_record[metric],
+                    'peer_median': np.median(peer_values),
+                    'peer_75th_percentile': np.percentile(peer_values, 75)
                 }
+            
+            # Generate performance analysis
+            performance_analysis = self._analyze_performance_vs_peers(benchmarks)
+            
+            return {
+                'user_id': user_id,
+                'peer_group': similar_users_result['peer_group'],
+                'benchmarks': benchmarks,
+                'performance_analysis': performance_analysis,
+                'improvement_areas': self._identify_improvement_areas(benchmarks),
+                'strength_areas': self._identify_strength_areas(benchmarks)
+            }
                 
         except Exception as e:
             logger.error(f"Failed to get peer benchmarks for {user_id}: {e}")
@@ -0,0 +1,310 @@
+"""
+Vectorized data drift detection for model monitoring.
+
+This module provides:
+- Reference profiles: per-feature quantile grids and counts, built once per
+  model version and cached on disk
+- PSI and Kolmogorov-Smirnov statistics for every feature from one pass of
+  cell counts over the feature matrix
+- Streaming accumulators fed by a sample of live inference inputs
+"""
+
+import json
+import logging
+import threading
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+PSI_FLOOR = 1e-10
+
+
+def psi_from_counts(reference_counts: np.ndarray, new_counts: np.ndarray) -> np.ndarray:
+    """PSI per row of two count matrices with matching bins."""
+    reference_counts = np.asarray(reference_counts, dtype=np.float64)
+    new_counts = np.asarray(new_counts, dtype=np.float64)
+    ref_totals = reference_counts.sum(axis=-1, keepdims=True)
+    new_totals = new_counts.sum(axis=-1, keepdims=True)
+    ref_props = np.maximum(reference_counts / np.where(ref_totals > 0, ref_totals, 1), PSI_FLOOR)
+    new_props = np.maximum(new_counts / np.where(new_totals > 0, new_totals, 1), PSI_FLOOR)
+    return np.sum((new_props - ref_props) * np.log(new_props / ref_props), axis=-1)
+
+
+def ks_from_counts(reference_counts: np.ndarray, new_counts: np.ndarray) -> np.ndarray:
+    """Largest CDF gap per row, evaluated at the cell boundaries."""
+    reference_counts = np.asarray(reference_counts, dtype=np.float64)
+    new_counts = np.asarray(new_counts, dtype=np.float64)
+    ref_totals = reference_counts.sum(axis=-1, keepdims=True)
+    new_totals = new_counts.sum(axis=-1, keepdims=True)
+    ref_cdf = np.cumsum(reference_counts, axis=-1) / np.where(ref_totals > 0, ref_totals, 1)
+    new_cdf = np.cumsum(new_counts, axis=-1) / np.where(new_totals > 0, new_totals, 1)
+    return np.max(np.abs(ref_cdf - new_cdf), axis=-1)
+
+
+@dataclass
+class ReferenceProfile:
+    """Binned summary of a model's reference (training) data."""
+    version: str
+    numeric_columns: List[str]
+    # (features, cells - 1) reference quantiles bounding the cells
+    grid: np.ndarray
+    # (features, cells) reference counts per cell
+    counts: np.ndarray
+    buckets: int
+    categorical: Dict[str, Tuple[List[Any], np.ndarray]] = field(default_factory=dict)
+
+    @property
+    def cells(self) -> int:
+        return self.grid.shape[1] + 1
+
+    @classmethod
+    def build(cls, reference: pd.DataFrame, version: str = "", buckets: int = 10,
+              cells: int = 100) -> "ReferenceProfile":
+        """
+        Profile ``reference`` on a grid of ``cells`` quantile cells.
+
+        ``cells`` must be a multiple of ``buckets``: PSI buckets are formed
+        by merging adjacent cells, so PSI and KS share one set of counts.
+        """
+        if cells % buckets:
+            raise ValueError(f"cells ({cells}) must be a multiple of buckets ({buckets})")
+
+        numeric = [c for c in reference.columns if pd.api.types.is_numeric_dtype(reference[c])]
+        values = reference[numeric].to_numpy(dtype=np.float64)
+        if len(values):
+            grid = np.nanquantile(values, np.arange(1, cells) / cells, axis=0).T
+        else:
+            grid = np.zeros((len(numeric), cells - 1))
+        grid = np.nan_to_num(grid)
+
+        categorical = {}
+        for column in reference.columns:
+            if column in numeric:
+                continue
+            frequencies = reference[column].astype(str).value_counts()
+            categorical[column] = (frequencies.index.tolist(), frequencies.to_numpy(dtype=np.float64))
+
+        profile = cls(version=version, numeric_columns=numeric, grid=grid,
+                      counts=np.zeros((len(numeric), cells)), buckets=buckets, categorical=categorical)
+        profile.counts = profile.cell_counts(values)
+        return profile
+
+    def cell_counts(self, values: np.ndarray) -> np.ndarray:
+        """
+        Counts per (feature, cell) for a matrix of numeric feature values.
+
+        Each column is located on its own grid and all columns are counted
+        with a single ``bincount``. Missing values are ignored.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n_features, cells = len(self.numeric_columns), self.cells
+        if values.size == 0:
+            return np.zeros((n_features, cells))
+
+        cell_index = np.empty(values.shape, dtype=np.int64)
+        for j in range(n_features):
+            cell_index[:, j] = np.searchsorted(self.grid[j], values[:, j], side='left')
+        # Missing values go to an extra slot per feature that is dropped below
+        cell_index[np.isnan(values)] = cells
+        offsets = cell_index + np.arange(n_features) * (cells + 1)
+        counts = np.bincount(offsets.ravel(), minlength=n_features * (cells + 1))
+        return counts.reshape(n_features, cells + 1)[:, :cells].astype(np.float64)
+
+    def category_counts(self, column: str, values: pd.Series) -> np.ndarray:
+        """Counts over the reference categories plus one slot for unseen values."""
+        categories, _ = self.categorical[column]
+        codes = pd.Index(categories).get_indexer(values.astype(str))
+        codes = np.where(codes < 0, len(categories), codes)
+        return np.bincount(codes, minlength=len(categories) + 1).astype(np.float64)
+
+    def bucket_counts(self, cell_counts: np.ndarray) -> np.ndarray:
+        """Merge adjacent cells into the PSI buckets."""
+        return cell_counts.reshape(cell_counts.shape[0], self.buckets, -1).sum(axis=2)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        categorical = {
+            column: [list(map(str, categories)), counts.tolist()]
+            for column, (categories, counts) in self.categorical.items()
+        }
+        tmp_path = path.with_suffix('.tmp.npz')
+        np.savez(
+            tmp_path, grid=self.grid, counts=self.counts,
+            meta=np.array(json.dumps({
+                'version': self.version,
+                'numeric_columns': self.numeric_columns,
+                'buckets': self.buckets,
+                'categorical': categorical
+            }))
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ReferenceProfile":
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(
+                version=meta['version'],
+                numeric_columns=meta['numeric_columns'],
+                grid=data['grid'],
+                counts=data['counts'],
+                buckets=meta['buckets'],
+                categorical={
+                    column: (categories, np.asarray(counts, dtype=np.float64))
+                    for column, (categories, counts) in meta['categorical'].items()
+                }
+            )
+
+
+class DriftAccumulator:
+    """Running cell counts for a sample of live inputs against one profile."""
+
+    def __init__(self, profile: ReferenceProfile):
+        self.profile = profile
+        self.counts = np.zeros_like(profile.counts)
+        self.category_counts = {
+            column: np.zeros(len(categories) + 1) for column, (categories, _) in profile.categorical.items()
+        }
+        self.rows = 0
+        self.started_at = time.time()
+
+    def update(self, frame: pd.DataFrame) -> None:
+        # Features missing from the frame count as missing values
+        numeric = frame.reindex(columns=self.profile.numeric_columns).apply(pd.to_numeric, errors='coerce')
+        self.counts += self.profile.cell_counts(numeric.to_numpy(dtype=np.float64))
+        for column in self.category_counts:
+            if column in frame.columns:
+                self.category_counts[column] += self.profile.category_counts(column, frame[column])
+        self.rows += len(frame)
+
+
+def compare(profile: ReferenceProfile, cell_counts: np.ndarray,
+            category_counts: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Dict[str, float]]:
+    """PSI (and KS for numeric features) of observed counts against the profile."""
+    scores: Dict[str, Dict[str, float]] = {}
+    if profile.numeric_columns:
+        psi = psi_from_counts(profile.bucket_counts(profile.counts), profile.bucket_counts(cell_counts))
+        ks = ks_from_counts(profile.counts, cell_counts)
+        observed = cell_counts.sum(axis=1) > 0
+        for j in np.flatnonzero(observed):
+            scores[profile.numeric_columns[j]] = {'psi': float(psi[j]), 'ks': float(ks[j])}
+
+    for column, counts in (category_counts or {}).items():
+        if counts.sum() == 0:
+            continue
+        _, reference = profile.categorical[column]
+        scores[column] = {'psi': float(psi_from_counts(np.append(reference, 0), counts))}
+    return scores
+
+
+class DriftEngine:
+    """Reference profiles and live-input windows for every monitored model."""
+
+    def __init__(self, cache_dir: str, buckets: int = 10, cells: int = 100,
+                 sample_rate: float = 0.1, seed: Optional[int] = None):
+        """
+        Initialize engine.
+
+        Args:
+            cache_dir: Directory for cached reference profiles
+            buckets: PSI buckets per feature
+            cells: Quantile cells per feature (KS resolution)
+            sample_rate: Fraction of live inference rows kept in the window
+            seed: Seed for row sampling
+        """
+        self.cache_dir = Path(cache_dir)
+        self.buckets = buckets
+        self.cells = cells
+        self.sample_rate = sample_rate
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.RLock()
+        self._profiles: Dict[str, ReferenceProfile] = {}
+        self._windows: Dict[str, DriftAccumulator] = {}
+
+    def _profile_path(self, model_name: str) -> Path:
+        return self.cache_dir / f"{model_name}_reference_profile.npz"
+
+    def reference_profile(self, model_name: str, version: str,
+                          loader: Callable[[], Optional[pd.DataFrame]]) -> Optional[ReferenceProfile]:
+        """
+        Profile for ``model_name`` at ``version``.
+
+        Served from memory, then from the on-disk cache, and only rebuilt
+        from ``loader`` when the version changes.
+        """
+        with self._lock:
+            profile = self._profiles.get(model_name)
+            if profile is not None and profile.version == version:
+                return profile
+
+            path = self._profile_path(model_name)
+            if path.exists():
+                try:
+                    cached = ReferenceProfile.load(path)
+                    if cached.version == version and cached.buckets == self.buckets and cached.cells == self.cells:
+                        self._set_profile(model_name, cached)
+                        return cached
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable drift profile for {model_name}: {e}")
+
+            reference = loader()
+            if reference is None:
+                return None
+            profile = ReferenceProfile.build(reference, version, self.buckets, self.cells)
+            profile.save(path)
+            self._set_profile(model_name, profile)
+            logger.info(f"Built drift reference profile for {model_name} ({version})")
+            return profile
+
+    def _set_profile(self, model_name: str, profile: ReferenceProfile) -> None:
+        self._profiles[model_name] = profile
+        window = self._windows.get(model_name)
+        if window is not None and window.profile is not profile:
+            # Counts against the old grid are not comparable
+            self._windows[model_name] = DriftAccumulator(profile)
+
+    def build_profile(self, reference: pd.DataFrame) -> ReferenceProfile:
+        """Uncached profile for ad-hoc reference data."""
+        return ReferenceProfile.build(reference, "", self.buckets, self.cells)
+
+    def score(self, profile: ReferenceProfile, frame: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+        """PSI/KS for every feature of ``frame`` in one pass."""
+        accumulator = DriftAccumulator(profile)
+        accumulator.update(frame)
+        return compare(profile, accumulator.counts, accumulator.category_counts)
+
+    def observe(self, model_name: str, frame: pd.DataFrame) -> int:
+        """Add a random sample of live inputs to the model's window. Returns rows kept."""
+        with self._lock:
+            profile = self._profiles.get(model_name)
+            if profile is None or len(frame) == 0:
+                return 0
+            keep = self._rng.random(len(frame)) < self.sample_rate
+            if not keep.any():
+                return 0
+            window = self._windows.setdefault(model_name, DriftAccumulator(profile))
+            window.update(frame[keep])
+            return int(keep.sum())
+
+    def window(self, model_name: str) -> Optional[DriftAccumulator]:
+        with self._lock:
+            return self._windows.get(model_name)
+
+    def close_window(self, model_name: str, min_rows: int = 0) -> Optional[DriftAccumulator]:
+        """
+        Detach and return the current window, starting a new one.
+
+        Returns None (and keeps the window open) while it has fewer than
+        ``min_rows`` rows.
+        """
+        with self._lock:
+            window = self._windows.get(model_name)
+            if window is None or window.rows < min_rows:
+                return None
+            self._windows[model_name] = DriftAccumulator(window.profile)
+            return window
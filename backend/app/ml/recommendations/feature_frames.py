@@ -0,0 +1,234 @@
+"""
+Vectorized feature extraction for the recommendation models.
+
+This module provides:
+- One DataFrame of profile, goal and investment columns for many users
+- Column-wise risk and life-stage feature frames built from it
+- Feature column orders shared by training and serving
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+RISK_FEATURE_COLUMNS = [
+    'age', 'income_log', 'net_worth_log', 'dependents',
+    'debt_to_income', 'savings_rate', 'emergency_fund_ratio',
+    'num_goals', 'avg_goal_timeline', 'goal_diversity', 'flexible_goals_ratio',
+    'num_investments', 'portfolio_concentration', 'investment_frequency',
+    'stated_risk_tolerance', 'investment_experience_years',
+    'market_timing_score', 'volatility_reaction_score',
+    'retirement_horizon', 'family_stage',
+    'job_stability_score', 'income_stability_score'
+]
+
+LIFE_STAGE_FEATURE_COLUMNS = [
+    'age', 'age_squared', 'marital_status_single', 'marital_status_married', 'dependents',
+    'income_log', 'net_worth_log', 'savings_rate', 'debt_to_income', 'liquid_assets_ratio',
+    'employment_stable', 'income_stable', 'high_income',
+    'investment_experience_advanced', 'risk_tolerance_aggressive',
+    'has_home_goal', 'has_education_goal', 'has_retirement_goal', 'num_goals', 'goal_planning_horizon',
+    'likely_family_planning_age', 'career_building_age', 'peak_earning_age', 'pre_retirement_age',
+    'urban_lifestyle_indicator', 'family_oriented_goals',
+    'marriage_financial_readiness', 'home_purchase_readiness', 'family_financial_readiness'
+]
+
+RISK_TOLERANCE_CODES = {'conservative': 0, 'moderate': 1, 'aggressive': 2}
+EXPERIENCE_YEARS = {'beginner': 1, 'intermediate': 5, 'advanced': 15}
+JOB_STABILITY_SCORES = {'stable': 1.0, 'unstable': 0.3, 'contract': 0.6}
+INCOME_STABILITY_SCORES = {'stable': 1.0, 'variable': 0.6, 'irregular': 0.3}
+
+_PROFILE_NUMERIC = [
+    'age', 'annual_income', 'monthly_expenses', 'liquid_assets', 'net_worth',
+    'debt_to_income_ratio', 'dependents', 'retirement_age_target', 'life_insurance_coverage'
+]
+_PROFILE_CATEGORICAL = [
+    'risk_tolerance', 'investment_experience', 'marital_status',
+    'job_stability', 'income_stability', 'employment_status'
+]
+
+
+def _to_float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+
+def safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise ratio, 0 where the denominator is not positive."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), 0.0)
+
+
+def build_user_frame(user_data: List[Dict[str, Any]], index: Optional[List[str]] = None,
+                     now: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    One row per user of raw profile columns and goal/investment aggregates.
+
+    ``user_data`` items hold ``profile`` and optional ``goals`` and
+    ``investments``. ORM attributes are read once per object; every
+    aggregate is computed column-wise.
+    """
+    now = now or datetime.utcnow()
+    index = list(index) if index is not None else list(range(len(user_data)))
+
+    profiles = []
+    goal_rows = []
+    investment_rows = []
+    for position, data in enumerate(user_data):
+        profile = data['profile']
+        row = {column: _to_float(getattr(profile, column, None)) for column in _PROFILE_NUMERIC}
+        row.update({column: getattr(profile, column, None) for column in _PROFILE_CATEGORICAL})
+        profiles.append(row)
+        for goal in data.get('goals') or []:
+            goal_rows.append((position, goal.goal_type, _to_float(goal.months_remaining),
+                              bool(goal.is_flexible_timeline)))
+        for investment in data.get('investments') or []:
+            updated_at = investment.updated_at
+            investment_rows.append((
+                position,
+                float(investment.current_value or 0),
+                bool(updated_at and (now - updated_at).days < 90)
+            ))
+
+    frame = pd.DataFrame(profiles, columns=_PROFILE_NUMERIC + _PROFILE_CATEGORICAL)
+    positions = pd.RangeIndex(len(user_data))
+
+    goals = pd.DataFrame(goal_rows, columns=['position', 'goal_type', 'months_remaining', 'flexible'])
+    by_goal = goals.groupby('position')
+    frame['num_goals'] = by_goal.size().reindex(positions, fill_value=0).to_numpy()
+    frame['avg_goal_timeline'] = by_goal['months_remaining'].mean().reindex(positions, fill_value=0).to_numpy()
+    frame['goal_diversity'] = by_goal['goal_type'].nunique().reindex(positions, fill_value=0).to_numpy()
+    frame['flexible_goal_count'] = by_goal['flexible'].sum().reindex(positions, fill_value=0).to_numpy()
+    for goal_type in ('home_purchase', 'education', 'retirement'):
+        counts = goals[goals['goal_type'] == goal_type].groupby('position').size()
+        frame[f'{goal_type}_goals'] = counts.reindex(positions, fill_value=0).to_numpy()
+
+    investments = pd.DataFrame(investment_rows, columns=['position', 'value', 'recent'])
+    investments['value_squared'] = investments['value'] ** 2
+    by_investment = investments.groupby('position')
+    frame['num_investments'] = by_investment.size().reindex(positions, fill_value=0).to_numpy()
+    frame['portfolio_value'] = by_investment['value'].sum().reindex(positions, fill_value=0).to_numpy()
+    frame['portfolio_value_squared'] = by_investment['value_squared'].sum().reindex(positions, fill_value=0).to_numpy()
+    frame['recent_investments'] = by_investment['recent'].sum().reindex(positions, fill_value=0).to_numpy()
+
+    frame.index = index
+    return frame
+
+
+def _savings_rate(frame: pd.DataFrame) -> np.ndarray:
+    income = frame['annual_income'].to_numpy()
+    rate = safe_divide(income - frame['monthly_expenses'].to_numpy() * 12, np.nan_to_num(income))
+    return np.clip(rate, 0.0, 1.0)
+
+
+def risk_feature_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Behavioral risk features for every row of a user frame."""
+    age = frame['age'].to_numpy()
+    income = frame['annual_income'].to_numpy()
+    expenses = np.nan_to_num(frame['monthly_expenses'].to_numpy())
+    liquid = np.nan_to_num(frame['liquid_assets'].to_numpy())
+    dependents = frame['dependents'].to_numpy()
+    num_goals = frame['num_goals'].to_numpy()
+    portfolio_value = frame['portfolio_value'].to_numpy()
+    marital_status = frame['marital_status'].to_numpy()
+
+    family_stage = np.select(
+        [age < 25, (age < 35) & (marital_status == 'single'), (age < 45) & (dependents == 0), dependents > 0],
+        [0, 1, 2, 3],
+        default=4
+    )
+
+    features = pd.DataFrame({
+        'age': age,
+        'income_log': np.log1p(income),
+        'net_worth_log': np.log1p(np.maximum(0, frame['net_worth'].to_numpy())),
+        'dependents': dependents,
+        'debt_to_income': frame['debt_to_income_ratio'].to_numpy(),
+        'savings_rate': _savings_rate(frame),
+        'emergency_fund_ratio': np.minimum(2.0, safe_divide(liquid, expenses * 6)),
+        'num_goals': num_goals,
+        'avg_goal_timeline': frame['avg_goal_timeline'].to_numpy(),
+        'goal_diversity': frame['goal_diversity'].to_numpy(),
+        'flexible_goals_ratio': frame['flexible_goal_count'].to_numpy() / np.maximum(1, num_goals),
+        'num_investments': frame['num_investments'].to_numpy(),
+        'portfolio_concentration': safe_divide(frame['portfolio_value_squared'].to_numpy(), portfolio_value ** 2),
+        'investment_frequency': frame['recent_investments'].to_numpy() / np.maximum(1, frame['num_investments'].to_numpy()),
+        'stated_risk_tolerance': frame['risk_tolerance'].map(RISK_TOLERANCE_CODES).fillna(1).to_numpy(),
+        'investment_experience_years': frame['investment_experience'].map(EXPERIENCE_YEARS).fillna(5).to_numpy(),
+        # Need transaction history; neutral until it is available
+        'market_timing_score': 0.5,
+        'volatility_reaction_score': 0.5,
+        'retirement_horizon': np.maximum(0, frame['retirement_age_target'].fillna(65).to_numpy() - age),
+        'family_stage': family_stage,
+        'job_stability_score': frame['job_stability'].map(JOB_STABILITY_SCORES).fillna(0.5).to_numpy(),
+        'income_stability_score': frame['income_stability'].map(INCOME_STABILITY_SCORES).fillna(0.5).to_numpy()
+    }, index=frame.index)
+    return features[RISK_FEATURE_COLUMNS]
+
+
+def life_stage_feature_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Life event features for every row of a user frame."""
+    age = frame['age'].to_numpy()
+    income = frame['annual_income'].to_numpy()
+    expenses = np.nan_to_num(frame['monthly_expenses'].to_numpy())
+    liquid = np.nan_to_num(frame['liquid_assets'].to_numpy())
+    debt_to_income = frame['debt_to_income_ratio'].to_numpy()
+    job_stable = (frame['job_stability'] == 'stable').to_numpy()
+    income_stable = (frame['income_stability'] == 'stable').to_numpy()
+    has_home_goal = frame['home_purchase_goals'].to_numpy() > 0
+    emergency_months = safe_divide(liquid, expenses)
+
+    marriage_readiness = np.mean([
+        np.where(income_stable, 1.0, 0.5),
+        np.minimum(1.0, emergency_months / 3),
+        np.maximum(0, 1.0 - debt_to_income),
+        np.minimum(1.0, income / 50000)
+    ], axis=0)
+    home_readiness = np.mean([
+        np.minimum(1.0, liquid / 80000),
+        np.where(job_stable, 1.0, 0.3),
+        np.maximum(0, 1.0 - debt_to_income / 0.43),
+        np.where(has_home_goal, 1.0, 0.5)
+    ], axis=0)
+    family_readiness = np.mean([
+        np.minimum(1.0, income / 60000),
+        np.minimum(1.0, emergency_months / 6),
+        np.where(np.nan_to_num(frame['life_insurance_coverage'].to_numpy()) > 0, 0.8, 0.3),
+        np.where((frame['employment_status'] == 'employed').to_numpy() & job_stable, 1.0, 0.5)
+    ], axis=0)
+
+    features = pd.DataFrame({
+        'age': age,
+        'age_squared': age ** 2,
+        'marital_status_single': (frame['marital_status'] == 'single').astype(int).to_numpy(),
+        'marital_status_married': (frame['marital_status'] == 'married').astype(int).to_numpy(),
+        'dependents': frame['dependents'].to_numpy(),
+        'income_log': np.log1p(income),
+        'net_worth_log': np.log1p(np.maximum(0, frame['net_worth'].to_numpy())),
+        'savings_rate': _savings_rate(frame),
+        'debt_to_income': debt_to_income,
+        'liquid_assets_ratio': safe_divide(liquid, np.nan_to_num(income)),
+        'employment_stable': job_stable.astype(int),
+        'income_stable': income_stable.astype(int),
+        'high_income': (income > 100000).astype(int),
+        'investment_experience_advanced': (frame['investment_experience'] == 'advanced').astype(int).to_numpy(),
+        'risk_tolerance_aggressive': (frame['risk_tolerance'] == 'aggressive').astype(int).to_numpy(),
+        'has_home_goal': has_home_goal.astype(int),
+        'has_education_goal': (frame['education_goals'].to_numpy() > 0).astype(int),
+        'has_retirement_goal': (frame['retirement_goals'].to_numpy() > 0).astype(int),
+        'num_goals': frame['num_goals'].to_numpy(),
+        'goal_planning_horizon': frame['avg_goal_timeline'].to_numpy(),
+        'likely_family_planning_age': ((age >= 25) & (age <= 40)).astype(int),
+        'career_building_age': ((age >= 22) & (age <= 35)).astype(int),
+        'peak_earning_age': ((age >= 35) & (age <= 55)).astype(int),
+        'pre_retirement_age': ((age >= 50) & (age <= 65)).astype(int),
+        'urban_lifestyle_indicator': ((income > 75000) & (age < 40)).astype(int),
+        'family_oriented_goals': frame['home_purchase_goals'].to_numpy() + frame['education_goals'].to_numpy(),
+        'marriage_financial_readiness': marriage_readiness,
+        'home_purchase_readiness': home_readiness,
+        'family_financial_readiness': family_readiness
+    }, index=frame.index)
+    return features[LIFE_STAGE_FEATURE_COLUMNS]
@@ -0,0 +1,229 @@
+"""
+Persisted user feature store for peer similarity lookups.
+
+This module provides:
+- A float32 feature matrix and user-id array written at training time
+- Memory-mapped serving, so lookups never scan the database
+- Vectorized cosine k-nearest-neighbour search
+- Incremental upserts for changed profiles, merged on compaction
+"""
+
+import json
+import logging
+import os
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class UserFeatureStore:
+    """Feature matrix, peer metrics and labels for every trained user."""
+
+    FEATURES_FILE = "features.npy"
+    METRICS_FILE = "metrics.npy"
+    USER_IDS_FILE = "user_ids.npy"
+    META_FILE = "meta.json"
+
+    def __init__(self, store_path: str, metric_columns: Iterable[str], label_columns: Iterable[str]):
+        self.store_path = Path(store_path)
+        self.metric_columns = list(metric_columns)
+        self.label_columns = list(label_columns)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._features = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._metrics = np.zeros((0, len(self.metric_columns)), dtype=np.float32)
+        self._user_ids = np.zeros(0, dtype=str)
+        self._labels: List[Dict[str, Any]] = []
+        self._row_index: Dict[str, int] = {}
+        self._stale = np.zeros(0, dtype=bool)
+        # Upserts since the last compaction, keyed by user id
+        self._delta: Dict[str, Tuple[np.ndarray, np.ndarray, Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int((~self._stale).sum()) + len(self._delta)
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._delta or (
+                user_id in self._row_index and not self._stale[self._row_index[user_id]]
+            )
+
+    @property
+    def dimension(self) -> int:
+        return self._features.shape[1]
+
+    def load(self) -> bool:
+        """Memory-map a previously built store. Returns False if none exists."""
+        if not (self.store_path / self.FEATURES_FILE).exists():
+            return False
+
+        with self._lock:
+            self._reset()
+            self._features = np.load(self.store_path / self.FEATURES_FILE, mmap_mode='r')
+            self._metrics = np.load(self.store_path / self.METRICS_FILE, mmap_mode='r')
+            self._user_ids = np.load(self.store_path / self.USER_IDS_FILE)
+            with open(self.store_path / self.META_FILE) as f:
+                self._labels = json.load(f)['labels']
+            self._norms = np.linalg.norm(self._features, axis=1).astype(np.float32)
+            self._row_index = {user_id: row for row, user_id in enumerate(self._user_ids.tolist())}
+            self._stale = np.zeros(len(self._user_ids), dtype=bool)
+
+        logger.info(f"Loaded feature store with {len(self._user_ids)} users")
+        return True
+
+    def build(self, user_ids: List[str], features: np.ndarray, metrics: np.ndarray,
+              labels: List[Dict[str, Any]]) -> None:
+        """Replace the store contents and persist them."""
+        with self._lock:
+            self._write(
+                np.asarray(user_ids, dtype=str),
+                np.asarray(features, dtype=np.float32),
+                np.asarray(metrics, dtype=np.float32),
+                list(labels)
+            )
+            self.load()
+
+    def compact(self) -> None:
+        """Merge pending upserts into the persisted matrix."""
+        with self._lock:
+            if not self._delta and not self._stale.any():
+                return
+            keep = ~self._stale
+            delta_ids = list(self._delta)
+            dimension = self.dimension or (len(next(iter(self._delta.values()))[0]) if self._delta else 0)
+
+            user_ids = np.concatenate([self._user_ids[keep], np.asarray(delta_ids, dtype=str)])
+            features = np.vstack([
+                np.asarray(self._features[keep], dtype=np.float32).reshape(-1, dimension),
+                np.asarray([self._delta[u][0] for u in delta_ids], dtype=np.float32).reshape(-1, dimension)
+            ])
+            metrics = np.vstack([
+                np.asarray(self._metrics[keep], dtype=np.float32).reshape(-1, len(self.metric_columns)),
+                np.asarray([self._delta[u][1] for u in delta_ids], dtype=np.float32).reshape(-1, len(self.metric_columns))
+            ])
+            labels = [label for label, k in zip(self._labels, keep) if k] + [self._delta[u][2] for u in delta_ids]
+
+            self._write(user_ids, features, metrics, labels)
+            self.load()
+
+    def _write(self, user_ids: np.ndarray, features: np.ndarray, metrics: np.ndarray,
+               labels: List[Dict[str, Any]]) -> None:
+        self.store_path.mkdir(parents=True, exist_ok=True)
+        # Drop the maps on the old files before replacing them
+        self._features = np.zeros((0, features.shape[1] if features.ndim == 2 else 0), dtype=np.float32)
+        self._metrics = np.zeros((0, len(self.metric_columns)), dtype=np.float32)
+
+        for name, array in ((self.FEATURES_FILE, features), (self.METRICS_FILE, metrics),
+                            (self.USER_IDS_FILE, user_ids)):
+            tmp_path = self.store_path / f"{name}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, self.store_path / name)
+
+        tmp_path = self.store_path / f"{self.META_FILE}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'metric_columns': self.metric_columns,
+                'label_columns': self.label_columns,
+                'labels': labels
+            }, f)
+        os.replace(tmp_path, self.store_path / self.META_FILE)
+
+    def upsert(self, user_id: str, features: np.ndarray, metrics: np.ndarray,
+               labels: Dict[str, Any]) -> None:
+        """Add or replace one user's vector until the next compaction."""
+        features = np.asarray(features, dtype=np.float32).ravel()
+        if self.dimension and features.shape[0] != self.dimension:
+            raise ValueError(f"Expected {self.dimension} features, got {features.shape[0]}")
+
+        with self._lock:
+            row = self._row_index.get(user_id)
+            if row is not None:
+                self._stale[row] = True
+            self._delta[user_id] = (features, np.asarray(metrics, dtype=np.float32).ravel(), dict(labels))
+
+    def upsert_many(self, user_ids: List[str], features: np.ndarray, metrics: np.ndarray,
+                    labels: List[Dict[str, Any]]) -> None:
+        """Upsert a batch of users (rows of ``features`` and ``metrics``) under one lock."""
+        features = np.asarray(features, dtype=np.float32)
+        metrics = np.asarray(metrics, dtype=np.float32)
+        with self._lock:
+            for row, user_id in enumerate(user_ids):
+                self.upsert(user_id, features[row], metrics[row], labels[row])
+
+    def user_ids(self) -> List[str]:
+        """Ids of every stored user, including pending upserts."""
+        with self._lock:
+            return self._user_ids[~self._stale].tolist() + list(self._delta)
+
+    def remove(self, user_id: str) -> None:
+        with self._lock:
+            self._delta.pop(user_id, None)
+            row = self._row_index.get(user_id)
+            if row is not None:
+                self._stale[row] = True
+
+    def get_vector(self, user_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            if user_id in self._delta:
+                return self._delta[user_id][0]
+            row = self._row_index.get(user_id)
+            if row is None or self._stale[row]:
+                return None
+            return np.asarray(self._features[row])
+
+    def get_record(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Peer metrics and labels for one user."""
+        with self._lock:
+            if user_id in self._delta:
+                _, metrics, labels = self._delta[user_id]
+            else:
+                row = self._row_index.get(user_id)
+                if row is None or self._stale[row]:
+                    return None
+                metrics, labels = self._metrics[row], self._labels[row]
+            record = {column: float(value) for column, value in zip(self.metric_columns, metrics)}
+            record.update(labels)
+            return record
+
+    def nearest(self, vector: np.ndarray, k: int,
+                exclude: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k users by cosine similarity to ``vector``.
+
+        One matrix-vector product over the mapped matrix plus the pending
+        upserts, then a partial sort of the candidates.
+        """
+        query = np.asarray(vector, dtype=np.float32).ravel()
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0 or k <= 0:
+            return []
+        exclude = set(exclude or ())
+
+        with self._lock:
+            candidates: List[Tuple[str, float]] = []
+            if len(self._user_ids):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    scores = (self._features @ query) / (self._norms * query_norm)
+                scores = np.where(self._stale | ~np.isfinite(scores), -np.inf, scores)
+                take = min(len(scores), k + len(exclude))
+                top = np.argpartition(-scores, take - 1)[:take]
+                candidates.extend(
+                    (str(self._user_ids[row]), float(scores[row]))
+                    for row in top if np.isfinite(scores[row])
+                )
+            for user_id, (features, _, _) in self._delta.items():
+                norm = float(np.linalg.norm(features))
+                if norm > 0:
+                    candidates.append((user_id, float(features @ query) / (norm * query_norm)))
+
+        candidates = [c for c in candidates if c[0] not in exclude]
+        candidates.sort(key=lambda c: c[1], reverse=True)
+        return candidates[:k]
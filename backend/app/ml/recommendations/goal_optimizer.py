@@ -25,6 +25,7 @@ from app.models.user import User
 from app.models.financial_profile import FinancialProfile
 from app.models.goal import Goal
 from app.database.base import SessionLocal
+from .user_snapshot import UserSnapshot, user_scope
 
 logger = logging.getLogger(__name__)
 
@@ -300,83 +301,91 @@ class GoalOptimizer:
         
         return training_data
     
-    def optimize_goals(self, user_id: str) -> Dict[str, Any]:
+    def optimize_goals(self, user_id: str, snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Generate goal optimization recommendations for a user."""
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
+            with user_scope(user_id, snapshot) as user:
                 if not user or not user.financial_profile:
                     return {"error": "User or financial profile not found"}
                 
-                active_goals = [g for g in user.goals if g.status == 'active']
-                if not active_goals:
-                    return {"recommendations": [], "message": "No active goals found"}
-                
-                # Prepare user data
-                user_data = [{
-                    'profile': user.financial_profile,
-                    'goals': active_goals
-                }]
-                
-                df = self._prepare_features(user_data)
-                df_processed = self._encode_categorical_features(df, fit=False)
-                df_processed = self._scale_features(df_processed, fit=False)
-                
-                feature_cols = [col for col in df_processed.columns 
-                               if not col.startswith('optimal_')]
-                X = df_processed[feature_cols]
-                
-                recommendations = []
-                
-                for i, goal in enumerate(active_goals):
-                    goal_features = X.iloc[i:i+1]
-                    
-                    # Get predictions
-                    if self.contribution_model:
-                        optimal_contribution = self.contribution_model.predict(goal_features)[0]
-                    else:
-                        optimal_contribution = goal.required_monthly_contribution
-                    
-                    if self.timeline_model:
-                        optimal_timeline = self.timeline_model.predict(goal_features)[0]
-                    else:
-                        optimal_timeline = goal.months_remaining
-                    
-                    if self.priority_model:
-                        optimal_priority = self.priority_model.predict(goal_features)[0]
-                    else:
-                        optimal_priority = goal.priority
-                    
-                    # Generate recommendations
-                    rec = {
-                        'goal_id': str(goal.id),
-                        'goal_name': goal.name,
-                        'current_monthly_contribution': float(goal.monthly_contribution or 0),
-                        'recommended_monthly_contribution': max(0, float(optimal_contribution)),
-                        'current_timeline_months': goal.months_remaining,
-                        'recommended_timeline_months': max(1, int(optimal_timeline)),
-                        'current_priority': goal.priority,
-                        'recommended_priority': max(1, min(10, int(optimal_priority))),
-                        'confidence_score': 0.85,  # Would be calculated based on model certainty
-                        'reasoning': self._generate_reasoning(goal, optimal_contribution, optimal_timeline, optimal_priority)
-                    }
-                    
-                    recommendations.append(rec)
-                
-                # Sort by priority
-                recommendations.sort(key=lambda x: x['recommended_priority'])
-                
-                return {
-                    'recommendations': recommendations,
-                    'total_monthly_recommendation': sum(r['recommended_monthly_contribution'] for r in recommendations),
-                    'available_monthly_budget': user.financial_profile.annual_income / 12 - user.financial_profile.monthly_expenses,
-                    'optimization_score': self._calculate_optimization_score(recommendations, user.financial_profile)
-                }
+                return self.optimize_goals_batch({user_id: user})[user_id]
                 
         except Exception as e:
             logger.error(f"Failed to optimize goals for user {user_id}: {e}")
             return {"error": str(e)}
     
+    def optimize_goals_batch(self, users: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Generate goal recommendations for many users with one call per model."""
+        active_goals = {
+            user_id: [g for g in (user.goals or []) if g.status == 'active']
+            for user_id, user in users.items()
+        }
+        results = {
+            user_id: {"recommendations": [], "message": "No active goals found"}
+            for user_id, goals in active_goals.items() if not goals
+        }
+        scored_users = [user_id for user_id in users if active_goals[user_id]]
+        if not scored_users:
+            return results
+        
+        # One feature row per active goal, users in order
+        user_data = [
+            {'profile': users[user_id].financial_profile, 'goals': active_goals[user_id]}
+            for user_id in scored_users
+        ]
+        
+        df = self._prepare_features(user_data)
+        df_processed = self._encode_categorical_features(df, fit=False)
+        df_processed = self._scale_features(df_processed, fit=False)
+        
+        feature_cols = [col for col in df_processed.columns 
+                       if not col.startswith('optimal_')]
+        X = df_processed[feature_cols]
+        
+        # Get predictions
+        contributions = self.contribution_model.predict(X) if self.contribution_model else None
+        timelines = self.timeline_model.predict(X) if self.timeline_model else None
+        priorities = self.priority_model.predict(X) if self.priority_model else None
+        
+        row = 0
+        for user_id in scored_users:
+            profile = users[user_id].financial_profile
+            recommendations = []
+            
+            for goal in active_goals[user_id]:
+                optimal_contribution = contributions[row] if contributions is not None else goal.required_monthly_contribution
+                optimal_timeline = timelines[row] if timelines is not None else goal.months_remaining
+                optimal_priority = priorities[row] if priorities is not None else goal.priority
+                row += 1
+                
+                # Generate recommendations
+                rec = {
+                    'goal_id': str(goal.id),
+                    'goal_name': goal.name,
+                    'current_monthly_contribution': float(goal.monthly_contribution or 0),
+                    'recommended_monthly_contribution': max(0, float(optimal_contribution)),
+                    'current_timeline_months': goal.months_remaining,
+                    'recommended_timeline_months': max(1, int(optimal_timeline)),
+                    'current_priority': goal.priority,
+                    'recommended_priority': max(1, min(10, int(optimal_priority))),
+                    'confidence_score': 0.85,  # Would be calculated based on model certainty
+                    'reasoning': self._generate_reasoning(goal, optimal_contribution, optimal_timeline, optimal_priority)
+                }
+                
+                recommendations.append(rec)
+            
+            # Sort by priority
+            recommendations.sort(key=lambda x: x['recommended_priority'])
+            
+            results[user_id] = {
+                'recommendations': recommendations,
+                'total_monthly_recommendation': sum(r['recommended_monthly_contribution'] for r in recommendations),
+                'available_monthly_budget': profile.annual_income / 12 - profile.monthly_expenses,
+                'optimization_score': self._calculate_optimization_score(recommendations, profile)
+            }
+        
+        return results
+    
     def _generate_reasoning(self, goal: Goal, optimal_contribution: float, 
                            optimal_timeline: float, optimal_priority: float) -> List[str]:
         """Generate human-readable reasoning for recommendations."""
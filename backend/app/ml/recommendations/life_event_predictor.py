@@ -14,7 +14,7 @@ import logging
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta, date
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Callable
 import xgboost as xgb
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler, LabelEncoder
@@ -28,6 +28,9 @@ from app.models.user import User
 from app.models.financial_profile import FinancialProfile
 from app.models.goal import Goal
 from app.database.base import SessionLocal
+from .user_snapshot import UserSnapshot, user_scope
+from .feature_frames import build_user_frame, life_stage_feature_frame
+from .model_server import model_registry
 
 logger = logging.getLogger(__name__)
 
@@ -35,12 +38,21 @@ logger = logging.getLogger(__name__)
 class LifeEventPredictor:
     """ML-powered life event prediction and financial impact analysis."""
     
+    MODEL_FILES = {
+        'event_models': 'event_models.pkl',
+        'impact_models': 'impact_models.pkl',
+        'scalers': 'scalers.pkl',
+        'encoders': 'encoders.pkl'
+    }
+    
     def __init__(self, model_path: Optional[str] = None):
         self.model_path = model_path or "/app/ml/models/life_event_predictor"
         self.event_models = {}
         self.impact_models = {}
         self.scalers = {}
         self.encoders = {}
+        self._model_version = None
+        self._training_observers: List[Callable[[pd.DataFrame], Any]] = []
         
         # Life events to predict
         self.life_events = {
@@ -75,19 +87,33 @@ class LifeEventPredictor:
         }
         
         self._load_models()
+        self.event_batcher = model_registry.batcher(
+            f"life_event_models:{Path(self.model_path).resolve()}", self._predict_event_proba
+        )
+    
+    def add_training_observer(self, callback: Callable[[pd.DataFrame], Any]) -> None:
+        """Call ``callback`` with the raw feature frame each newly trained model was fit on."""
+        if callback not in self._training_observers:
+            self._training_observers.append(callback)
+    
+    def _notify_trained(self, features: pd.DataFrame) -> None:
+        for callback in self._training_observers:
+            try:
+                callback(features)
+            except Exception as e:
+                logger.warning(f"Training observer failed: {e}")
     
     def _load_models(self) -> None:
-        """Load pre-trained life event prediction models."""
-        try:
-            model_dir = Path(self.model_path)
-            if model_dir.exists():
-                self.event_models = joblib.load(model_dir / "event_models.pkl")
-                self.impact_models = joblib.load(model_dir / "impact_models.pkl")
-                self.scalers = joblib.load(model_dir / "scalers.pkl")
-                self.encoders = joblib.load(model_dir / "encoders.pkl")
-                logger.info("Loaded pre-trained life event prediction models")
-        except Exception as e:
-            logger.warning(f"Could not load pre-trained models: {e}")
+        """Use the process-wide copy of the pre-trained models, reloaded when files change."""
+        bundle = model_registry.load_bundle(self.model_path, self.MODEL_FILES)
+        if bundle is None or bundle.version == self._model_version:
+            return
+        
+        self.event_models = bundle.get('event_models', {})
+        self.impact_models = bundle.get('impact_models', {})
+        self.scalers = bundle.get('scalers', {})
+        self.encoders = bundle.get('encoders', {})
+        self._model_version = bundle.version
     
     def _save_models(self) -> None:
         """Save trained models."""
@@ -100,62 +126,13 @@ class LifeEventPredictor:
             joblib.dump(self.scalers, model_dir / "scalers.pkl")
             joblib.dump(self.encoders, model_dir / "encoders.pkl")
             logger.info("Saved life event prediction models")
+            model_registry.invalidate(self.model_path)
         except Exception as e:
             logger.error(f"Failed to save models: {e}")
     
     def _extract_life_stage_features(self, user_data: Dict) -> Dict[str, float]:
-        """Extract features for life event prediction."""
-        profile = user_data['profile']
-        goals = user_data.get('goals', [])
-        
-        features = {
-            # Demographics
-            'age': profile.age,
-            'age_squared': profile.age ** 2,
-            'marital_status_single': 1 if profile.marital_status == 'single' else 0,
-            'marital_status_married': 1 if profile.marital_status == 'married' else 0,
-            'dependents': profile.dependents,
-            
-            # Financial indicators
-            'income_log': np.log1p(float(profile.annual_income)),
-            'net_worth_log': np.log1p(max(0, profile.net_worth)),
-            'savings_rate': self._calculate_savings_rate(profile),
-            'debt_to_income': profile.debt_to_income_ratio,
-            'liquid_assets_ratio': float(profile.liquid_assets or 0) / float(profile.annual_income),
-            
-            # Employment and stability
-            'employment_stable': 1 if profile.job_stability == 'stable' else 0,
-            'income_stable': 1 if profile.income_stability == 'stable' else 0,
-            'high_income': 1 if float(profile.annual_income) > 100000 else 0,
-            
-            # Investment and planning behavior
-            'investment_experience_advanced': 1 if profile.investment_experience == 'advanced' else 0,
-            'risk_tolerance_aggressive': 1 if profile.risk_tolerance == 'aggressive' else 0,
-            
-            # Goal patterns
-            'has_home_goal': 1 if any(g.goal_type == 'home_purchase' for g in goals) else 0,
-            'has_education_goal': 1 if any(g.goal_type == 'education' for g in goals) else 0,
-            'has_retirement_goal': 1 if any(g.goal_type == 'retirement' for g in goals) else 0,
-            'num_goals': len(goals),
-            'goal_planning_horizon': np.mean([g.months_remaining for g in goals]) if goals else 0,
-            
-            # Life stage indicators
-            'likely_family_planning_age': 1 if 25 <= profile.age <= 40 else 0,
-            'career_building_age': 1 if 22 <= profile.age <= 35 else 0,
-            'peak_earning_age': 1 if 35 <= profile.age <= 55 else 0,
-            'pre_retirement_age': 1 if 50 <= profile.age <= 65 else 0,
-            
-            # Location and lifestyle (derived from goals and income)
-            'urban_lifestyle_indicator': 1 if float(profile.annual_income) > 75000 and profile.age < 40 else 0,
-            'family_oriented_goals': len([g for g in goals if g.goal_type in ['education', 'home_purchase']]),
-            
-            # Financial readiness scores
-            'marriage_financial_readiness': self._calculate_marriage_readiness(profile),
-            'home_purchase_readiness': self._calculate_home_purchase_readiness(profile, goals),
-            'family_financial_readiness': self._calculate_family_readiness(profile)
-        }
-        
-        return features
+        """Extract life event features for a single user."""
+        return life_stage_feature_frame(build_user_frame([user_data])).iloc[0].to_dict()
     
     def _calculate_savings_rate(self, profile: FinancialProfile) -> float:
         """Calculate savings rate."""
@@ -241,25 +218,16 @@ class LifeEventPredictor:
             return self._create_synthetic_training_data()
         
         # Extract features
-        features_list = []
-        labels = {}
-        
-        for event in self.life_events.keys():
-            labels[event] = []
+        features = life_stage_feature_frame(build_user_frame(training_data))
+        df = features.fillna(features.median())
         
+        # Generate synthetic labels based on life stage patterns
+        labels = {event: [] for event in self.life_events.keys()}
         for user_data in training_data:
-            features = self._extract_life_stage_features(user_data)
-            features_list.append(features)
-            
-            # Generate synthetic labels based on life stage patterns
             synthetic_labels = self._generate_synthetic_labels(user_data)
             for event in self.life_events.keys():
                 labels[event].append(synthetic_labels.get(event, 0))
         
-        # Convert to DataFrame
-        df = pd.DataFrame(features_list)
-        df = df.fillna(df.median())
-        
         # Scale features
         scaler = StandardScaler()
         X_scaled = scaler.fit_transform(df)
@@ -302,6 +270,7 @@ class LifeEventPredictor:
         
         # Save models
         self._save_models()
+        self._notify_trained(features)
         
         logger.info(f"Life event models trained successfully: {metrics}")
         return metrics
@@ -428,81 +397,125 @@ class LifeEventPredictor:
         
         return RuleBasedModel(event_name)
     
-    def predict_life_events(self, user_id: str) -> Dict[str, Any]:
+    def predict_life_events(self, user_id: str, snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Predict life events for a user."""
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
+            with user_scope(user_id, snapshot) as user:
                 if not user or not user.financial_profile:
                     return {"error": "User or financial profile not found"}
                 
-                # Extract features
-                user_data = {
-                    'profile': user.financial_profile,
-                    'goals': user.goals or []
-                }
-                
-                features = self._extract_life_stage_features(user_data)
-                
-                # Convert to array and scale
-                feature_df = pd.DataFrame([features])
-                feature_df = feature_df.fillna(feature_df.median())
-                
-                if 'life_events' in self.scalers:
-                    X_scaled = self.scalers['life_events'].transform(feature_df)
-                else:
-                    X_scaled = feature_df.values
-                
-                # Make predictions for each event
-                predictions = {}
-                
-                for event_name, model in self.event_models.items():
-                    try:
-                        probabilities = model.predict_proba(X_scaled)[0]
-                        event_probability = probabilities[1] if len(probabilities) > 1 else probabilities[0]
-                        
-                        # Calculate timeline prediction
-                        timeline = self._predict_event_timeline(event_name, event_probability, user.financial_profile)
-                        
-                        # Calculate financial impact
-                        financial_impact = self._predict_financial_impact(event_name, user.financial_profile)
-                        
-                        # Generate preparation recommendations
-                        preparations = self._generate_preparation_recommendations(
-                            event_name, event_probability, user.financial_profile, user.goals
-                        )
-                        
-                        predictions[event_name] = {
-                            'probability': float(event_probability),
-                            'likelihood': self._categorize_probability(event_probability),
-                            'predicted_timeline': timeline,
-                            'financial_impact': financial_impact,
-                            'preparation_recommendations': preparations,
-                            'confidence_score': min(0.8, event_probability * 1.2)  # Conservative confidence
-                        }
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to predict {event_name}: {e}")
-                        predictions[event_name] = {
-                            'probability': 0.0,
-                            'likelihood': 'unknown',
-                            'error': str(e)
-                        }
-                
-                # Generate overall life planning insights
-                planning_insights = self._generate_life_planning_insights(predictions, user.financial_profile)
-                
-                return {
-                    'user_id': user_id,
-                    'predictions': predictions,
-                    'planning_insights': planning_insights,
-                    'next_review_date': (datetime.now() + timedelta(days=180)).isoformat()
-                }
+                return self.predict_life_events_batch({user_id: user})[user_id]
                 
         except Exception as e:
             logger.error(f"Failed to predict life events for user {user_id}: {e}")
             return {"error": str(e)}
     
+    def predict_life_events_batch(self, users: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Predict life events for many users with one call per event model."""
+        user_ids = list(users)
+        
+        # Extract features for all users at once
+        feature_df = life_stage_feature_frame(build_user_frame([
+            {
+                'profile': users[user_id].financial_profile,
+                'goals': users[user_id].goals or []
+            }
+            for user_id in user_ids
+        ], index=user_ids))
+        
+        # Score every user once per event model; models served from disk are
+        # shared with concurrent requests through the batcher
+        self._load_models()
+        event_names = list(self.life_events.keys())
+        if self._model_version is not None:
+            scores_matrix = self.event_batcher.predict(feature_df)
+        else:
+            scores_matrix = self._predict_event_proba(feature_df)
+        
+        event_probabilities = {}
+        for column, event_name in enumerate(event_names):
+            if event_name not in self.event_models:
+                continue
+            scores = scores_matrix[:, column]
+            if np.isnan(scores).any():
+                event_probabilities[event_name] = RuntimeError(f"{event_name} model failed to score")
+            else:
+                event_probabilities[event_name] = scores
+        
+        results = {}
+        for i, user_id in enumerate(user_ids):
+            user = users[user_id]
+            predictions = {}
+            
+            for event_name, scores in event_probabilities.items():
+                try:
+                    if isinstance(scores, Exception):
+                        raise scores
+                    
+                    event_probability = scores[i]
+                    
+                    # Calculate timeline prediction
+                    timeline = self._predict_event_timeline(event_name, event_probability, user.financial_profile)
+                    
+                    # Calculate financial impact
+                    financial_impact = self._predict_financial_impact(event_name, user.financial_profile)
+                    
+                    # Generate preparation recommendations
+                    preparations = self._generate_preparation_recommendations(
+                        event_name, event_probability, user.financial_profile, user.goals
+                    )
+                    
+                    predictions[event_name] = {
+                        'probability': float(event_probability),
+                        'likelihood': self._categorize_probability(event_probability),
+                        'predicted_timeline': timeline,
+                        'financial_impact': financial_impact,
+                        'preparation_recommendations': preparations,
+                        'confidence_score': min(0.8, event_probability * 1.2)  # Conservative confidence
+                    }
+                    
+                except Exception as e:
+                    logger.error(f"Failed to predict {event_name}: {e}")
+                    predictions[event_name] = {
+                        'probability': 0.0,
+                        'likelihood': 'unknown',
+                        'error': str(e)
+                    }
+            
+            # Generate overall life planning insights
+            planning_insights = self._generate_life_planning_insights(predictions, user.financial_profile)
+            
+            results[user_id] = {
+                'user_id': user_id,
+                'predictions': predictions,
+                'planning_insights': planning_insights,
+                'next_review_date': (datetime.now() + timedelta(days=180)).isoformat()
+            }
+        
+        return results
+    
+    def _predict_event_proba(self, feature_df: pd.DataFrame) -> np.ndarray:
+        """Probability of each life event (columns in ``life_events`` order) for a batch of rows."""
+        if self._model_version is not None:
+            self._load_models()
+        
+        if 'life_events' in self.scalers:
+            X_scaled = self.scalers['life_events'].transform(feature_df)
+        else:
+            X_scaled = feature_df.values
+        
+        scores = np.full((len(feature_df), len(self.life_events)), np.nan)
+        for column, event_name in enumerate(self.life_events.keys()):
+            model = self.event_models.get(event_name)
+            if model is None:
+                continue
+            try:
+                probabilities = model.predict_proba(X_scaled)
+                scores[:, column] = probabilities[:, 1] if probabilities.shape[1] > 1 else probabilities[:, 0]
+            except Exception as e:
+                logger.error(f"Failed to score {event_name} model: {e}")
+        return scores
+    
     def _categorize_probability(self, probability: float) -> str:
         """Categorize probability into likelihood levels."""
         if probability >= 0.7:
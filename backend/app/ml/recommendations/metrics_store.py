@@ -0,0 +1,421 @@
+"""
+Append-only time-series store for model monitoring history.
+
+This module provides:
+- A SQLite (WAL) store for metric observations, drift checks and alerts
+- Buffered appends written in one transaction per batch
+- One-shot imports committed together with a completion marker
+- Retention-based compaction of old rows
+- Vectorized per-metric trend statistics
+"""
+
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+import numpy as np
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    model TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts REAL NOT NULL,
+    value REAL NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_model_metric_ts ON metrics (model, metric, ts);
+CREATE INDEX IF NOT EXISTS idx_metrics_ts ON metrics (ts);
+
+CREATE TABLE IF NOT EXISTS drift (
+    model TEXT NOT NULL,
+    ts REAL NOT NULL,
+    overall_score REAL NOT NULL,
+    drift_detected INTEGER NOT NULL,
+    severity TEXT NOT NULL,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_drift_model_ts ON drift (model, ts);
+
+CREATE TABLE IF NOT EXISTS drift_features (
+    model TEXT NOT NULL,
+    ts REAL NOT NULL,
+    feature TEXT NOT NULL,
+    psi REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_drift_features_model_ts ON drift_features (model, ts);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    ts REAL NOT NULL,
+    model TEXT,
+    alert_type TEXT,
+    severity TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_model_ts ON alerts (model, ts);
+
+CREATE TABLE IF NOT EXISTS migrations (
+    source TEXT PRIMARY KEY,
+    ts REAL NOT NULL
+);
+"""
+
+
+def _to_epoch(timestamp: Optional[Any]) -> float:
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return datetime.fromisoformat(str(timestamp)).timestamp()
+
+
+def _to_iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch).isoformat()
+
+
+def grouped_slopes(groups: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Least-squares slope of each group's values against their position.
+
+    ``groups`` must be sorted so each group is contiguous. Returns the group
+    labels, the start offset of each group and the slope per group (0 for
+    groups with fewer than two points).
+    """
+    labels, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    order = np.argsort(starts)
+    labels, starts, counts = labels[order], starts[order], counts[order]
+    if len(values) == 0:
+        return labels, starts, np.zeros(0)
+
+    x = np.arange(len(values)) - np.repeat(starts, counts)
+    y = values.astype(np.float64)
+    n = counts.astype(np.float64)
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    sum_y = np.add.reduceat(y, starts)
+    sum_xy = np.add.reduceat(x * y, starts)
+
+    denominator = n * sum_xx - sum_x ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(denominator > 0, (n * sum_xy - sum_x * sum_y) / denominator, 0.0)
+    return labels, starts, slopes
+
+
+class MetricsStore:
+    """Monitoring history for all models in a single SQLite database."""
+
+    def __init__(self, db_path: str, batch_size: int = 100, flush_interval_seconds: float = 5.0,
+                 retention_days: Optional[int] = 365, compact_interval_seconds: float = 86400):
+        """
+        Initialize store.
+
+        Args:
+            db_path: SQLite database file
+            batch_size: Buffered rows that trigger a flush
+            flush_interval_seconds: Maximum age of buffered rows before an append flushes them
+            retention_days: Rows older than this are removed on compaction (None keeps all)
+            compact_interval_seconds: Minimum time between automatic compactions
+        """
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.retention_days = retention_days
+        self.compact_interval_seconds = compact_interval_seconds
+
+        self._lock = threading.RLock()
+        self._pending: Dict[str, List[Tuple]] = {
+            'metrics': [], 'drift': [], 'drift_features': [], 'alerts': []
+        }
+        self._pending_rows = 0
+        self._deferred = False
+        self._last_flush = time.monotonic()
+        self._last_compact = time.monotonic()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        # WAL lets several workers append while others read
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        atexit.register(self.flush)
+
+    _INSERTS = {
+        'metrics': "INSERT INTO metrics (model, metric, ts, value, metadata) VALUES (?, ?, ?, ?, ?)",
+        'drift': "INSERT INTO drift (model, ts, overall_score, drift_detected, severity, payload) VALUES (?, ?, ?, ?, ?, ?)",
+        'drift_features': "INSERT INTO drift_features (model, ts, feature, psi) VALUES (?, ?, ?, ?)",
+        'alerts': "INSERT INTO alerts (ts, model, alert_type, severity, payload) VALUES (?, ?, ?, ?, ?)"
+    }
+
+    def _append(self, table: str, rows: List[Tuple]) -> None:
+        with self._lock:
+            self._pending[table].extend(rows)
+            self._pending_rows += len(rows)
+            if not self._deferred and (
+                    self._pending_rows >= self.batch_size or
+                    time.monotonic() - self._last_flush >= self.flush_interval_seconds):
+                self.flush()
+
+    def _write_pending(self) -> None:
+        for table, rows in self._pending.items():
+            if rows:
+                self._conn.executemany(self._INSERTS[table], rows)
+
+    def _clear_pending(self) -> None:
+        for rows in self._pending.values():
+            rows.clear()
+        self._pending_rows = 0
+
+    def flush(self) -> None:
+        """Write all buffered rows in one transaction."""
+        with self._lock:
+            if self._deferred:
+                return
+            if self._pending_rows:
+                try:
+                    with self._conn:
+                        self._write_pending()
+                except sqlite3.ProgrammingError:
+                    # Connection already closed during interpreter shutdown
+                    return
+                self._clear_pending()
+            self._last_flush = time.monotonic()
+
+            if (self.retention_days is not None and
+                    time.monotonic() - self._last_compact >= self.compact_interval_seconds):
+                self.compact()
+
+    def compact(self, retention_days: Optional[int] = None) -> Dict[str, int]:
+        """Delete rows older than the retention window. Returns rows removed per table."""
+        retention_days = retention_days if retention_days is not None else self.retention_days
+        removed: Dict[str, int] = {}
+        with self._lock:
+            self._last_compact = time.monotonic()
+            self.flush()
+            if retention_days is None:
+                return removed
+            cutoff = time.time() - retention_days * 86400
+            with self._conn:
+                for table in ('metrics', 'drift', 'drift_features', 'alerts'):
+                    removed[table] = self._conn.execute(f"DELETE FROM {table} WHERE ts < ?", (cutoff,)).rowcount
+        if any(removed.values()):
+            logger.info(f"Compacted monitoring history: {removed}")
+        return removed
+
+    @contextmanager
+    def migration(self, source: str) -> Iterator[bool]:
+        """
+        Import rows from ``source`` exactly once.
+
+        Appends made inside the block are held back and committed in one
+        transaction together with a marker for ``source``, so an import that
+        fails part way leaves nothing behind and a completed one is never
+        repeated. Yields False, and the block should append nothing, when
+        ``source`` was already imported.
+        """
+        with self._lock:
+            self.flush()
+            if self._conn.execute("SELECT 1 FROM migrations WHERE source = ?", (source,)).fetchone():
+                yield False
+                return
+
+            self._deferred = True
+            try:
+                yield True
+                with self._conn:
+                    self._write_pending()
+                    self._conn.execute("INSERT INTO migrations (source, ts) VALUES (?, ?)", (source, time.time()))
+            finally:
+                self._deferred = False
+                self._clear_pending()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+        atexit.unregister(self.flush)
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[Tuple]:
+        with self._lock:
+            self.flush()
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    # Writes
+
+    def append_metrics(self, model_name: str, metrics: Dict[str, float],
+                       metadata: Optional[Dict[str, Any]] = None, timestamp: Optional[Any] = None) -> None:
+        ts = _to_epoch(timestamp)
+        encoded = json.dumps(metadata, default=str) if metadata else None
+        self._append('metrics', [
+            (model_name, metric, ts, float(value), encoded) for metric, value in metrics.items()
+        ])
+
+    def append_drift(self, model_name: str, drift_results: Dict[str, Any]) -> None:
+        ts = _to_epoch(drift_results.get('timestamp'))
+        self._append('drift', [(
+            model_name, ts,
+            float(drift_results.get('overall_drift_score', 0.0)),
+            int(bool(drift_results.get('drift_detected'))),
+            drift_results.get('drift_severity', 'none'),
+            json.dumps(drift_results, default=str)
+        )])
+        self._append('drift_features', [
+            (model_name, ts, feature, float(scores['psi_score']))
+            for feature, scores in drift_results.get('feature_drift_scores', {}).items()
+        ])
+
+    def append_alert(self, alert: Dict[str, Any]) -> None:
+        self._append('alerts', [(
+            _to_epoch(alert.get('timestamp')), alert.get('model_name'), alert.get('alert_type'),
+            alert.get('severity'), json.dumps(alert, default=str)
+        )])
+
+    # Reads
+
+    def metric_history(self, model_name: str, limit_per_metric: Optional[int] = None,
+                       since: Optional[datetime] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Observations per metric, oldest first, optionally only the latest N of each."""
+        conditions, params = ["model = ?"], [model_name]
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since.timestamp())
+        where = " AND ".join(conditions)
+        if limit_per_metric is not None:
+            sql = f"""
+                SELECT metric, ts, value, metadata FROM (
+                    SELECT metric, ts, value, metadata,
+                           ROW_NUMBER() OVER (PARTITION BY metric ORDER BY ts DESC, rowid DESC) AS rn
+                    FROM metrics WHERE {where}
+                ) WHERE rn <= ? ORDER BY metric, ts, rn DESC
+            """
+            params.append(limit_per_metric)
+        else:
+            sql = f"SELECT metric, ts, value, metadata FROM metrics WHERE {where} ORDER BY metric, ts, rowid"
+
+        history: Dict[str, List[Dict[str, Any]]] = {}
+        for metric, ts, value, metadata in self._query(sql, params):
+            history.setdefault(metric, []).append({
+                'timestamp': _to_iso(ts),
+                'value': value,
+                'metadata': json.loads(metadata) if metadata else {}
+            })
+        return history
+
+    def latest_metrics(self, model_name: str) -> Tuple[Dict[str, float], Optional[str]]:
+        """Most recent value of each metric and the latest observation time."""
+        rows = self._query("""
+            SELECT metric, value, ts FROM (
+                SELECT metric, value, ts,
+                       ROW_NUMBER() OVER (PARTITION BY metric ORDER BY ts DESC, rowid DESC) AS rn
+                FROM metrics WHERE model = ?
+            ) WHERE rn = 1
+        """, (model_name,))
+        if not rows:
+            return {}, None
+        return {metric: value for metric, value, _ in rows}, _to_iso(max(ts for _, _, ts in rows))
+
+    def metric_trends(self, model_name: str, since: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """Slope, latest, min and max per metric, computed over all points in one pass."""
+        conditions, params = ["model = ?"], [model_name]
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since.timestamp())
+        rows = self._query(
+            f"SELECT metric, value FROM metrics WHERE {' AND '.join(conditions)} ORDER BY metric, ts, rowid",
+            params
+        )
+        if not rows:
+            return {}
+
+        metrics = np.array([row[0] for row in rows], dtype=object)
+        values = np.array([row[1] for row in rows], dtype=np.float64)
+        labels, starts, slopes = grouped_slopes(metrics, values)
+        ends = np.append(starts[1:], len(values))
+        minimums = np.minimum.reduceat(values, starts)
+        maximums = np.maximum.reduceat(values, starts)
+
+        trends = {}
+        for label, start, end, slope, low, high in zip(labels, starts, ends, slopes, minimums, maximums):
+            count = int(end - start)
+            if count < 2:
+                continue
+            trends[str(label)] = {
+                'trend_direction': 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'stable',
+                'trend_magnitude': float(abs(slope)),
+                'data_points': count,
+                'latest_value': float(values[end - 1]),
+                'min_value': float(low),
+                'max_value': float(high)
+            }
+        return trends
+
+    def latest_drift(self, model_name: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT ts, overall_score, drift_detected, severity FROM drift "
+            "WHERE model = ? ORDER BY ts DESC, rowid DESC LIMIT 1",
+            (model_name,)
+        )
+        if not rows:
+            return None
+        ts, score, detected, severity = rows[0]
+        return {
+            'timestamp': _to_iso(ts),
+            'overall_drift_score': score,
+            'drift_detected': bool(detected),
+            'drift_severity': severity
+        }
+
+    def feature_psi_summary(self, model_name: str, since: Optional[datetime] = None) -> Dict[str, Dict[str, float]]:
+        """Latest, mean and max PSI per feature across drift checks in the window."""
+        conditions, params = ["model = ?"], [model_name]
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since.timestamp())
+        rows = self._query(
+            f"SELECT feature, psi FROM drift_features WHERE {' AND '.join(conditions)} ORDER BY feature, ts, rowid",
+            params
+        )
+        if not rows:
+            return {}
+
+        features = np.array([row[0] for row in rows], dtype=object)
+        psi = np.array([row[1] for row in rows], dtype=np.float64)
+        labels, starts, counts = np.unique(features, return_index=True, return_counts=True)
+        ends = starts + counts
+        means = np.add.reduceat(psi, starts) / counts
+        maximums = np.maximum.reduceat(psi, starts)
+
+        return {
+            str(label): {
+                'latest_psi': float(psi[end - 1]),
+                'mean_psi': float(mean),
+                'max_psi': float(high),
+                'checks': int(count)
+            }
+            for label, end, mean, high, count in zip(labels, ends, means, maximums, counts)
+        }
+
+    def recent_alerts(self, limit: int = 10, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent alerts first."""
+        if model_name is None:
+            rows = self._query("SELECT payload FROM alerts ORDER BY ts DESC, rowid DESC LIMIT ?", (limit,))
+        else:
+            rows = self._query(
+                "SELECT payload FROM alerts WHERE model = ? ORDER BY ts DESC, rowid DESC LIMIT ?",
+                (model_name, limit)
+            )
+        return [json.loads(payload) for payload, in rows]
+
+    def has_history(self, model_name: str) -> bool:
+        return bool(self._query("SELECT 1 FROM metrics WHERE model = ? LIMIT 1", (model_name,)))
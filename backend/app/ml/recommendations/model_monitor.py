@@ -11,6 +11,7 @@ This module provides:
 """
 
 import logging
+import time
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -21,7 +22,6 @@ from pathlib import Path
 import hashlib
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from scipy import stats
 import matplotlib.pyplot as plt
 import seaborn as sns
 
@@ -29,6 +29,9 @@ from app.models.user import User
 from app.models.financial_profile import FinancialProfile
 from app.database.base import SessionLocal
 
+from .drift_engine import DriftEngine, ReferenceProfile, compare as drift_compare
+from .metrics_store import MetricsStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -87,10 +90,24 @@ class ModelMonitor:
                 'critical': 0.15,  # 15% performance degradation
                 'warning': 0.10,   # 10% performance degradation
                 'info': 0.05       # 5% performance degradation
-            }
+            },
+            'history_retention_days': 365,
+            'degradation_window': 100,
+            'drift_sample_rate': 0.1,
+            'live_drift_interval_seconds': 3600,
+            'live_drift_min_rows': 500
         }
         
         self._ensure_monitoring_directories()
+        self.metrics_store = MetricsStore(
+            f"{self.monitoring_path}/history.db",
+            retention_days=self.monitoring_config['history_retention_days']
+        )
+        self._migrate_legacy_history()
+        self.drift_engine = DriftEngine(
+            f"{self.monitoring_path}/drift/profiles",
+            sample_rate=self.monitoring_config['drift_sample_rate']
+        )
     
     def _ensure_monitoring_directories(self) -> None:
         """Ensure monitoring directories exist."""
@@ -117,8 +134,10 @@ class ModelMonitor:
                 predictions, actuals, model_type
             )
             
-            # Load historical performance
-            historical_metrics = self._load_historical_metrics(model_name)
+            # Load recent historical performance
+            historical_metrics = self._load_historical_metrics(
+                model_name, limit=self.monitoring_config['degradation_window']
+            )
             
             # Detect performance degradation
             degradation_analysis = self._detect_performance_degradation(
@@ -278,50 +297,74 @@ class ModelMonitor:
         except:
             return 0.0
     
-    def _load_historical_metrics(self, model_name: str) -> Dict[str, List[float]]:
-        """Load historical performance metrics."""
+    def _load_historical_metrics(self, model_name: str,
+                                 limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Load historical performance metrics, optionally only the latest N per metric."""
         try:
-            metrics_file = f"{self.monitoring_path}/performance/{model_name}_metrics.json"
-            if Path(metrics_file).exists():
-                with open(metrics_file, 'r') as f:
-                    return json.load(f)
-            return {}
+            return self.metrics_store.metric_history(model_name, limit_per_metric=limit)
         except Exception as e:
             logger.error(f"Failed to load historical metrics for {model_name}: {e}")
             return {}
     
     def _save_performance_metrics(self, model_name: str, metrics: Dict[str, float],
                                  metadata: Dict[str, Any] = None) -> None:
-        """Save current performance metrics."""
+        """Append current performance metrics to the history store."""
         try:
-            metrics_file = f"{self.monitoring_path}/performance/{model_name}_metrics.json"
-            
-            # Load existing metrics
-            historical_metrics = self._load_historical_metrics(model_name)
-            
-            # Add current metrics
-            timestamp = datetime.now().isoformat()
-            for metric_name, value in metrics.items():
-                if metric_name not in historical_metrics:
-                    historical_metrics[metric_name] = []
-                
-                historical_metrics[metric_name].append({
-                    'timestamp': timestamp,
-                    'value': value,
-                    'metadata': metadata or {}
-                })
-            
-            # Keep only last 100 data points
-            for metric_name in historical_metrics:
-                historical_metrics[metric_name] = historical_metrics[metric_name][-100:]
-            
-            # Save updated metrics
-            with open(metrics_file, 'w') as f:
-                json.dump(historical_metrics, f, indent=2)
-                
+            self.metrics_store.append_metrics(model_name, metrics, metadata)
         except Exception as e:
             logger.error(f"Failed to save metrics for {model_name}: {e}")
     
+    def _migrate_legacy_history(self) -> None:
+        """
+        Import JSON history files written before the metrics store existed.
+        
+        Each file is imported in one transaction that also records it as
+        migrated, so a retry after a crash or a failed rename never
+        duplicates rows.
+        """
+        try:
+            root = Path(self.monitoring_path)
+            for metrics_file in (root / "performance").glob("*_metrics.json"):
+                model_name = metrics_file.name[:-len("_metrics.json")]
+                with self.metrics_store.migration(str(metrics_file.relative_to(root))) as pending:
+                    if pending:
+                        with open(metrics_file, 'r') as f:
+                            legacy = json.load(f)
+                        for metric_name, entries in legacy.items():
+                            for entry in entries:
+                                self.metrics_store.append_metrics(
+                                    model_name, {metric_name: entry['value']},
+                                    entry.get('metadata'), entry['timestamp']
+                                )
+                metrics_file.rename(metrics_file.with_suffix('.json.migrated'))
+            
+            for drift_file in (root / "drift").glob("*_drift_history.jsonl"):
+                model_name = drift_file.name[:-len("_drift_history.jsonl")]
+                with self.metrics_store.migration(str(drift_file.relative_to(root))) as pending:
+                    if pending:
+                        with open(drift_file, 'r') as f:
+                            for line in f:
+                                if line.strip():
+                                    self.metrics_store.append_drift(model_name, json.loads(line))
+                drift_file.rename(drift_file.with_suffix('.jsonl.migrated'))
+            
+            alerts_file = root / "alerts" / "alerts.jsonl"
+            if alerts_file.exists():
+                with self.metrics_store.migration(str(alerts_file.relative_to(root))) as pending:
+                    if pending:
+                        with open(alerts_file, 'r') as f:
+                            for line in f:
+                                if line.strip():
+                                    self.metrics_store.append_alert(json.loads(line))
+                alerts_file.rename(alerts_file.with_suffix('.jsonl.migrated'))
+                
+        except Exception as e:
+            logger.error(f"Failed to migrate legacy monitoring history: {e}")
+    
+    def compact_history(self, retention_days: Optional[int] = None) -> Dict[str, int]:
+        """Remove monitoring history older than the retention window."""
+        return self.metrics_store.compact(retention_days)
+    
     def _detect_performance_degradation(self, current_metrics: Dict[str, float],
                                        historical_metrics: Dict[str, List],
                                        model_config: Dict) -> Dict[str, Any]:
@@ -459,14 +502,9 @@ class ModelMonitor:
         return actions.get(severity, 'Continue monitoring')
     
     def _save_alert(self, alert: Dict[str, Any]) -> None:
-        """Save alert to file."""
+        """Append alert to the history store."""
         try:
-            alerts_file = f"{self.monitoring_path}/alerts/alerts.jsonl"
-            
-            # Append alert to file
-            with open(alerts_file, 'a') as f:
-                f.write(json.dumps(alert) + '\n')
-                
+            self.metrics_store.append_alert(alert)
         except Exception as e:
             logger.error(f"Failed to save alert: {e}")
     
@@ -521,106 +559,126 @@ class ModelMonitor:
     
     def detect_data_drift(self, model_name: str, new_data: pd.DataFrame,
                          reference_data: pd.DataFrame = None) -> Dict[str, Any]:
-        """Detect data drift using Population Stability Index (PSI)."""
+        """Detect data drift using Population Stability Index (PSI) and the KS statistic."""
         try:
-            if reference_data is None:
-                reference_data = self._load_reference_data(model_name)
-                if reference_data is None:
+            if reference_data is not None:
+                profile = self.drift_engine.build_profile(reference_data)
+            else:
+                profile = self._get_reference_profile(model_name)
+                if profile is None:
                     return {"error": "No reference data available"}
             
-            drift_results = {
-                'model_name': model_name,
-                'timestamp': datetime.now().isoformat(),
-                'features_analyzed': list(new_data.columns),
-                'drift_detected': False,
-                'feature_drift_scores': {},
-                'overall_drift_score': 0.0,
-                'drift_severity': 'none'
-            }
-            
-            psi_scores = []
-            
-            for feature in new_data.columns:
-                if feature in reference_data.columns:
-                    psi_score = self._calculate_psi(
-                        reference_data[feature].values,
-                        new_data[feature].values
-                    )
-                    
-                    drift_results['feature_drift_scores'][feature] = {
-                        'psi_score': psi_score,
-                        'drift_detected': psi_score > self.monitoring_config['data_drift_threshold'],
-                        'severity': self._get_drift_severity(psi_score)
-                    }
-                    
-                    psi_scores.append(psi_score)
-            
-            # Calculate overall drift
-            if psi_scores:
-                drift_results['overall_drift_score'] = np.mean(psi_scores)
-                drift_results['drift_detected'] = drift_results['overall_drift_score'] > self.monitoring_config['data_drift_threshold']
-                drift_results['drift_severity'] = self._get_drift_severity(drift_results['overall_drift_score'])
-            
-            # Save drift analysis
-            self._save_drift_analysis(model_name, drift_results)
-            
-            # Generate drift alerts
-            if drift_results['drift_detected']:
-                drift_alert = {
-                    'timestamp': datetime.now().isoformat(),
-                    'model_name': model_name,
-                    'alert_type': 'data_drift',
-                    'severity': drift_results['drift_severity'],
-                    'message': f"Data drift detected for {model_name} with PSI score {drift_results['overall_drift_score']:.3f}",
-                    'overall_drift_score': drift_results['overall_drift_score'],
-                    'recommended_action': 'Review data sources and consider model retraining'
-                }
-                self._save_alert(drift_alert)
-            
-            return drift_results
+            feature_scores = self.drift_engine.score(profile, new_data)
+            return self._record_drift(model_name, feature_scores, {
+                'features_analyzed': list(feature_scores),
+                'rows_analyzed': len(new_data)
+            })
             
         except Exception as e:
             logger.error(f"Failed to detect data drift for {model_name}: {e}")
             return {"error": str(e)}
     
-    def _calculate_psi(self, reference: np.ndarray, new: np.ndarray, 
-                      buckets: int = 10) -> float:
-        """Calculate Population Stability Index (PSI)."""
+    def record_inference_inputs(self, model_name: str, features: pd.DataFrame) -> None:
+        """
+        Feed a sample of live inference inputs into the model's drift window.
+        
+        Only cell counts are kept, so the window costs the same whatever its
+        size. Once it is older than ``live_drift_interval_seconds`` and has
+        enough rows, it is scored and a new window starts.
+        """
         try:
-            # Handle categorical data
-            if reference.dtype == 'object' or new.dtype == 'object':
-                # For categorical data, use value counts
-                ref_counts = pd.Series(reference).value_counts(normalize=True)
-                new_counts = pd.Series(new).value_counts(normalize=True)
-                
-                # Ensure both series have same index
-                all_categories = set(ref_counts.index) | set(new_counts.index)
-                ref_props = np.array([ref_counts.get(cat, 1e-10) for cat in all_categories])
-                new_props = np.array([new_counts.get(cat, 1e-10) for cat in all_categories])
-            else:
-                # For numerical data, use quantile-based bucketing
-                bins = np.linspace(np.min(reference), np.max(reference), buckets + 1)
-                bins[0] = -np.inf  # Handle edge cases
-                bins[-1] = np.inf
-                
-                ref_counts, _ = np.histogram(reference, bins=bins)
-                new_counts, _ = np.histogram(new, bins=bins)
-                
-                # Convert to proportions
-                ref_props = ref_counts / np.sum(ref_counts)
-                new_props = new_counts / np.sum(new_counts)
-                
-                # Add small constant to avoid log(0)
-                ref_props = np.where(ref_props == 0, 1e-10, ref_props)
-                new_props = np.where(new_props == 0, 1e-10, new_props)
-            
-            # Calculate PSI
-            psi = np.sum((new_props - ref_props) * np.log(new_props / ref_props))
-            return float(psi)
+            if self._get_reference_profile(model_name) is None:
+                return
+            self.drift_engine.observe(model_name, features)
+            
+            window = self.drift_engine.window(model_name)
+            if (window is not None
+                    and time.time() - window.started_at >= self.monitoring_config['live_drift_interval_seconds']
+                    and window.rows >= self.monitoring_config['live_drift_min_rows']):
+                self.check_live_drift(model_name)
+        except Exception as e:
+            logger.error(f"Failed to record inference inputs for {model_name}: {e}")
+    
+    def check_live_drift(self, model_name: str) -> Dict[str, Any]:
+        """Score the current live-input window against the reference profile."""
+        try:
+            window = self.drift_engine.close_window(
+                model_name, min_rows=self.monitoring_config['live_drift_min_rows']
+            )
+            if window is None:
+                current = self.drift_engine.window(model_name)
+                return {"error": "Not enough live inputs sampled",
+                        'rows_sampled': current.rows if current is not None else 0}
+            
+            feature_scores = drift_compare(window.profile, window.counts, window.category_counts)
+            return self._record_drift(model_name, feature_scores, {
+                'features_analyzed': list(feature_scores),
+                'rows_analyzed': window.rows,
+                'source': 'live',
+                'window_start': datetime.fromtimestamp(window.started_at).isoformat()
+            })
             
         except Exception as e:
-            logger.error(f"Failed to calculate PSI: {e}")
-            return 0.0
+            logger.error(f"Failed to check live drift for {model_name}: {e}")
+            return {"error": str(e)}
+    
+    def run_live_drift_checks(self) -> Dict[str, Dict[str, Any]]:
+        """Check live drift for every model with a sampled window."""
+        return {
+            model_name: self.check_live_drift(model_name)
+            for model_name in self.model_registry
+            if self.drift_engine.window(model_name) is not None
+        }
+    
+    def _record_drift(self, model_name: str, feature_scores: Dict[str, Dict[str, float]],
+                      details: Dict[str, Any]) -> Dict[str, Any]:
+        """Build, save and alert on drift results from per-feature scores."""
+        drift_results = {
+            'model_name': model_name,
+            'timestamp': datetime.now().isoformat(),
+            **details,
+            'drift_detected': False,
+            'feature_drift_scores': {},
+            'overall_drift_score': 0.0,
+            'drift_severity': 'none'
+        }
+        
+        psi_scores = []
+        for feature, scores in feature_scores.items():
+            psi_score = scores['psi']
+            drift_results['feature_drift_scores'][feature] = {
+                'psi_score': psi_score,
+                'drift_detected': psi_score > self.monitoring_config['data_drift_threshold'],
+                'severity': self._get_drift_severity(psi_score)
+            }
+            if 'ks' in scores:
+                drift_results['feature_drift_scores'][feature]['ks_statistic'] = scores['ks']
+            
+            psi_scores.append(psi_score)
+        
+        # Calculate overall drift
+        if psi_scores:
+            drift_results['overall_drift_score'] = float(np.mean(psi_scores))
+            drift_results['drift_detected'] = drift_results['overall_drift_score'] > self.monitoring_config['data_drift_threshold']
+            drift_results['drift_severity'] = self._get_drift_severity(drift_results['overall_drift_score'])
+        
+        # Save drift analysis
+        self._save_drift_analysis(model_name, drift_results)
+        
+        # Generate drift alerts
+        if drift_results['drift_detected']:
+            drift_alert = {
+                'timestamp': datetime.now().isoformat(),
+                'model_name': model_name,
+                'alert_type': 'data_drift',
+                'severity': drift_results['drift_severity'],
+                'message': f"Data drift detected for {model_name} with PSI score {drift_results['overall_drift_score']:.3f}",
+                'overall_drift_score': drift_results['overall_drift_score'],
+                'recommended_action': 'Review data sources and consider model retraining'
+            }
+            self._save_alert(drift_alert)
+        
+        return drift_results
     
     def _get_drift_severity(self, psi_score: float) -> str:
         """Get drift severity based on PSI score."""
@@ -633,6 +691,18 @@ class ModelMonitor:
         else:
             return 'none'
     
+    def _get_reference_profile(self, model_name: str) -> Optional[ReferenceProfile]:
+        """Cached reference profile, rebuilt when the reference data file changes."""
+        reference_file = Path(f"{self.monitoring_path}/drift/{model_name}_reference.pkl")
+        try:
+            stat = reference_file.stat()
+        except OSError:
+            return None
+        return self.drift_engine.reference_profile(
+            model_name, f"{stat.st_mtime_ns}:{stat.st_size}",
+            lambda: self._load_reference_data(model_name)
+        )
+    
     def _load_reference_data(self, model_name: str) -> Optional[pd.DataFrame]:
         """Load reference data for drift detection."""
         try:
@@ -644,15 +714,20 @@ class ModelMonitor:
             logger.error(f"Failed to load reference data for {model_name}: {e}")
             return None
     
+    def save_reference_data(self, model_name: str, reference_data: pd.DataFrame) -> None:
+        """Store the reference (training) feature data that drift is measured against."""
+        try:
+            reference_file = Path(f"{self.monitoring_path}/drift/{model_name}_reference.pkl")
+            tmp_file = reference_file.with_suffix('.tmp')
+            reference_data.to_pickle(tmp_file)
+            tmp_file.replace(reference_file)
+        except Exception as e:
+            logger.error(f"Failed to save reference data for {model_name}: {e}")
+    
     def _save_drift_analysis(self, model_name: str, drift_results: Dict[str, Any]) -> None:
-        """Save drift analysis results."""
+        """Append drift analysis results to the history store."""
         try:
-            drift_file = f"{self.monitoring_path}/drift/{model_name}_drift_history.jsonl"
-            
-            # Append drift results to file
-            with open(drift_file, 'a') as f:
-                f.write(json.dumps(drift_results, default=str) + '\n')
-                
+            self.metrics_store.append_drift(model_name, drift_results)
         except Exception as e:
             logger.error(f"Failed to save drift analysis for {model_name}: {e}")
     
@@ -739,25 +814,15 @@ class ModelMonitor:
     def _get_model_status(self, model_name: str) -> Dict[str, Any]:
         """Get current status of a model."""
         try:
-            historical_metrics = self._load_historical_metrics(model_name)
+            latest_metrics, last_timestamp = self.metrics_store.latest_metrics(model_name)
             
-            if not historical_metrics:
+            if not latest_metrics:
                 return {
                     'status': 'unknown',
                     'last_evaluation': None,
                     'key_metrics': {}
                 }
             
-            # Get latest metrics
-            latest_metrics = {}
-            last_timestamp = None
-            
-            for metric_name, metric_history in historical_metrics.items():
-                if metric_history:
-                    latest_entry = metric_history[-1]
-                    latest_metrics[metric_name] = latest_entry['value']
-                    last_timestamp = latest_entry['timestamp']
-            
             # Determine overall status
             status = 'healthy'
             if last_timestamp:
@@ -778,92 +843,38 @@ class ModelMonitor:
     def _get_performance_trends(self, model_name: str, days: int = 30) -> Dict[str, Any]:
         """Get performance trends for a model."""
         try:
-            historical_metrics = self._load_historical_metrics(model_name)
-            
-            if not historical_metrics:
-                return {}
-            
-            trends = {}
             cutoff_date = datetime.now() - timedelta(days=days)
-            
-            for metric_name, metric_history in historical_metrics.items():
-                recent_data = [
-                    entry for entry in metric_history
-                    if datetime.fromisoformat(entry['timestamp']) >= cutoff_date
-                ]
-                
-                if len(recent_data) >= 2:
-                    values = [entry['value'] for entry in recent_data]
-                    timestamps = [entry['timestamp'] for entry in recent_data]
-                    
-                    # Calculate trend (simple linear regression slope)
-                    x = np.arange(len(values))
-                    slope, _, _, _, _ = stats.linregress(x, values)
-                    
-                    trends[metric_name] = {
-                        'trend_direction': 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'stable',
-                        'trend_magnitude': abs(slope),
-                        'data_points': len(values),
-                        'latest_value': values[-1],
-                        'min_value': min(values),
-                        'max_value': max(values)
-                    }
-            
-            return trends
-            
+            return self.metrics_store.metric_trends(model_name, since=cutoff_date)
         except Exception as e:
             logger.error(f"Failed to get trends for {model_name}: {e}")
             return {}
     
-    def _get_latest_drift_status(self, model_name: str) -> Dict[str, Any]:
-        """Get latest drift status for a model."""
+    def _get_latest_drift_status(self, model_name: str, days: int = 30) -> Dict[str, Any]:
+        """Get latest drift status and per-feature PSI summary for a model."""
         try:
-            drift_file = f"{self.monitoring_path}/drift/{model_name}_drift_history.jsonl"
+            latest_drift = self.metrics_store.latest_drift(model_name)
             
-            if not Path(drift_file).exists():
+            if latest_drift is None:
                 return {'status': 'no_data'}
             
-            # Read last line of drift history
-            with open(drift_file, 'r') as f:
-                lines = f.readlines()
-            
-            if lines:
-                latest_drift = json.loads(lines[-1])
-                return {
-                    'status': 'drift_detected' if latest_drift['drift_detected'] else 'stable',
-                    'overall_drift_score': latest_drift['overall_drift_score'],
-                    'drift_severity': latest_drift['drift_severity'],
-                    'last_check': latest_drift['timestamp']
-                }
-            
-            return {'status': 'no_data'}
+            return {
+                'status': 'drift_detected' if latest_drift['drift_detected'] else 'stable',
+                'overall_drift_score': latest_drift['overall_drift_score'],
+                'drift_severity': latest_drift['drift_severity'],
+                'last_check': latest_drift['timestamp'],
+                'feature_psi': self.metrics_store.feature_psi_summary(
+                    model_name, since=datetime.now() - timedelta(days=days)
+                )
+            }
             
         except Exception as e:
             logger.error(f"Failed to get drift status for {model_name}: {e}")
             return {'status': 'error', 'error': str(e)}
     
-    def _get_recent_alerts(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent alerts."""
+    def _get_recent_alerts(self, limit: int = 10, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get recent alerts, most recent first."""
         try:
-            alerts_file = f"{self.monitoring_path}/alerts/alerts.jsonl"
-            
-            if not Path(alerts_file).exists():
-                return []
-            
-            alerts = []
-            with open(alerts_file, 'r') as f:
-                lines = f.readlines()
-            
-            # Get last N alerts
-            for line in lines[-limit:]:
-                alert = json.loads(line)
-                alerts.append(alert)
-            
-            # Sort by timestamp (most recent first)
-            alerts.sort(key=lambda x: x['timestamp'], reverse=True)
-            
-            return alerts
-            
+            return self.metrics_store.recent_alerts(limit, model_name)
         except Exception as e:
             logger.error(f"Failed to get recent alerts: {e}")
             return []
@@ -912,11 +923,8 @@ class ModelMonitor:
                     'model_name': model,
                     'status': self._get_model_status(model),
                     'performance_trends': self._get_performance_trends(model, days),
-                    'drift_status': self._get_latest_drift_status(model),
-                    'recent_alerts': [
-                        alert for alert in self._get_recent_alerts(50)
-                        if alert.get('model_name') == model
-                    ]
+                    'drift_status': self._get_latest_drift_status(model, days),
+                    'recent_alerts': self._get_recent_alerts(50, model)
                 }
                 
                 # Update summary
@@ -0,0 +1,253 @@
+"""
+Shared model serving for the recommendation models.
+
+This module provides:
+- A process-wide registry so each model file is unpickled once per process
+- Hot reload of model bundles when their files change on disk
+- Micro-batching, so concurrent predictions share one ``predict`` call
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelBundle:
+    """Objects loaded from one model directory, plus the file versions they came from."""
+    version: Tuple
+    objects: Dict[str, Any] = field(default_factory=dict)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.objects.get(name, default)
+
+
+def _file_version(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_file(path: Path) -> Any:
+    if path.suffix == '.json':
+        with open(path, 'r') as f:
+            return json.load(f)
+    return joblib.load(path)
+
+
+class ModelRegistry:
+    """Loads model bundles once per process and reloads them when their files change."""
+
+    def __init__(self, check_interval_seconds: float = 30.0):
+        """
+        Initialize registry.
+
+        Args:
+            check_interval_seconds: Minimum time between file checks for one bundle
+        """
+        self.check_interval_seconds = check_interval_seconds
+        self._lock = threading.RLock()
+        self._bundles: Dict[Tuple, ModelBundle] = {}
+        self._checked_at: Dict[Tuple, float] = {}
+        self._batchers: Dict[str, "MicroBatcher"] = {}
+
+    def load_bundle(self, model_dir: str, required: Dict[str, str],
+                    optional: Optional[Dict[str, str]] = None,
+                    watched: Tuple[str, ...] = ()) -> Optional[ModelBundle]:
+        """
+        Current bundle for ``model_dir``, loading or reloading it if needed.
+
+        ``required`` and ``optional`` map object names to file names in the
+        directory. ``watched`` names further files (relative to the directory)
+        that are not loaded but count towards the bundle version, such as data
+        the caller reads itself. Returns None while any required file is missing.
+        """
+        optional = optional or {}
+        model_dir = Path(model_dir)
+        key = (str(model_dir.resolve()), tuple(sorted(required.items())), tuple(sorted(optional.items())), watched)
+
+        with self._lock:
+            bundle = self._bundles.get(key)
+            now = time.monotonic()
+            if bundle is not None and now - self._checked_at.get(key, 0) < self.check_interval_seconds:
+                return bundle
+            self._checked_at[key] = now
+
+            files = {**optional, **required}
+            version = tuple(_file_version(model_dir / files[name]) for name in sorted(files)) + tuple(
+                _file_version(model_dir / filename) for filename in watched
+            )
+            if bundle is not None and bundle.version == version:
+                return bundle
+            if any(_file_version(model_dir / filename) is None for filename in required.values()):
+                return bundle
+
+            objects = {}
+            try:
+                for name, filename in files.items():
+                    path = model_dir / filename
+                    if name in required or path.exists():
+                        objects[name] = _load_file(path)
+            except Exception as e:
+                # Usually a save in progress; keep serving the previous bundle
+                logger.warning(f"Could not load models from {model_dir}: {e}")
+                self._checked_at[key] = 0
+                return bundle
+
+            logger.info(f"{'Reloaded' if bundle is not None else 'Loaded'} models from {model_dir}")
+            bundle = ModelBundle(version=version, objects=objects)
+            self._bundles[key] = bundle
+            return bundle
+
+    def invalidate(self, model_dir: Optional[str] = None) -> None:
+        """Force the next load of ``model_dir`` (or every bundle) to re-check its files."""
+        with self._lock:
+            for key in list(self._checked_at):
+                if model_dir is None or key[0] == str(Path(model_dir).resolve()):
+                    self._checked_at[key] = 0
+
+    def batcher(self, name: str, predict_fn: Callable[[pd.DataFrame], np.ndarray],
+                **kwargs: Any) -> "MicroBatcher":
+        """Shared micro-batcher for ``name``, created on first use."""
+        with self._lock:
+            if name not in self._batchers:
+                self._batchers[name] = MicroBatcher(predict_fn, **kwargs)
+            return self._batchers[name]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'bundles': len(self._bundles),
+                'batchers': {name: batcher.stats() for name, batcher in self._batchers.items()}
+            }
+
+
+class _Batch:
+    def __init__(self):
+        self.frames: List[pd.DataFrame] = []
+        self.rows = 0
+        self.closed = threading.Event()
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+
+    def add(self, frame: pd.DataFrame) -> int:
+        offset = self.rows
+        self.frames.append(frame)
+        self.rows += len(frame)
+        return offset
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent predictions into one call of ``predict_fn``.
+
+    The first caller into an empty batch leads it: it waits up to
+    ``max_wait_ms`` for other threads to add rows (or until the batch holds
+    ``max_batch_size`` rows), runs ``predict_fn`` once on the concatenated
+    frame and hands each caller its slice of the output. Calls made on an
+    event loop thread are never held back; they run immediately.
+    """
+
+    def __init__(self, predict_fn: Callable[[pd.DataFrame], np.ndarray],
+                 max_batch_size: int = 512, max_wait_ms: float = 5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._lock = threading.Lock()
+        self._current: Optional[_Batch] = None
+        self._observers: List[Callable[[pd.DataFrame], Any]] = []
+        self.calls = 0
+        self.rows = 0
+        self.requests = 0
+
+    def add_observer(self, callback: Callable[[pd.DataFrame], Any]) -> None:
+        """Call ``callback`` with every frame the model has scored (e.g. for drift monitoring)."""
+        if callback not in self._observers:
+            self._observers.append(callback)
+
+    def _run(self, frame: pd.DataFrame) -> np.ndarray:
+        with self._lock:
+            self.calls += 1
+            self.rows += len(frame)
+        result = np.asarray(self.predict_fn(frame))
+        for callback in self._observers:
+            try:
+                callback(frame)
+            except Exception as e:
+                logger.warning(f"Prediction observer failed: {e}")
+        return result
+
+    def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        """Predict for ``frame``, sharing the model call with concurrent callers."""
+        with self._lock:
+            self.requests += 1
+        if len(frame) == 0:
+            return self._run(frame)
+        if len(frame) >= self.max_batch_size or _on_event_loop():
+            return self._run(frame)
+
+        with self._lock:
+            batch = self._current
+            leader = batch is None
+            if leader:
+                batch = self._current = _Batch()
+            offset = batch.add(frame)
+            if batch.rows >= self.max_batch_size:
+                self._current = None
+                batch.closed.set()
+
+        if leader:
+            batch.closed.wait(self.max_wait_ms / 1000)
+            with self._lock:
+                if self._current is batch:
+                    self._current = None
+            try:
+                batch.result = self._run(pd.concat(batch.frames, ignore_index=True))
+            except BaseException as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.result[offset:offset + len(frame)]
+
+    async def predict_async(self, frame: pd.DataFrame) -> np.ndarray:
+        """Predict from a coroutine without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.predict, frame)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'predict_calls': self.calls,
+            'rows': self.rows,
+            'avg_batch_rows': self.rows / self.calls if self.calls else 0.0
+        }
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+# One registry per process, shared by every predictor instance
+model_registry = ModelRegistry()
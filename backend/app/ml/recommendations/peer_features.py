@@ -0,0 +1,234 @@
+"""
+Set-based peer features for collaborative filtering.
+
+This module provides:
+- One SQL query aggregating profiles, goals and investments per user
+- Selection of users changed since a timestamp, and of all eligible users,
+  for incremental training
+- Column-wise similarity features, peer metrics and labels
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+from typing import Dict, List, Optional, Any
+
+from sqlalchemy import case, distinct, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.financial_profile import FinancialProfile
+from app.models.goal import Goal
+from app.models.investment import Investment
+from .feature_frames import safe_divide
+
+logger = logging.getLogger(__name__)
+
+# Similarity features, in training column order
+PEER_FEATURE_COLUMNS = [
+    'age', 'income_bracket', 'dependents', 'marital_status_encoded',
+    'income_log', 'net_worth_log', 'debt_to_income', 'savings_rate', 'liquid_assets_ratio',
+    'risk_tolerance_encoded', 'investment_experience_encoded', 'employment_status_encoded',
+    'num_goals', 'avg_goal_timeline', 'total_goal_amount_ratio', 'goal_diversity',
+    'num_investments', 'portfolio_value_ratio',
+    'goal_completion_rate', 'financial_health_score'
+]
+
+# Per-user values kept in the feature store for peer summaries and benchmarks
+PEER_METRIC_COLUMNS = [
+    'age', 'income_bracket', 'dependents', 'num_goals', 'num_investments',
+    'savings_rate', 'financial_health_score', 'goal_completion_rate',
+    'net_worth_to_income', 'debt_to_income', 'emergency_fund_months',
+    'investment_portfolio_value'
+]
+PEER_LABEL_COLUMNS = ['marital_status', 'risk_tolerance']
+
+ENCODED_COLUMNS = ['marital_status', 'risk_tolerance', 'investment_experience', 'employment_status']
+
+INCOME_BRACKETS = [30000, 50000, 75000, 100000, 150000]
+
+_ASSET_COLUMNS = [
+    'liquid_assets', 'retirement_accounts', 'real_estate_value',
+    'other_investments', 'personal_property_value'
+]
+_DEBT_COLUMNS = ['credit_card_debt', 'student_loans', 'auto_loans', 'other_debts']
+_LIABILITY_COLUMNS = ['mortgage_balance'] + _DEBT_COLUMNS
+
+
+def query_peer_rows(db: Session, user_ids: Optional[List[str]] = None,
+                    changed_since: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Raw peer rows, one per user with an income, aggregated in the database.
+
+    With ``changed_since`` only users whose profile, goals or investments
+    were updated at or after that time are returned.
+    """
+    months_to_target = (Goal.target_date - func.current_date()) / 30
+    months_remaining = case(
+        (Goal.status == 'completed', 0),
+        (months_to_target < 1, 1),
+        else_=months_to_target
+    )
+    goal_stats = db.query(
+        Goal.user_id.label('user_id'),
+        func.count(Goal.id).label('num_goals'),
+        func.avg(months_remaining).label('avg_goal_timeline'),
+        func.sum(Goal.target_amount).label('total_goal_amount'),
+        func.count(distinct(Goal.goal_type)).label('goal_diversity'),
+        func.sum(case((Goal.status == 'completed', 1), else_=0)).label('completed_goals'),
+        func.avg(Goal.progress_percentage).label('avg_goal_progress'),
+        func.max(Goal.updated_at).label('goals_updated_at')
+    ).group_by(Goal.user_id).subquery()
+
+    investment_stats = db.query(
+        Investment.user_id.label('user_id'),
+        func.count(Investment.id).label('num_investments'),
+        func.sum(func.coalesce(Investment.current_value, 0)).label('portfolio_value'),
+        func.max(Investment.updated_at).label('investments_updated_at')
+    ).group_by(Investment.user_id).subquery()
+
+    profile_columns = [
+        'date_of_birth', 'annual_income', 'monthly_expenses', 'dependents',
+        'marital_status', 'risk_tolerance', 'investment_experience', 'employment_status'
+    ] + _ASSET_COLUMNS + _LIABILITY_COLUMNS
+    query = db.query(
+        FinancialProfile.user_id,
+        *[getattr(FinancialProfile, column) for column in profile_columns],
+        func.coalesce(goal_stats.c.num_goals, 0).label('num_goals'),
+        goal_stats.c.avg_goal_timeline,
+        goal_stats.c.total_goal_amount,
+        func.coalesce(goal_stats.c.goal_diversity, 0).label('goal_diversity'),
+        func.coalesce(goal_stats.c.completed_goals, 0).label('completed_goals'),
+        goal_stats.c.avg_goal_progress,
+        func.coalesce(investment_stats.c.num_investments, 0).label('num_investments'),
+        func.coalesce(investment_stats.c.portfolio_value, 0).label('portfolio_value')
+    ).outerjoin(
+        goal_stats, goal_stats.c.user_id == FinancialProfile.user_id
+    ).outerjoin(
+        investment_stats, investment_stats.c.user_id == FinancialProfile.user_id
+    ).filter(FinancialProfile.annual_income.isnot(None))
+
+    if user_ids is not None:
+        query = query.filter(FinancialProfile.user_id.in_(user_ids))
+    if changed_since is not None:
+        query = query.filter(or_(
+            FinancialProfile.updated_at >= changed_since,
+            goal_stats.c.goals_updated_at >= changed_since,
+            investment_stats.c.investments_updated_at >= changed_since
+        ))
+
+    rows = pd.DataFrame(query.all(), columns=['user_id'] + profile_columns + [
+        'num_goals', 'avg_goal_timeline', 'total_goal_amount', 'goal_diversity',
+        'completed_goals', 'avg_goal_progress', 'num_investments', 'portfolio_value'
+    ])
+    rows.index = rows.pop('user_id').astype(str)
+    return rows
+
+
+def query_peer_user_ids(db: Session) -> List[str]:
+    """Ids of every user that query_peer_rows can return."""
+    rows = db.query(FinancialProfile.user_id).filter(FinancialProfile.annual_income.isnot(None)).all()
+    return [str(user_id) for user_id, in rows]
+
+
+def prepare_peer_frame(rows: pd.DataFrame, today: Optional[date] = None) -> pd.DataFrame:
+    """Derive age, net worth and debt-to-income columns from raw peer rows."""
+    today = today or date.today()
+    frame = rows.copy()
+    numeric = ['annual_income', 'monthly_expenses', 'dependents', 'num_goals', 'avg_goal_timeline',
+               'total_goal_amount', 'goal_diversity', 'completed_goals', 'avg_goal_progress',
+               'num_investments', 'portfolio_value'] + _ASSET_COLUMNS + _LIABILITY_COLUMNS
+    for column in numeric:
+        frame[column] = pd.to_numeric(frame[column], errors='coerce').astype(np.float64)
+
+    birth = pd.to_datetime(frame['date_of_birth'])
+    birthday_passed = (birth.dt.month < today.month) | ((birth.dt.month == today.month) & (birth.dt.day <= today.day))
+    frame['age'] = (today.year - birth.dt.year - (~birthday_passed).astype(int)).astype(np.float64)
+
+    assets = frame[_ASSET_COLUMNS].fillna(0).sum(axis=1)
+    frame['net_worth'] = assets - frame[_LIABILITY_COLUMNS].fillna(0).sum(axis=1)
+    income = frame['annual_income'].fillna(0).to_numpy()
+    frame['debt_to_income_ratio'] = safe_divide(frame[_DEBT_COLUMNS].fillna(0).sum(axis=1).to_numpy(), income)
+    return frame
+
+
+def encode_labels(values: pd.Series, encoder: Any) -> np.ndarray:
+    """Label-encoder codes for a column; unseen values and unfitted encoders give -1."""
+    classes = getattr(encoder, 'classes_', None)
+    if classes is None:
+        return np.full(len(values), -1, dtype=np.int64)
+    return pd.Index(classes).get_indexer(values.astype(str))
+
+
+def _savings_rate(frame: pd.DataFrame) -> np.ndarray:
+    income = frame['annual_income'].fillna(0).to_numpy()
+    rate = safe_divide(income - frame['monthly_expenses'].fillna(0).to_numpy() * 12, income)
+    return np.clip(rate, 0.0, 1.0)
+
+
+def _emergency_fund_months(frame: pd.DataFrame) -> np.ndarray:
+    return safe_divide(frame['liquid_assets'].fillna(0).to_numpy(), frame['monthly_expenses'].fillna(0).to_numpy())
+
+
+def _financial_health_score(frame: pd.DataFrame) -> np.ndarray:
+    """Mean of emergency fund, debt, savings and (with goals) goal progress factors."""
+    has_goals = frame['num_goals'].to_numpy() > 0
+    factors = (
+        np.minimum(1.0, _emergency_fund_months(frame) / 6)
+        + np.maximum(0.0, 1.0 - frame['debt_to_income_ratio'].to_numpy())
+        + _savings_rate(frame)
+        + np.where(has_goals, frame['avg_goal_progress'].fillna(0).to_numpy() / 100, 0.0)
+    )
+    return factors / np.where(has_goals, 4, 3)
+
+
+def peer_feature_frame(frame: pd.DataFrame, label_encoders: Dict[str, Any]) -> pd.DataFrame:
+    """Similarity features (PEER_FEATURE_COLUMNS) for every row of a peer frame."""
+    income = frame['annual_income'].fillna(0).to_numpy()
+    num_goals = frame['num_goals'].to_numpy()
+
+    features = pd.DataFrame(index=frame.index)
+    features['age'] = frame['age']
+    features['income_bracket'] = np.digitize(income, INCOME_BRACKETS)
+    features['dependents'] = frame['dependents']
+    features['income_log'] = np.log1p(income)
+    features['net_worth_log'] = np.log1p(np.maximum(0.0, frame['net_worth'].to_numpy()))
+    features['debt_to_income'] = frame['debt_to_income_ratio']
+    features['savings_rate'] = _savings_rate(frame)
+    features['liquid_assets_ratio'] = safe_divide(frame['liquid_assets'].fillna(0).to_numpy(), income)
+    for column in ENCODED_COLUMNS:
+        features[f'{column}_encoded'] = encode_labels(frame[column], label_encoders.get(column))
+    features['num_goals'] = num_goals
+    features['avg_goal_timeline'] = np.where(num_goals > 0, frame['avg_goal_timeline'].fillna(0), 0.0)
+    features['total_goal_amount_ratio'] = np.where(
+        num_goals > 0, safe_divide(frame['total_goal_amount'].fillna(0).to_numpy(), income), 0.0
+    )
+    features['goal_diversity'] = frame['goal_diversity']
+    features['num_investments'] = frame['num_investments']
+    features['portfolio_value_ratio'] = safe_divide(frame['portfolio_value'].to_numpy(), income)
+    features['goal_completion_rate'] = safe_divide(frame['completed_goals'].to_numpy(), num_goals)
+    features['financial_health_score'] = _financial_health_score(frame)
+    return features[PEER_FEATURE_COLUMNS].astype(np.float64)
+
+
+def peer_metric_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Peer metrics (PEER_METRIC_COLUMNS) and labels (PEER_LABEL_COLUMNS) for the feature store."""
+    income = frame['annual_income'].fillna(0).to_numpy()
+    num_goals = frame['num_goals'].to_numpy()
+
+    metrics = pd.DataFrame(index=frame.index)
+    metrics['age'] = frame['age']
+    metrics['income_bracket'] = np.digitize(income, INCOME_BRACKETS)
+    metrics['dependents'] = frame['dependents'].fillna(0)
+    metrics['num_goals'] = num_goals
+    metrics['num_investments'] = frame['num_investments']
+    metrics['savings_rate'] = _savings_rate(frame)
+    metrics['financial_health_score'] = _financial_health_score(frame)
+    metrics['goal_completion_rate'] = safe_divide(frame['completed_goals'].to_numpy(), num_goals)
+    metrics['net_worth_to_income'] = safe_divide(frame['net_worth'].to_numpy(), income)
+    metrics['debt_to_income'] = frame['debt_to_income_ratio']
+    metrics['emergency_fund_months'] = _emergency_fund_months(frame)
+    metrics['investment_portfolio_value'] = frame['portfolio_value']
+    for column in PEER_LABEL_COLUMNS:
+        metrics[column] = frame[column].astype(object).where(frame[column].notna(), None)
+    return metrics[PEER_METRIC_COLUMNS + PEER_LABEL_COLUMNS]
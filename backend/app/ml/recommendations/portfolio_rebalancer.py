@@ -25,10 +25,9 @@ import joblib
 import json
 from pathlib import Path
 
-from app.models.user import User
 from app.models.financial_profile import FinancialProfile
 from app.models.investment import Investment
-from app.database.base import SessionLocal
+from .user_snapshot import UserSnapshot, user_scope
 
 logger = logging.getLogger(__name__)
 
@@ -236,16 +235,16 @@ class PortfolioRebalancer:
         
         return drift_analysis
     
-    def generate_rebalancing_plan(self, user_id: str, portfolio_value: float) -> Dict[str, Any]:
+    def generate_rebalancing_plan(self, user_id: str, portfolio_value: float,
+                                  snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Generate comprehensive rebalancing recommendations for a user."""
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
+            with user_scope(user_id, snapshot) as user:
                 if not user or not user.financial_profile:
                     return {"error": "User or financial profile not found"}
                 
                 # Get current portfolio
-                current_portfolio = self._get_current_portfolio(user_id, db)
+                current_portfolio = self._get_current_portfolio(user.investments or [])
                 if not current_portfolio:
                     return {"error": "No investment data found"}
                 
@@ -294,10 +293,8 @@ class PortfolioRebalancer:
             logger.error(f"Failed to generate rebalancing plan for user {user_id}: {e}")
             return {"error": str(e)}
     
-    def _get_current_portfolio(self, user_id: str, db) -> Dict[str, float]:
+    def _get_current_portfolio(self, investments: List[Investment]) -> Dict[str, float]:
         """Get user's current portfolio weights."""
-        investments = db.query(Investment).filter(Investment.user_id == user_id).all()
-        
         portfolio = {}
         total_value = 0
         
@@ -9,12 +9,15 @@ This engine provides a unified interface for:
 - Peer comparisons
 - Savings strategies
 - Life event predictions
+- Batch scoring for nightly recommendation refreshes
 """
 
 import logging
 import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable
 import json
 
 from .goal_optimizer import GoalOptimizer
@@ -25,10 +28,10 @@ from .collaborative_filter import CollaborativeFilter
 from .savings_strategist import SavingsStrategist
 from .life_event_predictor import LifeEventPredictor
 from .model_monitor import ModelMonitor
+from .model_server import MicroBatcher, model_registry
+from .user_snapshot import UserSnapshot, load_user_snapshot, load_user_snapshots
 
-from app.models.user import User
 from app.models.financial_profile import FinancialProfile
-from app.database.base import SessionLocal
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +39,7 @@ logger = logging.getLogger(__name__)
 class RecommendationEngine:
     """Unified ML-powered recommendation engine for financial planning."""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 8):
         # Initialize all ML modules
         self.goal_optimizer = GoalOptimizer()
         self.portfolio_rebalancer = PortfolioRebalancer()
@@ -47,6 +50,22 @@ class RecommendationEngine:
         self.life_event_predictor = LifeEventPredictor()
         self.model_monitor = ModelMonitor()
         
+        # Sample scored inputs into the monitor's live drift windows
+        self.risk_predictor.risk_batcher.add_observer(
+            functools.partial(self.model_monitor.record_inference_inputs, 'risk_predictor')
+        )
+        self.life_event_predictor.event_batcher.add_observer(
+            functools.partial(self.model_monitor.record_inference_inputs, 'life_event_predictor')
+        )
+        
+        # Training features become the reference those windows are scored against
+        self.risk_predictor.add_training_observer(
+            functools.partial(self.model_monitor.save_reference_data, 'risk_predictor')
+        )
+        self.life_event_predictor.add_training_observer(
+            functools.partial(self.model_monitor.save_reference_data, 'life_event_predictor')
+        )
+        
         # Recommendation categories
         self.recommendation_categories = {
             'goal_optimization': 'Optimize your financial goals',
@@ -57,9 +76,36 @@ class RecommendationEngine:
             'savings_strategy': 'Optimize your savings approach',
             'life_planning': 'Prepare for major life events'
         }
+        
+        self.category_generators = {
+            'goal_optimization': self._get_goal_recommendations,
+            'portfolio_rebalancing': self._get_portfolio_recommendations,
+            'risk_assessment': self._get_risk_recommendations,
+            'behavioral_insights': self._get_behavioral_recommendations,
+            'peer_insights': self._get_peer_recommendations,
+            'savings_strategy': self._get_savings_recommendations,
+            'life_planning': self._get_life_event_recommendations
+        }
+        
+        # Model inference and sync database work run here, off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recommendations")
+    
+    async def run_blocking(self, func: Callable, *args) -> Any:
+        """Run a blocking call on the engine's thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+    
+    def _annotate_category(self, result: Dict[str, Any], category: str) -> Dict[str, Any]:
+        """Add category metadata to a successful result."""
+        if 'error' not in result:
+            result['category'] = category
+            result['category_description'] = self.recommendation_categories[category]
+            result['priority'] = self._calculate_category_priority(result, category)
+        return result
     
     async def generate_comprehensive_recommendations(self, user_id: str,
-                                                   categories: List[str] = None) -> Dict[str, Any]:
+                                                   categories: List[str] = None,
+                                                   snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Generate comprehensive recommendations across all categories."""
         try:
             # Default to all categories if none specified
@@ -68,178 +114,220 @@ class RecommendationEngine:
             
             logger.info(f"Generating recommendations for user {user_id}, categories: {categories}")
             
-            # Verify user exists
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
-                if not user or not user.financial_profile:
-                    return {"error": "User or financial profile not found"}
+            # Load the user once and share the snapshot across all generators
+            if snapshot is None:
+                snapshot = await self.run_blocking(load_user_snapshot, user_id)
+            if snapshot is None or not snapshot.financial_profile:
+                return {"error": "User or financial profile not found"}
             
             # Generate recommendations concurrently
-            recommendations = {}
-            
-            # Execute recommendations
-            if 'goal_optimization' in categories:
-                recommendations['goal_optimization'] = await self._get_goal_recommendations(user_id)
-            
-            if 'portfolio_rebalancing' in categories:
-                recommendations['portfolio_rebalancing'] = await self._get_portfolio_recommendations(user_id)
-            
-            if 'risk_assessment' in categories:
-                recommendations['risk_assessment'] = await self._get_risk_recommendations(user_id)
-            
-            if 'behavioral_insights' in categories:
-                recommendations['behavioral_insights'] = await self._get_behavioral_recommendations(user_id)
-            
-            if 'peer_insights' in categories:
-                recommendations['peer_insights'] = await self._get_peer_recommendations(user_id)
-            
-            if 'savings_strategy' in categories:
-                recommendations['savings_strategy'] = await self._get_savings_recommendations(user_id)
-            
-            if 'life_planning' in categories:
-                recommendations['life_planning'] = await self._get_life_event_recommendations(user_id)
+            selected = [c for c in self.category_generators if c in categories]
+            results = await asyncio.gather(*(
+                self.category_generators[category](user_id, snapshot) for category in selected
+            ))
             
-            # Generate executive summary
-            executive_summary = self._generate_executive_summary(recommendations)
-            
-            # Prioritize recommendations
-            prioritized_actions = self._prioritize_recommendations(recommendations)
-            
-            # Calculate overall financial health score
-            financial_health_score = self._calculate_overall_health_score(recommendations)
-            
-            return {
-                'user_id': user_id,
-                'timestamp': datetime.now().isoformat(),
-                'executive_summary': executive_summary,
-                'financial_health_score': financial_health_score,
-                'prioritized_actions': prioritized_actions,
-                'recommendations': recommendations,
-                'categories_analyzed': categories,
-                'next_review_date': self._calculate_next_review_date(recommendations)
-            }
+            return self._build_response(user_id, categories, dict(zip(selected, results)))
             
         except Exception as e:
             logger.error(f"Failed to generate comprehensive recommendations for user {user_id}: {e}")
             return {"error": str(e)}
     
-    async def _get_goal_recommendations(self, user_id: str) -> Dict[str, Any]:
+    async def generate_batch_recommendations(self, user_ids: List[str],
+                                           categories: List[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate recommendations for many users (nightly refresh).
+        
+        Snapshots for the whole batch load in three queries. Goal, risk and
+        life event models score every user in one call per model; the other
+        categories run per user on the shared snapshots.
+        """
+        if categories is None:
+            categories = list(self.recommendation_categories.keys())
+        
+        user_ids = [str(user_id) for user_id in user_ids]
+        snapshots = await self.run_blocking(load_user_snapshots, user_ids)
+        
+        responses = {
+            user_id: {"error": "User or financial profile not found"}
+            for user_id in user_ids if user_id not in snapshots
+        }
+        users = {user_id: snapshots[user_id] for user_id in user_ids if user_id in snapshots}
+        if not users:
+            return responses
+        
+        batch_scorers = {
+            'goal_optimization': self.goal_optimizer.optimize_goals_batch,
+            'risk_assessment': self.risk_predictor.predict_risk_tolerance_batch,
+            'life_planning': self.life_event_predictor.predict_life_events_batch
+        }
+        
+        async def run_category(category: str) -> Dict[str, Dict[str, Any]]:
+            if category in batch_scorers:
+                results = await self.run_blocking(self._score_batch, category, batch_scorers[category], users)
+                return {user_id: self._annotate_category(result, category) for user_id, result in results.items()}
+            
+            results = await asyncio.gather(*(
+                self.category_generators[category](user_id, snapshot)
+                for user_id, snapshot in users.items()
+            ))
+            return dict(zip(users, results))
+        
+        selected = [c for c in self.category_generators if c in categories]
+        category_results = dict(zip(selected, await asyncio.gather(*(run_category(c) for c in selected))))
+        
+        for user_id in users:
+            recommendations = {category: category_results[category][user_id] for category in selected}
+            responses[user_id] = self._build_response(user_id, categories, recommendations)
+        
+        logger.info(f"Generated batch recommendations for {len(users)} users")
+        
+        return {user_id: responses[user_id] for user_id in user_ids}
+    
+    def _score_batch(self, category: str, scorer: Callable,
+                     users: Dict[str, UserSnapshot]) -> Dict[str, Dict[str, Any]]:
+        """Score a batch with one model call, falling back to per-user calls on failure."""
+        try:
+            results = scorer(users)
+        except Exception as e:
+            logger.error(f"Batch scoring failed for {category}, scoring users individually: {e}")
+            results = {}
+            for user_id, snapshot in users.items():
+                try:
+                    results[user_id] = scorer({user_id: snapshot})[user_id]
+                except Exception as user_error:
+                    results[user_id] = {"error": str(user_error), "category": category}
+        
+        if category == 'risk_assessment':
+            for user_id, result in results.items():
+                if 'error' not in result:
+                    result['risk_capacity_analysis'] = self.risk_predictor.analyze_risk_capacity_vs_tolerance(
+                        user_id, users[user_id]
+                    )
+        
+        return results
+    
+    def _build_response(self, user_id: str, categories: List[str],
+                        recommendations: Dict[str, Any]) -> Dict[str, Any]:
+        """Assemble the response for one user's category results."""
+        # Generate executive summary
+        executive_summary = self._generate_executive_summary(recommendations)
+        
+        # Prioritize recommendations
+        prioritized_actions = self._prioritize_recommendations(recommendations)
+        
+        # Calculate overall financial health score
+        financial_health_score = self._calculate_overall_health_score(recommendations)
+        
+        return {
+            'user_id': user_id,
+            'timestamp': datetime.now().isoformat(),
+            'executive_summary': executive_summary,
+            'financial_health_score': financial_health_score,
+            'prioritized_actions': prioritized_actions,
+            'recommendations': recommendations,
+            'categories_analyzed': categories,
+            'next_review_date': self._calculate_next_review_date(recommendations)
+        }
+    
+    async def _get_goal_recommendations(self, user_id: str,
+                                        snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Get goal optimization recommendations."""
         try:
-            result = self.goal_optimizer.optimize_goals(user_id)
+            result = await self.run_blocking(self.goal_optimizer.optimize_goals, user_id, snapshot)
             
             # Add category metadata
-            if 'error' not in result:
-                result['category'] = 'goal_optimization'
-                result['category_description'] = self.recommendation_categories['goal_optimization']
-                result['priority'] = self._calculate_category_priority(result, 'goal_optimization')
-            
-            return result
+            return self._annotate_category(result, 'goal_optimization')
         except Exception as e:
             logger.error(f"Failed to get goal recommendations: {e}")
             return {"error": str(e), "category": "goal_optimization"}
     
-    async def _get_portfolio_recommendations(self, user_id: str) -> Dict[str, Any]:
+    async def _get_portfolio_recommendations(self, user_id: str,
+                                             snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Get portfolio rebalancing recommendations."""
         try:
             # Estimate portfolio value (in real implementation, this would come from investment data)
             portfolio_value = 100000  # Default value
             
-            result = self.portfolio_rebalancer.generate_rebalancing_plan(user_id, portfolio_value)
-            
-            if 'error' not in result:
-                result['category'] = 'portfolio_rebalancing'
-                result['category_description'] = self.recommendation_categories['portfolio_rebalancing']
-                result['priority'] = self._calculate_category_priority(result, 'portfolio_rebalancing')
+            result = await self.run_blocking(
+                self.portfolio_rebalancer.generate_rebalancing_plan, user_id, portfolio_value, snapshot
+            )
             
-            return result
+            return self._annotate_category(result, 'portfolio_rebalancing')
         except Exception as e:
             logger.error(f"Failed to get portfolio recommendations: {e}")
             return {"error": str(e), "category": "portfolio_rebalancing"}
     
-    async def _get_risk_recommendations(self, user_id: str) -> Dict[str, Any]:
+    async def _get_risk_recommendations(self, user_id: str,
+                                        snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Get risk tolerance recommendations."""
         try:
-            result = self.risk_predictor.predict_actual_risk_tolerance(user_id)
+            result = await self.run_blocking(self.risk_predictor.predict_actual_risk_tolerance, user_id, snapshot)
             
             if 'error' not in result:
                 # Also get risk capacity analysis
-                capacity_analysis = self.risk_predictor.analyze_risk_capacity_vs_tolerance(user_id)
+                capacity_analysis = await self.run_blocking(
+                    self.risk_predictor.analyze_risk_capacity_vs_tolerance, user_id, snapshot
+                )
                 result['risk_capacity_analysis'] = capacity_analysis
-                
-                result['category'] = 'risk_assessment'
-                result['category_description'] = self.recommendation_categories['risk_assessment']
-                result['priority'] = self._calculate_category_priority(result, 'risk_assessment')
             
-            return result
+            return self._annotate_category(result, 'risk_assessment')
         except Exception as e:
             logger.error(f"Failed to get risk recommendations: {e}")
             return {"error": str(e), "category": "risk_assessment"}
     
-    async def _get_behavioral_recommendations(self, user_id: str) -> Dict[str, Any]:
+    async def _get_behavioral_recommendations(self, user_id: str,
+                                              snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Get behavioral pattern recommendations."""
         try:
-            result = self.behavioral_analyzer.analyze_spending_patterns(user_id)
+            result = await self.run_blocking(self.behavioral_analyzer.analyze_spending_patterns, user_id, snapshot)
             
             if 'error' not in result:
                 # Also get spending predictions
-                predictions = self.behavioral_analyzer.predict_future_spending(user_id)
+                predictions = await self.run_blocking(
+                    self.behavioral_analyzer.predict_future_spending, user_id, 6, snapshot
+                )
                 result['spending_predictions'] = predictions
-                
-                result['category'] = 'behavioral_insights'
-                result['category_description'] = self.recommendation_categories['behavioral_insights']
-                result['priority'] = self._calculate_category_priority(result, 'behavioral_insights')
             
-            return result
+            return self._annotate_category(result, 'behavioral_insights')
         except Exception as e:
             logger.error(f"Failed to get behavioral recommendations: {e}")
             return {"error": str(e), "category": "behavioral_insights"}
     
-    async def _get_peer_recommendations(self, user_id: str) -> Dict[str, Any]:
+    async def _get_peer_recommendations(self, user_id: str,
+                                        snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Get peer comparison recommendations."""
         try:
-            similar_users = self.collaborative_filter.find_similar_users(user_id)
+            # Served from the collaborative filter's feature store, no snapshot needed
+            similar_users = await self.run_blocking(self.collaborative_filter.find_similar_users, user_id)
             
             if 'error' not in similar_users:
                 # Also get peer benchmarks
-                benchmarks = self.collaborative_filter.get_peer_benchmarks(user_id)
+                benchmarks = await self.run_blocking(self.collaborative_filter.get_peer_benchmarks, user_id)
                 similar_users['peer_benchmarks'] = benchmarks
-                
-                similar_users['category'] = 'peer_insights'
-                similar_users['category_description'] = self.recommendation_categories['peer_insights']
-                similar_users['priority'] = self._calculate_category_priority(similar_users, 'peer_insights')
             
-            return similar_users
+            return self._annotate_category(similar_users, 'peer_insights')
         except Exception as e:
             logger.error(f"Failed to get peer recommendations: {e}")
             return {"error": str(e), "category": "peer_insights"}
     
-    async def _get_savings_recommendations(self, user_id: str) -> Dict[str, Any]:
+    async def _get_savings_recommendations(self, user_id: str,
+                                           snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Get savings strategy recommendations."""
         try:
-            result = self.savings_strategist.generate_savings_strategy(user_id)
-            
-            if 'error' not in result:
-                result['category'] = 'savings_strategy'
-                result['category_description'] = self.recommendation_categories['savings_strategy']
-                result['priority'] = self._calculate_category_priority(result, 'savings_strategy')
+            result = await self.run_blocking(self.savings_strategist.generate_savings_strategy, user_id, snapshot)
             
-            return result
+            return self._annotate_category(result, 'savings_strategy')
         except Exception as e:
             logger.error(f"Failed to get savings recommendations: {e}")
             return {"error": str(e), "category": "savings_strategy"}
     
-    async def _get_life_event_recommendations(self, user_id: str) -> Dict[str, Any]:
+    async def _get_life_event_recommendations(self, user_id: str,
+                                              snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Get life event predictions and recommendations."""
         try:
-            result = self.life_event_predictor.predict_life_events(user_id)
+            result = await self.run_blocking(self.life_event_predictor.predict_life_events, user_id, snapshot)
             
-            if 'error' not in result:
-                result['category'] = 'life_planning'
-                result['category_description'] = self.recommendation_categories['life_planning']
-                result['priority'] = self._calculate_category_priority(result, 'life_planning')
-            
-            return result
+            return self._annotate_category(result, 'life_planning')
         except Exception as e:
             logger.error(f"Failed to get life event recommendations: {e}")
             return {"error": str(e), "category": "life_planning"}
@@ -625,8 +713,8 @@ class RecommendationEngine:
             next_review = datetime.now().timestamp() + (90 * 24 * 60 * 60)
             return datetime.fromtimestamp(next_review).isoformat()
     
-    def train_all_models(self, retrain: bool = False) -> Dict[str, Any]:
-        """Train all ML models."""
+    def train_all_models(self, retrain: bool = False, incremental: bool = False) -> Dict[str, Any]:
+        """Train all ML models. ``incremental`` applies to models that support it."""
         try:
             training_results = {}
             
@@ -647,7 +735,9 @@ class RecommendationEngine:
                     elif hasattr(model_instance, 'train_risk_prediction_model'):
                         result = model_instance.train_risk_prediction_model(retrain=retrain)
                     elif hasattr(model_instance, 'train_collaborative_models'):
-                        result = model_instance.train_collaborative_models(retrain=retrain)
+                        result = model_instance.train_collaborative_models(
+                            retrain=retrain, incremental=incremental
+                        )
                     elif hasattr(model_instance, 'train_life_event_models'):
                         result = model_instance.train_life_event_models(retrain=retrain)
                     else:
@@ -704,6 +794,8 @@ class RecommendationEngine:
                     # Count loaded models
                     for attr_name in dir(module_instance):
                         attr = getattr(module_instance, attr_name)
+                        if isinstance(attr, MicroBatcher):
+                            continue
                         if hasattr(attr, 'predict') or hasattr(attr, 'fit') or hasattr(attr, 'transform'):
                             if attr is not None:
                                 module_status['models_loaded'] += 1
@@ -727,6 +819,7 @@ class RecommendationEngine:
             elif unhealthy_modules > 0:
                 status['overall_health'] = 'degraded'
             
+            status['serving'] = model_registry.stats()
             return status
             
         except Exception as e:
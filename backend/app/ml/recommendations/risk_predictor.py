@@ -8,8 +8,7 @@ and recommend adjustments to investment strategies.
 import logging
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Callable
 import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
@@ -24,6 +23,9 @@ from app.models.financial_profile import FinancialProfile
 from app.models.goal import Goal
 from app.models.investment import Investment
 from app.database.base import SessionLocal
+from .user_snapshot import UserSnapshot, user_scope
+from .feature_frames import build_user_frame, risk_feature_frame, RISK_TOLERANCE_CODES
+from .model_server import model_registry
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +33,17 @@ logger = logging.getLogger(__name__)
 class RiskTolerancePredictor:
     """ML-based risk tolerance prediction and behavioral analysis."""
     
+    MODEL_FILES = {
+        'risk_classifier': 'risk_classifier.pkl',
+        'scalers': 'scalers.pkl',
+        'encoders': 'encoders.pkl'
+    }
+    OPTIONAL_MODEL_FILES = {
+        'behavioral_model': 'behavioral_model.pkl',
+        'market_reaction_model': 'market_reaction_model.pkl',
+        'feature_importance': 'feature_importance.json'
+    }
+    
     def __init__(self, model_path: Optional[str] = None):
         self.model_path = model_path or "/app/ml/models/risk_predictor"
         self.risk_classifier = None
@@ -39,6 +52,8 @@ class RiskTolerancePredictor:
         self.scalers = {}
         self.encoders = {}
         self.feature_importance = {}
+        self._model_version = None
+        self._training_observers: List[Callable[[pd.DataFrame], Any]] = []
         
         # Risk tolerance mapping
         self.risk_levels = {
@@ -48,24 +63,35 @@ class RiskTolerancePredictor:
         }
         
         self._load_models()
+        self.risk_batcher = model_registry.batcher(
+            f"risk_classifier:{Path(self.model_path).resolve()}", self._predict_risk_proba
+        )
+    
+    def add_training_observer(self, callback: Callable[[pd.DataFrame], Any]) -> None:
+        """Call ``callback`` with the raw feature frame each newly trained model was fit on."""
+        if callback not in self._training_observers:
+            self._training_observers.append(callback)
+    
+    def _notify_trained(self, features: pd.DataFrame) -> None:
+        for callback in self._training_observers:
+            try:
+                callback(features)
+            except Exception as e:
+                logger.warning(f"Training observer failed: {e}")
     
     def _load_models(self) -> None:
-        """Load pre-trained risk prediction models."""
-        try:
-            model_dir = Path(self.model_path)
-            if model_dir.exists():
-                self.risk_classifier = joblib.load(model_dir / "risk_classifier.pkl")
-                self.behavioral_model = joblib.load(model_dir / "behavioral_model.pkl")
-                self.market_reaction_model = joblib.load(model_dir / "market_reaction_model.pkl")
-                self.scalers = joblib.load(model_dir / "scalers.pkl")
-                self.encoders = joblib.load(model_dir / "encoders.pkl")
-                
-                with open(model_dir / "feature_importance.json", 'r') as f:
-                    self.feature_importance = json.load(f)
-                
-                logger.info("Loaded pre-trained risk prediction models")
-        except Exception as e:
-            logger.warning(f"Could not load pre-trained models: {e}")
+        """Use the process-wide copy of the pre-trained models, reloaded when files change."""
+        bundle = model_registry.load_bundle(self.model_path, self.MODEL_FILES, self.OPTIONAL_MODEL_FILES)
+        if bundle is None or bundle.version == self._model_version:
+            return
+        
+        self.risk_classifier = bundle.get('risk_classifier')
+        self.behavioral_model = bundle.get('behavioral_model')
+        self.market_reaction_model = bundle.get('market_reaction_model')
+        self.scalers = bundle.get('scalers', {})
+        self.encoders = bundle.get('encoders', {})
+        self.feature_importance = bundle.get('feature_importance', {})
+        self._model_version = bundle.version
     
     def _save_models(self) -> None:
         """Save trained models."""
@@ -87,56 +113,13 @@ class RiskTolerancePredictor:
                 json.dump(self.feature_importance, f, indent=2)
             
             logger.info("Saved risk prediction models")
+            model_registry.invalidate(self.model_path)
         except Exception as e:
             logger.error(f"Failed to save models: {e}")
     
     def _extract_behavioral_features(self, user_data: Dict) -> Dict[str, float]:
-        """Extract behavioral features from user data."""
-        profile = user_data['profile']
-        goals = user_data.get('goals', [])
-        investments = user_data.get('investments', [])
-        
-        features = {
-            # Demographics
-            'age': profile.age,
-            'income_log': np.log1p(float(profile.annual_income)),
-            'net_worth_log': np.log1p(max(0, profile.net_worth)),
-            'dependents': profile.dependents,
-            
-            # Financial behavior
-            'debt_to_income': profile.debt_to_income_ratio,
-            'savings_rate': self._calculate_savings_rate(profile),
-            'emergency_fund_ratio': self._calculate_emergency_fund_ratio(profile),
-            
-            # Goal behavior
-            'num_goals': len(goals),
-            'avg_goal_timeline': np.mean([g.months_remaining for g in goals]) if goals else 0,
-            'goal_diversity': len(set(g.goal_type for g in goals)),
-            'flexible_goals_ratio': sum(g.is_flexible_timeline for g in goals) / max(1, len(goals)),
-            
-            # Investment behavior
-            'num_investments': len(investments),
-            'portfolio_concentration': self._calculate_portfolio_concentration(investments),
-            'investment_frequency': self._calculate_investment_frequency(investments),
-            
-            # Stated vs actual behavior
-            'stated_risk_tolerance': self._encode_risk_tolerance(profile.risk_tolerance),
-            'investment_experience_years': self._encode_experience(profile.investment_experience),
-            
-            # Market timing behavior (would be derived from transaction history)
-            'market_timing_score': self._calculate_market_timing_score(investments),
-            'volatility_reaction_score': self._calculate_volatility_reaction(investments),
-            
-            # Life stage factors
-            'retirement_horizon': max(0, (profile.retirement_age_target or 65) - profile.age),
-            'family_stage': self._encode_family_stage(profile),
-            
-            # Employment stability
-            'job_stability_score': self._encode_job_stability(profile),
-            'income_stability_score': self._encode_income_stability(profile)
-        }
-        
-        return features
+        """Extract behavioral features for a single user."""
+        return risk_feature_frame(build_user_frame([user_data])).iloc[0].to_dict()
     
     def _calculate_savings_rate(self, profile: FinancialProfile) -> float:
         """Calculate user's savings rate."""
@@ -159,67 +142,9 @@ class RiskTolerancePredictor:
         emergency_fund_ratio = liquid_assets / (monthly_expenses * 6)
         return min(2.0, emergency_fund_ratio)  # Cap at 2x adequate
     
-    def _calculate_portfolio_concentration(self, investments: List) -> float:
-        """Calculate portfolio concentration (Herfindahl index)."""
-        if not investments:
-            return 0.0
-        
-        total_value = sum(float(inv.current_value or 0) for inv in investments)
-        if total_value <= 0:
-            return 0.0
-        
-        weights = [float(inv.current_value or 0) / total_value for inv in investments]
-        herfindahl = sum(w**2 for w in weights)
-        
-        return herfindahl
-    
-    def _calculate_investment_frequency(self, investments: List) -> float:
-        """Estimate investment frequency from portfolio data."""
-        # This would ideally use transaction history
-        # For now, estimate based on number of positions and recency
-        if not investments:
-            return 0.0
-        
-        recent_investments = sum(1 for inv in investments 
-                               if inv.updated_at and 
-                               (datetime.utcnow() - inv.updated_at).days < 90)
-        
-        return recent_investments / max(1, len(investments))
-    
-    def _calculate_market_timing_score(self, investments: List) -> float:
-        """Calculate market timing behavior score."""
-        # This would require transaction history to be accurate
-        # For now, return a neutral score
-        return 0.5
-    
-    def _calculate_volatility_reaction(self, investments: List) -> float:
-        """Calculate how user reacts to volatility."""
-        # This would require transaction history during volatile periods
-        # For now, return a neutral score
-        return 0.5
-    
     def _encode_risk_tolerance(self, risk_tolerance: str) -> int:
         """Encode risk tolerance to numeric value."""
-        mapping = {'conservative': 0, 'moderate': 1, 'aggressive': 2}
-        return mapping.get(risk_tolerance, 1)
-    
-    def _encode_experience(self, experience: str) -> float:
-        """Encode investment experience to years."""
-        mapping = {'beginner': 1, 'intermediate': 5, 'advanced': 15}
-        return mapping.get(experience, 5)
-    
-    def _encode_family_stage(self, profile: FinancialProfile) -> int:
-        """Encode family life stage."""
-        if profile.age < 25:
-            return 0  # Young single
-        elif profile.age < 35 and profile.marital_status == 'single':
-            return 1  # Established single
-        elif profile.age < 45 and profile.dependents == 0:
-            return 2  # Young couple/married no kids
-        elif profile.dependents > 0:
-            return 3  # Family with dependents
-        else:
-            return 4  # Pre-retirement/empty nest
+        return RISK_TOLERANCE_CODES.get(risk_tolerance, 1)
     
     def _encode_job_stability(self, profile: FinancialProfile) -> float:
         """Encode job stability to numeric score."""
@@ -254,24 +179,17 @@ class RiskTolerancePredictor:
             return {}
         
         # Extract features
-        features_list = []
-        labels = []
+        features = risk_feature_frame(build_user_frame(training_data))
         
-        for user_data in training_data:
-            features = self._extract_behavioral_features(user_data)
-            features_list.append(features)
-            
-            # Use stated risk tolerance as ground truth for now
-            # In practice, this would be derived from actual behavior
-            risk_label = self._encode_risk_tolerance(user_data['profile'].risk_tolerance)
-            labels.append(risk_label)
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(features_list)
-        y = np.array(labels)
+        # Use stated risk tolerance as ground truth for now
+        # In practice, this would be derived from actual behavior
+        y = np.array([
+            self._encode_risk_tolerance(user_data['profile'].risk_tolerance)
+            for user_data in training_data
+        ])
         
         # Handle missing values
-        df = df.fillna(df.median())
+        df = features.fillna(features.median())
         
         # Scale features
         scaler = StandardScaler()
@@ -300,11 +218,12 @@ class RiskTolerancePredictor:
         
         # Store feature importance
         self.feature_importance['risk_prediction'] = dict(
-            zip(df.columns, self.risk_classifier.feature_importances_)
+            zip(df.columns, self.risk_classifier.feature_importances_.tolist())
         )
         
         # Save models
         self._save_models()
+        self._notify_trained(features)
         
         metrics = {
             'accuracy': accuracy,
@@ -340,75 +259,98 @@ class RiskTolerancePredictor:
         
         return training_data
     
-    def predict_actual_risk_tolerance(self, user_id: str) -> Dict[str, Any]:
+    def predict_actual_risk_tolerance(self, user_id: str, snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Predict user's actual risk tolerance based on behavior."""
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
+            with user_scope(user_id, snapshot) as user:
                 if not user or not user.financial_profile:
                     return {"error": "User or financial profile not found"}
                 
-                # Extract behavioral features
-                user_data = {
-                    'profile': user.financial_profile,
-                    'goals': user.goals or [],
-                    'investments': user.investments or []
-                }
-                
-                features = self._extract_behavioral_features(user_data)
-                
-                # Convert to array
-                feature_df = pd.DataFrame([features])
-                feature_df = feature_df.fillna(feature_df.median())
-                
-                # Scale features
-                if 'risk_features' in self.scalers:
-                    X = self.scalers['risk_features'].transform(feature_df)
-                else:
-                    X = feature_df.values
-                
-                # Make prediction
-                if self.risk_classifier:
-                    probabilities = self.risk_classifier.predict_proba(X)[0]
-                    predicted_class = self.risk_classifier.predict(X)[0]
-                    
-                    # Calculate confidence
-                    confidence = np.max(probabilities)
-                    
-                    predicted_risk = self.risk_levels[predicted_class]
-                    stated_risk = user.financial_profile.risk_tolerance
-                    
-                    # Analyze discrepancy
-                    discrepancy_analysis = self._analyze_risk_discrepancy(
-                        stated_risk, predicted_risk, features, probabilities
-                    )
-                    
-                    return {
-                        'user_id': user_id,
-                        'stated_risk_tolerance': stated_risk,
-                        'predicted_risk_tolerance': predicted_risk,
-                        'confidence': float(confidence),
-                        'risk_probabilities': {
-                            'conservative': float(probabilities[0]),
-                            'moderate': float(probabilities[1]),
-                            'aggressive': float(probabilities[2])
-                        },
-                        'discrepancy_analysis': discrepancy_analysis,
-                        'behavioral_insights': self._generate_behavioral_insights(features),
-                        'recommendations': self._generate_risk_recommendations(
-                            stated_risk, predicted_risk, features, confidence
-                        )
-                    }
-                else:
-                    return {
-                        "error": "Risk prediction model not trained",
-                        "behavioral_insights": self._generate_behavioral_insights(features)
-                    }
+                return self.predict_risk_tolerance_batch({user_id: user})[user_id]
                     
         except Exception as e:
             logger.error(f"Failed to predict risk tolerance for user {user_id}: {e}")
             return {"error": str(e)}
     
+    def predict_risk_tolerance_batch(self, users: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Predict risk tolerance for many users with one classifier call."""
+        user_ids = list(users)
+        
+        # Extract behavioral features for all users at once
+        feature_df = risk_feature_frame(build_user_frame([
+            {
+                'profile': users[user_id].financial_profile,
+                'goals': users[user_id].goals or [],
+                'investments': users[user_id].investments or []
+            }
+            for user_id in user_ids
+        ], index=user_ids))
+        features_list = feature_df.to_dict('records')
+        
+        self._load_models()
+        if not self.risk_classifier:
+            return {
+                user_id: {
+                    "error": "Risk prediction model not trained",
+                    "behavioral_insights": self._generate_behavioral_insights(features)
+                }
+                for user_id, features in zip(user_ids, features_list)
+            }
+        
+        # Models served from disk share one classifier call with concurrent requests
+        if self._model_version is not None:
+            all_probabilities = self.risk_batcher.predict(feature_df)
+        else:
+            all_probabilities = self._predict_risk_proba(feature_df)
+        classes = getattr(self.risk_classifier, 'classes_', None)
+        predicted_indices = np.argmax(all_probabilities, axis=1)
+        predicted_classes = classes[predicted_indices] if classes is not None else predicted_indices
+        
+        results = {}
+        for i, user_id in enumerate(user_ids):
+            features = features_list[i]
+            probabilities = all_probabilities[i]
+            
+            # Calculate confidence
+            confidence = np.max(probabilities)
+            
+            predicted_risk = self.risk_levels[predicted_classes[i]]
+            stated_risk = users[user_id].financial_profile.risk_tolerance
+            
+            # Analyze discrepancy
+            discrepancy_analysis = self._analyze_risk_discrepancy(
+                stated_risk, predicted_risk, features, probabilities
+            )
+            
+            results[user_id] = {
+                'user_id': user_id,
+                'stated_risk_tolerance': stated_risk,
+                'predicted_risk_tolerance': predicted_risk,
+                'confidence': float(confidence),
+                'risk_probabilities': {
+                    'conservative': float(probabilities[0]),
+                    'moderate': float(probabilities[1]),
+                    'aggressive': float(probabilities[2])
+                },
+                'discrepancy_analysis': discrepancy_analysis,
+                'behavioral_insights': self._generate_behavioral_insights(features),
+                'recommendations': self._generate_risk_recommendations(
+                    stated_risk, predicted_risk, features, confidence
+                )
+            }
+        
+        return results
+    
+    def _predict_risk_proba(self, feature_df: pd.DataFrame) -> np.ndarray:
+        """Class probabilities for a batch of behavioral feature rows."""
+        if self._model_version is not None:
+            self._load_models()
+        if 'risk_features' in self.scalers:
+            X = self.scalers['risk_features'].transform(feature_df)
+        else:
+            X = feature_df.values
+        return self.risk_classifier.predict_proba(X)
+    
     def _analyze_risk_discrepancy(self, stated: str, predicted: str,
                                  features: Dict, probabilities: np.ndarray) -> Dict[str, Any]:
         """Analyze discrepancy between stated and predicted risk tolerance."""
@@ -506,11 +448,10 @@ class RiskTolerancePredictor:
         
         return recommendations
     
-    def analyze_risk_capacity_vs_tolerance(self, user_id: str) -> Dict[str, Any]:
+    def analyze_risk_capacity_vs_tolerance(self, user_id: str, snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Analyze difference between risk capacity and risk tolerance."""
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
+            with user_scope(user_id, snapshot) as user:
                 if not user or not user.financial_profile:
                     return {"error": "User or financial profile not found"}
                 
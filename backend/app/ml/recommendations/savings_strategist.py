@@ -20,10 +20,10 @@ import joblib
 import json
 from pathlib import Path
 
-from app.models.user import User
 from app.models.financial_profile import FinancialProfile
 from app.models.goal import Goal
-from app.database.base import SessionLocal
+from .user_snapshot import UserSnapshot, user_scope
+from .model_server import model_registry
 
 logger = logging.getLogger(__name__)
 
@@ -31,12 +31,20 @@ logger = logging.getLogger(__name__)
 class SavingsStrategist:
     """ML-powered personalized savings strategy generator."""
     
+    MODEL_FILES = {'scaler': 'scaler.pkl'}
+    OPTIONAL_MODEL_FILES = {
+        'savings_optimizer': 'savings_optimizer.pkl',
+        'behavior_predictor': 'behavior_predictor.pkl',
+        'allocation_model': 'allocation_model.pkl'
+    }
+    
     def __init__(self, model_path: Optional[str] = None):
         self.model_path = model_path or "/app/ml/models/savings_strategist"
         self.savings_optimizer = None
         self.behavior_predictor = None
         self.allocation_model = None
         self.scaler = StandardScaler()
+        self._model_version = None
         
         # Savings strategies and rules
         self.savings_strategies = {
@@ -69,17 +77,16 @@ class SavingsStrategist:
         self._load_models()
     
     def _load_models(self) -> None:
-        """Load pre-trained savings strategy models."""
-        try:
-            model_dir = Path(self.model_path)
-            if model_dir.exists():
-                self.savings_optimizer = joblib.load(model_dir / "savings_optimizer.pkl")
-                self.behavior_predictor = joblib.load(model_dir / "behavior_predictor.pkl")
-                self.allocation_model = joblib.load(model_dir / "allocation_model.pkl")
-                self.scaler = joblib.load(model_dir / "scaler.pkl")
-                logger.info("Loaded pre-trained savings strategy models")
-        except Exception as e:
-            logger.warning(f"Could not load pre-trained models: {e}")
+        """Use the process-wide copy of the pre-trained models, reloaded when files change."""
+        bundle = model_registry.load_bundle(self.model_path, self.MODEL_FILES, self.OPTIONAL_MODEL_FILES)
+        if bundle is None or bundle.version == self._model_version:
+            return
+        
+        self.savings_optimizer = bundle.get('savings_optimizer')
+        self.behavior_predictor = bundle.get('behavior_predictor')
+        self.allocation_model = bundle.get('allocation_model')
+        self.scaler = bundle.get('scaler')
+        self._model_version = bundle.version
     
     def _save_models(self) -> None:
         """Save trained models."""
@@ -96,14 +103,15 @@ class SavingsStrategist:
             
             joblib.dump(self.scaler, model_dir / "scaler.pkl")
             logger.info("Saved savings strategy models")
+            model_registry.invalidate(self.model_path)
         except Exception as e:
             logger.error(f"Failed to save models: {e}")
     
-    def generate_savings_strategy(self, user_id: str) -> Dict[str, Any]:
+    def generate_savings_strategy(self, user_id: str, snapshot: Optional[UserSnapshot] = None) -> Dict[str, Any]:
         """Generate personalized savings strategy for a user."""
+        self._load_models()
         try:
-            with SessionLocal() as db:
-                user = db.query(User).filter(User.id == user_id).first()
+            with user_scope(user_id, snapshot) as user:
                 if not user or not user.financial_profile:
                     return {"error": "User or financial profile not found"}
                 
@@ -0,0 +1,80 @@
+"""
+Shared user snapshots for recommendation requests.
+
+This module provides:
+- One load of profile, goals and investments per user per request
+- Set-based loading for many users at once (nightly refreshes)
+- A scope helper so ML modules accept a snapshot or fall back to the database
+"""
+
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Iterator
+
+from app.models.user import User
+from app.models.financial_profile import FinancialProfile
+from app.models.goal import Goal
+from app.models.investment import Investment
+from app.database.base import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UserSnapshot:
+    """Detached, fully loaded view of a user with the attributes ML modules read."""
+    id: Any
+    financial_profile: Optional[FinancialProfile]
+    goals: List[Goal] = field(default_factory=list)
+    investments: List[Investment] = field(default_factory=list)
+
+    @property
+    def user_id(self) -> str:
+        return str(self.id)
+
+
+def load_user_snapshots(user_ids: List[str]) -> Dict[str, UserSnapshot]:
+    """
+    Load snapshots for many users in three queries.
+
+    Users without a financial profile are omitted.
+    """
+    if not user_ids:
+        return {}
+
+    with SessionLocal() as db:
+        profiles = db.query(FinancialProfile).filter(FinancialProfile.user_id.in_(user_ids)).all()
+        goals = db.query(Goal).filter(Goal.user_id.in_(user_ids)).all()
+        investments = db.query(Investment).filter(Investment.user_id.in_(user_ids)).all()
+
+    snapshots = {
+        str(profile.user_id): UserSnapshot(id=profile.user_id, financial_profile=profile)
+        for profile in profiles
+    }
+    for goal in goals:
+        snapshot = snapshots.get(str(goal.user_id))
+        if snapshot is not None:
+            snapshot.goals.append(goal)
+    for investment in investments:
+        snapshot = snapshots.get(str(investment.user_id))
+        if snapshot is not None:
+            snapshot.investments.append(investment)
+
+    return snapshots
+
+
+def load_user_snapshot(user_id: str) -> Optional[UserSnapshot]:
+    """Load a single user's snapshot, or None without a financial profile."""
+    return load_user_snapshots([user_id]).get(str(user_id))
+
+
+@contextmanager
+def user_scope(user_id: str, snapshot: Optional[Any] = None) -> Iterator[Optional[Any]]:
+    """Yield the snapshot if given, else the user loaded in a new session."""
+    if snapshot is not None:
+        yield snapshot
+        return
+
+    with SessionLocal() as db:
+        yield db.query(User).filter(User.id == user_id).first()
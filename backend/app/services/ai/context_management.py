@@ -10,7 +10,8 @@ from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
 from enum import Enum
 import asyncio
-from collections import deque
+import time
+from collections import deque, defaultdict
 import hashlib
 
 import redis
@@ -149,6 +150,80 @@ class GoalContext:
     success_probability: Dict[str, float] = field(default_factory=dict)
 
 
+@dataclass
+class ContextComponentSpec:
+    """Caching policy for one context component"""
+    field_name: str  # ComprehensiveContext attribute
+    scope: str  # 'global' (all users), 'user' or 'session'
+    ttl_seconds: int
+
+
+CONTEXT_COMPONENTS: Dict[ContextType, ContextComponentSpec] = {
+    ContextType.CONVERSATION_HISTORY: ContextComponentSpec('conversation', 'session', 300),
+    ContextType.MARKET_STATE: ContextComponentSpec('market', 'global', 60),
+    ContextType.PORTFOLIO_STATE: ContextComponentSpec('portfolio', 'user', 300),
+    ContextType.USER_PROFILE: ContextComponentSpec('user_life', 'user', 3600),
+    ContextType.TAX_SITUATION: ContextComponentSpec('tax', 'user', 900),
+    ContextType.GOAL_STATE: ContextComponentSpec('goals', 'user', 900),
+    ContextType.BEHAVIORAL: ContextComponentSpec('behavioral_profile', 'user', 3600),
+    ContextType.REGULATORY: ContextComponentSpec('regulatory_constraints', 'user', 86400),
+}
+
+# Components derived from holdings and transactions
+PORTFOLIO_WRITE_CONTEXT_TYPES = [ContextType.PORTFOLIO_STATE, ContextType.TAX_SITUATION]
+TRANSACTION_WRITE_CONTEXT_TYPES = [ContextType.PORTFOLIO_STATE, ContextType.TAX_SITUATION]
+
+CONTEXT_GENERATION_TTL_SECONDS = 86400 * 7
+
+_write_hook_redis: Optional[redis.Redis] = None
+
+
+def context_generation_key(user_id: str) -> str:
+    return f"context_gen:{user_id}"
+
+
+def publish_context_invalidation(
+    redis_client: redis.Redis,
+    user_id: str,
+    context_types: List[ContextType]
+):
+    """Bump a user's shared generation counters so every ContextManager rebuilds these types"""
+    
+    try:
+        pipeline = redis_client.pipeline()
+        for context_type in context_types:
+            pipeline.hincrby(context_generation_key(user_id), context_type.value, 1)
+        pipeline.expire(context_generation_key(user_id), CONTEXT_GENERATION_TTL_SECONDS)
+        pipeline.execute()
+    except Exception as e:
+        logger.warning(f"Failed to publish context invalidation for {user_id}: {e}")
+
+
+def _get_write_hook_redis() -> redis.Redis:
+    global _write_hook_redis
+    if _write_hook_redis is None:
+        from app.core.config import settings
+        _write_hook_redis = redis.Redis.from_url(settings.redis_url)
+    return _write_hook_redis
+
+
+def notify_portfolio_write(user_id: str):
+    """
+    Write-path hook for holdings and position updates
+    
+    For services without a ContextManager (import processors, position
+    updates); blocking, so async callers run it in a thread.
+    """
+    
+    publish_context_invalidation(_get_write_hook_redis(), str(user_id), PORTFOLIO_WRITE_CONTEXT_TYPES)
+
+
+def notify_transaction_write(user_id: str):
+    """Write-path hook for new or changed transactions (see notify_portfolio_write)"""
+    
+    publish_context_invalidation(_get_write_hook_redis(), str(user_id), TRANSACTION_WRITE_CONTEXT_TYPES)
+
+
 class ComprehensiveContext(BaseModel):
     """Complete context for AI decision-making"""
     user_id: str = Field(..., description="User identifier")
@@ -177,96 +252,224 @@ class ContextManager:
         self.redis_client = redis.Redis.from_url(
             config.get('redis_url', 'redis://localhost:6379')
         )
-        self.context_cache = {}
-        self.context_ttl = config.get('context_ttl', 3600)  # 1 hour default
         self.max_conversation_history = config.get('max_conversation_history', 50)
         
+        # Per-component cache: (context type, scope id) -> (value, expires_at, generation)
+        ttl_overrides = config.get('context_component_ttls', {})
+        self.component_specs = {
+            context_type: ContextComponentSpec(
+                spec.field_name,
+                spec.scope,
+                ttl_overrides.get(context_type.value, spec.ttl_seconds)
+            )
+            for context_type, spec in CONTEXT_COMPONENTS.items()
+        }
+        self.max_cached_components = config.get('max_cached_components', 50000)
+        self._component_cache: Dict[Tuple[ContextType, str], Tuple[Any, float, int]] = {}
+        self._component_builds: Dict[Tuple[ContextType, str], asyncio.Future] = {}
+        
     async def build_comprehensive_context(
         self,
         user_id: str,
         session_id: str,
         db_session: Optional[AsyncSession] = None,
-        include_types: Optional[List[ContextType]] = None
+        include_types: Optional[List[ContextType]] = None,
+        query: Optional[str] = None
     ) -> ComprehensiveContext:
-        """Build comprehensive context for AI processing"""
-        
-        # Check cache first
-        cache_key = self._get_cache_key(user_id, session_id)
-        cached_context = await self._get_cached_context(cache_key)
+        """
+        Build comprehensive context for AI processing
         
-        if cached_context and self._is_context_fresh(cached_context):
-            return cached_context
+        Only the requested components are built: ``include_types`` plus the
+        types the query analyzer derives from ``query``, or every type when
+        neither is given. Each component is served from its own cache tier (market shared by
+        all users, portfolio/tax/goals per user, conversation per session).
+        """
         
-        # Build fresh context
         context = ComprehensiveContext(
             user_id=user_id,
             session_id=session_id
         )
         
         # Determine which context types to include
-        if not include_types:
+        if not include_types and not query:
             include_types = list(ContextType)
+        include_types = set(include_types or [])
+        if query:
+            include_types.update(self._analyze_context_requirements(query))
+        requested = [t for t in self.component_specs if t in include_types]
+        
+        # Invalidation generations written by portfolio/transaction hooks
+        generations = {}
+        if any(self.component_specs[t].scope != 'global' for t in requested):
+            generations = self._get_context_generations(user_id)
+        
+        # Gather requested components concurrently
+        results = await asyncio.gather(
+            *(
+                self._get_component(context_type, user_id, session_id, db_session, generations)
+                for context_type in requested
+            ),
+            return_exceptions=True
+        )
         
-        # Parallel context gathering
-        tasks = []
+        # Assign results by context type
+        for context_type, result in zip(requested, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error building {context_type.value} context: {result}")
+                continue
+            setattr(context, self.component_specs[context_type].field_name, result)
         
-        if ContextType.CONVERSATION_HISTORY in include_types:
-            tasks.append(self._build_conversation_context(user_id, session_id))
+        # Calculate context quality score
+        context.context_quality_score = self._calculate_context_quality(context)
         
-        if ContextType.MARKET_STATE in include_types:
-            tasks.append(self._build_market_context())
+        return context
+    
+    async def _get_component(
+        self,
+        context_type: ContextType,
+        user_id: str,
+        session_id: str,
+        db_session: Optional[AsyncSession],
+        generations: Dict[str, int]
+    ) -> Any:
+        """Serve a component from cache, join an in-flight build, or build it"""
+        
+        spec = self.component_specs[context_type]
+        key = (context_type, self._component_scope_id(spec, user_id, session_id))
+        generation = generations.get(context_type.value, 0)
+        
+        cached = self._component_cache.get(key)
+        if cached and cached[1] > time.monotonic() and cached[2] == generation:
+            return cached[0]
+        
+        # Concurrent turns (e.g. many users needing market state) share one build
+        in_flight = self._component_builds.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+        
+        future = asyncio.ensure_future(
+            self._build_component(context_type, user_id, session_id, db_session)
+        )
+        self._component_builds[key] = future
+        try:
+            value = await asyncio.shield(future)
+        finally:
+            if self._component_builds.get(key) is future:
+                del self._component_builds[key]
         
-        if ContextType.PORTFOLIO_STATE in include_types:
-            tasks.append(self._build_portfolio_context(user_id, db_session))
+        self._store_component(key, value, time.monotonic() + spec.ttl_seconds, generation)
+        return value
+    
+    def _build_component(
+        self,
+        context_type: ContextType,
+        user_id: str,
+        session_id: str,
+        db_session: Optional[AsyncSession]
+    ):
+        """Coroutine that builds one context component"""
+        
+        if context_type == ContextType.CONVERSATION_HISTORY:
+            return self._build_conversation_context(user_id, session_id)
+        if context_type == ContextType.MARKET_STATE:
+            return self._build_market_context()
+        if context_type == ContextType.PORTFOLIO_STATE:
+            return self._build_portfolio_context(user_id, db_session)
+        if context_type == ContextType.USER_PROFILE:
+            return self._build_user_life_context(user_id, db_session)
+        if context_type == ContextType.TAX_SITUATION:
+            return self._build_tax_context(user_id, db_session)
+        if context_type == ContextType.GOAL_STATE:
+            return self._build_goal_context(user_id, db_session)
+        if context_type == ContextType.BEHAVIORAL:
+            return self._build_behavioral_context(user_id)
+        if context_type == ContextType.REGULATORY:
+            return self._build_regulatory_context(user_id)
+        raise ValueError(f"No builder for context type {context_type.value}")
+    
+    def _component_scope_id(
+        self,
+        spec: ContextComponentSpec,
+        user_id: str,
+        session_id: str
+    ) -> str:
+        """Cache scope identifier for a component"""
+        
+        if spec.scope == 'global':
+            return '*'
+        if spec.scope == 'session':
+            return f"{user_id}:{session_id}"
+        return user_id
+    
+    def _store_component(
+        self,
+        key: Tuple[ContextType, str],
+        value: Any,
+        expires_at: float,
+        generation: int
+    ):
+        """Cache a component, evicting expired and then oldest entries when full"""
         
-        if ContextType.USER_PROFILE in include_types:
-            tasks.append(self._build_user_life_context(user_id, db_session))
+        self._component_cache[key] = (value, expires_at, generation)
         
-        if ContextType.TAX_SITUATION in include_types:
-            tasks.append(self._build_tax_context(user_id, db_session))
+        if len(self._component_cache) > self.max_cached_components:
+            now = time.monotonic()
+            for stale_key in [k for k, v in self._component_cache.items() if v[1] <= now]:
+                del self._component_cache[stale_key]
+            while len(self._component_cache) > self.max_cached_components:
+                del self._component_cache[next(iter(self._component_cache))]
+    
+    def _get_context_generations(self, user_id: str) -> Dict[str, int]:
+        """Per-type invalidation counters for a user, shared across processes"""
         
-        if ContextType.GOAL_STATE in include_types:
-            tasks.append(self._build_goal_context(user_id, db_session))
+        try:
+            raw = self.redis_client.hgetall(context_generation_key(user_id))
+        except Exception as e:
+            logger.warning(f"Failed to read context generations for {user_id}: {e}")
+            return {}
         
-        if ContextType.BEHAVIORAL in include_types:
-            tasks.append(self._build_behavioral_context(user_id))
+        return {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in raw.items()
+        }
+    
+    def invalidate_context(
+        self,
+        user_id: str,
+        context_types: List[ContextType]
+    ):
+        """
+        Drop cached user/session components of the given types
         
-        if ContextType.REGULATORY in include_types:
-            tasks.append(self._build_regulatory_context(user_id))
+        Clears this process's cache and bumps the shared generation counters
+        so other processes rebuild on their next read.
+        """
         
-        # Gather all context components
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        types = [t for t in context_types if self.component_specs[t].scope != 'global']
+        if not types:
+            return
         
-        # Process results
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Error building context component: {result}")
-                continue
-                
-            if i == 0 and ContextType.CONVERSATION_HISTORY in include_types:
-                context.conversation = result
-            elif i == 1 and ContextType.MARKET_STATE in include_types:
-                context.market = result
-            elif i == 2 and ContextType.PORTFOLIO_STATE in include_types:
-                context.portfolio = result
-            elif i == 3 and ContextType.USER_PROFILE in include_types:
-                context.user_life = result
-            elif i == 4 and ContextType.TAX_SITUATION in include_types:
-                context.tax = result
-            elif i == 5 and ContextType.GOAL_STATE in include_types:
-                context.goals = result
-            elif i == 6 and ContextType.BEHAVIORAL in include_types:
-                context.behavioral_profile = result
-            elif i == 7 and ContextType.REGULATORY in include_types:
-                context.regulatory_constraints = result
+        for key in list(self._component_cache):
+            context_type, scope_id = key
+            if context_type in types and (scope_id == user_id or scope_id.startswith(f"{user_id}:")):
+                del self._component_cache[key]
         
-        # Calculate context quality score
-        context.context_quality_score = self._calculate_context_quality(context)
+        publish_context_invalidation(self.redis_client, user_id, types)
+    
+    def on_portfolio_write(self, user_id: str):
+        """Invalidation hook for holdings and portfolio updates"""
         
-        # Cache the context
-        await self._cache_context(cache_key, context)
+        self.invalidate_context(user_id, PORTFOLIO_WRITE_CONTEXT_TYPES)
+    
+    def on_transaction_write(self, user_id: str):
+        """Invalidation hook for new or changed transactions"""
         
-        return context
+        self.invalidate_context(user_id, TRANSACTION_WRITE_CONTEXT_TYPES)
+    
+    def invalidate_market_context(self):
+        """Drop the shared market component (e.g. after a market data refresh)"""
+        
+        self._component_cache.pop((ContextType.MARKET_STATE, '*'), None)
     
     async def _build_conversation_context(
         self,
@@ -887,47 +1090,6 @@ class ContextManager:
         
         return min(score, 1.0)
     
-    def _get_cache_key(self, user_id: str, session_id: str) -> str:
-        """Generate cache key for context"""
-        
-        return f"context:{user_id}:{session_id}"
-    
-    async def _get_cached_context(
-        self,
-        cache_key: str
-    ) -> Optional[ComprehensiveContext]:
-        """Retrieve context from cache"""
-        
-        cached_data = self.redis_client.get(cache_key)
-        
-        if cached_data:
-            try:
-                data = json.loads(cached_data)
-                # Reconstruct dataclass objects
-                # This is simplified - full implementation would properly deserialize
-                return None  # For now, always rebuild
-            except:
-                return None
-        
-        return None
-    
-    def _is_context_fresh(self, context: ComprehensiveContext) -> bool:
-        """Check if cached context is still fresh"""
-        
-        age = (datetime.utcnow() - context.timestamp).seconds
-        return age < self.context_ttl
-    
-    async def _cache_context(
-        self,
-        cache_key: str,
-        context: ComprehensiveContext
-    ):
-        """Cache context for future use"""
-        
-        # Simplified caching - full implementation would properly serialize
-        # For now, we'll cache individual components
-        pass
-    
     async def update_conversation_context(
         self,
         user_id: str,
@@ -950,6 +1112,9 @@ class ContextManager:
         
         # Set expiry
         self.redis_client.expire(history_key, 86400)  # 24 hours
+        
+        # The cached conversation component is now stale
+        self.invalidate_context(user_id, [ContextType.CONVERSATION_HISTORY])
     
     async def get_relevant_context(
         self,
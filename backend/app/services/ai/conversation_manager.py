@@ -23,7 +23,8 @@ from langchain.schema import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from .context_management import (
     ContextManager, 
     ComprehensiveContext,
-    ConversationContext
+    ConversationContext,
+    ContextType
 )
 
 logger = logging.getLogger(__name__)
@@ -401,10 +402,13 @@ class ConversationManager:
         entities = await self._extract_entities(message)
         sentiment = await self._analyze_sentiment(message)
         
-        # Build context
+        # Build only the context components this message needs, plus those
+        # used to spot missing information
         context = await self.context_manager.build_comprehensive_context(
             user_id=session.user_id,
-            session_id=session_id
+            session_id=session_id,
+            include_types=[ContextType.USER_PROFILE, ContextType.GOAL_STATE, ContextType.PORTFOLIO_STATE],
+            query=message
         )
         
         # Update conversation context
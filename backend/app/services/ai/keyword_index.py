@@ -0,0 +1,365 @@
+"""
+Persistent BM25 keyword index for the RAG system
+Sparse term-document matrix built at indexing time, updated incrementally and
+searched without re-tokenizing the corpus
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class KeywordIndex:
+    """
+    BM25 index over a CSC term-document matrix
+
+    Each query touches only the matrix columns of its own terms. Upserts and
+    removals go to an in-memory delta (with a stale mask over the persisted
+    rows) and are merged into the matrix on compaction.
+
+    Saving appends the changes made since the last save to a journal, and the
+    full matrix is only rewritten once the journal reaches max_delta entries.
+    """
+
+    MATRIX_FILE = "term_matrix.npz"
+    DOCUMENTS_FILE = "documents.json"
+    VOCABULARY_FILE = "vocabulary.json"
+    JOURNAL_FILE = "journal.jsonl"
+
+    def __init__(
+        self,
+        index_path: str,
+        k1: float = 1.5,
+        b: float = 0.75,
+        max_delta: int = 1000
+    ):
+        self.index_path = Path(index_path)
+        self.k1 = k1
+        self.b = b
+        self.max_delta = max_delta
+        self._lock = threading.RLock()
+        # Changes not yet saved, and changes already in the journal file
+        self._pending: List[Dict[str, Any]] = []
+        self._journaled = 0
+        self._reset()
+
+    def _reset(self):
+        self._matrix = sparse.csc_matrix((0, 0), dtype=np.float32)
+        self._rows = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._sources = np.zeros(0, dtype=object)
+        self._documents: List[Dict[str, Any]] = []
+        self._vocabulary: Dict[str, int] = {}
+        self._row_index: Dict[str, int] = {}
+        self._stale = np.zeros(0, dtype=bool)
+        self._total_length = 0.0
+        # Upserts since the last compaction: doc id -> (term counts, length, document)
+        self._delta: Dict[str, Tuple[Counter, int, Dict[str, Any]]] = {}
+        self._delta_postings: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int((~self._stale).sum()) + len(self._delta)
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._delta or (
+                doc_id in self._row_index and not self._stale[self._row_index[doc_id]]
+            )
+
+    def load(self) -> bool:
+        """Load a persisted index. Returns False if none exists."""
+        if not (self.index_path / self.MATRIX_FILE).exists():
+            return False
+
+        with self._lock:
+            self._reset()
+            self._install(
+                sparse.load_npz(self.index_path / self.MATRIX_FILE),
+                json.loads((self.index_path / self.DOCUMENTS_FILE).read_text()),
+                json.loads((self.index_path / self.VOCABULARY_FILE).read_text())
+            )
+            self._journaled = self._replay_journal()
+            self._pending = []
+
+        logger.info(f"Loaded keyword index with {len(self)} documents")
+        return True
+
+    def _replay_journal(self) -> int:
+        """Apply saved changes on top of the matrix. Returns the entry count."""
+        journal_path = self.index_path / self.JOURNAL_FILE
+        if not journal_path.exists():
+            return 0
+
+        entries = 0
+        with open(journal_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A save interrupted mid-write leaves a partial last line
+                    logger.warning("Ignoring truncated keyword index journal entry")
+                    break
+                if entry['op'] == 'upsert':
+                    document = entry['document']
+                    self._upsert(document['id'], document['content'], document['source'], document['metadata'])
+                else:
+                    self._drop(entry['id'])
+                entries += 1
+        return entries
+
+    def _install(
+        self,
+        matrix: sparse.spmatrix,
+        documents: List[Dict[str, Any]],
+        vocabulary: List[str]
+    ):
+        self._matrix = sparse.csc_matrix(matrix, dtype=np.float32)
+        self._rows = self._matrix.tocsr()
+        self._lengths = np.asarray(self._rows.sum(axis=1), dtype=np.float32).ravel()
+        self._documents = documents
+        self._sources = np.array([doc['source'] for doc in documents], dtype=object)
+        self._vocabulary = {term: column for column, term in enumerate(vocabulary)}
+        self._row_index = {doc['id']: row for row, doc in enumerate(documents)}
+        self._stale = np.zeros(len(documents), dtype=bool)
+        self._total_length = float(self._lengths.sum())
+
+    def upsert(
+        self,
+        doc_id: str,
+        content: str,
+        source: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Add or replace a document"""
+        with self._lock:
+            document = self._upsert(doc_id, content, source, metadata)
+            self._pending.append({'op': 'upsert', 'document': document})
+
+    def _upsert(
+        self,
+        doc_id: str,
+        content: str,
+        source: str,
+        metadata: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        counts = Counter(tokenize(content))
+        document = {
+            'id': doc_id,
+            'source': source,
+            'content': content,
+            'metadata': metadata or {}
+        }
+
+        with self._lock:
+            self._drop(doc_id)
+            length = sum(counts.values())
+            self._delta[doc_id] = (counts, length, document)
+            for term, tf in counts.items():
+                self._delta_postings.setdefault(term, {})[doc_id] = tf
+            self._total_length += length
+
+            if len(self._delta) >= self.max_delta:
+                self.compact()
+
+        return document
+
+    def upsert_many(self, documents: Iterable[Dict[str, Any]]):
+        """Upsert documents given as dicts with id, content, source and metadata"""
+        with self._lock:
+            for doc in documents:
+                self.upsert(doc['id'], doc['content'], doc['source'], doc.get('metadata'))
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._drop(doc_id)
+            self._pending.append({'op': 'remove', 'id': doc_id})
+
+    def _drop(self, doc_id: str):
+        if doc_id in self._delta:
+            counts, length, _ = self._delta.pop(doc_id)
+            for term in counts:
+                postings = self._delta_postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._delta_postings[term]
+            self._total_length -= length
+
+        row = self._row_index.get(doc_id)
+        if row is not None and not self._stale[row]:
+            self._stale[row] = True
+            self._total_length -= float(self._lengths[row])
+
+    def compact(self):
+        """Merge the delta and drop stale rows from the matrix"""
+        with self._lock:
+            if not self._delta and not self._stale.any():
+                return
+
+            keep = np.flatnonzero(~self._stale)
+            vocabulary = list(self._vocabulary)
+            columns = dict(self._vocabulary)
+            for term in self._delta_postings:
+                if term not in columns:
+                    columns[term] = len(vocabulary)
+                    vocabulary.append(term)
+
+            base = self._rows[keep] if self._rows.shape[0] else sparse.csr_matrix((0, 0), dtype=np.float32)
+            base = sparse.csr_matrix(base, dtype=np.float32)
+            base.resize((len(keep), len(vocabulary)))
+
+            rows, cols, data = [], [], []
+            for row, (counts, _, _) in enumerate(self._delta.values()):
+                for term, tf in counts.items():
+                    rows.append(row)
+                    cols.append(columns[term])
+                    data.append(tf)
+            delta = sparse.csr_matrix(
+                (np.asarray(data, dtype=np.float32), (rows, cols)),
+                shape=(len(self._delta), len(vocabulary))
+            )
+
+            documents = [self._documents[row] for row in keep]
+            documents.extend(document for _, _, document in self._delta.values())
+
+            self._reset()
+            self._install(sparse.vstack([base, delta]), documents, vocabulary)
+
+    def save(self):
+        """Persist changes since the last save, rewriting the matrix only when the journal is full"""
+        with self._lock:
+            if not self._pending and (self.index_path / self.MATRIX_FILE).exists():
+                return
+
+            if (
+                self._journaled + len(self._pending) < self.max_delta
+                and (self.index_path / self.MATRIX_FILE).exists()
+            ):
+                with open(self.index_path / self.JOURNAL_FILE, 'a') as f:
+                    f.write("".join(json.dumps(entry) + "\n" for entry in self._pending))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._journaled += len(self._pending)
+                self._pending = []
+                return
+
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """Compact and rewrite the whole index, starting a new journal"""
+        with self._lock:
+            self.compact()
+            self.index_path.mkdir(parents=True, exist_ok=True)
+
+            tmp_path = self.index_path / f"{self.MATRIX_FILE}.tmp"
+            with open(tmp_path, 'wb') as f:
+                sparse.save_npz(f, self._matrix)
+            os.replace(tmp_path, self.index_path / self.MATRIX_FILE)
+
+            vocabulary = sorted(self._vocabulary, key=self._vocabulary.get)
+            for name, payload in ((self.DOCUMENTS_FILE, self._documents),
+                                  (self.VOCABULARY_FILE, vocabulary)):
+                tmp_path = self.index_path / f"{name}.tmp"
+                tmp_path.write_text(json.dumps(payload))
+                os.replace(tmp_path, self.index_path / name)
+
+            # The snapshot now includes every journaled change
+            (self.index_path / self.JOURNAL_FILE).unlink(missing_ok=True)
+            self._journaled = 0
+            self._pending = []
+
+    def search(
+        self,
+        query: str,
+        sources: Optional[Iterable[str]] = None,
+        top_k: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k documents by BM25 score
+
+        Corpus statistics cover the whole index; ``sources`` only restricts
+        which documents are returned. IDF uses log(1 + (N - df + 0.5) / (df + 0.5))
+        so terms present in most documents still score positively.
+        """
+        query_counts = Counter(tokenize(query))
+        if not query_counts or top_k <= 0:
+            return []
+
+        with self._lock:
+            n_docs = len(self)
+            if n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs
+
+            base_scores = np.zeros(len(self._documents), dtype=np.float64)
+            delta_scores: Dict[str, float] = {}
+
+            for term, query_tf in query_counts.items():
+                column = self._vocabulary.get(term)
+                rows = tf = None
+                df = 0
+                if column is not None:
+                    start, end = self._matrix.indptr[column], self._matrix.indptr[column + 1]
+                    rows = self._matrix.indices[start:end]
+                    tf = self._matrix.data[start:end]
+                    live = ~self._stale[rows]
+                    rows, tf = rows[live], tf[live]
+                    df += len(rows)
+                postings = self._delta_postings.get(term, {})
+                df += len(postings)
+                if df == 0:
+                    continue
+
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                if rows is not None and len(rows):
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[rows] / avg_length)
+                    base_scores[rows] += query_tf * idf * tf * (self.k1 + 1) / (tf + norm)
+                for doc_id, doc_tf in postings.items():
+                    length = self._delta[doc_id][1]
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    delta_scores[doc_id] = delta_scores.get(doc_id, 0.0) + (
+                        query_tf * idf * doc_tf * (self.k1 + 1) / (doc_tf + norm)
+                    )
+
+            allowed_sources = set(sources) if sources is not None else None
+            if allowed_sources is not None and len(self._documents):
+                base_scores[~np.isin(self._sources, list(allowed_sources))] = 0.0
+
+            candidates: List[Tuple[float, Dict[str, Any]]] = []
+            matched = np.flatnonzero(base_scores > 0)
+            if len(matched) > top_k:
+                matched = matched[np.argpartition(-base_scores[matched], top_k - 1)[:top_k]]
+            candidates.extend((float(base_scores[row]), self._documents[row]) for row in matched)
+            for doc_id, score in delta_scores.items():
+                document = self._delta[doc_id][2]
+                if allowed_sources is None or document['source'] in allowed_sources:
+                    candidates.append((score, document))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        return [
+            {
+                'id': document['id'],
+                'content': document['content'],
+                'metadata': document.get('metadata', {}),
+                'score': score
+            }
+            for score, document in candidates[:top_k]
+        ]
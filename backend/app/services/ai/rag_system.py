@@ -11,6 +11,7 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 import asyncio
+import functools
 import hashlib
 from pathlib import Path
 
@@ -36,8 +37,9 @@ import qdrant_client
 from qdrant_client.models import Distance, VectorParams, PointStruct
 import redis
 from sentence_transformers import SentenceTransformer
-import faiss
-from rank_bm25 import BM25Okapi
+
+from .keyword_index import KeywordIndex
+from .vector_index import EmbeddingCache, LocalVectorIndex
 
 logger = logging.getLogger(__name__)
 
@@ -102,6 +104,7 @@ class FinancialRAGSystem:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.embeddings = self._initialize_embeddings()
+        self.query_embedding_cache = EmbeddingCache(config.get('embedding_cache_size', 10000))
         self.vector_stores = self._initialize_vector_stores()
         self.text_splitters = self._initialize_text_splitters()
         self.retrievers = {}
@@ -111,6 +114,7 @@ class FinancialRAGSystem:
         self.knowledge_sources = self._load_knowledge_sources()
         self.domain_vocabulary = self._load_financial_vocabulary()
         self.reranker = self._initialize_reranker()
+        self.keyword_index = self._initialize_keyword_index()
         
     def _initialize_embeddings(self) -> Dict[str, Any]:
         """Initialize embedding models"""
@@ -157,14 +161,20 @@ class FinancialRAGSystem:
             stores['pinecone'] = pinecone.Index('financial-knowledge')
         
         # Local Chroma for development
-        stores['chroma'] = Chroma(
-            embedding_function=self.embeddings.get('openai'),
-            persist_directory="./chroma_db"
-        )
+        if self.config.get('use_chroma', True):
+            stores['chroma'] = Chroma(
+                embedding_function=self.embeddings.get('openai'),
+                persist_directory="./chroma_db"
+            )
         
-        # FAISS for fast local search
-        dimension = 1536  # OpenAI embedding dimension
-        stores['faiss'] = faiss.IndexFlatL2(dimension)
+        # In-process index for fast local search (no remote round trip)
+        local_index = LocalVectorIndex(
+            self.config.get('local_vector_index_path', './local_vector_index'),
+            ivf_threshold=self.config.get('local_ivf_threshold', 50000),
+            n_probe=self.config.get('local_ivf_probes', 8)
+        )
+        local_index.load()
+        stores['local'] = local_index
         
         return stores
     
@@ -203,6 +213,13 @@ class FinancialRAGSystem:
         
         return splitters
     
+    def _initialize_keyword_index(self) -> KeywordIndex:
+        """Load the persisted BM25 keyword index"""
+        keyword_index = KeywordIndex(self.config.get('keyword_index_path', './keyword_index'))
+        if not keyword_index.load():
+            logger.info("No persisted keyword index found, starting empty")
+        return keyword_index
+    
     def _initialize_reranker(self):
         """Initialize reranking model for result optimization"""
         # This would use a cross-encoder model for reranking
@@ -286,6 +303,13 @@ class FinancialRAGSystem:
                 logger.error(f"Failed to index batch: {e}")
                 failed_count += len(batch)
         
+        # Persist the keyword index changes and the local vector index
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            loop.run_in_executor(None, self.keyword_index.save),
+            loop.run_in_executor(None, self.vector_stores['local'].save)
+        )
+        
         # Store indexing metadata
         await self._store_index_metadata(index_metadata)
         
@@ -338,34 +362,39 @@ class FinancialRAGSystem:
         self,
         documents: List[KnowledgeDocument]
     ) -> List[List[np.ndarray]]:
-        """Generate embeddings for documents and chunks"""
+        """Generate embeddings for documents and chunks in one batched call"""
         
-        all_embeddings = []
-        embedding_model = self.embeddings.get('openai', self.embeddings['financial'])
+        texts = []
+        for doc in documents:
+            texts.append(doc.content)
+            texts.extend(doc.chunks)
+        
+        vectors = await self._embed_texts(texts)
         
+        all_embeddings = []
+        position = 0
         for doc in documents:
-            # Embed full document
-            if hasattr(embedding_model, 'embed_documents'):
-                doc_embedding = embedding_model.embed_documents([doc.content])[0]
-            else:
-                doc_embedding = embedding_model.encode(doc.content)
-            
-            doc.embedding = doc_embedding
+            doc.embedding = vectors[position]
+            doc.chunk_embeddings = list(vectors[position + 1:position + 1 + len(doc.chunks)])
+            position += 1 + len(doc.chunks)
             
-            # Embed chunks
-            if doc.chunks:
-                if hasattr(embedding_model, 'embed_documents'):
-                    chunk_embeddings = embedding_model.embed_documents(doc.chunks)
-                else:
-                    chunk_embeddings = embedding_model.encode(doc.chunks)
-                
-                doc.chunk_embeddings = chunk_embeddings
-                all_embeddings.append(chunk_embeddings)
-            else:
-                all_embeddings.append([doc_embedding])
+            all_embeddings.append(doc.chunk_embeddings or [doc.embedding])
         
         return all_embeddings
     
+    async def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts with a single model call off the event loop"""
+        
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        embedding_model = self.embeddings.get('openai', self.embeddings['financial'])
+        embed = getattr(embedding_model, 'embed_documents', None) or embedding_model.encode
+        
+        loop = asyncio.get_running_loop()
+        vectors = await loop.run_in_executor(None, embed, texts)
+        return np.asarray(vectors, dtype=np.float32)
+    
     async def _store_in_vector_dbs(
         self,
         documents: List[KnowledgeDocument],
@@ -381,9 +410,20 @@ class FinancialRAGSystem:
         if 'chroma' in self.vector_stores:
             await self._store_in_chroma(documents, embeddings)
         
-        # Store in FAISS
-        if 'faiss' in self.vector_stores:
-            await self._store_in_faiss(documents, embeddings)
+        # Store in the local index
+        if 'local' in self.vector_stores:
+            await self._store_in_local_index(documents, embeddings)
+        
+        # Add to the keyword index
+        self.keyword_index.upsert_many(
+            {
+                'id': doc.id,
+                'content': doc.content,
+                'source': doc.source.value,
+                'metadata': doc.metadata
+            }
+            for doc in documents
+        )
         
         # Cache in Redis for fast access
         await self._cache_documents(documents)
@@ -474,29 +514,36 @@ class FinancialRAGSystem:
                 ids=ids
             )
     
-    async def _store_in_faiss(
+    async def _store_in_local_index(
         self,
         documents: List[KnowledgeDocument],
         embeddings: List[List[np.ndarray]]
     ):
-        """Store in FAISS index"""
-        
-        faiss_index = self.vector_stores['faiss']
+        """Store chunk vectors in the in-process index"""
         
-        # Flatten embeddings
-        all_embeddings = []
-        for doc_embeddings in embeddings:
-            all_embeddings.extend(doc_embeddings)
+        local_index = self.vector_stores['local']
         
-        if all_embeddings:
-            # Convert to numpy array
-            embedding_matrix = np.array(all_embeddings).astype('float32')
-            
-            # Add to FAISS index
-            faiss_index.add(embedding_matrix)
-            
-            # Save index
-            faiss.write_index(faiss_index, "financial_knowledge.index")
+        for doc, doc_embeddings in zip(documents, embeddings):
+            chunks = doc.chunks or [doc.content]
+            local_index.add_document(
+                doc.id,
+                doc_embeddings,
+                [
+                    {
+                        'content': chunk,
+                        'source': doc.source.value,
+                        'metadata': {
+                            'doc_id': doc.id,
+                            'source': doc.source.value,
+                            'type': doc.type.value,
+                            'title': doc.title,
+                            'chunk_index': i,
+                            **doc.metadata
+                        }
+                    }
+                    for i, chunk in enumerate(chunks)
+                ]
+            )
     
     async def retrieve(
         self,
@@ -592,14 +639,20 @@ class FinancialRAGSystem:
         return processed
     
     async def _embed_query(self, query: str) -> np.ndarray:
-        """Generate embedding for query"""
+        """Generate embedding for query, served from the LRU cache when possible"""
+        
+        cached = self.query_embedding_cache.get(query)
+        if cached is not None:
+            return cached
         
         embedding_model = self.embeddings.get('openai', self.embeddings['financial'])
+        embed = getattr(embedding_model, 'embed_query', None) or embedding_model.encode
         
-        if hasattr(embedding_model, 'embed_query'):
-            return embedding_model.embed_query(query)
-        else:
-            return embedding_model.encode(query)
+        loop = asyncio.get_running_loop()
+        embedding = np.asarray(await loop.run_in_executor(None, embed, query), dtype=np.float32)
+        self.query_embedding_cache.put(query, embedding)
+        
+        return embedding
     
     async def _hybrid_retrieve(
         self,
@@ -610,18 +663,19 @@ class FinancialRAGSystem:
     ) -> List[Dict[str, Any]]:
         """Perform hybrid retrieval (vector + keyword)"""
         
-        # Vector search
-        vector_results = await self._vector_retrieve(
-            query_embedding,
-            source_filter,
-            top_k
-        )
-        
-        # BM25 keyword search
-        keyword_results = await self._keyword_retrieve(
-            query,
-            source_filter,
-            top_k
+        # Vector and BM25 keyword search run concurrently, each scored in
+        # the default executor
+        keyword_results, vector_results = await asyncio.gather(
+            self._keyword_retrieve(
+                query,
+                source_filter,
+                top_k
+            ),
+            self._vector_retrieve(
+                query_embedding,
+                source_filter,
+                top_k
+            )
         )
         
         # Combine results using reciprocal rank fusion
@@ -638,27 +692,25 @@ class FinancialRAGSystem:
         source_filter: Optional[List[KnowledgeSource]],
         top_k: int
     ) -> List[Dict[str, Any]]:
-        """Perform vector similarity search"""
+        """Perform vector similarity search across all stores concurrently"""
         
-        results = []
+        searches = []
+        
+        # Search in the local index
+        if 'local' in self.vector_stores:
+            searches.append(self._search_local(query_embedding, source_filter, top_k))
         
         # Search in Qdrant
         if 'qdrant' in self.vector_stores:
-            qdrant_results = await self._search_qdrant(
-                query_embedding,
-                source_filter,
-                top_k
-            )
-            results.extend(qdrant_results)
+            searches.append(self._search_qdrant(query_embedding, source_filter, top_k))
         
         # Search in Chroma
         if 'chroma' in self.vector_stores:
-            chroma_results = await self._search_chroma(
-                query_embedding,
-                source_filter,
-                top_k
-            )
-            results.extend(chroma_results)
+            searches.append(self._search_chroma(query_embedding, source_filter, top_k))
+        
+        results = []
+        for store_results in await asyncio.gather(*searches):
+            results.extend(store_results)
         
         # Deduplicate and sort by score
         seen_ids = set()
@@ -679,36 +731,49 @@ class FinancialRAGSystem:
     ) -> List[Dict[str, Any]]:
         """Perform keyword-based retrieval using BM25"""
         
-        # Get documents from cache
-        all_docs = await self._get_cached_documents(source_filter)
+        sources = [s.value for s in source_filter] if source_filter else None
         
-        if not all_docs:
-            return []
-        
-        # Tokenize documents and query
-        tokenized_docs = [doc['content'].lower().split() for doc in all_docs]
-        tokenized_query = query.lower().split()
-        
-        # Create BM25 index
-        bm25 = BM25Okapi(tokenized_docs)
-        
-        # Get scores
-        scores = bm25.get_scores(tokenized_query)
+        # Scored off the event loop against the persisted index
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            self.keyword_index.search,
+            query,
+            sources,
+            top_k
+        )
+    
+    async def _search_local(
+        self,
+        query_embedding: np.ndarray,
+        source_filter: Optional[List[KnowledgeSource]],
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """Search the in-process vector index"""
         
-        # Get top-k results
-        top_indices = np.argsort(scores)[::-1][:top_k]
+        sources = [s.value for s in source_filter] if source_filter else None
         
-        results = []
-        for idx in top_indices:
-            if scores[idx] > 0:
-                results.append({
-                    'id': all_docs[idx]['id'],
-                    'content': all_docs[idx]['content'],
-                    'metadata': all_docs[idx].get('metadata', {}),
-                    'score': float(scores[idx])
-                })
+        # Extra chunks leave room for per-document deduplication
+        loop = asyncio.get_running_loop()
+        hits = await loop.run_in_executor(
+            None,
+            functools.partial(
+                self.vector_stores['local'].search,
+                query_embedding,
+                top_k * 2,
+                sources
+            )
+        )
         
-        return results
+        return [
+            {
+                'id': hit['doc_id'],
+                'content': hit['content'],
+                'metadata': hit['metadata'],
+                'score': hit['score']
+            }
+            for hit in hits
+        ]
     
     async def _search_qdrant(
         self,
@@ -734,11 +799,16 @@ class FinancialRAGSystem:
             }
         
         # Search
-        search_result = client.search(
-            collection_name=collection_name,
-            query_vector=query_embedding.tolist(),
-            limit=top_k,
-            query_filter=filter_dict
+        loop = asyncio.get_running_loop()
+        search_result = await loop.run_in_executor(
+            None,
+            functools.partial(
+                client.search,
+                collection_name=collection_name,
+                query_vector=query_embedding.tolist(),
+                limit=top_k,
+                query_filter=filter_dict
+            )
         )
         
         # Format results
@@ -771,10 +841,15 @@ class FinancialRAGSystem:
             }
         
         # Search
-        results = chroma_db.similarity_search_with_score(
-            query=query_embedding,
-            k=top_k,
-            filter=where_clause
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            None,
+            functools.partial(
+                chroma_db.similarity_search_with_score,
+                query=query_embedding,
+                k=top_k,
+                filter=where_clause
+            )
         )
         
         # Format results
@@ -0,0 +1,304 @@
+"""
+In-process vector search for the RAG system
+Query-embedding LRU cache and a local normalized-matrix index that can stand
+in for the external vector stores in local deployments
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterable, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query_text(text: str) -> str:
+    """Cache key for a query: lowercased with collapsed whitespace"""
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+class EmbeddingCache:
+    """Thread-safe LRU cache of query embeddings keyed by normalized text"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = normalize_query_text(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, text: str, embedding: np.ndarray):
+        key = normalize_query_text(text)
+        with self._lock:
+            self._entries[key] = np.asarray(embedding, dtype=np.float32)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class LocalVectorIndex:
+    """
+    Cosine-similarity index over unit-normalized float32 chunk vectors
+
+    Search is exact (one matrix-vector product plus argpartition) until the
+    corpus reaches ``ivf_threshold`` rows; beyond that an inverted-file
+    layout over k-means centroids probes only the ``n_probe`` closest lists.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    PAYLOADS_FILE = "payloads.json"
+
+    def __init__(
+        self,
+        index_path: Optional[str] = None,
+        ivf_threshold: int = 50000,
+        n_probe: int = 8,
+        kmeans_iterations: int = 10,
+        seed: int = 0
+    ):
+        self.index_path = Path(index_path) if index_path else None
+        self.ivf_threshold = ivf_threshold
+        self.n_probe = n_probe
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self, dimension: int = 0):
+        self._vectors = np.zeros((0, dimension), dtype=np.float32)
+        self._size = 0
+        self._payloads: List[Optional[Dict[str, Any]]] = []
+        self._sources = np.zeros(0, dtype=object)
+        self._live = np.zeros(0, dtype=bool)
+        self._doc_rows: Dict[str, List[int]] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._live[:self._size].sum())
+
+    @property
+    def dimension(self) -> int:
+        return self._vectors.shape[1]
+
+    @property
+    def uses_ivf(self) -> bool:
+        return self._centroids is not None
+
+    def add_document(
+        self,
+        doc_id: str,
+        vectors: Sequence[np.ndarray],
+        payloads: Sequence[Dict[str, Any]]
+    ):
+        """
+        Replace all chunk vectors for a document
+
+        Each payload should carry 'content', 'source' and 'metadata'.
+        """
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(payloads), -1))
+
+        with self._lock:
+            self.remove_document(doc_id)
+            if self._size == 0 and self.dimension != matrix.shape[1]:
+                self._reset(matrix.shape[1])
+            elif matrix.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {matrix.shape[1]}")
+
+            start = self._size
+            self._grow(start + len(matrix))
+            self._vectors[start:start + len(matrix)] = matrix
+            self._live[start:start + len(matrix)] = True
+            for offset, payload in enumerate(payloads):
+                payload = {'doc_id': doc_id, **payload}
+                self._payloads.append(payload)
+                self._sources[start + offset] = payload.get('source')
+            self._size += len(matrix)
+            self._doc_rows[doc_id] = list(range(start, self._size))
+
+            if self._centroids is not None:
+                self._assignments[start:self._size] = self._assign(matrix)
+            self._maybe_train()
+
+    def remove_document(self, doc_id: str):
+        with self._lock:
+            for row in self._doc_rows.pop(doc_id, []):
+                self._live[row] = False
+                self._payloads[row] = None
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 10,
+        sources: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Top-k chunks by cosine similarity"""
+        query = self._normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+
+        with self._lock:
+            if self._size == 0 or top_k <= 0:
+                return []
+            if query.shape[0] != self.dimension:
+                raise ValueError(f"Expected a {self.dimension}-dimensional query, got {query.shape[0]}")
+
+            mask = self._live[:self._size].copy()
+            if sources is not None:
+                mask &= np.isin(self._sources[:self._size], list(sources))
+            if self._centroids is not None:
+                probe = np.argpartition(-(self._centroids @ query), min(self.n_probe, len(self._centroids)) - 1)
+                mask &= np.isin(self._assignments[:self._size], probe[:self.n_probe])
+
+            candidates = np.flatnonzero(mask)
+            if len(candidates) == 0:
+                return []
+            scores = self._vectors[candidates] @ query
+            if len(candidates) > top_k:
+                top = np.argpartition(-scores, top_k - 1)[:top_k]
+                candidates, scores = candidates[top], scores[top]
+            order = np.argsort(-scores)
+
+            return [
+                {**self._payloads[candidates[i]], 'score': float(scores[i])}
+                for i in order
+            ]
+
+    def build_ivf(self, n_lists: Optional[int] = None):
+        """Train k-means centroids over the live vectors and assign every row"""
+        with self._lock:
+            live = np.flatnonzero(self._live[:self._size])
+            if len(live) == 0:
+                return
+            n_lists = min(n_lists or int(np.sqrt(len(live))), len(live))
+            rng = np.random.default_rng(self.seed)
+            sample = self._vectors[rng.choice(live, size=min(len(live), n_lists * 256), replace=False)]
+
+            centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+            for _ in range(self.kmeans_iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for k in range(n_lists):
+                    members = sample[labels == k]
+                    if len(members):
+                        centroids[k] = members.mean(axis=0)
+                centroids = self._normalize(centroids)
+
+            self._centroids = centroids
+            self._assignments = np.zeros(len(self._live), dtype=np.int32)
+            self._assignments[:self._size] = self._assign(self._vectors[:self._size])
+            self._trained_size = len(live)
+
+        logger.info(f"Built IVF layout with {n_lists} lists over {len(live)} vectors")
+
+    def save(self):
+        """Compact removed rows and persist vectors and payloads"""
+        if self.index_path is None:
+            return
+        with self._lock:
+            self._compact()
+            self.index_path.mkdir(parents=True, exist_ok=True)
+
+            tmp_path = self.index_path / f"{self.VECTORS_FILE}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, self._vectors[:self._size])
+            os.replace(tmp_path, self.index_path / self.VECTORS_FILE)
+
+            tmp_path = self.index_path / f"{self.PAYLOADS_FILE}.tmp"
+            tmp_path.write_text(json.dumps(self._payloads[:self._size], default=str))
+            os.replace(tmp_path, self.index_path / self.PAYLOADS_FILE)
+
+    def load(self) -> bool:
+        """Load a persisted index. Returns False if none exists."""
+        if self.index_path is None or not (self.index_path / self.VECTORS_FILE).exists():
+            return False
+
+        vectors = np.load(self.index_path / self.VECTORS_FILE)
+        payloads = json.loads((self.index_path / self.PAYLOADS_FILE).read_text())
+        with self._lock:
+            self._install(vectors, payloads)
+            self._maybe_train()
+
+        logger.info(f"Loaded local vector index with {self._size} vectors")
+        return True
+
+    def _install(self, vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        self._reset(vectors.shape[1])
+        self._grow(len(vectors))
+        self._vectors[:len(vectors)] = vectors
+        self._live[:len(vectors)] = True
+        self._payloads = list(payloads)
+        for row, payload in enumerate(payloads):
+            self._sources[row] = payload.get('source')
+            self._doc_rows.setdefault(payload['doc_id'], []).append(row)
+        self._size = len(vectors)
+
+    def _compact(self):
+        live = np.flatnonzero(self._live[:self._size])
+        if len(live) == self._size:
+            return
+        had_ivf = self._centroids is not None
+        self._install(self._vectors[live].copy(), [self._payloads[row] for row in live])
+        if had_ivf:
+            self._maybe_train(force=True)
+
+    def _grow(self, required: int):
+        capacity = len(self._live)
+        if required <= capacity:
+            return
+        capacity = max(required, capacity * 2, 1024)
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        self._live = np.concatenate([self._live, np.zeros(capacity - len(self._live), dtype=bool)])
+        self._sources = np.concatenate([self._sources, np.empty(capacity - len(self._sources), dtype=object)])
+        if self._centroids is not None:
+            self._assignments = np.concatenate([
+                self._assignments, np.zeros(capacity - len(self._assignments), dtype=np.int32)
+            ])
+
+    def _maybe_train(self, force: bool = False):
+        live = len(self)
+        if live < self.ivf_threshold:
+            self._centroids = None
+            return
+        # Retrain once the corpus has doubled since the last training run
+        if force or self._centroids is None or live >= 2 * self._trained_size:
+            self.build_ivf()
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
@@ -12,11 +12,17 @@ from datetime import datetime, timedelta
 from enum import Enum
 
 import asyncio
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.exceptions import ValidationError
+from app.database.banking_models import BankAccount as BankAccountModel, BankTransaction
 from .plaid_service import BankAccount, PlaidService
+from .threshold_index import (
+    DEPOSIT, LEVEL, WITHDRAWAL, AlertDebouncer, IndexedThreshold, RecurringFlow,
+    ThresholdIndex, detect_recurring_flows, project_balances
+)
 from .yodlee_service import YodleeService
 
 logger = logging.getLogger(__name__)
@@ -100,14 +106,25 @@ class BalanceMonitor:
     - Balance trend analysis
     - Overdraft prevention
     - Recurring payment monitoring
+    
+    Thresholds are held in a per-user ThresholdIndex, so each sync cycle only
+    evaluates accounts whose balance changed and only the levels they crossed.
     """
     
+    # Lookback used to detect recurring transactions for the forecast
+    RECURRING_LOOKBACK_DAYS = 120
+    
     def __init__(self):
         self.check_frequency_hours = settings.BALANCE_CHECK_FREQUENCY_HOURS
         self.low_balance_threshold = settings.LOW_BALANCE_THRESHOLD_PERCENTAGE
+        self.forecast_days = settings.balance_forecast_days
         self.plaid_service = PlaidService()
         self.yodlee_service = YodleeService()
+        self.debouncer = AlertDebouncer(settings.balance_alert_debounce_seconds)
         self._monitoring_tasks: Dict[str, asyncio.Task] = {}
+        self._custom_thresholds: Dict[str, List[BalanceThreshold]] = {}
+        self._threshold_indexes: Dict[str, Tuple[Tuple, ThresholdIndex]] = {}
+        self._last_balances: Dict[str, float] = {}
     
     async def start_monitoring(
         self,
@@ -183,9 +200,8 @@ class BalanceMonitor:
     ):
         """Main monitoring loop for user accounts"""
         try:
-            # Initialize thresholds
-            thresholds = await self._get_monitoring_thresholds(user_id, custom_thresholds, db)
-            previous_snapshots: Dict[str, AccountSnapshot] = {}
+            if custom_thresholds:
+                self._custom_thresholds[user_id] = custom_thresholds
             
             while True:
                 try:
@@ -194,18 +210,11 @@ class BalanceMonitor:
                         user_id, credential_ids, db
                     )
                     
-                    # Check for alerts
-                    alerts = await self._check_balance_alerts(
-                        current_snapshots, previous_snapshots, thresholds, user_id
+                    # Evaluate changed balances and send debounced alerts
+                    await self.evaluate_sync_cycle(
+                        {user_id: list(current_snapshots.values())}, db
                     )
                     
-                    # Process and send alerts
-                    if alerts:
-                        await self._process_alerts(alerts, user_id, db)
-                    
-                    # Update previous snapshots
-                    previous_snapshots = current_snapshots
-                    
                     # Wait for next check
                     await asyncio.sleep(self.check_frequency_hours * 3600)
                     
@@ -319,143 +328,266 @@ class BalanceMonitor:
             logger.error(f"Error getting monitoring thresholds: {str(e)}")
             return []
     
-    async def _check_balance_alerts(
+    def _get_threshold_index(
         self,
-        current_snapshots: Dict[str, AccountSnapshot],
-        previous_snapshots: Dict[str, AccountSnapshot],
-        thresholds: List[BalanceThreshold],
-        user_id: str
-    ) -> List[BalanceAlert]:
-        """Check for balance alerts based on current snapshots and thresholds"""
-        alerts = []
+        user_id: str,
+        thresholds: List[BalanceThreshold]
+    ) -> ThresholdIndex:
+        """Get the user's threshold index, rebuilding it only when thresholds change"""
+        key = tuple(
+            (t.account_id, t.threshold_type.value, t.threshold_value, t.enabled)
+            for t in thresholds
+        )
+        cached = self._threshold_indexes.get(user_id)
+        if cached and cached[0] == key:
+            return cached[1]
         
-        try:
-            for account_id, current_snapshot in current_snapshots.items():
-                previous_snapshot = previous_snapshots.get(account_id)
-                
-                # Check each threshold
-                for threshold in thresholds:
-                    if not threshold.enabled:
-                        continue
-                    
-                    # Check if threshold applies to this account
-                    if threshold.account_id != "*" and threshold.account_id != account_id:
-                        continue
-                    
-                    alert = await self._evaluate_threshold(
-                        current_snapshot, previous_snapshot, threshold, user_id
-                    )
-                    
-                    if alert:
-                        alerts.append(alert)
+        entries = []
+        for threshold in thresholds:
+            if not threshold.enabled:
+                continue
             
-            return alerts
-            
-        except Exception as e:
-            logger.error(f"Error checking balance alerts: {str(e)}")
-            return []
+            if threshold.threshold_type == AlertType.LOW_BALANCE:
+                # Percentage thresholds need a historical average; use the $100 fallback
+                level = 100.0 if threshold.threshold_value <= 1.0 else threshold.threshold_value
+                entries.append(IndexedThreshold(threshold.account_id, LEVEL, level, threshold))
+            elif threshold.threshold_type == AlertType.NEGATIVE_BALANCE:
+                entries.append(IndexedThreshold(threshold.account_id, LEVEL, 0.0, threshold))
+            elif threshold.threshold_type == AlertType.UNUSUAL_WITHDRAWAL:
+                entries.append(IndexedThreshold(threshold.account_id, WITHDRAWAL, threshold.threshold_value, threshold))
+            elif threshold.threshold_type == AlertType.LARGE_DEPOSIT:
+                entries.append(IndexedThreshold(threshold.account_id, DEPOSIT, threshold.threshold_value, threshold))
+        
+        index = ThresholdIndex(entries)
+        self._threshold_indexes[user_id] = (key, index)
+        return index
     
-    async def _evaluate_threshold(
+    async def evaluate_sync_cycle(
         self,
-        current_snapshot: AccountSnapshot,
-        previous_snapshot: Optional[AccountSnapshot],
-        threshold: BalanceThreshold,
-        user_id: str
-    ) -> Optional[BalanceAlert]:
-        """Evaluate a specific threshold against account snapshot"""
+        snapshots_by_user: Dict[str, List[AccountSnapshot]],
+        db: AsyncSession,
+        last_balances: Optional[Dict[str, float]] = None
+    ) -> Dict[str, List[BalanceAlert]]:
+        """
+        Evaluate balance alerts for one sync cycle
+        
+        Accounts whose balance is unchanged since the last evaluation are
+        skipped. The remaining accounts of every user share one recurring
+        transaction query and one vectorized forecast, and each is checked
+        only against the thresholds its balance crossed. Notifications are
+        debounced per account, alert type and threshold.
+        
+        Args:
+            snapshots_by_user: Current account snapshots keyed by user
+            db: Database session
+            last_balances: Previously evaluated balances to compare against and
+                update; defaults to the monitoring loop's own state
+            
+        Returns:
+            Alerts triggered in this cycle, keyed by user
+        """
         try:
-            current_balance = current_snapshot.current_balance
-            account_id = current_snapshot.account_id
+            if last_balances is None:
+                last_balances = self._last_balances
+            
+            changed = [
+                (user_id, snapshot)
+                for user_id, snapshots in snapshots_by_user.items()
+                for snapshot in snapshots
+                if last_balances.get(snapshot.account_id) != snapshot.current_balance
+            ]
+            if not changed:
+                return {}
+            
+            account_ids = [snapshot.account_id for _, snapshot in changed]
+            balances = [snapshot.current_balance for _, snapshot in changed]
+            flows = await self._get_recurring_flows(account_ids, db)
+            projected, projected_day = project_balances(
+                account_ids, balances, flows, datetime.utcnow().date(), self.forecast_days
+            )
             
-            if threshold.threshold_type == AlertType.LOW_BALANCE:
-                # Calculate percentage-based threshold
-                if threshold.threshold_value <= 1.0:  # Percentage
-                    # Need historical average for percentage calculation
-                    # For now, use a simple low balance check
-                    if current_balance < 100:  # Simple $100 threshold
-                        return BalanceAlert(
-                            alert_id=f"low_balance_{account_id}_{int(datetime.utcnow().timestamp())}",
-                            user_id=user_id,
-                            account_id=account_id,
-                            alert_type=AlertType.LOW_BALANCE,
-                            severity=AlertSeverity.WARNING,
-                            title="Low Balance Alert",
-                            message=f"Your account balance is low: ${current_balance:.2f}",
-                            current_balance=current_balance,
-                            threshold_value=threshold.threshold_value,
-                            triggered_at=datetime.utcnow()
-                        )
-                else:  # Absolute amount
-                    if current_balance < threshold.threshold_value:
-                        return BalanceAlert(
-                            alert_id=f"low_balance_{account_id}_{int(datetime.utcnow().timestamp())}",
-                            user_id=user_id,
-                            account_id=account_id,
-                            alert_type=AlertType.LOW_BALANCE,
-                            severity=AlertSeverity.WARNING,
-                            title="Low Balance Alert",
-                            message=f"Your account balance ${current_balance:.2f} is below ${threshold.threshold_value:.2f}",
-                            current_balance=current_balance,
-                            threshold_value=threshold.threshold_value,
-                            triggered_at=datetime.utcnow()
-                        )
+            indexes = {}
+            for user_id in {user_id for user_id, _ in changed}:
+                thresholds = await self._get_monitoring_thresholds(
+                    user_id, self._custom_thresholds.get(user_id), db
+                )
+                indexes[user_id] = self._get_threshold_index(user_id, thresholds)
+            
+            alerts_by_user: Dict[str, List[BalanceAlert]] = {}
+            for position, (user_id, snapshot) in enumerate(changed):
+                alerts = self._evaluate_account(
+                    indexes[user_id], snapshot, user_id,
+                    last_balances.get(snapshot.account_id),
+                    float(projected[position]), int(projected_day[position])
+                )
+                last_balances[snapshot.account_id] = snapshot.current_balance
+                if alerts:
+                    alerts_by_user.setdefault(user_id, []).extend(alerts)
             
-            elif threshold.threshold_type == AlertType.NEGATIVE_BALANCE:
-                if current_balance < 0:
-                    return BalanceAlert(
-                        alert_id=f"negative_balance_{account_id}_{int(datetime.utcnow().timestamp())}",
-                        user_id=user_id,
-                        account_id=account_id,
-                        alert_type=AlertType.NEGATIVE_BALANCE,
-                        severity=AlertSeverity.CRITICAL,
-                        title="Negative Balance Alert",
-                        message=f"Your account has a negative balance: ${current_balance:.2f}",
-                        current_balance=current_balance,
-                        threshold_value=0.0,
-                        triggered_at=datetime.utcnow()
-                    )
+            for user_id, alerts in alerts_by_user.items():
+                await self._process_alerts(alerts, user_id, db)
             
-            elif threshold.threshold_type == AlertType.UNUSUAL_WITHDRAWAL:
-                if previous_snapshot:
-                    balance_change = current_balance - previous_snapshot.current_balance
-                    if balance_change < -threshold.threshold_value:  # Large withdrawal
-                        return BalanceAlert(
-                            alert_id=f"unusual_withdrawal_{account_id}_{int(datetime.utcnow().timestamp())}",
-                            user_id=user_id,
-                            account_id=account_id,
-                            alert_type=AlertType.UNUSUAL_WITHDRAWAL,
-                            severity=AlertSeverity.WARNING,
-                            title="Large Withdrawal Detected",
-                            message=f"Large withdrawal detected: ${abs(balance_change):.2f}",
-                            current_balance=current_balance,
-                            threshold_value=threshold.threshold_value,
-                            triggered_at=datetime.utcnow(),
-                            metadata={'balance_change': balance_change}
-                        )
-            
-            elif threshold.threshold_type == AlertType.LARGE_DEPOSIT:
-                if previous_snapshot:
-                    balance_change = current_balance - previous_snapshot.current_balance
-                    if balance_change > threshold.threshold_value:  # Large deposit
-                        return BalanceAlert(
-                            alert_id=f"large_deposit_{account_id}_{int(datetime.utcnow().timestamp())}",
-                            user_id=user_id,
-                            account_id=account_id,
-                            alert_type=AlertType.LARGE_DEPOSIT,
-                            severity=AlertSeverity.INFO,
-                            title="Large Deposit Received",
-                            message=f"Large deposit received: ${balance_change:.2f}",
-                            current_balance=current_balance,
-                            threshold_value=threshold.threshold_value,
-                            triggered_at=datetime.utcnow(),
-                            metadata={'balance_change': balance_change}
-                        )
+            return alerts_by_user
             
-            return None
+        except Exception as e:
+            logger.error(f"Error evaluating balance alerts: {str(e)}")
+            return {}
+    
+    def _evaluate_account(
+        self,
+        index: ThresholdIndex,
+        snapshot: AccountSnapshot,
+        user_id: str,
+        previous_balance: Optional[float],
+        projected_balance: float,
+        projected_day: int
+    ) -> List[BalanceAlert]:
+        """Evaluate the thresholds crossed by one account's balance change"""
+        account_id = snapshot.account_id
+        current_balance = snapshot.current_balance
+        alerts = []
+        
+        for threshold in index.crossed_levels(account_id, current_balance, previous_balance):
+            alerts.append(self._build_alert(threshold, snapshot, user_id))
+        
+        if previous_balance is not None:
+            balance_change = current_balance - previous_balance
+            for threshold in index.exceeded_changes(account_id, balance_change):
+                alerts.append(self._build_alert(threshold, snapshot, user_id, balance_change))
+        
+        # Levels not yet breached but reached by upcoming recurring payments
+        upcoming = index.levels_between(account_id, projected_balance, current_balance)
+        if upcoming:
+            alerts.append(self._build_projected_alert(
+                upcoming[0], snapshot, user_id, projected_balance, projected_day
+            ))
+        
+        return alerts
+    
+    def _build_alert(
+        self,
+        threshold: BalanceThreshold,
+        snapshot: AccountSnapshot,
+        user_id: str,
+        balance_change: Optional[float] = None
+    ) -> BalanceAlert:
+        """Build the alert for a crossed threshold"""
+        account_id = snapshot.account_id
+        current_balance = snapshot.current_balance
+        now = datetime.utcnow()
+        alert_type = threshold.threshold_type
+        metadata = None
+        
+        if alert_type == AlertType.LOW_BALANCE:
+            severity = AlertSeverity.WARNING
+            title = "Low Balance Alert"
+            if threshold.threshold_value <= 1.0:
+                message = f"Your account balance is low: ${current_balance:.2f}"
+            else:
+                message = f"Your account balance ${current_balance:.2f} is below ${threshold.threshold_value:.2f}"
+        elif alert_type == AlertType.NEGATIVE_BALANCE:
+            severity = AlertSeverity.CRITICAL
+            title = "Negative Balance Alert"
+            message = f"Your account has a negative balance: ${current_balance:.2f}"
+        elif alert_type == AlertType.UNUSUAL_WITHDRAWAL:
+            severity = AlertSeverity.WARNING
+            title = "Large Withdrawal Detected"
+            message = f"Large withdrawal detected: ${abs(balance_change):.2f}"
+            metadata = {'balance_change': balance_change}
+        else:
+            severity = AlertSeverity.INFO
+            title = "Large Deposit Received"
+            message = f"Large deposit received: ${balance_change:.2f}"
+            metadata = {'balance_change': balance_change}
+        
+        return BalanceAlert(
+            alert_id=f"{alert_type.value}_{account_id}_{int(now.timestamp())}",
+            user_id=user_id,
+            account_id=account_id,
+            alert_type=alert_type,
+            severity=severity,
+            title=title,
+            message=message,
+            current_balance=current_balance,
+            threshold_value=0.0 if alert_type == AlertType.NEGATIVE_BALANCE else threshold.threshold_value,
+            triggered_at=now,
+            metadata=metadata
+        )
+    
+    def _build_projected_alert(
+        self,
+        threshold: BalanceThreshold,
+        snapshot: AccountSnapshot,
+        user_id: str,
+        projected_balance: float,
+        projected_day: int
+    ) -> BalanceAlert:
+        """Build the alert for a threshold that recurring payments are expected to cross"""
+        account_id = snapshot.account_id
+        now = datetime.utcnow()
+        projected_date = (now + timedelta(days=projected_day)).date()
+        
+        if projected_balance < 0:
+            alert_type = AlertType.ACCOUNT_OVERDRAFT
+            title = "Projected Overdraft"
+            message = (
+                f"Upcoming recurring payments may overdraw your account to "
+                f"${projected_balance:.2f} by {projected_date.isoformat()}"
+            )
+        else:
+            alert_type = AlertType.LOW_BALANCE
+            title = "Projected Low Balance"
+            message = (
+                f"Upcoming recurring payments may bring your balance down to "
+                f"${projected_balance:.2f} by {projected_date.isoformat()}"
+            )
+        
+        return BalanceAlert(
+            alert_id=f"projected_{alert_type.value}_{account_id}_{int(now.timestamp())}",
+            user_id=user_id,
+            account_id=account_id,
+            alert_type=alert_type,
+            severity=AlertSeverity.WARNING,
+            title=title,
+            message=message,
+            current_balance=snapshot.current_balance,
+            threshold_value=threshold.threshold_value,
+            triggered_at=now,
+            metadata={
+                'projected': True,
+                'projected_balance': projected_balance,
+                'projected_date': projected_date.isoformat()
+            }
+        )
+    
+    async def _get_recurring_flows(self, account_ids: List[str], db: AsyncSession) -> List[RecurringFlow]:
+        """Detect recurring transactions for the given provider accounts in one query"""
+        try:
+            since = datetime.utcnow() - timedelta(days=self.RECURRING_LOOKBACK_DAYS)
+            result = await db.execute(
+                select(
+                    BankAccountModel.account_id,
+                    BankTransaction.merchant_name,
+                    BankTransaction.name,
+                    BankTransaction.amount,
+                    BankTransaction.date
+                )
+                .join(BankAccountModel, BankTransaction.account_id == BankAccountModel.id)
+                .where(
+                    BankAccountModel.account_id.in_(account_ids),
+                    BankTransaction.pending.is_(False),
+                    BankTransaction.date >= since
+                )
+            )
+            rows = (
+                (account_id, merchant_name or name, float(amount), when.date())
+                for account_id, merchant_name, name, amount, when in result.all()
+            )
+            return detect_recurring_flows(rows, datetime.utcnow().date())
             
         except Exception as e:
-            logger.error(f"Error evaluating threshold: {str(e)}")
-            return None
+            logger.error(f"Error loading recurring transactions: {str(e)}")
+            return []
     
     async def _process_alerts(
         self,
@@ -469,7 +601,17 @@ class BalanceMonitor:
                 # Store alert in database
                 await self._store_alert(alert, db)
                 
-                # Send notifications
+                # Send notifications unless the same alert fired recently
+                key = (
+                    alert.account_id,
+                    alert.alert_type.value,
+                    alert.threshold_value,
+                    bool(alert.metadata and alert.metadata.get('projected'))
+                )
+                if not self.debouncer.allow(key):
+                    logger.debug(f"Debounced {alert.alert_type.value} alert for account {alert.account_id}")
+                    continue
+                
                 await self._send_alert_notifications(alert, user_id)
                 
                 logger.info(
@@ -598,6 +740,8 @@ class BalanceMonitor:
         """
         try:
             # Implementation would update thresholds in database
+            self._custom_thresholds[user_id] = thresholds
+            self._threshold_indexes.pop(user_id, None)
             logger.info(f"Updated monitoring thresholds for user {user_id}")
             return True
             
@@ -654,15 +798,13 @@ class BalanceMonitor:
             # Get current snapshots
             current_snapshots = await self._get_account_snapshots(user_id, credential_ids, db)
             
-            # Get thresholds
-            thresholds = await self._get_monitoring_thresholds(user_id, None, db)
-            
-            # Check for alerts
-            alerts = await self._check_balance_alerts(
-                current_snapshots, {}, thresholds, user_id
+            # Evaluate from a fresh state so levels the account is already
+            # below are reported, without disturbing the monitoring loop
+            alerts = await self.evaluate_sync_cycle(
+                {user_id: list(current_snapshots.values())}, db, last_balances={}
             )
             
-            return alerts
+            return alerts.get(user_id, [])
             
         except Exception as e:
             logger.error(f"Error checking immediate alerts: {str(e)}")
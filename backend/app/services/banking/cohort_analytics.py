@@ -0,0 +1,297 @@
+"""
+Cohort Spending Analytics Job
+
+This module provides a batch job that analyzes spending and cash flow for
+many users at once. Transactions are loaded as one columnar frame
+(user_id, date, amount, category, merchant), per-user metrics are computed
+with grouped and windowed pandas operations, users are partitioned across
+worker processes, and one summary row per user is written to the
+spending_summaries table.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.banking_models import BankAccount, BankingCredential, BankTransaction, SpendingSummary
+
+logger = logging.getLogger(__name__)
+
+FRAME_COLUMNS = ['user_id', 'date', 'amount', 'category', 'merchant']
+LOAD_PARTITION_ROWS = 100_000
+WRITE_CHUNK = 1000
+SUMMARY_COLUMNS = ('total_income', 'total_expenses', 'net_cash_flow', 'savings_rate', 'top_category', 'anomaly_count')
+
+
+def compute_user_metrics(
+    frame: pd.DataFrame,
+    as_of: date,
+    lookback_days: int = 90,
+    anomaly_threshold: float = 2.0,
+    min_transactions: int = 5
+) -> pd.DataFrame:
+    """
+    Per-user cash flow, pattern and anomaly metrics, one row per user.
+
+    Positive amounts are spending and negative amounts income, as in the
+    per-user analyzers. Cash flow covers the whole frame by month; patterns
+    and anomalies use spending in the last ``lookback_days`` and follow
+    the rules of SpendingPatternDetector and CashFlowAnalyzer.
+    """
+    if frame.empty:
+        return pd.DataFrame()
+
+    month = frame['date'].dt.to_period('M')
+    flows = pd.DataFrame({
+        'user_id': frame['user_id'],
+        'month': month,
+        'income': (-frame['amount']).clip(lower=0),
+        'expense': frame['amount'].clip(lower=0)
+    })
+    monthly = flows.groupby(['user_id', 'month'], sort=True, observed=True)[['income', 'expense']].sum()
+    monthly['net'] = monthly['income'] - monthly['expense']
+    by_user_month = monthly.groupby(level='user_id', observed=True)
+
+    metrics = pd.DataFrame({
+        'months': by_user_month.size(),
+        'total_income': by_user_month['income'].sum(),
+        'total_expenses': by_user_month['expense'].sum(),
+        'avg_monthly_income': by_user_month['income'].mean(),
+        'avg_monthly_expenses': by_user_month['expense'].mean(),
+        'avg_monthly_net': by_user_month['net'].mean()
+    })
+    metrics['net_cash_flow'] = metrics['total_income'] - metrics['total_expenses']
+    metrics['savings_rate'] = (metrics['net_cash_flow'] / metrics['total_income']).where(metrics['total_income'] > 0)
+    mean_net = metrics['avg_monthly_net'].abs()
+    metrics['net_volatility'] = (by_user_month['net'].std() / mean_net * 100).where(mean_net > 0)
+
+    # Trend: mean net flow of the later half of each user's months vs the earlier half
+    position = by_user_month.cumcount()
+    later_half = position >= by_user_month['net'].transform('size') // 2
+    halves = monthly['net'].groupby([monthly.index.get_level_values('user_id'), later_half]).mean().unstack()
+    if True in halves and False in halves:
+        earlier = halves[False]
+        metrics['trend_percentage'] = ((halves[True] - earlier) / earlier.abs() * 100).where(
+            (metrics['months'] >= 2) & (earlier != 0)
+        )
+    else:
+        metrics['trend_percentage'] = np.nan
+
+    start = pd.Timestamp(as_of - timedelta(days=lookback_days))
+    spend = frame[(frame['date'] >= start) & (frame['amount'] > 0)]
+    if spend.empty:
+        return metrics.reset_index()
+
+    spend_total = spend.groupby('user_id', observed=True)['amount'].sum()
+    metrics['spend_in_window'] = spend_total
+    metrics['transactions_in_window'] = spend.groupby('user_id', observed=True).size()
+    weekend = spend['date'].dt.weekday >= 5
+    metrics['weekend_share'] = spend['amount'].where(weekend, 0.0).groupby(spend['user_id'], observed=True).sum() / spend_total
+
+    by_category = spend.groupby(['user_id', 'category'], observed=True)['amount'].agg(['sum', 'count'])
+    top = by_category.reset_index().sort_values(['user_id', 'sum'], ascending=[True, False]).drop_duplicates('user_id')
+    top = top.set_index('user_id')
+    metrics['top_category'] = top['category'].astype(object)
+    metrics['top_category_share'] = top['sum'] / spend_total
+
+    visits = spend.groupby(['user_id', 'merchant'], observed=True).size().rename('visits').reset_index()
+    top_merchant = visits.sort_values(['user_id', 'visits'], ascending=[True, False]).drop_duplicates('user_id')
+    top_merchant = top_merchant.set_index('user_id')
+    metrics['top_merchant'] = top_merchant['merchant'].astype(object)
+    metrics['top_merchant_share'] = top_merchant['visits'] / metrics['transactions_in_window']
+
+    # Weekly patterns: consistency of weekly category totals
+    week = spend['date'].dt.to_period('W')
+    weekly = spend.groupby(['user_id', 'category', week], observed=True)['amount'].sum()
+    weekly_stats = weekly.groupby(level=['user_id', 'category'], observed=True).agg(['mean', 'std', 'count'])
+    weekly_stats = weekly_stats.join(by_category['count'].rename('transactions'))
+    weekly_stats = weekly_stats[(weekly_stats['count'] >= 2) & (weekly_stats['transactions'] >= min_transactions)]
+    cv = (weekly_stats['std'] / weekly_stats['mean']).where(weekly_stats['mean'] > 0, 1.0)
+    confidence = (0.8 - cv).clip(lower=0.1)
+    metrics['weekly_patterns'] = confidence.groupby(level='user_id', observed=True).size()
+    metrics['strong_patterns'] = (confidence > 0.7).groupby(level='user_id', observed=True).sum()
+
+    # Amount anomalies: z-score within each user's category
+    grouped = spend.groupby(['user_id', 'category'], observed=True)['amount']
+    category_std = grouped.transform('std', ddof=0)
+    z_scores = ((spend['amount'] - grouped.transform('mean')) / category_std).abs()
+    is_anomaly = (grouped.transform('size') >= min_transactions) & (category_std > 0) & (z_scores > anomaly_threshold)
+    metrics['amount_anomalies'] = is_anomaly.groupby(spend['user_id'], observed=True).sum()
+    metrics['max_amount_zscore'] = z_scores.where(is_anomaly).groupby(spend['user_id'], observed=True).max()
+
+    # Frequency anomalies: days with a transaction count two deviations above the user's mean
+    daily = spend.groupby(['user_id', spend['date'].dt.normalize()], observed=True).size()
+    by_user_day = daily.groupby(level='user_id', observed=True)
+    busy = daily > by_user_day.transform('mean') + 2 * by_user_day.transform('std')
+    busy &= by_user_day.transform('size') >= 7
+    metrics['frequency_anomaly_days'] = busy.groupby(level='user_id', observed=True).sum()
+
+    counts = ['transactions_in_window', 'weekly_patterns', 'strong_patterns', 'amount_anomalies', 'frequency_anomaly_days']
+    metrics[counts] = metrics[counts].fillna(0).astype(int)
+    metrics['anomaly_count'] = metrics['amount_anomalies'] + metrics['frequency_anomaly_days']
+    return metrics.reset_index()
+
+
+def partition_frame(frame: pd.DataFrame, partitions: int) -> List[pd.DataFrame]:
+    """Split by a stable hash of user_id so every user lands in exactly one partition"""
+    if partitions <= 1 or frame.empty:
+        return [frame]
+    keys = pd.util.hash_pandas_object(frame['user_id'].astype(str), index=False).to_numpy() % partitions
+    return [frame[keys == part] for part in range(partitions) if (keys == part).any()]
+
+
+class CohortSpendingJob:
+    """Load, analyze and summarize spending for a cohort of users"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        lookback_days: int = 90,
+        cash_flow_months: int = 6,
+        anomaly_threshold: float = 2.0
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.lookback_days = lookback_days
+        self.cash_flow_months = cash_flow_months
+        self.anomaly_threshold = anomaly_threshold
+
+    async def run(
+        self,
+        db: AsyncSession,
+        as_of: Optional[date] = None,
+        user_ids: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Analyze every user with transactions (or ``user_ids``) and upsert their summaries"""
+        as_of = as_of or datetime.utcnow().date()
+        started = datetime.utcnow()
+
+        frame = await self.load_frame(db, as_of, user_ids)
+        metrics = await self.compute(frame, as_of)
+        written = await self.write_summaries(db, metrics, as_of)
+        await db.commit()
+
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        logger.info(
+            f"Cohort spending analysis: {len(frame)} transactions, {written} users "
+            f"in {elapsed:.1f}s with {self.workers} workers"
+        )
+        return {"transactions": len(frame), "users": written, "seconds": elapsed}
+
+    async def load_frame(
+        self,
+        db: AsyncSession,
+        as_of: date,
+        user_ids: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Posted transactions in the cash flow window as one columnar frame"""
+        start = datetime.combine(as_of.replace(day=1), datetime.min.time(), tzinfo=timezone.utc)
+        for _ in range(self.cash_flow_months - 1):
+            start = (start - timedelta(days=1)).replace(day=1)
+        end = datetime.combine(as_of + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+
+        query = (
+            select(
+                BankingCredential.user_id,
+                BankTransaction.date,
+                BankTransaction.amount,
+                func.coalesce(BankTransaction.manual_category, BankTransaction.category, 'other'),
+                func.coalesce(BankTransaction.merchant_name, 'Unknown')
+            )
+            .join(BankAccount, BankTransaction.account_id == BankAccount.id)
+            .join(BankingCredential, BankAccount.credential_id == BankingCredential.id)
+            .where(
+                BankTransaction.date >= start,
+                BankTransaction.date < end,
+                BankTransaction.pending.is_(False)
+            )
+        )
+        if user_ids:
+            query = query.where(BankingCredential.user_id.in_([uuid.UUID(str(u)) for u in user_ids]))
+
+        parts = []
+        result = await db.stream(query.execution_options(yield_per=LOAD_PARTITION_ROWS))
+        async for rows in result.partitions(LOAD_PARTITION_ROWS):
+            parts.append(self._to_frame(rows))
+        return pd.concat(parts, ignore_index=True) if parts else self._to_frame([])
+
+    def _to_frame(self, rows) -> pd.DataFrame:
+        frame = pd.DataFrame.from_records(rows, columns=FRAME_COLUMNS)
+        frame['user_id'] = frame['user_id'].astype(str).astype('category')
+        frame['date'] = pd.to_datetime(frame['date'], utc=True).dt.tz_localize(None)
+        frame['amount'] = frame['amount'].astype(float)
+        frame['category'] = frame['category'].astype('category')
+        frame['merchant'] = frame['merchant'].astype('category')
+        return frame
+
+    async def compute(self, frame: pd.DataFrame, as_of: date) -> pd.DataFrame:
+        """Per-user metrics, computed in worker processes when there are several partitions"""
+        compute = partial(
+            compute_user_metrics,
+            as_of=as_of,
+            lookback_days=self.lookback_days,
+            anomaly_threshold=self.anomaly_threshold
+        )
+        parts = partition_frame(frame, self.workers)
+        if len(parts) == 1:
+            return compute(parts[0])
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=len(parts)) as executor:
+            results = await asyncio.gather(*[loop.run_in_executor(executor, compute, part) for part in parts])
+        return pd.concat(results, ignore_index=True)
+
+    async def write_summaries(self, db: AsyncSession, metrics: pd.DataFrame, as_of: date) -> int:
+        if metrics.empty:
+            return 0
+        now = datetime.now(timezone.utc)
+        rows = []
+        for record in metrics.to_dict('records'):
+            details = {
+                key: (None if isinstance(value, float) and np.isnan(value) else
+                      value.item() if isinstance(value, np.generic) else value)
+                for key, value in record.items() if key != 'user_id'
+            }
+            rows.append({
+                'id': uuid.uuid4(),
+                'user_id': uuid.UUID(str(record['user_id'])),
+                'period_end': as_of,
+                'lookback_days': self.lookback_days,
+                'total_income': round(details['total_income'], 2),
+                'total_expenses': round(details['total_expenses'], 2),
+                'net_cash_flow': round(details['net_cash_flow'], 2),
+                'savings_rate': round(details['savings_rate'], 4) if details['savings_rate'] is not None else None,
+                'top_category': details.get('top_category'),
+                'anomaly_count': details.get('anomaly_count') or 0,
+                'metrics': details,
+                'created_at': now,
+                'updated_at': now
+            })
+
+        for start in range(0, len(rows), WRITE_CHUNK):
+            stmt = insert(SpendingSummary).values(rows[start:start + WRITE_CHUNK])
+            stmt = stmt.on_conflict_do_update(
+                constraint='unique_user_spending_summary',
+                set_={
+                    **{column: stmt.excluded[column] for column in SUMMARY_COLUMNS},
+                    'lookback_days': stmt.excluded.lookback_days,
+                    'metrics': stmt.excluded.metrics,
+                    'updated_at': now
+                }
+            )
+            await db.execute(stmt)
+        return len(rows)
+
+
+# Singleton instance
+cohort_spending_job = CohortSpendingJob()
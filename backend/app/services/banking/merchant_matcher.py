@@ -0,0 +1,94 @@
+"""
+Multi-Pattern Text Matcher
+
+This module provides an Aho-Corasick automaton that finds every occurrence
+of a fixed set of substrings (merchant names, category keywords, custom
+rule patterns) in one pass over the text, independent of the number of
+patterns.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class PatternMatcher:
+    """
+    Aho-Corasick automaton over a list of patterns.
+
+    Patterns are identified by their position in the list they were built
+    from, so callers can keep payloads (categories, weights) in parallel
+    lists or arrays and resolve priority by the lowest id.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(patterns)
+        # State 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            if pattern:
+                self._insert(pattern, pattern_id)
+        self._link()
+
+    def _insert(self, pattern: str, pattern_id: int) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _link(self) -> None:
+        """
+        Breadth-first failure links, then resolve them into a full
+        transition table so matching never follows a failure link.
+        """
+        order = []
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+        # Characters missing from a state's table lead back to the root
+        self._delta: List[Dict[str, int]] = [dict(self._goto[0])]
+        self._delta.extend({} for _ in range(len(self._goto) - 1))
+        for state in order:
+            self._delta[state] = {**self._delta[self._fail[state]], **self._goto[state]}
+        self._outputs: List[Optional[Tuple[int, ...]]] = [tuple(output) or None for output in self._output]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def find(self, text: str) -> Set[int]:
+        """Ids of all patterns occurring in ``text``."""
+        found: Set[int] = set()
+        if not text:
+            return found
+
+        delta, outputs = self._delta, self._outputs
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def first(self, text: str) -> Optional[int]:
+        """Lowest id among the patterns occurring in ``text``, or None."""
+        found = self.find(text)
+        return min(found) if found else None
@@ -9,12 +9,13 @@ import logging
 import asyncio
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import plaid
 from plaid.api import plaid_api
 from plaid.model.accounts_get_request import AccountsGetRequest
 from plaid.model.transactions_get_request import TransactionsGetRequest
+from plaid.model.transactions_sync_request import TransactionsSyncRequest
 from plaid.model.item_get_request import ItemGetRequest
 from plaid.model.link_token_create_request import LinkTokenCreateRequest
 from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
@@ -64,6 +65,15 @@ class Transaction:
     location: Optional[Dict[str, Any]]
 
 
+@dataclass
+class TransactionChanges:
+    """Incremental transaction changes since a sync cursor"""
+    added: List[Transaction] = field(default_factory=list)
+    modified: List[Transaction] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
 class PlaidService:
     """
     Plaid API integration service for secure banking data access.
@@ -87,14 +97,15 @@ class PlaidService:
         try:
             # Determine environment
             environment_map = {
-                "sandbox": plaid.Environment.sandbox,
-                "development": plaid.Environment.development,
-                "production": plaid.Environment.production
+                "sandbox": plaid.Environment.Sandbox,
+                "production": plaid.Environment.Production
             }
             
+            # A URL points the client at a local provider simulator
             environment = environment_map.get(
                 settings.PLAID_ENVIRONMENT,
-                plaid.Environment.sandbox
+                settings.PLAID_ENVIRONMENT if settings.PLAID_ENVIRONMENT.startswith("http")
+                else plaid.Environment.Sandbox
             )
             
             # Configure Plaid client
@@ -139,7 +150,7 @@ class PlaidService:
                 user=LinkTokenCreateRequestUser(client_user_id=user_id)
             )
             
-            response = self.client.link_token_create(request)
+            response = await asyncio.to_thread(self.client.link_token_create, request)
             link_token = response['link_token']
             
             logger.info(f"Created link token for user {user_id}")
@@ -175,7 +186,7 @@ class PlaidService:
                 public_token=public_token
             )
             
-            response = self.client.item_public_token_exchange(request)
+            response = await asyncio.to_thread(self.client.item_public_token_exchange, request)
             access_token = response['access_token']
             item_id = response['item_id']
             
@@ -243,7 +254,7 @@ class PlaidService:
             
             # Get accounts from Plaid
             request = AccountsGetRequest(access_token=access_token)
-            response = self.client.accounts_get(request)
+            response = await asyncio.to_thread(self.client.accounts_get, request)
             
             # Convert to our data structure
             accounts = []
@@ -322,25 +333,10 @@ class PlaidService:
                 account_ids=account_ids
             )
             
-            response = self.client.transactions_get(request)
+            response = await asyncio.to_thread(self.client.transactions_get, request)
             
             # Convert to our data structure
-            transactions = []
-            for txn_data in response['transactions']:
-                transaction = Transaction(
-                    transaction_id=txn_data['transaction_id'],
-                    account_id=txn_data['account_id'],
-                    amount=txn_data['amount'],
-                    date=datetime.strptime(txn_data['date'], '%Y-%m-%d'),
-                    name=txn_data['name'],
-                    merchant_name=txn_data.get('merchant_name'),
-                    category=txn_data.get('category', []),
-                    subcategory=txn_data.get('category', [])[-1] if txn_data.get('category') else None,
-                    pending=txn_data.get('pending', False),
-                    currency=txn_data.get('iso_currency_code', 'USD'),
-                    location=txn_data.get('location')
-                )
-                transactions.append(transaction)
+            transactions = [self._to_transaction(txn_data) for txn_data in response['transactions']]
             
             logger.info(
                 f"Retrieved {len(transactions)} transactions for user {user_id} "
@@ -356,6 +352,97 @@ class PlaidService:
             logger.error(f"Unexpected error getting transactions: {str(e)}")
             raise BankingIntegrationError("Failed to retrieve transactions")
     
+    async def sync_transactions(
+        self,
+        credential_id: str,
+        user_id: str,
+        db: AsyncSession,
+        cursor: Optional[str] = None
+    ) -> TransactionChanges:
+        """
+        Fetch transaction changes since a cursor via /transactions/sync
+        
+        All pages are collected before returning. If the item changes while
+        paging, Plaid asks for the whole update to be restarted from the
+        original cursor.
+        
+        Args:
+            credential_id: Stored credential identifier
+            user_id: User identifier
+            db: Database session
+            cursor: Cursor returned by the previous sync (None for a full sync)
+            
+        Returns:
+            Added, modified and removed transactions with the next cursor
+        """
+        try:
+            credential_data = await credential_vault.retrieve_credentials(
+                credential_id, user_id, db
+            )
+            
+            if not credential_data:
+                raise BankingIntegrationError("Banking credentials not found")
+            
+            access_token = credential_data["credentials"]["access_token"]
+            
+            for _ in range(self._retry_attempts):
+                changes = TransactionChanges(next_cursor=cursor)
+                try:
+                    has_more = True
+                    while has_more:
+                        request = TransactionsSyncRequest(access_token=access_token)
+                        if changes.next_cursor:
+                            request.cursor = changes.next_cursor
+                        response = await asyncio.to_thread(self.client.transactions_sync, request)
+                        
+                        changes.added.extend(self._to_transaction(txn) for txn in response['added'])
+                        changes.modified.extend(self._to_transaction(txn) for txn in response['modified'])
+                        changes.removed.extend(txn['transaction_id'] for txn in response['removed'])
+                        changes.next_cursor = response['next_cursor']
+                        has_more = response['has_more']
+                    break
+                except ApiException as e:
+                    if 'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION' not in str(e.body):
+                        raise
+                    logger.info(f"Plaid data changed during sync for user {user_id}, restarting")
+                    await asyncio.sleep(self._retry_delay)
+            else:
+                raise BankingIntegrationError("Transactions kept changing during sync")
+            
+            logger.info(
+                f"Plaid sync for user {user_id}: {len(changes.added)} added, "
+                f"{len(changes.modified)} modified, {len(changes.removed)} removed"
+            )
+            
+            return changes
+            
+        except ApiException as e:
+            logger.error(f"Plaid API error syncing transactions: {str(e)}")
+            raise BankingIntegrationError("Failed to sync transactions")
+        except BankingIntegrationError:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error syncing transactions: {str(e)}")
+            raise BankingIntegrationError("Failed to sync transactions")
+    
+    def _to_transaction(self, txn_data: Dict[str, Any]) -> Transaction:
+        """Convert a Plaid transaction payload to our data structure"""
+        txn_date = txn_data['date']
+        return Transaction(
+            transaction_id=txn_data['transaction_id'],
+            account_id=txn_data['account_id'],
+            amount=txn_data['amount'],
+            date=datetime.strptime(txn_date, '%Y-%m-%d') if isinstance(txn_date, str)
+            else datetime.combine(txn_date, datetime.min.time()),
+            name=txn_data['name'],
+            merchant_name=txn_data.get('merchant_name'),
+            category=txn_data.get('category') or [],
+            subcategory=txn_data.get('category', [])[-1] if txn_data.get('category') else None,
+            pending=txn_data.get('pending', False),
+            currency=txn_data.get('iso_currency_code') or 'USD',
+            location=txn_data.get('location')
+        )
+    
     async def sync_account_data(
         self,
         credential_id: str,
@@ -406,7 +493,7 @@ class PlaidService:
         """Get institution information for an access token"""
         try:
             request = ItemGetRequest(access_token=access_token)
-            response = self.client.item_get(request)
+            response = await asyncio.to_thread(self.client.item_get, request)
             
             return {
                 "institution_id": response['item']['institution_id'],
@@ -449,7 +536,7 @@ class PlaidService:
             try:
                 from plaid.model.item_remove_request import ItemRemoveRequest
                 request = ItemRemoveRequest(access_token=access_token)
-                self.client.item_remove(request)
+                await asyncio.to_thread(self.client.item_remove, request)
             except Exception as e:
                 logger.warning(f"Could not remove Plaid item: {str(e)}")
             
@@ -0,0 +1,605 @@
+"""
+Incremental Spending Aggregates
+
+This module provides per-user rolling spending aggregates that are updated
+as transactions are synced: daily and monthly spend by category, spend by
+merchant, and Welford running mean/variance of amounts per category. Only
+new or modified transactions are scored for anomalies, and removed or
+modified ones are retracted using what they contributed; pattern summaries
+for dashboards are derived from the aggregates without re-reading
+transactions.
+"""
+
+import logging
+import math
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.banking_models import SpendingAggregate
+from .plaid_service import Transaction
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_VERSION = 2
+DAILY_RETENTION_DAYS = 120
+MONTHLY_RETENTION_MONTHS = 24
+MAX_RECENT_ANOMALIES = 100
+DEFAULT_ANOMALY_THRESHOLD = 2.0
+MIN_TRANSACTIONS_FOR_PATTERN = 5
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+@dataclass
+class RunningStats:
+    """Welford running mean and variance"""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value: float):
+        """Undo add(value)"""
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = (self.count * self.mean - value) / (self.count - 1)
+        self.m2 = max(0.0, self.m2 - (value - mean) * (value - self.mean))
+        self.count -= 1
+        self.mean = mean
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def zscore(self, value: float) -> float:
+        std = self.std
+        return (value - self.mean) / std if std > 0 else 0.0
+
+
+@dataclass
+class Bucket:
+    """Count, sum and sum of squares of amounts"""
+    count: int = 0
+    total: float = 0.0
+    squares: float = 0.0
+
+    def add(self, amount: float):
+        self.count += 1
+        self.total += amount
+        self.squares += amount * amount
+
+    def remove(self, amount: float):
+        self.count -= 1
+        self.total -= amount
+        self.squares -= amount * amount
+
+    def merge(self, other: "Bucket"):
+        self.count += other.count
+        self.total += other.total
+        self.squares += other.squares
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation"""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(max(0.0, (self.squares - self.total * self.total / self.count) / (self.count - 1)))
+
+
+@dataclass
+class MerchantStats:
+    """Spend at one merchant since it was first seen"""
+    category: str
+    first_seen: date
+    last_seen: date
+    amounts: Bucket = field(default_factory=Bucket)
+    weekdays: List[int] = field(default_factory=lambda: [0] * 7)
+
+
+@dataclass
+class CountedTransaction:
+    """What one counted transaction added to the aggregates"""
+    day: date
+    category: str
+    amount: float
+    merchant: str
+
+
+@dataclass
+class SpendingAggregates:
+    """
+    Rolling aggregates for one user.
+
+    Daily buckets are kept for ``DAILY_RETENTION_DAYS`` and monthly buckets
+    for ``MONTHLY_RETENTION_MONTHS``; older buckets are pruned on update.
+    Transactions counted within the daily retention are remembered with
+    their contribution, so re-reported transactions are not counted twice
+    and modified or removed ones can be retracted. Transactions dated
+    before the daily retention that are not remembered are ignored, since
+    they may already be counted in the monthly buckets.
+    """
+    user_id: str
+    days: Dict[date, Dict[str, Bucket]] = field(default_factory=dict)
+    months: Dict[str, Dict[str, Bucket]] = field(default_factory=dict)
+    merchants: Dict[str, MerchantStats] = field(default_factory=dict)
+    amount_stats: Dict[str, RunningStats] = field(default_factory=dict)
+    seen: Dict[str, CountedTransaction] = field(default_factory=dict)
+    anomalies: List[Dict[str, Any]] = field(default_factory=list)
+    last_transaction_date: Optional[date] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact JSON form: buckets are [count, total, squares] lists keyed by ISO date"""
+        return {
+            'v': AGGREGATE_VERSION,
+            'days': {
+                day.isoformat(): {category: _pack(bucket) for category, bucket in buckets.items()}
+                for day, buckets in self.days.items()
+            },
+            'months': {
+                month: {category: _pack(bucket) for category, bucket in buckets.items()}
+                for month, buckets in self.months.items()
+            },
+            'merchants': {
+                name: [m.category, m.first_seen.isoformat(), m.last_seen.isoformat(), _pack(m.amounts), m.weekdays]
+                for name, m in self.merchants.items()
+            },
+            'amount_stats': {
+                category: [s.count, round(s.mean, 6), round(s.m2, 6)]
+                for category, s in self.amount_stats.items()
+            },
+            'seen': {
+                txn_id: [t.day.isoformat(), t.category, round(t.amount, 2), t.merchant]
+                for txn_id, t in self.seen.items()
+            },
+            'anomalies': self.anomalies,
+            'last': self.last_transaction_date.isoformat() if self.last_transaction_date else None
+        }
+
+    @classmethod
+    def from_dict(cls, user_id: str, data: Optional[Dict[str, Any]]) -> "SpendingAggregates":
+        if not data or data.get('v') != AGGREGATE_VERSION:
+            return cls(user_id=user_id)
+        return cls(
+            user_id=user_id,
+            days={
+                date.fromisoformat(day): {category: Bucket(*packed) for category, packed in buckets.items()}
+                for day, buckets in data.get('days', {}).items()
+            },
+            months={
+                month: {category: Bucket(*packed) for category, packed in buckets.items()}
+                for month, buckets in data.get('months', {}).items()
+            },
+            merchants={
+                name: MerchantStats(
+                    category=category,
+                    first_seen=date.fromisoformat(first_seen),
+                    last_seen=date.fromisoformat(last_seen),
+                    amounts=Bucket(*packed),
+                    weekdays=list(weekdays)
+                )
+                for name, (category, first_seen, last_seen, packed, weekdays) in data.get('merchants', {}).items()
+            },
+            amount_stats={
+                category: RunningStats(*packed) for category, packed in data.get('amount_stats', {}).items()
+            },
+            seen={
+                txn_id: CountedTransaction(date.fromisoformat(day), category, amount, merchant)
+                for txn_id, (day, category, amount, merchant) in data.get('seen', {}).items()
+            },
+            anomalies=list(data.get('anomalies', [])),
+            last_transaction_date=date.fromisoformat(data['last']) if data.get('last') else None
+        )
+
+
+def _pack(bucket: Bucket) -> List[Any]:
+    return [bucket.count, round(bucket.total, 2), round(bucket.squares, 4)]
+
+
+def _retract_amount(buckets_by_key: Dict[Any, Dict[str, Bucket]], key: Any, category: str, amount: float):
+    buckets = buckets_by_key.get(key)
+    bucket = buckets.get(category) if buckets else None
+    if bucket is None:
+        return
+    bucket.remove(amount)
+    if bucket.count <= 0:
+        del buckets[category]
+        if not buckets:
+            del buckets_by_key[key]
+
+
+def _severity(z_score: float) -> str:
+    if z_score > 3:
+        return 'critical'
+    elif z_score > 2.5:
+        return 'high'
+    elif z_score > 2:
+        return 'medium'
+    return 'low'
+
+
+def transaction_category(transaction: Transaction, prediction: Any = None) -> str:
+    """Predicted category, else the provider's top-level category, else 'other'"""
+    if prediction is not None:
+        return prediction.category
+    if transaction.category:
+        return transaction.category[0].lower()
+    return 'other'
+
+
+class SpendingAggregator:
+    """Fold new transactions into SpendingAggregates and score them"""
+
+    def __init__(
+        self,
+        anomaly_threshold: float = DEFAULT_ANOMALY_THRESHOLD,
+        min_transactions: int = MIN_TRANSACTIONS_FOR_PATTERN
+    ):
+        self.anomaly_threshold = anomaly_threshold
+        self.min_transactions = min_transactions
+
+    def update(
+        self,
+        aggregates: SpendingAggregates,
+        transactions: Iterable[Transaction],
+        categories: Optional[List[Any]] = None,
+        removed: Iterable[str] = ()
+    ) -> List[Dict[str, Any]]:
+        """
+        Add posted spending transactions not seen before and return the
+        anomalies among them. Each transaction is scored against the
+        history before it, in date order. Pending transactions are left
+        out until they post, since providers may repost them under a new id.
+
+        Transactions in ``removed``, and re-reported ones whose amount, date,
+        category or merchant changed, are retracted first; changed ones are
+        then added and scored again like new ones. Transactions older than
+        the daily retention are ignored unless they are still remembered.
+        """
+        for txn_id in removed:
+            self._retract(aggregates, txn_id)
+
+        cutoff = self._cutoff(aggregates)
+        transactions = list(transactions)
+        predictions = categories or []
+        new = []
+        for index, txn in enumerate(transactions):
+            prediction = predictions[index] if index < len(predictions) else None
+            category = transaction_category(txn, prediction)
+            eligible = not txn.pending and txn.amount > 0
+            counted = aggregates.seen.get(txn.transaction_id)
+            if counted is not None:
+                if eligible and counted == self._contribution(txn, category):
+                    continue
+                self._retract(aggregates, txn.transaction_id)
+            elif cutoff is not None and self._contribution(txn, category).day < cutoff:
+                continue
+            if eligible:
+                new.append((txn, category))
+        new.sort(key=lambda item: item[0].date)
+
+        anomalies = []
+        for txn, category in new:
+            anomalies.extend(self._score(aggregates, txn, category))
+            self._add(aggregates, txn, category)
+
+        if anomalies:
+            aggregates.anomalies = (aggregates.anomalies + anomalies)[-MAX_RECENT_ANOMALIES:]
+        self._prune(aggregates)
+        return anomalies
+
+    def _contribution(self, txn: Transaction, category: str) -> CountedTransaction:
+        day = txn.date.date() if isinstance(txn.date, datetime) else txn.date
+        return CountedTransaction(day, category, round(float(txn.amount), 2), txn.merchant_name or 'Unknown')
+
+    def _add(self, aggregates: SpendingAggregates, txn: Transaction, category: str):
+        counted = self._contribution(txn, category)
+        day = counted.day
+        amount = float(txn.amount)
+
+        aggregates.seen[txn.transaction_id] = counted
+        aggregates.days.setdefault(day, {}).setdefault(category, Bucket()).add(amount)
+        aggregates.months.setdefault(day.strftime('%Y-%m'), {}).setdefault(category, Bucket()).add(amount)
+        aggregates.amount_stats.setdefault(category, RunningStats()).add(amount)
+
+        name = txn.merchant_name or 'Unknown'
+        merchant = aggregates.merchants.get(name)
+        if merchant is None:
+            merchant = aggregates.merchants[name] = MerchantStats(category, day, day)
+        merchant.first_seen = min(merchant.first_seen, day)
+        merchant.last_seen = max(merchant.last_seen, day)
+        merchant.amounts.add(amount)
+        merchant.weekdays[day.weekday()] += 1
+
+        if aggregates.last_transaction_date is None or day > aggregates.last_transaction_date:
+            aggregates.last_transaction_date = day
+
+    def _retract(self, aggregates: SpendingAggregates, txn_id: str):
+        """Undo _add for a counted transaction and drop its anomalies"""
+        counted = aggregates.seen.pop(txn_id, None)
+        if counted is None:
+            return
+        day, category, amount = counted.day, counted.category, counted.amount
+
+        _retract_amount(aggregates.days, day, category, amount)
+        _retract_amount(aggregates.months, day.strftime('%Y-%m'), category, amount)
+        stats = aggregates.amount_stats.get(category)
+        if stats is not None:
+            stats.remove(amount)
+            if stats.count == 0:
+                del aggregates.amount_stats[category]
+
+        merchant = aggregates.merchants.get(counted.merchant)
+        if merchant is not None:
+            merchant.amounts.remove(amount)
+            merchant.weekdays[day.weekday()] = max(0, merchant.weekdays[day.weekday()] - 1)
+            if merchant.amounts.count <= 0:
+                del aggregates.merchants[counted.merchant]
+
+        aggregates.anomalies = [a for a in aggregates.anomalies if a['transaction_id'] != txn_id]
+
+    def _score(self, aggregates: SpendingAggregates, txn: Transaction, category: str) -> List[Dict[str, Any]]:
+        anomalies = []
+        amount = float(txn.amount)
+        history = aggregates.amount_stats.get(category)
+        if history is None or history.count < self.min_transactions:
+            return anomalies
+
+        z_score = abs(history.zscore(amount))
+        if z_score > self.anomaly_threshold:
+            anomalies.append(self._anomaly(
+                txn, 'amount', _severity(z_score), z_score, history.mean, amount,
+                f"Transaction amount ${amount:.2f} is {z_score:.1f} standard deviations from typical {category} spending"
+            ))
+
+        merchant = txn.merchant_name or 'Unknown'
+        if merchant not in aggregates.merchants:
+            ratio = amount / history.mean if history.mean > 0 else 1.0
+            anomalies.append(self._anomaly(
+                txn, 'merchant', 'medium' if ratio > 2 else 'low',
+                min(5.0, 2.0 + math.log(max(ratio, 1e-6))), None, amount,
+                f"Spending at unusual merchant '{merchant}' for {category} category"
+            ))
+
+        # Dates without a time of day carry no timing information
+        if isinstance(txn.date, datetime) and txn.date.time() != time.min:
+            hour = txn.date.hour
+            if hour >= 23 or hour <= 5:
+                base_score = 2.5 if hour >= 23 or hour <= 2 else 2.0
+                score = base_score * min(2.0, amount / history.mean if history.mean > 0 else 1.0)
+                anomalies.append(self._anomaly(
+                    txn, 'time', 'high' if score > 4 else 'medium' if score > 3 else 'low',
+                    score, None, hour, f"Transaction at unusual time {hour:02d}:00"
+                ))
+        return anomalies
+
+    def _anomaly(
+        self,
+        txn: Transaction,
+        anomaly_type: str,
+        severity: str,
+        score: float,
+        expected: Optional[float],
+        actual: float,
+        reason: str
+    ) -> Dict[str, Any]:
+        return {
+            'transaction_id': txn.transaction_id,
+            'date': (txn.date.date() if isinstance(txn.date, datetime) else txn.date).isoformat(),
+            'anomaly_type': anomaly_type,
+            'severity': severity,
+            'anomaly_score': round(score, 4),
+            'expected_value': round(expected, 2) if expected is not None else None,
+            'actual_value': actual,
+            'reason': reason
+        }
+
+    def _cutoff(self, aggregates: SpendingAggregates) -> Optional[date]:
+        """First day still held in the daily buckets and seen transactions"""
+        if aggregates.last_transaction_date is None:
+            return None
+        return aggregates.last_transaction_date - timedelta(days=DAILY_RETENTION_DAYS)
+
+    def _prune(self, aggregates: SpendingAggregates):
+        cutoff = self._cutoff(aggregates)
+        if cutoff is None:
+            return
+        aggregates.days = {day: buckets for day, buckets in aggregates.days.items() if day >= cutoff}
+        aggregates.seen = {txn_id: counted for txn_id, counted in aggregates.seen.items() if counted.day >= cutoff}
+        aggregates.merchants = {
+            name: merchant for name, merchant in aggregates.merchants.items() if merchant.last_seen >= cutoff
+        }
+        if len(aggregates.months) > MONTHLY_RETENTION_MONTHS:
+            keep = sorted(aggregates.months)[-MONTHLY_RETENTION_MONTHS:]
+            aggregates.months = {month: aggregates.months[month] for month in keep}
+
+    def summarize(
+        self,
+        aggregates: SpendingAggregates,
+        lookback_days: int = 90,
+        as_of: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Patterns over the lookback window, computed from daily buckets
+        with the same rules as the full analysis
+        """
+        as_of = as_of or aggregates.last_transaction_date or datetime.utcnow().date()
+        start = as_of - timedelta(days=lookback_days)
+        window = {day: buckets for day, buckets in aggregates.days.items() if start <= day <= as_of}
+
+        by_category: Dict[str, Bucket] = defaultdict(Bucket)
+        by_weekday: Dict[Tuple[str, int], Bucket] = defaultdict(Bucket)
+        by_week: Dict[str, Dict[Tuple[int, int], Bucket]] = defaultdict(lambda: defaultdict(Bucket))
+        by_month: Dict[str, Dict[str, Bucket]] = defaultdict(lambda: defaultdict(Bucket))
+        for day, buckets in window.items():
+            for category, bucket in buckets.items():
+                by_category[category].merge(bucket)
+                by_weekday[(category, day.weekday())].merge(bucket)
+                by_week[category][day.isocalendar()[:2]].merge(bucket)
+                by_month[category][day.strftime('%Y-%m')].merge(bucket)
+
+        merchants_by_category: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        for name, merchant in aggregates.merchants.items():
+            merchants_by_category[merchant.category].append((merchant.amounts.count, name))
+        top_merchants = {
+            category: [name for _, name in sorted(entries, reverse=True)[:3]]
+            for category, entries in merchants_by_category.items()
+        }
+
+        span_days = (max(window) - min(window)).days if window else 0
+        eligible = {c for c, bucket in by_category.items() if bucket.count >= self.min_transactions}
+
+        daily = []
+        for (category, weekday), bucket in by_weekday.items():
+            if category not in eligible or bucket.count < 2:
+                continue
+            mean = bucket.mean
+            confidence = min(0.9, 0.3 + bucket.count * 0.1 - (bucket.std / mean if mean > 0 else 0) * 0.2)
+            daily.append(self._pattern(
+                f"daily_{category}_{weekday}", 'daily', category, bucket.count / max(span_days / 7, 1),
+                mean, top_merchants.get(category, []), [DAY_NAMES[weekday]], max(0.1, confidence),
+                f"Regular {category} spending on {DAY_NAMES[weekday]}s"
+            ))
+
+        weekly = self._period_patterns('weekly', by_week, eligible, top_merchants, lambda cv: max(0.1, 0.8 - cv))
+        monthly = self._period_patterns('monthly', by_month, eligible, top_merchants, lambda cv: max(0.1, 0.7 - cv * 0.5))
+
+        merchant_patterns = []
+        for name, merchant in aggregates.merchants.items():
+            amounts = merchant.amounts
+            if amounts.count < self.min_transactions or merchant.last_seen < start:
+                continue
+            days_seen = (merchant.last_seen - merchant.first_seen).days
+            cv = amounts.std / amounts.mean if amounts.mean > 0 else 1
+            top_days = sorted(range(7), key=lambda d: merchant.weekdays[d], reverse=True)[:3]
+            merchant_patterns.append(self._pattern(
+                f"merchant_{name.replace(' ', '_')}", 'merchant', merchant.category,
+                amounts.count / max(days_seen / 30, 1), amounts.mean, [name],
+                [DAY_NAMES[d][:3] for d in top_days if merchant.weekdays[d]],
+                max(0.1, min(0.9, 0.4 + amounts.count * 0.05 - cv * 0.2)),
+                f"Regular spending at {name}"
+            ))
+
+        def by_confidence(patterns):
+            return sorted(patterns, key=lambda p: p['confidence'], reverse=True)
+
+        return {
+            'user_id': aggregates.user_id,
+            'analysis_period': {
+                'lookback_days': lookback_days,
+                'transactions_analyzed': sum(bucket.count for bucket in by_category.values()),
+                'start_date': min(window).isoformat() if window else None,
+                'end_date': max(window).isoformat() if window else None
+            },
+            'category_totals': {category: round(bucket.total, 2) for category, bucket in by_category.items()},
+            'monthly_totals': {
+                month: {category: round(bucket.total, 2) for category, bucket in buckets.items()}
+                for month, buckets in sorted(aggregates.months.items())
+            },
+            'spending_patterns': {
+                'daily': by_confidence(daily),
+                'weekly': by_confidence(weekly),
+                'monthly': by_confidence(monthly),
+                'merchant': by_confidence(merchant_patterns)[:20]
+            },
+            'anomalies': [a for a in aggregates.anomalies if a['date'] >= start.isoformat()]
+        }
+
+    def _period_patterns(self, pattern_type, periods, eligible, top_merchants, confidence) -> List[Dict[str, Any]]:
+        patterns = []
+        for category, buckets in periods.items():
+            if category not in eligible or len(buckets) < 2:
+                continue
+            totals = [bucket.total for bucket in buckets.values()]
+            mean_total = sum(totals) / len(totals)
+            std_total = math.sqrt(sum((t - mean_total) ** 2 for t in totals) / (len(totals) - 1))
+            cv = std_total / mean_total if mean_total > 0 else 1
+            patterns.append(self._pattern(
+                f"{pattern_type}_{category}", pattern_type, category,
+                sum(bucket.count for bucket in buckets.values()) / len(buckets), mean_total,
+                top_merchants.get(category, []), [pattern_type], confidence(cv),
+                f"{pattern_type.capitalize()} {category} spending pattern"
+            ))
+        return patterns
+
+    def _pattern(self, pattern_id, pattern_type, category, frequency, average_amount,
+                 merchants, times, confidence, description) -> Dict[str, Any]:
+        return {
+            'pattern_id': pattern_id,
+            'pattern_type': pattern_type,
+            'category': category,
+            'frequency': round(frequency, 4),
+            'average_amount': round(average_amount, 2),
+            'typical_merchants': merchants,
+            'typical_times': times,
+            'confidence': round(confidence, 4),
+            'description': description
+        }
+
+
+class SpendingAggregateStore:
+    """Load and save aggregates as one JSONB row per user"""
+
+    def __init__(self, aggregator: Optional[SpendingAggregator] = None):
+        self.aggregator = aggregator or SpendingAggregator()
+
+    async def load(self, db: AsyncSession, user_id: str, for_update: bool = False) -> SpendingAggregates:
+        query = select(SpendingAggregate.data).where(SpendingAggregate.user_id == uuid.UUID(str(user_id)))
+        if for_update:
+            query = query.with_for_update()
+        result = await db.execute(query)
+        return SpendingAggregates.from_dict(user_id, result.scalar_one_or_none())
+
+    async def save(self, db: AsyncSession, aggregates: SpendingAggregates):
+        now = datetime.now(timezone.utc)
+        stmt = insert(SpendingAggregate).values(
+            user_id=uuid.UUID(str(aggregates.user_id)), data=aggregates.to_dict(), created_at=now, updated_at=now
+        )
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[SpendingAggregate.user_id],
+            set_={'data': stmt.excluded.data, 'updated_at': now}
+        ))
+
+    async def apply(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        transactions: List[Transaction],
+        categories: Optional[List[Any]] = None,
+        removed: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fold synced transactions into the user's aggregates in the caller's
+        transaction, retract ``removed`` transaction ids, and return new
+        anomalies. The row is locked so syncs of a user's other items wait
+        rather than overwrite each other.
+        """
+        if not transactions and not removed:
+            return []
+        now = datetime.now(timezone.utc)
+        await db.execute(
+            insert(SpendingAggregate)
+            .values(user_id=uuid.UUID(str(user_id)), data={}, created_at=now, updated_at=now)
+            .on_conflict_do_nothing(index_elements=[SpendingAggregate.user_id])
+        )
+        aggregates = await self.load(db, user_id, for_update=True)
+        anomalies = self.aggregator.update(aggregates, transactions, categories, removed or ())
+        await self.save(db, aggregates)
+        return anomalies
@@ -24,6 +24,7 @@ from app.core.config import settings
 from app.core.exceptions import ValidationError
 from .plaid_service import Transaction
 from .transaction_categorizer import CategoryPrediction
+from .spending_aggregates import SpendingAggregator, SpendingAggregateStore
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +87,9 @@ class SpendingPatternDetector:
         self.min_transactions_for_pattern = 5
         self.isolation_forest = IsolationForest(contamination=0.1, random_state=42)
         self.scaler = StandardScaler()
+        self.aggregate_store = SpendingAggregateStore(
+            SpendingAggregator(self.anomaly_threshold, self.min_transactions_for_pattern)
+        )
     
     async def analyze_spending_patterns(
         self,
@@ -175,6 +179,105 @@ class SpendingPatternDetector:
             logger.error(f"Error analyzing spending patterns: {str(e)}")
             raise ValidationError("Failed to analyze spending patterns")
     
+    async def update_spending_aggregates(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        transactions: List[Transaction],
+        categorized_transactions: Optional[List[CategoryPrediction]] = None,
+        removed: Optional[List[str]] = None
+    ) -> List[SpendingAnomaly]:
+        """
+        Incremental mode: fold newly synced transactions into the user's
+        rolling aggregates and score only those transactions
+        
+        Args:
+            db: Database session (the caller commits)
+            user_id: User identifier
+            transactions: Newly synced (added or modified) transactions
+            categorized_transactions: Predictions aligned with transactions
+            removed: Ids of transactions the provider removed
+            
+        Returns:
+            Anomalies among the new transactions
+        """
+        anomalies = await self.aggregate_store.apply(
+            db, user_id, transactions, categorized_transactions, removed
+        )
+        return [self._anomaly_from_dict(anomaly) for anomaly in anomalies]
+    
+    async def get_incremental_analysis(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        lookback_days: int = 90
+    ) -> Dict[str, Any]:
+        """
+        Spending analysis read from the precomputed aggregates
+        
+        Args:
+            db: Database session
+            user_id: User identifier
+            lookback_days: Analysis period in days
+            
+        Returns:
+            Patterns, recent anomalies and risk in the shape of
+            analyze_spending_patterns
+        """
+        try:
+            aggregates = await self.aggregate_store.load(db, user_id)
+            summary = self.aggregate_store.aggregator.summarize(aggregates, lookback_days)
+            
+            patterns = {
+                pattern_type: [SpendingPattern(**pattern) for pattern in patterns]
+                for pattern_type, patterns in summary['spending_patterns'].items()
+            }
+            anomalies = defaultdict(list)
+            for anomaly in summary['anomalies']:
+                anomalies[anomaly['anomaly_type']].append(self._anomaly_from_dict(anomaly))
+            
+            risk_score = self._calculate_risk_score(
+                anomalies['amount'], anomalies['frequency'], anomalies['merchant'], anomalies['time']
+            )
+            
+            return {
+                'user_id': user_id,
+                'analysis_timestamp': datetime.utcnow().isoformat(),
+                'analysis_period': summary['analysis_period'],
+                'category_totals': summary['category_totals'],
+                'monthly_totals': summary['monthly_totals'],
+                'spending_patterns': summary['spending_patterns'],
+                'anomalies': {
+                    anomaly_type: [anomaly.__dict__ for anomaly in anomalies[anomaly_type]]
+                    for anomaly_type in ('amount', 'frequency', 'merchant', 'time')
+                },
+                'risk_assessment': {
+                    'overall_risk_score': risk_score,
+                    'risk_level': self._get_risk_level(risk_score),
+                    'total_anomalies': len(summary['anomalies'])
+                },
+                'recommendations': self._generate_pattern_recommendations(
+                    patterns['daily'], patterns['weekly'], []
+                )
+            }
+            
+        except Exception as e:
+            logger.error(f"Error reading spending aggregates: {str(e)}")
+            raise ValidationError("Failed to load spending analysis")
+    
+    def _anomaly_from_dict(self, anomaly: Dict[str, Any]) -> SpendingAnomaly:
+        """Build a SpendingAnomaly from a stored aggregate anomaly"""
+        return SpendingAnomaly(
+            transaction_id=anomaly['transaction_id'],
+            anomaly_type=anomaly['anomaly_type'],
+            severity=anomaly['severity'],
+            anomaly_score=anomaly['anomaly_score'],
+            expected_value=anomaly['expected_value'],
+            actual_value=anomaly['actual_value'],
+            reason=anomaly['reason'],
+            suggestions=[]
+        )
+    
     def _create_analysis_dataframe(
         self,
         transactions: List[Transaction],
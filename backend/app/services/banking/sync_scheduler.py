@@ -0,0 +1,256 @@
+"""
+Bank Transaction Sync Scheduler
+
+This module provides background transaction syncs for banking webhooks.
+Sync requests are queued per item and requests arriving within a short
+window are coalesced into one sync. Each item syncs at most once at a time,
+providers have a bounded number of concurrent syncs, and the changes since
+the stored cursor are written in bulk.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.banking_models import BankAccount, BankingCredential, BankTransaction
+from .plaid_service import Transaction, TransactionChanges
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COALESCE_SECONDS = 2.0
+DEFAULT_CONCURRENCY = 4
+WRITE_CHUNK = 1000
+
+SyncKey = Tuple[str, str]
+
+# Columns refreshed when a provider reports a transaction again
+UPSERT_COLUMNS = (
+    'amount', 'date', 'name', 'merchant_name', 'pending', 'category', 'subcategory',
+    'provider_categories', 'location_address', 'location_city', 'location_region',
+    'location_country', 'location_postal_code', 'location_lat', 'location_lon', 'updated_at'
+)
+
+
+@dataclass
+class SyncRequest:
+    """A queued sync for one provider item"""
+    provider: str
+    item_id: str
+    user_id: str
+    reason: str = "webhook"
+    requested_at: float = field(default_factory=time.monotonic)
+    coalesced: int = 0
+    attempts: int = 0
+
+    @property
+    def key(self) -> SyncKey:
+        return (self.provider, self.item_id)
+
+
+def _default_session_factory():
+    from app.core.infrastructure.database import db_manager
+    return db_manager.get_async_session()
+
+
+class BankSyncScheduler:
+    """
+    Per-item sync queue with coalescing and bounded provider concurrency.
+
+    A request waits ``coalesce_window`` seconds before it runs; requests for
+    the same item arriving meanwhile are merged into it. A request arriving
+    while its item is syncing queues one follow-up sync, so changes that
+    landed after the provider was read are not missed. Failed syncs are
+    retried with a linear backoff; since syncs are cursor based, a sync
+    lost on shutdown is caught up by the next one for the item.
+    """
+
+    def __init__(
+        self,
+        sync_item: Callable[[SyncRequest, AsyncSession], Awaitable[Dict[str, Any]]],
+        session_factory: Callable[[], Any] = _default_session_factory,
+        coalesce_window: float = DEFAULT_COALESCE_SECONDS,
+        concurrency: Optional[Dict[str, int]] = None,
+        max_attempts: int = 3,
+        retry_delay: float = 30.0
+    ):
+        self._sync_item = sync_item
+        self._session_factory = session_factory
+        self.coalesce_window = coalesce_window
+        self.concurrency = concurrency or {}
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._pending: Dict[SyncKey, SyncRequest] = {}
+        self._locks: Dict[SyncKey, asyncio.Lock] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, provider: str, item_id: str, user_id: str, reason: str = "webhook") -> bool:
+        """Queue a sync for an item; False when it was merged into a queued one"""
+        return self._schedule(SyncRequest(provider, item_id, user_id, reason), self.coalesce_window)
+
+    def _schedule(self, request: SyncRequest, delay: float) -> bool:
+        queued = self._pending.get(request.key)
+        if queued is not None:
+            queued.coalesced += 1 + request.coalesced
+            return False
+        self._pending[request.key] = request
+        task = asyncio.create_task(self._run(request.key, delay))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency.get(provider, DEFAULT_CONCURRENCY))
+            self._semaphores[provider] = semaphore
+        return semaphore
+
+    async def _run(self, key: SyncKey, delay: float):
+        await asyncio.sleep(delay)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Requests keep merging into this one until the item is free
+            request = self._pending.pop(key)
+            async with self._semaphore(request.provider):
+                await self._execute(request)
+        if key not in self._pending:
+            self._locks.pop(key, None)
+
+    async def _execute(self, request: SyncRequest):
+        request.attempts += 1
+        started = time.monotonic()
+        try:
+            async with self._session_factory() as db:
+                result = await self._sync_item(request, db)
+            logger.info(
+                f"Synced {request.provider} item {request.item_id} "
+                f"({request.coalesced} coalesced requests) in "
+                f"{time.monotonic() - started:.2f}s: {result}"
+            )
+        except Exception as e:
+            logger.error(f"Sync failed for {request.provider} item {request.item_id}: {str(e)}")
+            if request.attempts < self.max_attempts:
+                self._schedule(request, self.retry_delay * request.attempts)
+
+    async def drain(self):
+        """Wait until every queued sync, including retries, has finished"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+def _chunks(items: List[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BankTransactionWriter:
+    """Bulk writes of synced transactions and sync cursors"""
+
+    def __init__(self, chunk_size: int = WRITE_CHUNK):
+        self.chunk_size = chunk_size
+
+    async def load_cursor(self, db: AsyncSession, credential_id: str) -> Optional[str]:
+        result = await db.execute(
+            select(BankingCredential.sync_cursor).where(BankingCredential.credential_id == credential_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def write(
+        self,
+        db: AsyncSession,
+        credential_id: str,
+        changes: TransactionChanges
+    ) -> Dict[str, int]:
+        """
+        Upsert added and modified transactions, delete removed ones and store
+        the next cursor, all in the caller's transaction
+        """
+        result = await db.execute(
+            select(BankAccount.account_id, BankAccount.id)
+            .join(BankingCredential, BankAccount.credential_id == BankingCredential.id)
+            .where(BankingCredential.credential_id == credential_id)
+        )
+        accounts = dict(result.all())
+
+        rows: Dict[Tuple[Any, str], Dict[str, Any]] = {}
+        unknown_accounts = 0
+        for txn in changes.added + changes.modified:
+            account_pk = accounts.get(txn.account_id)
+            if account_pk is None:
+                unknown_accounts += 1
+                continue
+            # A transaction reported twice keeps its latest version
+            rows[(account_pk, txn.transaction_id)] = self._transaction_row(txn, account_pk)
+
+        for chunk in _chunks(list(rows.values()), self.chunk_size):
+            stmt = insert(BankTransaction).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                constraint='unique_account_transaction',
+                set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS}
+            )
+            await db.execute(stmt)
+
+        removed = 0
+        if changes.removed and accounts:
+            for chunk in _chunks(changes.removed, self.chunk_size):
+                deleted = await db.execute(
+                    delete(BankTransaction).where(
+                        BankTransaction.account_id.in_(list(accounts.values())),
+                        BankTransaction.transaction_id.in_(chunk)
+                    )
+                )
+                removed += deleted.rowcount or 0
+
+        await db.execute(
+            update(BankingCredential)
+            .where(BankingCredential.credential_id == credential_id)
+            .values(sync_cursor=changes.next_cursor, last_sync=datetime.now(timezone.utc))
+        )
+
+        if unknown_accounts:
+            logger.warning(
+                f"Skipped {unknown_accounts} transactions for accounts not linked to credential {credential_id}"
+            )
+
+        return {"upserted": len(rows), "removed": removed, "skipped": unknown_accounts}
+
+    def _transaction_row(self, txn: Transaction, account_pk: Any) -> Dict[str, Any]:
+        location = txn.location or {}
+        now = datetime.now(timezone.utc)
+        txn_date = txn.date if txn.date.tzinfo else txn.date.replace(tzinfo=timezone.utc)
+        return {
+            'id': uuid.uuid4(),
+            'account_id': account_pk,
+            'transaction_id': txn.transaction_id,
+            'amount': Decimal(str(txn.amount)),
+            'date': txn_date,
+            'name': (txn.name or 'Unknown')[:500],
+            'merchant_name': txn.merchant_name,
+            'pending': txn.pending,
+            'category': txn.category[0] if txn.category else None,
+            'subcategory': txn.subcategory,
+            'provider_categories': txn.category,
+            'location_address': location.get('address'),
+            'location_city': location.get('city'),
+            'location_region': location.get('region'),
+            'location_country': location.get('country'),
+            'location_postal_code': location.get('postal_code'),
+            'location_lat': location.get('lat'),
+            'location_lon': location.get('lon'),
+            'created_at': now,
+            'updated_at': now
+        }
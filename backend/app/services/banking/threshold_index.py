@@ -0,0 +1,308 @@
+"""
+Balance Threshold Index
+
+This module provides the indexed structures behind balance alert evaluation.
+Thresholds are kept as sorted per-account arrays so a balance change only
+touches the levels it actually crossed, projected balances are computed for
+a whole batch of accounts at once from their recurring transactions, and a
+debouncer keeps repeated crossings from re-notifying within a window.
+"""
+
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WILDCARD_ACCOUNT = "*"
+
+# Threshold kinds held by the index
+LEVEL = "level"            # alert when the balance falls below the value
+WITHDRAWAL = "withdrawal"  # alert when the balance drops by more than the value
+DEPOSIT = "deposit"        # alert when the balance rises by more than the value
+
+# Detected cadences: (nominal interval in days, tolerance in days)
+RECURRING_CADENCES = ((7, 1), (14, 2), (30, 3))
+MIN_RECURRING_OCCURRENCES = 3
+
+
+@dataclass
+class IndexedThreshold:
+    """A threshold value and the object it stands for"""
+    account_id: str
+    kind: str
+    value: float
+    payload: Any
+
+
+@dataclass
+class RecurringFlow:
+    """A recurring transaction expected to hit an account again"""
+    account_id: str
+    amount: float  # Provider convention: positive amounts leave the account
+    next_date: date
+    interval_days: int
+    description: str = ""
+
+
+class _SortedThresholds:
+    """Threshold values of one kind for one account, in ascending order"""
+
+    __slots__ = ("values", "payloads")
+
+    def __init__(self, entries: List[IndexedThreshold]):
+        entries = sorted(entries, key=lambda entry: entry.value)
+        self.values = np.array([entry.value for entry in entries], dtype=np.float64)
+        self.payloads = [entry.payload for entry in entries]
+
+    def between(self, low: float, high: float) -> List[Any]:
+        """Payloads with low < value <= high"""
+        start = np.searchsorted(self.values, low, side="right")
+        stop = np.searchsorted(self.values, high, side="right")
+        return self.payloads[start:stop]
+
+    def below(self, bound: float) -> List[Any]:
+        """Payloads with value < bound"""
+        return self.payloads[:np.searchsorted(self.values, bound, side="left")]
+
+
+class ThresholdIndex:
+    """
+    Sorted threshold arrays keyed by account.
+
+    Each account has one ascending array per threshold kind, plus the
+    wildcard arrays shared by every account. Lookups are binary searches,
+    so evaluating a balance change costs O(log k) plus the number of
+    thresholds actually crossed, regardless of how many rules exist.
+    """
+
+    def __init__(self, entries: Iterable[IndexedThreshold] = ()):
+        grouped: Dict[Tuple[str, str], List[IndexedThreshold]] = defaultdict(list)
+        for entry in entries:
+            grouped[(entry.account_id, entry.kind)].append(entry)
+
+        self._arrays: Dict[Tuple[str, str], _SortedThresholds] = {
+            key: _SortedThresholds(group) for key, group in grouped.items()
+        }
+        self.size = sum(len(group) for group in grouped.values())
+
+    def _arrays_for(self, account_id: str, kind: str) -> List[_SortedThresholds]:
+        arrays = []
+        for key in ((account_id, kind), (WILDCARD_ACCOUNT, kind)):
+            if key in self._arrays:
+                arrays.append(self._arrays[key])
+        return arrays
+
+    def levels_between(self, account_id: str, low: float, high: float) -> List[Any]:
+        """
+        Level thresholds crossed when a balance moves from high down to low
+
+        Args:
+            account_id: Account identifier
+            low: Lower balance (exclusive)
+            high: Higher balance (inclusive)
+
+        Returns:
+            Payloads of levels in (low, high], lowest level first
+        """
+        if low >= high:
+            return []
+        found = []
+        for array in self._arrays_for(account_id, LEVEL):
+            found.extend(array.between(low, high))
+        return found
+
+    def crossed_levels(self, account_id: str, current: float, previous: Optional[float] = None) -> List[Any]:
+        """
+        Level thresholds newly breached by the current balance
+
+        Args:
+            account_id: Account identifier
+            current: Current balance
+            previous: Last evaluated balance, or None if the account is new
+
+        Returns:
+            Payloads of levels the balance fell below since the previous balance
+        """
+        return self.levels_between(account_id, current, np.inf if previous is None else previous)
+
+    def exceeded_changes(self, account_id: str, change: float) -> List[Any]:
+        """
+        Withdrawal or deposit thresholds exceeded by a balance change
+
+        Args:
+            account_id: Account identifier
+            change: Current balance minus previous balance
+
+        Returns:
+            Payloads of exceeded thresholds
+        """
+        if change == 0:
+            return []
+        kind, magnitude = (WITHDRAWAL, -change) if change < 0 else (DEPOSIT, change)
+        found = []
+        for array in self._arrays_for(account_id, kind):
+            found.extend(array.below(magnitude))
+        return found
+
+    def has_levels(self, account_id: str) -> bool:
+        """Whether any level threshold applies to the account"""
+        return bool(self._arrays_for(account_id, LEVEL))
+
+
+def detect_recurring_flows(
+    rows: Iterable[Tuple[str, str, float, date]],
+    as_of: date
+) -> List[RecurringFlow]:
+    """
+    Detect recurring transactions from posted history
+
+    Transactions are grouped by account, payee and rounded amount. A group
+    is recurring when it has enough occurrences and its median gap matches
+    a weekly, biweekly or monthly cadence.
+
+    Args:
+        rows: (account_id, payee, amount, date) tuples
+        as_of: Date the forecast starts from
+
+    Returns:
+        Recurring flows with their next expected date
+    """
+    groups: Dict[Tuple[str, str, int], List[Tuple[date, float]]] = defaultdict(list)
+    for account_id, payee, amount, when in rows:
+        if not payee or not amount:
+            continue
+        groups[(account_id, payee.strip().lower(), int(round(amount)))].append((when, amount))
+
+    flows = []
+    for (account_id, payee, _), occurrences in groups.items():
+        if len(occurrences) < MIN_RECURRING_OCCURRENCES:
+            continue
+        occurrences.sort()
+        ordinals = np.array([when.toordinal() for when, _ in occurrences])
+        gaps = np.diff(ordinals)
+        gaps = gaps[gaps > 0]
+        if not len(gaps):
+            continue
+        median_gap = float(np.median(gaps))
+        for interval, tolerance in RECURRING_CADENCES:
+            if abs(median_gap - interval) <= tolerance:
+                break
+        else:
+            continue
+
+        interval = int(round(median_gap))
+        next_ordinal = ordinals[-1] + interval
+        if next_ordinal < as_of.toordinal():
+            # Missed more than one cycle, so treat the series as lapsed
+            if as_of.toordinal() - ordinals[-1] > 2 * interval:
+                continue
+            next_ordinal += interval
+        flows.append(RecurringFlow(
+            account_id=account_id,
+            amount=float(np.median([amount for _, amount in occurrences])),
+            next_date=date.fromordinal(int(next_ordinal)),
+            interval_days=interval,
+            description=payee
+        ))
+    return flows
+
+
+def project_balances(
+    account_ids: Sequence[str],
+    balances: Sequence[float],
+    flows: Sequence[RecurringFlow],
+    as_of: date,
+    horizon_days: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Project daily balances for a batch of accounts
+
+    Every occurrence of every flow inside the horizon is expanded at once,
+    scattered into an accounts by days matrix of balance deltas and summed
+    cumulatively along the days.
+
+    Args:
+        account_ids: Accounts to project
+        balances: Current balance per account
+        flows: Recurring flows; flows for other accounts are ignored
+        as_of: First projected day
+        horizon_days: Number of days to project
+
+    Returns:
+        (minimum projected balance, day offset of that minimum) per account
+    """
+    current = np.asarray(balances, dtype=np.float64)
+    position = {account_id: i for i, account_id in enumerate(account_ids)}
+    flows = [flow for flow in flows if flow.account_id in position and flow.interval_days > 0]
+    if not flows or horizon_days <= 0:
+        return current.copy(), np.zeros(len(current), dtype=np.int64)
+
+    rows = np.array([position[flow.account_id] for flow in flows], dtype=np.int64)
+    amounts = np.array([flow.amount for flow in flows], dtype=np.float64)
+    intervals = np.array([flow.interval_days for flow in flows], dtype=np.int64)
+    offsets = np.array([(flow.next_date - as_of).days for flow in flows], dtype=np.int64)
+
+    # Roll overdue flows forward to their first occurrence on or after as_of
+    overdue = offsets < 0
+    offsets[overdue] += -(offsets[overdue] // intervals[overdue]) * intervals[overdue]
+
+    counts = np.where(offsets < horizon_days, (horizon_days - 1 - offsets) // intervals + 1, 0)
+    flow_of = np.repeat(np.arange(len(flows)), counts)
+    nth = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    days = offsets[flow_of] + nth * intervals[flow_of]
+
+    deltas = np.zeros((len(current), horizon_days), dtype=np.float64)
+    np.add.at(deltas, (rows[flow_of], days), -amounts[flow_of])
+    projected = current[:, None] + np.cumsum(deltas, axis=1)
+
+    lowest_day = projected.argmin(axis=1)
+    lowest = np.minimum(projected[np.arange(len(current)), lowest_day], current)
+    return lowest, lowest_day
+
+
+class AlertDebouncer:
+    """
+    Suppresses repeat notifications for the same alert key.
+
+    A key that fired within the window is held back, so a balance hovering
+    around a threshold notifies once instead of on every sync. Keys are kept
+    in insertion order and the oldest are evicted beyond max_keys.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._clock = clock
+        self._fired: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def allow(self, key: Hashable) -> bool:
+        """
+        Record an alert key and decide whether to notify
+
+        Args:
+            key: Alert identity, e.g. (account, alert type, threshold)
+
+        Returns:
+            True if the key has not fired within the window
+        """
+        now = self._clock()
+        fired_at = self._fired.get(key)
+        if fired_at is not None and now - fired_at < self.window_seconds:
+            return False
+
+        self._fired[key] = now
+        self._fired.move_to_end(key)
+        while len(self._fired) > self.max_keys:
+            self._fired.popitem(last=False)
+        return True
@@ -28,9 +28,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.core.exceptions import ValidationError
 from .plaid_service import Transaction
+from .merchant_matcher import PatternMatcher
 
 logger = logging.getLogger(__name__)
 
+# Precompiled text cleaning patterns
+LONG_NUMBER_PATTERN = re.compile(r'\b\d{4,}\b')
+REFERENCE_NUMBER_PATTERN = re.compile(r'#\d+')
+ASTERISK_PATTERN = re.compile(r'\*+')
+
 
 @dataclass
 class CategoryPrediction:
@@ -118,12 +124,26 @@ class TransactionCategorizer:
         }
     }
     
+    # Rule keywords matched against the transaction description
+    INCOME_KEYWORDS = ['payroll', 'salary', 'deposit', 'refund', 'interest']
+    TRANSFER_KEYWORDS = ['transfer', 'payment', 'ach', 'wire']
+    FEE_KEYWORDS = ['atm', 'fee']
+    RECURRING_KEYWORDS = [
+        'autopay', 'automatic', 'recurring', 'subscription',
+        'monthly', 'annual', 'yearly', 'payment'
+    ]
+    
+    # Compiled custom rule sets kept per categorizer
+    MAX_CUSTOM_MATCHERS = 256
+    
     def __init__(self):
         self.models = {}
         self.vectorizers = {}
         self.confidence_threshold = settings.TRANSACTION_CATEGORIZATION_CONFIDENCE_THRESHOLD
+        self._custom_matchers: Dict[str, Tuple[PatternMatcher, List[CategoryPrediction]]] = {}
         self._setup_models()
         self._load_merchant_database()
+        self._build_matchers()
     
     def _setup_models(self):
         """Initialize ML models for categorization"""
@@ -196,6 +216,45 @@ class TransactionCategorizer:
             'walgreens': ('healthcare', 'pharmacy')
         }
     
+    def _build_matchers(self):
+        """
+        Compile merchant names, category keywords and rule keywords into
+        multi-pattern matchers. Call again after changing merchant_mappings.
+        """
+        # Merchant names, in mapping order so the first listed merchant wins
+        self._merchant_patterns = list(self.merchant_mappings)
+        self._merchant_matcher = PatternMatcher(self._merchant_patterns)
+        self._fuzzy_patterns = [pattern for pattern in self._merchant_patterns if len(pattern) > 3]
+        self._fuzzy_matcher = PatternMatcher(pattern[:4] for pattern in self._fuzzy_patterns)
+        
+        # Category keywords with a (keyword x category) weight matrix
+        self._category_ids = list(self.STANDARD_CATEGORIES)
+        keywords = list(dict.fromkeys(
+            keyword for info in self.STANDARD_CATEGORIES.values() for keyword in info['keywords']
+        ))
+        self._keyword_matcher = PatternMatcher(keywords)
+        self._keyword_weights = np.zeros((len(keywords), len(self._category_ids)))
+        for column, info in enumerate(self.STANDARD_CATEGORIES.values()):
+            for keyword in info['keywords']:
+                self._keyword_weights[keywords.index(keyword), column] += 1.0 / len(info['keywords'])
+        
+        # Rule keywords, tagged with the rule they belong to
+        rule_keywords = (
+            [(keyword, 'income') for keyword in self.INCOME_KEYWORDS] +
+            [(keyword, 'transfer') for keyword in self.TRANSFER_KEYWORDS] +
+            [(keyword, 'fee') for keyword in self.FEE_KEYWORDS] +
+            [(keyword, 'recurring') for keyword in self.RECURRING_KEYWORDS]
+        )
+        self._rule_matcher = PatternMatcher(keyword for keyword, _ in rule_keywords)
+        self._rule_tags = [tag for _, tag in rule_keywords]
+        self._payroll_rule_id = self.INCOME_KEYWORDS.index('payroll')
+    
+    def _rule_hits(self, description: str) -> Dict[str, Any]:
+        """Rule tags (and whether 'payroll' matched) for a cleaned description."""
+        found = self._rule_matcher.find(description)
+        hits = {self._rule_tags[rule_id] for rule_id in found}
+        return {'tags': hits, 'payroll': self._payroll_rule_id in found}
+    
     def _extract_features(self, transaction: Transaction) -> TransactionFeatures:
         """Extract features from transaction for ML classification"""
         try:
@@ -252,14 +311,12 @@ class TransactionCategorizer:
         text = text.lower()
         
         # Remove common transaction codes and numbers
-        text = re.sub(r'\b\d{4,}\b', '', text)  # Remove long numbers
-        text = re.sub(r'#\d+', '', text)  # Remove reference numbers
-        text = re.sub(r'\*+', '', text)  # Remove asterisks
+        text = LONG_NUMBER_PATTERN.sub('', text)  # Remove long numbers
+        text = REFERENCE_NUMBER_PATTERN.sub('', text)  # Remove reference numbers
+        text = ASTERISK_PATTERN.sub('', text)  # Remove asterisks
         
         # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        return text.strip()
+        return ' '.join(text.split())
     
     def _get_amount_bucket(self, amount: float) -> str:
         """Categorize transaction amount into buckets"""
@@ -276,13 +333,7 @@ class TransactionCategorizer:
     
     def _detect_recurring_pattern(self, description: str, amount: float) -> bool:
         """Simple recurring transaction detection"""
-        recurring_keywords = [
-            'autopay', 'automatic', 'recurring', 'subscription',
-            'monthly', 'annual', 'yearly', 'payment'
-        ]
-        
-        description_lower = description.lower()
-        return any(keyword in description_lower for keyword in recurring_keywords)
+        return 'recurring' in self._rule_hits(description.lower())['tags']
     
     def _extract_location_type(self, location: Dict[str, Any]) -> Optional[str]:
         """Extract location type from transaction location data"""
@@ -318,40 +369,58 @@ class TransactionCategorizer:
             Category prediction with confidence score
         """
         try:
-            # Extract features
             features = self._extract_features(transaction)
+            return self._categorize_features([features], custom_rules)[0]
             
+        except Exception as e:
+            logger.error(f"Error categorizing transaction: {str(e)}")
+            return CategoryPrediction(
+                category='other',
+                subcategory='uncategorized',
+                confidence=0.0,
+                reasoning=f'Error during categorization: {str(e)}'
+            )
+    
+    def _categorize_features(
+        self,
+        features_list: List[TransactionFeatures],
+        custom_rules: Optional[Dict[str, Any]] = None
+    ) -> List[CategoryPrediction]:
+        """
+        Categorize extracted features: rules, then merchant mapping, then
+        keyword classification, each accepted above the confidence threshold.
+        Keyword scores for all transactions are computed in one pass.
+        """
+        ml_results = self._classify_with_ml_batch(features_list)
+        predictions = []
+        
+        for features, ml_result in zip(features_list, ml_results):
             # Try rule-based classification first
             rule_result = self._apply_rules(features, custom_rules)
             if rule_result and rule_result.confidence >= self.confidence_threshold:
-                return rule_result
+                predictions.append(rule_result)
+                continue
             
             # Try merchant mapping
             merchant_result = self._classify_by_merchant(features)
             if merchant_result and merchant_result.confidence >= self.confidence_threshold:
-                return merchant_result
+                predictions.append(merchant_result)
+                continue
             
             # Try ML classification
-            ml_result = self._classify_with_ml(features)
             if ml_result and ml_result.confidence >= self.confidence_threshold:
-                return ml_result
+                predictions.append(ml_result)
+                continue
             
             # Fallback to rule-based or default
-            return rule_result or CategoryPrediction(
+            predictions.append(rule_result or CategoryPrediction(
                 category='other',
                 subcategory='uncategorized',
                 confidence=0.1,
                 reasoning='No confident classification found'
-            )
-            
-        except Exception as e:
-            logger.error(f"Error categorizing transaction: {str(e)}")
-            return CategoryPrediction(
-                category='other',
-                subcategory='uncategorized',
-                confidence=0.0,
-                reasoning=f'Error during categorization: {str(e)}'
-            )
+            ))
+        
+        return predictions
     
     def _apply_rules(
         self,
@@ -360,23 +429,20 @@ class TransactionCategorizer:
     ) -> Optional[CategoryPrediction]:
         """Apply rule-based classification"""
         try:
-            description = features.description.lower()
-            merchant = features.merchant_name.lower() if features.merchant_name else ''
+            hits = self._rule_hits(features.description.lower())
             
             # Income detection
             if features.amount < 0:  # Negative amounts are typically income
-                income_keywords = ['payroll', 'salary', 'deposit', 'refund', 'interest']
-                if any(keyword in description for keyword in income_keywords):
+                if 'income' in hits['tags']:
                     return CategoryPrediction(
                         category='income',
-                        subcategory='salary' if 'payroll' in description else 'other',
+                        subcategory='salary' if hits['payroll'] else 'other',
                         confidence=0.9,
                         reasoning='Rule-based: Income keywords detected'
                     )
             
             # Transfer detection
-            transfer_keywords = ['transfer', 'payment', 'ach', 'wire']
-            if any(keyword in description for keyword in transfer_keywords):
+            if 'transfer' in hits['tags']:
                 return CategoryPrediction(
                     category='financial',
                     subcategory='transfers',
@@ -385,7 +451,7 @@ class TransactionCategorizer:
                 )
             
             # ATM and bank fees
-            if 'atm' in description or 'fee' in description:
+            if 'fee' in hits['tags']:
                 return CategoryPrediction(
                     category='financial',
                     subcategory='bank_fees',
@@ -414,25 +480,28 @@ class TransactionCategorizer:
             merchant_lower = features.merchant_name.lower()
             
             # Direct merchant lookup
-            for merchant_pattern, (category, subcategory) in self.merchant_mappings.items():
-                if merchant_pattern in merchant_lower:
-                    return CategoryPrediction(
-                        category=category,
-                        subcategory=subcategory,
-                        confidence=0.95,
-                        reasoning=f'Merchant mapping: {merchant_pattern}'
-                    )
+            pattern_id = self._merchant_matcher.first(merchant_lower)
+            if pattern_id is not None:
+                merchant_pattern = self._merchant_patterns[pattern_id]
+                category, subcategory = self.merchant_mappings[merchant_pattern]
+                return CategoryPrediction(
+                    category=category,
+                    subcategory=subcategory,
+                    confidence=0.95,
+                    reasoning=f'Merchant mapping: {merchant_pattern}'
+                )
             
-            # Fuzzy merchant matching
-            for merchant_pattern, (category, subcategory) in self.merchant_mappings.items():
-                # Simple similarity check
-                if len(merchant_pattern) > 3 and merchant_pattern[:4] in merchant_lower:
-                    return CategoryPrediction(
-                        category=category,
-                        subcategory=subcategory,
-                        confidence=0.75,
-                        reasoning=f'Fuzzy merchant matching: {merchant_pattern}'
-                    )
+            # Fuzzy merchant matching on the first four characters
+            pattern_id = self._fuzzy_matcher.first(merchant_lower)
+            if pattern_id is not None:
+                merchant_pattern = self._fuzzy_patterns[pattern_id]
+                category, subcategory = self.merchant_mappings[merchant_pattern]
+                return CategoryPrediction(
+                    category=category,
+                    subcategory=subcategory,
+                    confidence=0.75,
+                    reasoning=f'Fuzzy merchant matching: {merchant_pattern}'
+                )
             
             return None
             
@@ -442,73 +511,113 @@ class TransactionCategorizer:
     
     def _classify_with_ml(self, features: TransactionFeatures) -> Optional[CategoryPrediction]:
         """Classify using machine learning models"""
+        return self._classify_with_ml_batch([features])[0]
+    
+    def _classify_with_ml_batch(
+        self,
+        features_list: List[TransactionFeatures]
+    ) -> List[Optional[CategoryPrediction]]:
+        """Keyword and amount scores for many transactions as one matrix"""
         try:
             # This would use pre-trained models in practice
             # For now, implement keyword-based classification
-            
-            description = features.description.lower()
-            merchant = features.merchant_name.lower() if features.merchant_name else ''
-            text_input = f"{description} {merchant}".strip()
+            if not features_list:
+                return []
+            
+            # Histories repeat the same merchants, so each distinct text is matched once
+            keyword_hits = np.zeros((len(features_list), len(self._keyword_matcher)))
+            matches: Dict[str, List[int]] = {}
+            for row, features in enumerate(features_list):
+                merchant = features.merchant_name.lower() if features.merchant_name else ''
+                text_input = f"{features.description.lower()} {merchant}".strip()
+                if text_input not in matches:
+                    matches[text_input] = list(self._keyword_matcher.find(text_input))
+                keyword_hits[row, matches[text_input]] = 1.0
             
             # Score against each category
-            category_scores = {}
+            scores = keyword_hits @ self._keyword_weights
             
-            for category_id, category_info in self.STANDARD_CATEGORIES.items():
-                score = 0.0
-                keywords = category_info['keywords']
-                
-                # Keyword matching
-                for keyword in keywords:
-                    if keyword in text_input:
-                        score += 1.0 / len(keywords)
-                
-                # Amount-based scoring
-                if category_id == 'food_dining' and 5 <= abs(features.amount) <= 100:
-                    score += 0.2
-                elif category_id == 'transportation' and 10 <= abs(features.amount) <= 200:
-                    score += 0.2
-                elif category_id == 'bills_utilities' and features.is_recurring:
-                    score += 0.3
-                
-                category_scores[category_id] = score
+            # Amount-based scoring
+            amounts = np.abs(np.array([features.amount for features in features_list], dtype=float))
+            recurring = np.array([features.is_recurring for features in features_list], dtype=bool)
+            scores[:, self._category_ids.index('food_dining')] += 0.2 * ((amounts >= 5) & (amounts <= 100))
+            scores[:, self._category_ids.index('transportation')] += 0.2 * ((amounts >= 10) & (amounts <= 200))
+            scores[:, self._category_ids.index('bills_utilities')] += 0.3 * recurring
             
             # Get best category
-            if category_scores:
-                best_category = max(category_scores, key=category_scores.get)
-                best_score = category_scores[best_category]
-                
-                if best_score > 0.3:  # Minimum confidence threshold
-                    subcategories = self.STANDARD_CATEGORIES[best_category]['subcategories']
-                    best_subcategory = subcategories[0] if subcategories else None
-                    
-                    return CategoryPrediction(
-                        category=best_category,
-                        subcategory=best_subcategory,
-                        confidence=min(best_score, 0.9),
-                        reasoning=f'ML classification: keyword matching'
-                    )
-            
-            return None
+            best_columns = np.argmax(scores, axis=1)
+            best_scores = scores[np.arange(len(features_list)), best_columns]
+            
+            results: List[Optional[CategoryPrediction]] = []
+            for best_column, best_score in zip(best_columns, best_scores):
+                if best_score <= 0.3:  # Minimum confidence threshold
+                    results.append(None)
+                    continue
+                best_category = self._category_ids[best_column]
+                subcategories = self.STANDARD_CATEGORIES[best_category]['subcategories']
+                results.append(CategoryPrediction(
+                    category=best_category,
+                    subcategory=subcategories[0] if subcategories else None,
+                    confidence=min(float(best_score), 0.9),
+                    reasoning='ML classification: keyword matching'
+                ))
+            return results
             
         except Exception as e:
             logger.warning(f"Error in ML classification: {str(e)}")
-            return None
+            return [None] * len(features_list)
     
     def _apply_custom_rules(
         self,
         features: TransactionFeatures,
         custom_rules: Dict[str, Any]
     ) -> Optional[CategoryPrediction]:
-        """Apply user-defined custom categorization rules"""
+        """
+        Apply user-defined custom categorization rules
+        
+        ``custom_rules`` maps a text pattern to a category id, or to a dict
+        with ``category`` and optional ``subcategory`` and ``confidence``.
+        Patterns match case-insensitively anywhere in the description or
+        merchant name; the first listed rule that matches wins.
+        """
         try:
-            # Implementation for custom rules
-            # This would allow users to define their own categorization logic
-            return None
+            matcher, predictions = self._compile_custom_rules(custom_rules)
+            merchant = features.merchant_name.lower() if features.merchant_name else ''
+            found = matcher.find(features.description.lower()) | matcher.find(merchant)
+            return predictions[min(found)] if found else None
             
         except Exception as e:
             logger.warning(f"Error applying custom rules: {str(e)}")
             return None
     
+    def _compile_custom_rules(
+        self,
+        custom_rules: Dict[str, Any]
+    ) -> Tuple[PatternMatcher, List[CategoryPrediction]]:
+        """Matcher and predictions for a rule set, compiled once per distinct rule set"""
+        key = json.dumps(custom_rules, sort_keys=True, default=str)
+        compiled = self._custom_matchers.get(key)
+        if compiled is not None:
+            return compiled
+        
+        patterns = []
+        predictions = []
+        for pattern, rule in custom_rules.items():
+            rule = rule if isinstance(rule, dict) else {'category': rule}
+            patterns.append(str(pattern).lower())
+            predictions.append(CategoryPrediction(
+                category=rule['category'],
+                subcategory=rule.get('subcategory'),
+                confidence=float(rule.get('confidence', 0.9)),
+                reasoning=f'Custom rule: {pattern}'
+            ))
+        
+        compiled = (PatternMatcher(patterns), predictions)
+        if len(self._custom_matchers) >= self.MAX_CUSTOM_MATCHERS:
+            self._custom_matchers.pop(next(iter(self._custom_matchers)))
+        self._custom_matchers[key] = compiled
+        return compiled
+    
     async def categorize_transactions_batch(
         self,
         transactions: List[Transaction],
@@ -527,13 +636,8 @@ class TransactionCategorizer:
             List of category predictions
         """
         try:
-            predictions = []
-            
-            for transaction in transactions:
-                prediction = await self.categorize_transaction(
-                    transaction, user_id, custom_rules
-                )
-                predictions.append(prediction)
+            features_list = [self._extract_features(transaction) for transaction in transactions]
+            predictions = self._categorize_features(features_list, custom_rules)
             
             logger.info(f"Categorized {len(transactions)} transactions")
             return predictions
@@ -0,0 +1,174 @@
+"""
+Webhook Deduplication Store
+
+This module provides bounded duplicate detection for provider webhooks:
+a process-local store with O(1) amortized insert and expiry, and a Redis
+store (SET NX with TTL) shared by all workers that pipelines the claims
+of a burst into a single round trip.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 500_000
+
+
+class InMemoryWebhookDeduplicator:
+    """
+    Process-local deduplication with a fixed TTL.
+
+    With a single TTL, insertion order is also expiry order, so expired
+    keys are always at the front of the ordered dict and eviction pops
+    from the front only. The number of keys is capped at ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def _evict(self, now: float):
+        expiry = self._expiry
+        while expiry:
+            _, expires_at = next(iter(expiry.items()))
+            if expires_at > now and len(expiry) < self.max_entries:
+                break
+            expiry.popitem(last=False)
+
+    def claim_now(self, key: str) -> bool:
+        """Record ``key``; True when it was not seen within the TTL"""
+        now = self._clock()
+        self._evict(now)
+        if key in self._expiry:
+            return False
+        self._expiry[key] = now + self.ttl_seconds
+        return True
+
+    async def claim(self, key: str) -> bool:
+        return self.claim_now(key)
+
+    async def claim_many(self, keys: Iterable[str]) -> List[bool]:
+        """Claim a burst of keys; repeats within the burst count as duplicates"""
+        return [self.claim_now(key) for key in keys]
+
+
+class RedisWebhookDeduplicator:
+    """
+    Deduplication shared across workers through Redis ``SET NX EX``.
+
+    Concurrent ``claim`` calls are collected for up to ``batch_window``
+    seconds (or ``max_batch`` keys) and sent as one pipeline. If Redis is
+    unavailable, claims fall back to a process-local store so webhooks
+    keep flowing with per-worker deduplication.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        key_prefix: str = "webhook:seen:",
+        batch_window: float = 0.002,
+        max_batch: int = 1000
+    ):
+        self.redis = redis_client
+        self.ttl_seconds = int(ttl_seconds)
+        self.key_prefix = key_prefix
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.fallback = InMemoryWebhookDeduplicator(ttl_seconds=ttl_seconds)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushes = set()
+
+    async def claim(self, key: str) -> bool:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((key, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def claim_many(self, keys: Iterable[str]) -> List[bool]:
+        """Claim a burst of keys in one pipeline; repeats within the burst count as duplicates"""
+        keys = list(keys)
+        first = {}
+        for index, key in enumerate(keys):
+            first.setdefault(key, index)
+        unique = list(first)
+        claimed = dict(zip(unique, await self._set_nx(unique)))
+        return [claimed[key] and first[key] == index for index, key in enumerate(keys)]
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_window)
+        self._flush_task = None
+        await self._flush(self._take_pending())
+
+    def _flush_now(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        task = asyncio.create_task(self._flush(self._take_pending()))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    def _take_pending(self) -> List[Tuple[str, asyncio.Future]]:
+        pending, self._pending = self._pending, []
+        return pending
+
+    async def _flush(self, pending: List[Tuple[str, asyncio.Future]]):
+        if not pending:
+            return
+        try:
+            results = await self.claim_many([key for key, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _set_nx(self, keys: List[str]) -> List[bool]:
+        if not keys:
+            return []
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.set(self.key_prefix + key, 1, nx=True, ex=self.ttl_seconds)
+            return [bool(result) for result in await pipe.execute()]
+        except Exception as e:
+            logger.warning(f"Redis webhook deduplication unavailable, using local store: {str(e)}")
+            return await self.fallback.claim_many(keys)
+
+
+def create_webhook_deduplicator(
+    backend: str = "memory",
+    redis_url: Optional[str] = None,
+    ttl_seconds: int = DEFAULT_TTL_SECONDS
+):
+    """Build the configured deduplicator; Redis needs the optional redis package"""
+    if backend == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning("redis package not installed, using in-memory webhook deduplication")
+        else:
+            return RedisWebhookDeduplicator(redis.from_url(redis_url), ttl_seconds=ttl_seconds)
+    return InMemoryWebhookDeduplicator(ttl_seconds=ttl_seconds)
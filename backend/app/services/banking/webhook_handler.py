@@ -23,6 +23,10 @@ from .credential_vault import credential_vault
 from .balance_monitor import balance_monitor, AlertType, AlertSeverity, BalanceAlert
 from .plaid_service import PlaidService
 from .yodlee_service import YodleeService
+from .webhook_dedup import create_webhook_deduplicator
+from .sync_scheduler import BankSyncScheduler, BankTransactionWriter, SyncRequest
+from .spending_pattern_detector import spending_pattern_detector
+from .transaction_categorizer import transaction_categorizer
 
 logger = logging.getLogger(__name__)
 
@@ -56,10 +60,31 @@ class BankingWebhookHandler:
     - Secure credential management
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        deduplicator: Optional[Any] = None,
+        sync_scheduler: Optional[BankSyncScheduler] = None
+    ):
         self.plaid_service = PlaidService()
         self.yodlee_service = YodleeService()
-        self._processed_events: Dict[str, datetime] = {}
+        self._deduplicator = deduplicator or create_webhook_deduplicator(
+            backend=settings.webhook_dedup_backend,
+            redis_url=settings.redis_url,
+            ttl_seconds=settings.webhook_dedup_ttl_seconds
+        )
+        self.transaction_writer = BankTransactionWriter()
+        self.sync_scheduler = sync_scheduler or BankSyncScheduler(
+            self._run_transaction_sync,
+            coalesce_window=settings.bank_sync_coalesce_seconds,
+            concurrency={
+                'plaid': settings.bank_sync_plaid_concurrency,
+                'yodlee': settings.bank_sync_yodlee_concurrency
+            }
+        )
+        self._sync_services = {
+            'plaid': (self.plaid_service, self._get_credential_id_for_item),
+            'yodlee': (self.yodlee_service, self._get_credential_id_for_provider_account)
+        }
         self._event_processors = {
             'plaid': self._process_plaid_webhook,
             'yodlee': self._process_yodlee_webhook
@@ -93,7 +118,7 @@ class BankingWebhookHandler:
             
             # Create webhook event
             event = WebhookEvent(
-                event_id=webhook_data.get('webhook_id', f"plaid_{int(datetime.utcnow().timestamp())}"),
+                event_id=webhook_data.get('webhook_id') or self._fallback_event_id('plaid', body),
                 provider='plaid',
                 event_type=webhook_data.get('webhook_type', 'unknown'),
                 event_data=webhook_data,
@@ -104,7 +129,7 @@ class BankingWebhookHandler:
             )
             
             # Check for duplicate events
-            if self._is_duplicate_event(event):
+            if await self._is_duplicate_event(event):
                 logger.info(f"Skipping duplicate Plaid webhook event: {event.event_id}")
                 return {"status": "duplicate", "event_id": event.event_id}
             
@@ -146,7 +171,7 @@ class BankingWebhookHandler:
             
             # Create webhook event
             event = WebhookEvent(
-                event_id=webhook_data.get('id', f"yodlee_{int(datetime.utcnow().timestamp())}"),
+                event_id=webhook_data.get('id') or self._fallback_event_id('yodlee', body),
                 provider='yodlee',
                 event_type=webhook_data.get('event', 'unknown'),
                 event_data=webhook_data,
@@ -157,7 +182,7 @@ class BankingWebhookHandler:
             )
             
             # Check for duplicate events
-            if self._is_duplicate_event(event):
+            if await self._is_duplicate_event(event):
                 logger.info(f"Skipping duplicate Yodlee webhook event: {event.event_id}")
                 return {"status": "duplicate", "event_id": event.event_id}
             
@@ -211,28 +236,16 @@ class BankingWebhookHandler:
             logger.error(f"Error verifying Yodlee signature: {str(e)}")
             return False
     
-    def _is_duplicate_event(self, event: WebhookEvent) -> bool:
-        """Check if this is a duplicate event"""
+    def _fallback_event_id(self, provider: str, body: bytes) -> str:
+        """Event id for payloads without one: identical bodies within a second collapse"""
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        return f"{provider}_{int(datetime.utcnow().timestamp())}_{digest}"
+    
+    async def _is_duplicate_event(self, event: WebhookEvent) -> bool:
+        """Check if this event was already seen within the deduplication TTL"""
         try:
             event_key = f"{event.provider}_{event.event_id}"
-            
-            if event_key in self._processed_events:
-                # Check if the event was processed recently (within 1 hour)
-                processed_time = self._processed_events[event_key]
-                if (datetime.utcnow() - processed_time).total_seconds() < 3600:
-                    return True
-            
-            # Mark event as processed
-            self._processed_events[event_key] = datetime.utcnow()
-            
-            # Clean up old events (older than 24 hours)
-            cutoff_time = datetime.utcnow() - timedelta(hours=24)
-            self._processed_events = {
-                k: v for k, v in self._processed_events.items() 
-                if v > cutoff_time
-            }
-            
-            return False
+            return not await self._deduplicator.claim(event_key)
             
         except Exception as e:
             logger.error(f"Error checking duplicate event: {str(e)}")
@@ -412,33 +425,55 @@ class BankingWebhookHandler:
         event: WebhookEvent,
         db: AsyncSession
     ) -> Dict[str, Any]:
-        """Sync new Plaid transactions"""
-        try:
-            if not event.user_id:
-                return {"error": "Unable to resolve user for transaction sync"}
-            
-            # Get credential ID for this item
-            credential_id = await self._get_credential_id_for_item(event.item_id, event.user_id, 'plaid', db)
-            
-            if not credential_id:
-                return {"error": "Unable to find credentials for item"}
-            
-            # Sync transactions
-            sync_result = await self.plaid_service.sync_account_data(credential_id, event.user_id, db)
-            
-            # Trigger balance monitoring check
-            if sync_result.get('accounts'):
-                await balance_monitor.check_immediate_alerts(event.user_id, [credential_id], db)
-            
-            return {
-                "message": "Transactions synced successfully",
-                "accounts_count": sync_result.get('accounts_count', 0),
-                "transactions_count": sync_result.get('transactions_count', 0)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error syncing Plaid transactions: {str(e)}")
-            return {"error": str(e)}
+        """Queue an incremental sync of new Plaid transactions"""
+        return self._enqueue_sync(event, "Transaction sync queued")
+    
+    def _enqueue_sync(self, event: WebhookEvent, message: str) -> Dict[str, Any]:
+        """Hand the item to the sync scheduler so the webhook returns immediately"""
+        if not event.user_id:
+            return {"error": "Unable to resolve user for transaction sync"}
+        
+        queued = self.sync_scheduler.enqueue(
+            event.provider,
+            event.item_id,
+            event.user_id,
+            reason=event.event_data.get('webhook_code') or event.event_type
+        )
+        
+        return {"message": message, "coalesced": not queued}
+    
+    async def _run_transaction_sync(
+        self,
+        request: SyncRequest,
+        db: AsyncSession
+    ) -> Dict[str, Any]:
+        """Sync an item's transactions since its cursor (runs in the scheduler)"""
+        service, resolve_credential = self._sync_services[request.provider]
+        
+        credential_id = await resolve_credential(request.item_id, request.user_id, request.provider, db)
+        if not credential_id:
+            logger.warning(f"No credentials for {request.provider} item {request.item_id}, skipping sync")
+            return {"error": "Unable to find credentials for item"}
+        
+        cursor = await self.transaction_writer.load_cursor(db, credential_id)
+        changes = await service.sync_transactions(credential_id, request.user_id, db, cursor)
+        counts = await self.transaction_writer.write(db, credential_id, changes)
+        
+        # Only the synced changes are folded into the rolling spending aggregates,
+        # categorized the same way as the full spending analysis
+        synced = changes.added + changes.modified
+        predictions = await transaction_categorizer.categorize_transactions_batch(synced, request.user_id)
+        anomalies = await spending_pattern_detector.update_spending_aggregates(
+            db, request.user_id, synced, predictions, changes.removed
+        )
+        counts["anomalies"] = len(anomalies)
+        await db.commit()
+        
+        # Trigger balance monitoring check
+        if changes.added or changes.modified or changes.removed:
+            await balance_monitor.check_immediate_alerts(request.user_id, [credential_id], db)
+        
+        return counts
     
     async def _handle_plaid_item_error(
         self,
@@ -486,34 +521,7 @@ class BankingWebhookHandler:
         db: AsyncSession
     ) -> Dict[str, Any]:
         """Handle Yodlee refresh webhook"""
-        try:
-            # Process Yodlee refresh event
-            if not event.user_id:
-                return {"error": "Unable to resolve user for refresh"}
-            
-            # Get credential ID
-            credential_id = await self._get_credential_id_for_provider_account(
-                event.item_id, event.user_id, 'yodlee', db
-            )
-            
-            if credential_id:
-                # Sync account data
-                sync_result = await self.yodlee_service.sync_account_data(credential_id, event.user_id, db)
-                
-                # Trigger balance monitoring
-                await balance_monitor.check_immediate_alerts(event.user_id, [credential_id], db)
-                
-                return {
-                    "message": "Yodlee data refreshed successfully",
-                    "accounts_count": sync_result.get('accounts_count', 0),
-                    "transactions_count": sync_result.get('transactions_count', 0)
-                }
-            else:
-                return {"error": "Unable to find credentials for provider account"}
-            
-        except Exception as e:
-            logger.error(f"Error handling Yodlee refresh webhook: {str(e)}")
-            return {"error": str(e)}
+        return self._enqueue_sync(event, "Yodlee refresh queued")
     
     async def _resolve_user_from_item_id(
         self,
@@ -18,10 +18,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.core.exceptions import BankingIntegrationError, ValidationError
 from .credential_vault import credential_vault
-from .plaid_service import BankAccount, Transaction
+from .plaid_service import BankAccount, Transaction, TransactionChanges
 
 logger = logging.getLogger(__name__)
 
+# Yodlee has no change feed; incremental syncs re-read this many days before
+# the last sync so pending transactions that post late are picked up
+SYNC_OVERLAP_DAYS = 7
+
 
 @dataclass
 class YodleeAuthToken:
@@ -498,6 +502,43 @@ class YodleeService:
             logger.error(f"Failed to get Yodlee transactions: {str(e)}")
             raise BankingIntegrationError("Failed to retrieve transactions")
     
+    async def sync_transactions(
+        self,
+        credential_id: str,
+        user_id: str,
+        db: AsyncSession,
+        cursor: Optional[str] = None
+    ) -> TransactionChanges:
+        """
+        Fetch transactions changed since a cursor
+        
+        The cursor is the date of the previous sync. Transactions from that
+        date (less an overlap window) are returned as modified and upserted
+        by the caller; Yodlee does not report removals.
+        
+        Args:
+            credential_id: Stored credential identifier
+            user_id: User identifier
+            db: Database session
+            cursor: Date of the previous sync (None for a full sync)
+            
+        Returns:
+            Changed transactions with the next cursor
+        """
+        start_date = None
+        if cursor:
+            start_date = datetime.strptime(cursor, '%Y-%m-%d') - timedelta(days=SYNC_OVERLAP_DAYS)
+        end_date = datetime.now()
+        
+        transactions = await self.get_transactions(
+            credential_id, user_id, db, start_date=start_date, end_date=end_date
+        )
+        
+        return TransactionChanges(
+            modified=transactions,
+            next_cursor=end_date.strftime('%Y-%m-%d')
+        )
+    
     async def sync_account_data(
         self,
         credential_id: str,
@@ -0,0 +1,270 @@
+"""
+In-memory tax lot engine.
+
+Open lots are loaded once per (account, instrument) into a queue, a sorted
+batch of buys and sells is applied in memory, and only the lots and
+positions that changed are handed back for a bulk write. Every lot
+closure produces a RealizedGain record that tax reporting and the
+tax-loss harvesting engines can consume without re-querying.
+"""
+import heapq
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+from ..tax_optimization import TaxLotMethod
+
+logger = logging.getLogger(__name__)
+
+LONG_TERM_DAYS = 365
+
+ZERO = Decimal("0")
+
+LotKey = Tuple[Any, Any]
+
+
+@dataclass
+class OpenLot:
+    """A tax lot with shares still open (cost basis is per share)."""
+    lot_id: Any
+    transaction_id: Any
+    account_id: Any
+    instrument_id: Any
+    open_date: date
+    quantity_open: Decimal
+    cost_basis: Decimal
+    quantity_closed: Decimal = ZERO
+    close_date: Optional[date] = None
+    is_new: bool = False
+
+    @property
+    def remaining(self) -> Decimal:
+        return self.quantity_open - self.quantity_closed
+
+
+@dataclass
+class Trade:
+    """A buy or sell to apply; ``lot_ids`` selects lots for specific identification."""
+    transaction_id: Any
+    account_id: Any
+    instrument_id: Any
+    side: str
+    quantity: Decimal
+    price: Decimal
+    trade_date: date
+    fee: Decimal = ZERO
+    lot_ids: Optional[List[Any]] = None
+
+
+@dataclass
+class RealizedGain:
+    """Shares of one lot closed by one sale."""
+    lot_id: Any
+    transaction_id: Any
+    account_id: Any
+    instrument_id: Any
+    open_date: date
+    close_date: date
+    quantity: Decimal
+    cost_basis: Decimal
+    proceeds: Decimal
+
+    @property
+    def gain(self) -> Decimal:
+        return self.proceeds - self.cost_basis
+
+    @property
+    def holding_days(self) -> int:
+        return (self.close_date - self.open_date).days
+
+    @property
+    def is_long_term(self) -> bool:
+        return self.holding_days > LONG_TERM_DAYS
+
+
+class LotQueue:
+    """
+    Open lots of one (account, instrument) in acquisition order.
+
+    FIFO and LIFO consume from the ends of the deque; HIFO uses a heap on
+    cost basis built on first use and specific identification a lot id
+    index. Lots closed out of order are skipped until they reach an end
+    of the deque and are dropped.
+    """
+
+    def __init__(self, lots: Iterable[OpenLot] = ()):
+        self.lots: Deque[OpenLot] = deque(sorted(lots, key=lambda lot: lot.open_date))
+        self._by_id: Dict[Any, OpenLot] = {lot.lot_id: lot for lot in self.lots}
+        self._heap: Optional[List[Tuple[Decimal, int, OpenLot]]] = None
+        self._sequence = len(self.lots)
+
+    def add(self, lot: OpenLot):
+        self.lots.append(lot)
+        self._by_id[lot.lot_id] = lot
+        self._sequence += 1
+        if self._heap is not None:
+            heapq.heappush(self._heap, (-lot.cost_basis, self._sequence, lot))
+
+    def position(self) -> Tuple[Decimal, Decimal]:
+        """(open quantity, average cost per share)"""
+        quantity = ZERO
+        cost = ZERO
+        for lot in self.lots:
+            remaining = lot.remaining
+            if remaining > 0:
+                quantity += remaining
+                cost += remaining * lot.cost_basis
+        return quantity, (cost / quantity if quantity > 0 else ZERO)
+
+    def select(
+        self,
+        quantity: Decimal,
+        method: TaxLotMethod,
+        lot_ids: Optional[List[Any]] = None
+    ) -> List[Tuple[OpenLot, Decimal]]:
+        """(lot, shares to close) pairs covering ``quantity`` as far as open lots allow"""
+        if method == TaxLotMethod.HIFO:
+            return self._select_highest_cost(quantity)
+
+        if method == TaxLotMethod.SPECIFIC_ID and lot_ids:
+            candidates = [self._by_id[lot_id] for lot_id in lot_ids if lot_id in self._by_id]
+        elif method == TaxLotMethod.LIFO:
+            candidates = reversed(self.lots)
+        else:
+            # FIFO, and specific identification without lot ids
+            candidates = self.lots
+
+        picks = []
+        for lot in candidates:
+            if quantity <= 0:
+                break
+            remaining = lot.remaining
+            if remaining > 0:
+                shares = min(remaining, quantity)
+                picks.append((lot, shares))
+                quantity -= shares
+        return picks
+
+    def _select_highest_cost(self, quantity: Decimal) -> List[Tuple[OpenLot, Decimal]]:
+        if self._heap is None:
+            self._heap = [(-lot.cost_basis, i, lot) for i, lot in enumerate(self.lots) if lot.remaining > 0]
+            heapq.heapify(self._heap)
+
+        picks = []
+        partially_closed = None
+        while self._heap and quantity > 0:
+            entry = heapq.heappop(self._heap)
+            lot = entry[2]
+            remaining = lot.remaining
+            if remaining <= 0:
+                continue
+            shares = min(remaining, quantity)
+            picks.append((lot, shares))
+            quantity -= shares
+            if shares < remaining:
+                partially_closed = entry
+        if partially_closed is not None:
+            heapq.heappush(self._heap, partially_closed)
+        return picks
+
+    def compact(self):
+        """Drop exhausted lots from the ends of the queue"""
+        while self.lots and self.lots[0].remaining <= 0:
+            self.lots.popleft()
+        while self.lots and self.lots[-1].remaining <= 0:
+            self.lots.pop()
+
+
+class LotEngine:
+    """Apply trades to per-instrument lot queues and collect the changes."""
+
+    def __init__(self, method: TaxLotMethod = TaxLotMethod.FIFO):
+        self.method = method
+        self.queues: Dict[LotKey, LotQueue] = {}
+        self.realized: List[RealizedGain] = []
+        self._changed: Dict[Any, OpenLot] = {}
+        self._touched: Set[LotKey] = set()
+
+    def load(self, lots: Iterable[OpenLot], keys: Iterable[LotKey] = ()):
+        """
+        Load open lots; every key in ``keys`` gets a queue even without
+        open lots, so new instruments start empty rather than unloaded.
+        """
+        grouped: Dict[LotKey, List[OpenLot]] = {key: [] for key in keys}
+        for lot in lots:
+            grouped.setdefault((lot.account_id, lot.instrument_id), []).append(lot)
+        for key, key_lots in grouped.items():
+            self.queues[key] = LotQueue(key_lots)
+
+    def apply(self, trades: Iterable[Trade], method: Optional[TaxLotMethod] = None) -> List[RealizedGain]:
+        """Apply trades in trade date order; returns the gains realized by this batch."""
+        method = method or self.method
+        realized: List[RealizedGain] = []
+        for trade in sorted(trades, key=lambda trade: trade.trade_date):
+            key = (trade.account_id, trade.instrument_id)
+            queue = self.queues.get(key)
+            if queue is None:
+                raise KeyError(f"Lots for {key} were not loaded")
+            self._touched.add(key)
+            if trade.side == "buy":
+                self._buy(queue, trade)
+            else:
+                realized.extend(self._sell(queue, trade, method))
+        self.realized.extend(realized)
+        return realized
+
+    def _buy(self, queue: LotQueue, trade: Trade):
+        lot = OpenLot(
+            lot_id=uuid.uuid4(),
+            transaction_id=trade.transaction_id,
+            account_id=trade.account_id,
+            instrument_id=trade.instrument_id,
+            open_date=trade.trade_date,
+            quantity_open=trade.quantity,
+            cost_basis=trade.price + (trade.fee / trade.quantity),
+            is_new=True
+        )
+        queue.add(lot)
+        self._changed[lot.lot_id] = lot
+
+    def _sell(self, queue: LotQueue, trade: Trade, method: TaxLotMethod) -> List[RealizedGain]:
+        realized = []
+        remaining = trade.quantity
+        for lot, shares in queue.select(trade.quantity, method, trade.lot_ids):
+            lot.quantity_closed += shares
+            if lot.quantity_closed >= lot.quantity_open:
+                lot.close_date = trade.trade_date
+            remaining -= shares
+            self._changed[lot.lot_id] = lot
+
+            realized.append(RealizedGain(
+                lot_id=lot.lot_id,
+                transaction_id=trade.transaction_id,
+                account_id=trade.account_id,
+                instrument_id=trade.instrument_id,
+                open_date=lot.open_date,
+                close_date=trade.trade_date,
+                quantity=shares,
+                cost_basis=lot.cost_basis * shares,
+                proceeds=trade.price * shares - trade.fee * shares / trade.quantity
+            ))
+
+        queue.compact()
+
+        if remaining > 0:
+            logger.warning(f"Short sale detected: {remaining} shares of {trade.instrument_id}")
+        return realized
+
+    def changed_lots(self) -> Tuple[List[OpenLot], List[OpenLot]]:
+        """(new lots, existing lots with closed shares) since loading"""
+        new = [lot for lot in self._changed.values() if lot.is_new]
+        updated = [lot for lot in self._changed.values() if not lot.is_new]
+        return new, updated
+
+    def positions(self) -> Dict[LotKey, Tuple[Decimal, Decimal]]:
+        """(quantity, average cost) for every (account, instrument) a trade touched"""
+        return {key: self.queues[key].position() for key in self._touched}
@@ -10,7 +10,9 @@ from decimal import Decimal
 from dataclasses import dataclass
 import logging
 import re
+import uuid
 
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
@@ -18,6 +20,8 @@ from app.models.portfolio import (
     Transaction, Instrument, Account, Lot, Position,
     TransactionSide, AssetClass
 )
+from ..tax_optimization import TaxLotMethod
+from .lot_engine import LotEngine, OpenLot, RealizedGain, Trade
 
 logger = logging.getLogger(__name__)
 
@@ -199,9 +203,11 @@ class CSVParser:
 class TransactionProcessor:
     """Process and import transactions."""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, lot_method: TaxLotMethod = TaxLotMethod.FIFO):
         self.db = db
         self.csv_parser = CSVParser()
+        self.lot_method = lot_method
+        self.realized_gains: List[RealizedGain] = []
         
     def import_csv(
         self,
@@ -212,6 +218,7 @@ class TransactionProcessor:
         """Import transactions from CSV."""
         errors = []
         imported_count = 0
+        account_uuid = uuid.UUID(str(account_id))
         
         # Parse CSV
         try:
@@ -221,6 +228,7 @@ class TransactionProcessor:
             return 0, errors
         
         # Process each transaction
+        trades: List[Trade] = []
         for parsed_tx in parsed_transactions:
             try:
                 # Generate idempotency key
@@ -237,12 +245,14 @@ class TransactionProcessor:
                 
                 # Get or create instrument
                 instrument = self._get_or_create_instrument(parsed_tx.symbol)
+                side = TransactionSide.BUY if parsed_tx.side == 'buy' else TransactionSide.SELL
                 
                 # Create transaction
                 transaction = Transaction(
-                    account_id=account_id,
+                    id=uuid.uuid4(),
+                    account_id=account_uuid,
                     instrument_id=instrument.id,
-                    side=TransactionSide.BUY if parsed_tx.side == 'buy' else TransactionSide.SELL,
+                    side=side,
                     quantity=parsed_tx.quantity,
                     price=parsed_tx.price,
                     fee=parsed_tx.fee,
@@ -253,10 +263,16 @@ class TransactionProcessor:
                 )
                 
                 self.db.add(transaction)
-                self.db.flush()  # Get transaction ID
-                
-                # Create or update lots
-                self._process_lots(transaction)
+                trades.append(Trade(
+                    transaction_id=transaction.id,
+                    account_id=account_uuid,
+                    instrument_id=instrument.id,
+                    side=side.value,
+                    quantity=parsed_tx.quantity,
+                    price=parsed_tx.price,
+                    fee=parsed_tx.fee or Decimal('0'),
+                    trade_date=parsed_tx.trade_date
+                ))
                 
                 imported_count += 1
                 
@@ -265,8 +281,8 @@ class TransactionProcessor:
                 logger.error(f"Transaction import error: {e}")
                 continue
         
-        # Update positions after all transactions
-        self._update_positions(account_id)
+        # Apply the imported trades to lots and positions in one pass
+        self.realized_gains = self._process_lots(account_uuid, trades)
         
         # Commit all changes
         try:
@@ -277,8 +293,20 @@ class TransactionProcessor:
             errors.append(f"Database error: {e}")
             return 0, errors
         
+        if trades:
+            self._notify_context_write(account_uuid)
+        
         return imported_count, errors
     
+    def _notify_context_write(self, account_id: uuid.UUID):
+        """Invalidate cached AI context built from the owner's lots and positions."""
+        # Imported here: the AI package pulls in the LLM clients
+        from app.services.ai.context_management import notify_portfolio_write
+        
+        account = self.db.get(Account, account_id)
+        if account is not None:
+            notify_portfolio_write(account.user_id)
+    
     def _generate_idempotency_key(self, account_id: str, tx: ParsedTransaction) -> str:
         """Generate unique idempotency key for transaction."""
         key_data = f"{account_id}:{tx.symbol}:{tx.side}:{tx.quantity}:{tx.price}:{tx.trade_date}"
@@ -318,72 +346,106 @@ class TransactionProcessor:
         # Default to equity
         return AssetClass.EQUITY
     
-    def _process_lots(self, transaction: Transaction):
-        """Process tax lots for a transaction."""
-        if transaction.side == TransactionSide.BUY:
-            # Create new lot for buy
-            lot = Lot(
-                transaction_id=transaction.id,
-                account_id=transaction.account_id,
-                instrument_id=transaction.instrument_id,
-                quantity_open=transaction.quantity,
-                quantity_closed=0,
-                cost_basis=transaction.price + (transaction.fee / transaction.quantity),
-                open_date=transaction.trade_date
-            )
-            self.db.add(lot)
-            
-        else:  # SELL
-            # Close lots using FIFO
-            remaining_qty = transaction.quantity
-            
-            # Get open lots ordered by date (FIFO)
-            open_lots = self.db.query(Lot).filter(
-                Lot.account_id == transaction.account_id,
-                Lot.instrument_id == transaction.instrument_id,
-                Lot.close_date.is_(None)
-            ).order_by(Lot.open_date).all()
-            
-            for lot in open_lots:
-                if remaining_qty <= 0:
-                    break
-                    
-                available_qty = lot.quantity_open - lot.quantity_closed
-                close_qty = min(available_qty, remaining_qty)
-                
-                lot.quantity_closed += close_qty
-                if lot.quantity_closed >= lot.quantity_open:
-                    lot.close_date = transaction.trade_date
-                    
-                remaining_qty -= close_qty
-            
-            if remaining_qty > 0:
-                logger.warning(f"Short sale detected: {remaining_qty} shares of {transaction.instrument_id}")
-    
-    def _update_positions(self, account_id: str):
-        """Update cached positions for an account."""
-        # Clear existing positions
-        self.db.query(Position).filter_by(account_id=account_id).delete()
+    def _process_lots(self, account_id: uuid.UUID, trades: List[Trade]) -> List[RealizedGain]:
+        """
+        Apply trades to tax lots in memory and write back only what changed.
+        
+        Open lots of the traded instruments are loaded in one query; new
+        lots are bulk inserted, partially or fully closed lots bulk updated
+        and positions refreshed for the traded instruments only.
+        """
+        if not trades:
+            return []
+        
+        keys = {(trade.account_id, trade.instrument_id) for trade in trades}
+        engine = LotEngine(self.lot_method)
+        engine.load(self._load_open_lots(account_id, [instrument_id for _, instrument_id in keys]), keys)
+        realized = engine.apply(trades)
         
-        # Calculate positions from lots
-        lot_summary = self.db.query(
-            Lot.instrument_id,
-            func.sum(Lot.quantity_open - Lot.quantity_closed).label('quantity'),
-            func.sum((Lot.quantity_open - Lot.quantity_closed) * Lot.cost_basis).label('total_cost')
+        # Transactions must exist before lots reference them
+        self.db.flush()
+        
+        new_lots, updated_lots = engine.changed_lots()
+        if new_lots:
+            self.db.bulk_insert_mappings(Lot, [
+                {
+                    'id': lot.lot_id,
+                    'transaction_id': lot.transaction_id,
+                    'account_id': lot.account_id,
+                    'instrument_id': lot.instrument_id,
+                    'quantity_open': lot.quantity_open,
+                    'quantity_closed': lot.quantity_closed,
+                    'cost_basis': lot.cost_basis,
+                    'open_date': lot.open_date,
+                    'close_date': lot.close_date
+                }
+                for lot in new_lots
+            ])
+        if updated_lots:
+            self.db.bulk_update_mappings(Lot, [
+                {'id': lot.lot_id, 'quantity_closed': lot.quantity_closed, 'close_date': lot.close_date}
+                for lot in updated_lots
+            ])
+        
+        self._update_positions(account_id, engine.positions())
+        return realized
+    
+    def _load_open_lots(self, account_id: uuid.UUID, instrument_ids: List[uuid.UUID]) -> List[OpenLot]:
+        """Open lots of an account for the given instruments."""
+        rows = self.db.query(
+            Lot.id, Lot.transaction_id, Lot.account_id, Lot.instrument_id,
+            Lot.open_date, Lot.quantity_open, Lot.quantity_closed, Lot.cost_basis
         ).filter(
             Lot.account_id == account_id,
-            Lot.quantity_open > Lot.quantity_closed
-        ).group_by(Lot.instrument_id).all()
+            Lot.instrument_id.in_(instrument_ids),
+            Lot.close_date.is_(None)
+        ).all()
         
-        for instrument_id, quantity, total_cost in lot_summary:
-            if quantity > 0:
-                position = Position(
-                    account_id=account_id,
-                    instrument_id=instrument_id,
-                    quantity=quantity,
-                    average_cost=total_cost / quantity if quantity > 0 else 0,
-                    last_updated=datetime.utcnow()
-                )
-                self.db.add(position)
+        return [
+            OpenLot(
+                lot_id=row.id,
+                transaction_id=row.transaction_id,
+                account_id=row.account_id,
+                instrument_id=row.instrument_id,
+                open_date=row.open_date,
+                quantity_open=row.quantity_open,
+                quantity_closed=row.quantity_closed or Decimal('0'),
+                cost_basis=row.cost_basis
+            )
+            for row in rows
+        ]
+    
+    def _update_positions(self, account_id: uuid.UUID, positions: Dict[Tuple, Tuple[Decimal, Decimal]]):
+        """Upsert cached positions for changed instruments; remove closed ones."""
+        now = datetime.utcnow()
+        rows = [
+            {
+                'id': uuid.uuid4(),
+                'account_id': account_id,
+                'instrument_id': instrument_id,
+                'quantity': quantity,
+                'average_cost': average_cost,
+                'last_updated': now
+            }
+            for (_, instrument_id), (quantity, average_cost) in positions.items()
+            if quantity > 0
+        ]
+        closed = [instrument_id for (_, instrument_id), (quantity, _) in positions.items() if quantity <= 0]
+        
+        if rows:
+            stmt = insert(Position).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                constraint='uq_account_instrument',
+                set_={
+                    'quantity': stmt.excluded.quantity,
+                    'average_cost': stmt.excluded.average_cost,
+                    'last_updated': stmt.excluded.last_updated
+                }
+            )
+            self.db.execute(stmt)
         
-        self.db.flush()
\ No newline at end of file
+        if closed:
+            self.db.query(Position).filter(
+                Position.account_id == account_id,
+                Position.instrument_id.in_(closed)
+            ).delete(synchronize_session=False)
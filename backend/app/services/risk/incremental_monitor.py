@@ -0,0 +1,622 @@
+"""
+Event-Driven Incremental Risk Monitor
+
+This module implements an asyncio-native portfolio risk monitor that runs on
+the application's event loop and is fed by market-data ticks:
+- Rolling returns kept in fixed-size ring buffers
+- Running peak value for drawdown
+- Incremental portfolio value, concentration (HHI), liquidity and leverage
+- Monitoring rules evaluated only for metrics that changed
+- One monitor instance serving thousands of portfolios
+"""
+
+import asyncio
+import concurrent.futures
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Set, Callable, Iterable
+from dataclasses import dataclass, field
+from collections import defaultdict, deque
+import logging
+import numpy as np
+
+from app.services.risk.real_time_monitor import (
+    MonitoringMetric,
+    MonitoringRule,
+    RiskAlert,
+    RealTimeRiskMonitor
+)
+from app.services.risk.var_engine import partition_quantiles
+
+logger = logging.getLogger(__name__)
+
+
+POSITION_METRICS = (
+    MonitoringMetric.PORTFOLIO_VALUE,
+    MonitoringMetric.CONCENTRATION,
+    MonitoringMetric.LIQUIDITY,
+    MonitoringMetric.LEVERAGE
+)
+
+RETURN_METRICS = (
+    MonitoringMetric.VAR_95,
+    MonitoringMetric.VAR_99,
+    MonitoringMetric.VOLATILITY,
+    MonitoringMetric.CURRENT_DRAWDOWN
+)
+
+
+class RollingWindow:
+    """Fixed-capacity ring buffer of floats with O(1) running mean and variance"""
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=float)
+        self._position = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value: float):
+        """Add a value, evicting the oldest one when full"""
+        if self._count == self.capacity:
+            old = self._data[self._position]
+            self._sum -= old
+            self._sum_sq -= old * old
+        else:
+            self._count += 1
+
+        self._data[self._position] = value
+        self._sum += value
+        self._sum_sq += value * value
+        self._position = (self._position + 1) % self.capacity
+
+        # Re-anchor running sums once per full cycle to bound float drift
+        if self._position == 0:
+            window = self.values()
+            self._sum = float(window.sum())
+            self._sum_sq = float(np.dot(window, window))
+
+    def values(self) -> np.ndarray:
+        """Window contents (unordered)"""
+        return self._data[:self._count]
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self._count if self._count else 0.0
+
+    @property
+    def std(self) -> float:
+        if self._count < 2:
+            return 0.0
+        mean = self.mean
+        return float(np.sqrt(max(self._sum_sq / self._count - mean * mean, 0.0)))
+
+    def quantiles(self, probs: List[float]) -> np.ndarray:
+        """Quantiles of the window from a single partition"""
+        if self._count == 0:
+            return np.zeros(len(probs))
+        return partition_quantiles(self.values(), probs)
+
+
+@dataclass
+class MarketTick:
+    """Single market data update"""
+    symbol: str
+    price: float
+    volume: Optional[float] = None
+    timestamp: datetime = field(default_factory=datetime.now)
+
+
+@dataclass
+class PortfolioRiskState:
+    """Incrementally maintained risk state for one portfolio"""
+    portfolio_id: str
+    quantities: Dict[str, float] = field(default_factory=dict)
+    prices: Dict[str, float] = field(default_factory=dict)
+    volumes: Dict[str, float] = field(default_factory=dict)
+    position_values: Dict[str, float] = field(default_factory=dict)
+    liquid_positions: Set[str] = field(default_factory=set)
+    total_value: float = 0.0
+    gross_exposure: float = 0.0
+    sum_sq_values: float = 0.0
+    liquid_value: float = 0.0
+    account_equity: Optional[float] = None
+    margin_used: float = 0.0
+    margin_available: float = 100000.0
+    peak_value: float = 0.0
+    last_marked_value: Optional[float] = None
+    returns: RollingWindow = field(default_factory=RollingWindow)
+    metrics: Dict[MonitoringMetric, float] = field(default_factory=dict)
+    previous_metrics: Dict[MonitoringMetric, float] = field(default_factory=dict)
+    last_alert_times: Dict[str, datetime] = field(default_factory=dict)
+
+    def set_position_value(self, symbol: str):
+        """Re-mark one position and update aggregates by its delta"""
+        old_value = self.position_values.get(symbol, 0.0)
+        new_value = self.quantities.get(symbol, 0.0) * self.prices.get(symbol, 0.0)
+
+        self.total_value += new_value - old_value
+        self.gross_exposure += abs(new_value) - abs(old_value)
+        self.sum_sq_values += new_value * new_value - old_value * old_value
+
+        if symbol in self.liquid_positions:
+            self.liquid_value -= old_value
+            self.liquid_positions.discard(symbol)
+
+        # Position should be < 1% of daily volume for good liquidity; a closed
+        # or unpriced position is not a liquid holding
+        daily_volume_value = self.volumes.get(symbol, 0.0) * self.prices.get(symbol, 0.0)
+        if new_value != 0 and daily_volume_value > 0 and new_value < daily_volume_value * 0.01:
+            self.liquid_positions.add(symbol)
+            self.liquid_value += new_value
+
+        if symbol in self.quantities:
+            self.position_values[symbol] = new_value
+        else:
+            self.position_values.pop(symbol, None)
+
+
+class IncrementalRiskMonitor:
+    """
+    Asyncio-native, tick-driven risk monitor for many portfolios
+
+    Ticks are queued with ``publish_tick`` (or ``on_market_data`` as a stream
+    callback) and consumed in batches by a task on the running event loop.
+    Only portfolios holding a ticked symbol are re-marked, and only rules whose
+    metric changed are evaluated.
+    """
+
+    def __init__(
+        self,
+        monitoring_rules: Optional[List[MonitoringRule]] = None,
+        returns_window: int = 100,
+        max_batch_size: int = 5000,
+        alert_history_size: int = 10000
+    ):
+        """
+        Initialize incremental monitor
+
+        Args:
+            monitoring_rules: Rules applied to every portfolio (defaults to
+                RealTimeRiskMonitor's rule set)
+            returns_window: Number of returns kept per portfolio
+            max_batch_size: Maximum ticks coalesced into one processing batch
+            alert_history_size: Number of alerts retained in memory
+        """
+        self.returns_window = returns_window
+        self.max_batch_size = max_batch_size
+
+        self.portfolios: Dict[str, PortfolioRiskState] = {}
+        self.symbol_index: Dict[str, Set[str]] = defaultdict(set)
+        self.last_prices: Dict[str, float] = {}
+        self.last_volumes: Dict[str, float] = {}
+
+        self.monitoring_rules: List[MonitoringRule] = []
+        self.rules_by_metric: Dict[MonitoringMetric, List[MonitoringRule]] = defaultdict(list)
+        rules = monitoring_rules
+        if rules is None:
+            rules = RealTimeRiskMonitor._initialize_monitoring_rules()
+        for rule in rules:
+            self.add_monitoring_rule(rule)
+
+        self.alert_handlers: List[Callable[[str, RiskAlert], Any]] = []
+        self.alert_history: deque = deque(maxlen=alert_history_size)
+
+        self._tick_queue: Optional[asyncio.Queue] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.monitoring_active = False
+        self.ticks_processed = 0
+        self.rule_evaluations = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start_monitoring(self):
+        """Start consuming ticks on the current event loop"""
+
+        if self.monitoring_active:
+            logger.warning("Monitoring already active")
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._tick_queue = asyncio.Queue()
+        self.monitoring_active = True
+        self._consumer_task = asyncio.create_task(self._consume_ticks())
+        logger.info("Incremental risk monitoring started")
+
+    async def stop_monitoring(self):
+        """Stop consuming ticks and drain the consumer task"""
+
+        self.monitoring_active = False
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            try:
+                await self._consumer_task
+            except asyncio.CancelledError:
+                pass
+            self._consumer_task = None
+        self._loop = None
+        logger.info("Incremental risk monitoring stopped")
+
+    def _on_monitor_loop(self) -> bool:
+        """Whether the caller may touch monitor state directly
+
+        True before monitoring starts and on the monitor's own loop; other
+        threads must hand their work to that loop.
+        """
+        if self._loop is None:
+            return True
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def publish_tick(
+        self,
+        symbol: str,
+        price: float,
+        volume: Optional[float] = None,
+        timestamp: Optional[datetime] = None
+    ):
+        """Queue a market data tick (non-blocking, callable from any thread)"""
+
+        if self._tick_queue is None:
+            raise RuntimeError("Monitoring not started")
+        tick = MarketTick(symbol, float(price), volume, timestamp or datetime.now())
+        if self._on_monitor_loop():
+            self._tick_queue.put_nowait(tick)
+        else:
+            self._loop.call_soon_threadsafe(self._tick_queue.put_nowait, tick)
+
+    async def on_market_data(self, data_point: Any):
+        """Stream callback accepting MarketDataPoint-like objects"""
+
+        price = getattr(data_point, 'current_price', None) or getattr(data_point, 'close_price', None)
+        if price is None:
+            return
+        self.publish_tick(
+            data_point.symbol,
+            float(price),
+            getattr(data_point, 'volume', None),
+            getattr(data_point, 'timestamp', None)
+        )
+
+    async def _consume_ticks(self):
+        """Consume queued ticks in coalesced batches"""
+
+        while self.monitoring_active:
+            tick = await self._tick_queue.get()
+            batch = [tick]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._tick_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            try:
+                alerts = self.process_ticks(batch)
+                if alerts:
+                    await self._dispatch_alerts(alerts)
+            except Exception as e:
+                logger.error(f"Error processing tick batch: {e}")
+
+    # ------------------------------------------------------------------
+    # Portfolio registration and position updates
+    # ------------------------------------------------------------------
+
+    def update_positions(
+        self,
+        portfolio_id: str,
+        positions: Dict[str, Dict]
+    ) -> List[tuple]:
+        """
+        Register or update a portfolio's positions
+
+        Accepts the same shape as RealTimeRiskMonitor.update_positions: symbol
+        entries with a 'quantity' plus optional 'account_equity', 'margin_used'
+        and 'margin_available' keys. Only symbols whose quantity changed are
+        re-marked.
+
+        While monitoring, calls from other threads are applied on the
+        monitor's event loop and block until the update is done.
+
+        Returns:
+            (portfolio_id, RiskAlert) pairs raised by the update
+        """
+        if not self._on_monitor_loop():
+            future: concurrent.futures.Future = concurrent.futures.Future()
+
+            def apply():
+                try:
+                    future.set_result(self.update_positions(portfolio_id, positions))
+                except Exception as e:
+                    future.set_exception(e)
+
+            self._loop.call_soon_threadsafe(apply)
+            return future.result()
+
+        state = self.portfolios.get(portfolio_id)
+        if state is None:
+            state = PortfolioRiskState(
+                portfolio_id=portfolio_id,
+                returns=RollingWindow(self.returns_window)
+            )
+            self.portfolios[portfolio_id] = state
+
+        previous_total = state.total_value
+        changed: Set[MonitoringMetric] = set()
+        if 'account_equity' in positions:
+            state.account_equity = float(positions['account_equity'])
+            changed.add(MonitoringMetric.LEVERAGE)
+        if 'margin_used' in positions or 'margin_available' in positions:
+            state.margin_used = float(positions.get('margin_used', state.margin_used))
+            state.margin_available = float(positions.get('margin_available', state.margin_available))
+            changed.add(MonitoringMetric.MARGIN_USAGE)
+
+        symbols = {
+            symbol: entry for symbol, entry in positions.items()
+            if isinstance(entry, dict)
+        }
+        for symbol in set(state.quantities) - set(symbols):
+            del state.quantities[symbol]
+            self.symbol_index[symbol].discard(portfolio_id)
+            state.set_position_value(symbol)
+            changed.update(POSITION_METRICS)
+
+        for symbol, entry in symbols.items():
+            quantity = float(entry.get('quantity', 0))
+            if state.quantities.get(symbol) == quantity:
+                continue
+            state.quantities[symbol] = quantity
+            self.symbol_index[symbol].add(portfolio_id)
+            if symbol not in state.prices:
+                price = self.last_prices.get(symbol, entry.get('price', entry.get('cost_basis', 0.0)))
+                state.prices[symbol] = float(price)
+            if symbol in self.last_volumes:
+                state.volumes[symbol] = self.last_volumes[symbol]
+            state.set_position_value(symbol)
+            changed.update(POSITION_METRICS)
+
+        # Position changes are flows, not market returns: shift the peak by the
+        # flow so drawdown only reflects price moves
+        state.last_marked_value = state.total_value
+        state.peak_value = max(state.peak_value + state.total_value - previous_total, state.total_value)
+        if state.peak_value != state.total_value or previous_total:
+            changed.add(MonitoringMetric.CURRENT_DRAWDOWN)
+
+        changed = self._refresh_metrics(state, changed, record_return=False)
+        alerts = [(portfolio_id, alert) for alert in self._evaluate_rules(state, changed)]
+        if alerts and self.monitoring_active:
+            self._loop.create_task(self._dispatch_alerts(alerts))
+        return alerts
+
+    def remove_portfolio(self, portfolio_id: str):
+        """Stop monitoring a portfolio"""
+
+        state = self.portfolios.pop(portfolio_id, None)
+        if state:
+            for symbol in state.quantities:
+                self.symbol_index[symbol].discard(portfolio_id)
+
+    def add_monitoring_rule(self, rule: MonitoringRule):
+        """Add a rule applied to every portfolio"""
+
+        self.monitoring_rules.append(rule)
+        self.rules_by_metric[rule.metric].append(rule)
+
+    def add_alert_handler(self, handler: Callable[[str, RiskAlert], Any]):
+        """Register a sync or async callback receiving (portfolio_id, alert)"""
+
+        self.alert_handlers.append(handler)
+
+    # ------------------------------------------------------------------
+    # Tick processing
+    # ------------------------------------------------------------------
+
+    def process_ticks(self, ticks: Iterable[MarketTick]) -> List[tuple]:
+        """
+        Apply a batch of ticks and evaluate rules for changed metrics
+
+        Multiple ticks for the same symbol collapse to the latest price, so each
+        affected portfolio records one return per batch.
+
+        Returns:
+            (portfolio_id, RiskAlert) pairs raised by the batch
+        """
+        latest: Dict[str, MarketTick] = {}
+        for tick in ticks:
+            latest[tick.symbol] = tick
+            self.ticks_processed += 1
+
+        dirty: Set[str] = set()
+        for symbol, tick in latest.items():
+            self.last_prices[symbol] = tick.price
+            if tick.volume is not None:
+                self.last_volumes[symbol] = float(tick.volume)
+
+            for portfolio_id in self.symbol_index.get(symbol, ()):
+                state = self.portfolios[portfolio_id]
+                state.prices[symbol] = tick.price
+                if tick.volume is not None:
+                    state.volumes[symbol] = float(tick.volume)
+                state.set_position_value(symbol)
+                dirty.add(portfolio_id)
+
+        alerts = []
+        for portfolio_id in dirty:
+            state = self.portfolios[portfolio_id]
+            changed = self._refresh_metrics(
+                state, set(POSITION_METRICS) | set(RETURN_METRICS), record_return=True
+            )
+            alerts.extend((portfolio_id, alert) for alert in self._evaluate_rules(state, changed))
+        return alerts
+
+    def _refresh_metrics(
+        self,
+        state: PortfolioRiskState,
+        candidates: Set[MonitoringMetric],
+        record_return: bool
+    ) -> Set[MonitoringMetric]:
+        """Recompute candidate metrics from incremental state; return those that changed"""
+
+        if record_return and state.last_marked_value:
+            state.returns.append(state.total_value / state.last_marked_value - 1.0)
+            state.last_marked_value = state.total_value
+        state.peak_value = max(state.peak_value, state.total_value)
+
+        values: Dict[MonitoringMetric, float] = {}
+        total = state.total_value
+
+        if MonitoringMetric.PORTFOLIO_VALUE in candidates:
+            values[MonitoringMetric.PORTFOLIO_VALUE] = total
+        if MonitoringMetric.CONCENTRATION in candidates:
+            values[MonitoringMetric.CONCENTRATION] = (
+                state.sum_sq_values / (total * total) if total else 1.0
+            )
+        if MonitoringMetric.LIQUIDITY in candidates:
+            values[MonitoringMetric.LIQUIDITY] = state.liquid_value / total if total else 0.0
+        if MonitoringMetric.LEVERAGE in candidates:
+            equity = state.account_equity if state.account_equity is not None else total
+            values[MonitoringMetric.LEVERAGE] = state.gross_exposure / equity if equity > 0 else 1.0
+        if MonitoringMetric.MARGIN_USAGE in candidates:
+            total_margin = state.margin_used + state.margin_available
+            values[MonitoringMetric.MARGIN_USAGE] = (
+                state.margin_used / total_margin if total_margin > 0 else 0.0
+            )
+        if MonitoringMetric.CURRENT_DRAWDOWN in candidates:
+            values[MonitoringMetric.CURRENT_DRAWDOWN] = (
+                (total - state.peak_value) / state.peak_value if state.peak_value > 0 else 0.0
+            )
+        if record_return and len(state.returns) > 1:
+            q_95, q_99 = state.returns.quantiles([0.05, 0.01])
+            values[MonitoringMetric.VAR_95] = abs(float(q_95))
+            values[MonitoringMetric.VAR_99] = abs(float(q_99))
+            values[MonitoringMetric.VOLATILITY] = state.returns.std
+
+        changed = set()
+        for metric, value in values.items():
+            previous = state.metrics.get(metric)
+            if previous is None or abs(value - previous) > 1e-12:
+                if previous is not None:
+                    state.previous_metrics[metric] = previous
+                state.metrics[metric] = value
+                changed.add(metric)
+        return changed
+
+    # ------------------------------------------------------------------
+    # Rule evaluation and alert dispatch
+    # ------------------------------------------------------------------
+
+    def _evaluate_rules(
+        self,
+        state: PortfolioRiskState,
+        changed: Set[MonitoringMetric]
+    ) -> List[RiskAlert]:
+        """Evaluate rules attached to changed metrics only"""
+
+        alerts = []
+        current_time = datetime.now()
+
+        for metric in changed:
+            metric_value = state.metrics.get(metric, 0)
+            for rule in self.rules_by_metric.get(metric, ()):
+                if not rule.enabled:
+                    continue
+
+                last_alert = state.last_alert_times.get(rule.rule_id)
+                if last_alert and (current_time - last_alert).total_seconds() < rule.cooldown_minutes * 60:
+                    continue
+
+                self.rule_evaluations += 1
+                if not self._rule_triggered(rule, metric_value, state.previous_metrics.get(metric)):
+                    continue
+
+                alert = RiskAlert(
+                    alert_id=f"ALERT-{current_time.strftime('%Y%m%d%H%M%S')}-{state.portfolio_id}-{rule.rule_id}",
+                    timestamp=current_time,
+                    metric=rule.metric,
+                    severity=rule.severity,
+                    current_value=metric_value,
+                    threshold_value=rule.threshold,
+                    message=f"{state.portfolio_id}: {rule.metric.value} triggered: "
+                            f"{metric_value:.4f} (threshold: {rule.threshold:.4f})",
+                    recommended_action=RealTimeRiskMonitor._get_recommended_action(rule, metric_value)
+                )
+                state.last_alert_times[rule.rule_id] = current_time
+                self.alert_history.append(alert)
+                alerts.append(alert)
+
+                if rule.auto_action:
+                    try:
+                        rule.auto_action(state.portfolio_id, rule, metric_value)
+                    except Exception as e:
+                        logger.error(f"Auto action failed for {rule.rule_id}: {e}")
+
+        return alerts
+
+    @staticmethod
+    def _rule_triggered(
+        rule: MonitoringRule,
+        metric_value: float,
+        previous_value: Optional[float]
+    ) -> bool:
+        """Check a rule condition against the current and previous metric values"""
+
+        if rule.condition == "greater_than":
+            return metric_value > rule.threshold
+        if rule.condition == "less_than":
+            return metric_value < rule.threshold
+        if rule.condition == "equals":
+            return abs(metric_value - rule.threshold) < 0.0001
+        if rule.condition == "change_percent":
+            if previous_value:
+                change_pct = (metric_value - previous_value) / abs(previous_value)
+                return abs(change_pct) > rule.threshold
+        return False
+
+    async def _dispatch_alerts(self, alerts: List[tuple]):
+        """Send alerts to registered handlers"""
+
+        for portfolio_id, alert in alerts:
+            logger.warning(f"Risk alert: {alert.message}")
+            for handler in self.alert_handlers:
+                try:
+                    result = handler(portfolio_id, alert)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Alert handler failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+
+    def get_portfolio_metrics(self, portfolio_id: str) -> Dict[str, float]:
+        """Current metric values for one portfolio"""
+
+        state = self.portfolios.get(portfolio_id)
+        if state is None:
+            return {}
+        return {metric.value: value for metric, value in state.metrics.items()}
+
+    def get_current_status(self) -> Dict[str, Any]:
+        """Get current monitoring status"""
+
+        return {
+            'monitoring_active': self.monitoring_active,
+            'portfolios_monitored': len(self.portfolios),
+            'symbols_tracked': sum(1 for ids in self.symbol_index.values() if ids),
+            'queued_ticks': self._tick_queue.qsize() if self._tick_queue else 0,
+            'ticks_processed': self.ticks_processed,
+            'rule_evaluations': self.rule_evaluations,
+            'monitoring_rules_enabled': sum(1 for rule in self.monitoring_rules if rule.enabled),
+            'total_alerts_today': len([
+                a for a in self.alert_history
+                if a.timestamp.date() == datetime.now().date()
+            ])
+        }
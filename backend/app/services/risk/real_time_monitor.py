@@ -22,7 +22,7 @@ import numpy as np
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor
 import websocket
-from threading import Lock, Thread
+from threading import Lock
 import redis
 import pickle
 
@@ -129,8 +129,8 @@ class RealTimeRiskMonitor:
         # Threading and async
         self.executor = ThreadPoolExecutor(max_workers=4)
         self.monitoring_active = False
-        self.monitoring_thread = None
-        self.calculation_thread = None
+        self.monitoring_task: Optional[asyncio.Task] = None
+        self.calculation_task: Optional[asyncio.Task] = None
         self.lock = Lock()
         
         # Redis for distributed monitoring
@@ -155,7 +155,8 @@ class RealTimeRiskMonitor:
         self.alert_history = deque(maxlen=1000)
         self.metric_history = {metric: deque(maxlen=1000) for metric in MonitoringMetric}
         
-    def _initialize_monitoring_rules(self) -> List[MonitoringRule]:
+    @staticmethod
+    def _initialize_monitoring_rules() -> List[MonitoringRule]:
         """Initialize default monitoring rules"""
         
         return [
@@ -299,15 +300,10 @@ class RealTimeRiskMonitor:
         
         self.monitoring_active = True
         
-        # Start monitoring thread
-        self.monitoring_thread = Thread(target=self._monitoring_loop)
-        self.monitoring_thread.daemon = True
-        self.monitoring_thread.start()
-        
-        # Start calculation thread
-        self.calculation_thread = Thread(target=self._calculation_loop)
-        self.calculation_thread.daemon = True
-        self.calculation_thread.start()
+        # Both loops run as tasks on the caller's event loop; each cycle's
+        # blocking work is handed to the executor
+        self.monitoring_task = asyncio.create_task(self._monitoring_loop())
+        self.calculation_task = asyncio.create_task(self._calculation_loop())
         
         # Start WebSocket server
         await self._start_websocket_server()
@@ -319,62 +315,77 @@ class RealTimeRiskMonitor:
         
         self.monitoring_active = False
         
-        if self.monitoring_thread:
-            self.monitoring_thread.join(timeout=5)
-        
-        if self.calculation_thread:
-            self.calculation_thread.join(timeout=5)
+        for task in (self.monitoring_task, self.calculation_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.monitoring_task = None
+        self.calculation_task = None
         
         if self.websocket_server:
             self.websocket_server.close()
         
         logger.info("Real-time risk monitoring stopped")
     
-    def _monitoring_loop(self):
-        """Main monitoring loop (runs in separate thread)"""
+    async def _monitoring_loop(self):
+        """Main monitoring loop (runs as an event loop task)"""
         
+        loop = asyncio.get_running_loop()
         while self.monitoring_active:
             try:
-                # Update market data
-                self._update_market_data()
-                
-                # Check monitoring rules
-                self._check_monitoring_rules()
-                
-                # Check circuit breakers
-                self._check_circuit_breakers()
-                
-                # Send updates to clients
-                self._broadcast_updates()
-                
+                # Metric math, the lock and Redis writes stay off the event loop
+                await loop.run_in_executor(self.executor, self._run_monitoring_cycle)
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
             
             # Sleep for monitoring interval
-            asyncio.run(asyncio.sleep(self.monitoring_interval))
+            await asyncio.sleep(self.monitoring_interval)
+    
+    def _run_monitoring_cycle(self):
+        """One monitoring pass (runs on the executor)"""
+        
+        # Update market data
+        self._update_market_data()
+        
+        # Check monitoring rules
+        self._check_monitoring_rules()
+        
+        # Check circuit breakers
+        self._check_circuit_breakers()
+        
+        # Send updates to clients
+        self._broadcast_updates()
     
-    def _calculation_loop(self):
+    async def _calculation_loop(self):
         """Heavy calculation loop (runs less frequently)"""
         
+        loop = asyncio.get_running_loop()
         while self.monitoring_active:
             try:
-                # Calculate risk metrics
-                self._calculate_risk_metrics()
-                
-                # Update historical data
-                self._update_historical_data()
-                
-                # Analyze trends
-                self._analyze_trends()
-                
-                # Generate predictions
-                self._generate_risk_predictions()
-                
+                await loop.run_in_executor(self.executor, self._run_calculation_cycle)
             except Exception as e:
                 logger.error(f"Error in calculation loop: {e}")
             
             # Sleep for calculation interval
-            asyncio.run(asyncio.sleep(self.calculation_interval))
+            await asyncio.sleep(self.calculation_interval)
+    
+    def _run_calculation_cycle(self):
+        """One heavy calculation pass (runs on the executor)"""
+        
+        # Calculate risk metrics
+        self._calculate_risk_metrics()
+        
+        # Update historical data
+        self._update_historical_data()
+        
+        # Analyze trends
+        self._analyze_trends()
+        
+        # Generate predictions
+        self._generate_risk_predictions()
     
     def _update_market_data(self):
         """Update live market data"""
@@ -702,7 +713,8 @@ class RealTimeRiskMonitor:
             logger.critical("INITIATING EMERGENCY HEDGING")
             # Implementation would buy protective puts or other hedges
     
-    def _get_recommended_action(self, rule: MonitoringRule, current_value: float) -> str:
+    @staticmethod
+    def _get_recommended_action(rule: MonitoringRule, current_value: float) -> str:
         """Get recommended action for alert"""
         
         actions = {
@@ -16,11 +16,13 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from scipy import stats
 from scipy.optimize import minimize
-from scipy.stats import norm, t, skew, kurtosis
+from scipy.stats import norm, t
 import asyncio
 import logging
 from enum import Enum
 
+from app.services.risk.var_engine import BatchVaREngine, BatchVaRResult, ReturnMoments, partition_quantiles
+
 logger = logging.getLogger(__name__)
 
 
@@ -113,6 +115,7 @@ class RiskModelsEngine:
         self.monte_carlo_simulations = 10000
         self.stress_scenarios = self._initialize_stress_scenarios()
         self.risk_factors = self._initialize_risk_factors()
+        self.var_engine = BatchVaREngine(confidence_levels=self.confidence_levels)
         
     def _initialize_stress_scenarios(self) -> Dict[str, Dict]:
         """Initialize historical and hypothetical stress test scenarios"""
@@ -235,8 +238,8 @@ class RiskModelsEngine:
         """
         results = {}
         
-        # Scale for holding period
-        sqrt_hp = np.sqrt(holding_period)
+        # Moments are computed once and shared by the analytic methods
+        moments = self.var_engine.compute_moments(returns)
         
         # 1. Historical VaR
         results['historical'] = self._calculate_historical_var(
@@ -245,7 +248,7 @@ class RiskModelsEngine:
         
         # 2. Parametric VaR (variance-covariance)
         results['parametric'] = self._calculate_parametric_var(
-            returns, portfolio_value, holding_period
+            returns, portfolio_value, holding_period, moments
         )
         
         # 3. Monte Carlo VaR
@@ -255,12 +258,12 @@ class RiskModelsEngine:
         
         # 4. Cornish-Fisher VaR (accounts for skewness and kurtosis)
         results['cornish_fisher'] = self._calculate_cornish_fisher_var(
-            returns, portfolio_value, holding_period
+            returns, portfolio_value, holding_period, moments
         )
         
         # 5. GARCH VaR (for time-varying volatility)
         results['garch'] = self._calculate_garch_var(
-            returns, portfolio_value, holding_period
+            returns, portfolio_value, holding_period, moments
         )
         
         # Perform backtesting
@@ -282,13 +285,14 @@ class RiskModelsEngine:
         # Scale returns for holding period
         scaled_returns = returns * np.sqrt(holding_period)
         
-        # Calculate VaR at different confidence levels
-        var_95 = np.percentile(scaled_returns, 5) * portfolio_value
-        var_99 = np.percentile(scaled_returns, 1) * portfolio_value
+        # Both tail quantiles come from a single partition
+        q_95, q_99 = partition_quantiles(scaled_returns, [0.05, 0.01])
+        var_95 = q_95 * portfolio_value
+        var_99 = q_99 * portfolio_value
         
         # Calculate CVaR (Expected Shortfall)
-        cvar_95 = scaled_returns[scaled_returns <= np.percentile(scaled_returns, 5)].mean() * portfolio_value
-        cvar_99 = scaled_returns[scaled_returns <= np.percentile(scaled_returns, 1)].mean() * portfolio_value
+        cvar_95 = scaled_returns[scaled_returns <= q_95].mean() * portfolio_value
+        cvar_99 = scaled_returns[scaled_returns <= q_99].mean() * portfolio_value
         
         # Bootstrap confidence intervals
         confidence_intervals = self._bootstrap_confidence_intervals(
@@ -308,12 +312,14 @@ class RiskModelsEngine:
         self,
         returns: np.ndarray,
         portfolio_value: float,
-        holding_period: int
+        holding_period: int,
+        moments: Optional[ReturnMoments] = None
     ) -> VaRResult:
         """Calculate parametric VaR using normal distribution"""
         
-        mean_return = returns.mean()
-        std_return = returns.std()
+        moments = moments or self.var_engine.compute_moments(returns)
+        mean_return = moments.mean[0]
+        std_return = moments.std[0]
         
         # Scale for holding period
         mean_hp = mean_return * holding_period
@@ -386,14 +392,16 @@ class RiskModelsEngine:
         self,
         returns: np.ndarray,
         portfolio_value: float,
-        holding_period: int
+        holding_period: int,
+        moments: Optional[ReturnMoments] = None
     ) -> VaRResult:
         """Calculate VaR using Cornish-Fisher expansion (accounts for higher moments)"""
         
-        mean_return = returns.mean() * holding_period
-        std_return = returns.std() * np.sqrt(holding_period)
-        skewness = skew(returns)
-        excess_kurtosis = kurtosis(returns)
+        moments = moments or self.var_engine.compute_moments(returns)
+        mean_return = moments.mean[0] * holding_period
+        std_return = moments.std[0] * np.sqrt(holding_period)
+        skewness = moments.skewness[0]
+        excess_kurtosis = moments.excess_kurtosis[0]
         
         # Cornish-Fisher z-score adjustment
         def cornish_fisher_z(alpha):
@@ -428,25 +436,21 @@ class RiskModelsEngine:
         self,
         returns: np.ndarray,
         portfolio_value: float,
-        holding_period: int
+        holding_period: int,
+        moments: Optional[ReturnMoments] = None
     ) -> VaRResult:
         """Calculate VaR using GARCH model for time-varying volatility"""
         
         # Simplified GARCH(1,1) implementation
         # In production, use arch library for proper GARCH modeling
         
-        # Estimate current volatility using EWMA as proxy
-        lambda_param = 0.94
-        squared_returns = returns ** 2
-        
-        volatility = np.sqrt(
-            np.average(squared_returns, 
-                      weights=lambda_param ** np.arange(len(squared_returns)-1, -1, -1))
-        )
+        # Estimate current volatility using EWMA (lambda 0.94) as proxy
+        moments = moments or self.var_engine.compute_moments(returns)
+        volatility = moments.ewma_volatility[0]
         
         # Scale for holding period
         volatility_hp = volatility * np.sqrt(holding_period)
-        mean_hp = returns.mean() * holding_period
+        mean_hp = moments.mean[0] * holding_period
         
         # Calculate VaR
         z_95 = norm.ppf(0.05)
@@ -476,21 +480,40 @@ class RiskModelsEngine:
     ) -> Dict[float, float]:
         """Calculate confidence intervals using bootstrap"""
         
-        intervals = {}
-        for confidence in self.confidence_levels:
-            bootstrap_vars = []
-            
-            for _ in range(n_bootstrap):
-                sample = np.random.choice(returns, size=len(returns), replace=True)
-                var = np.percentile(sample, (1 - confidence) * 100) * portfolio_value
-                bootstrap_vars.append(abs(var))
-            
-            intervals[confidence] = {
-                'lower': np.percentile(bootstrap_vars, 2.5),
-                'upper': np.percentile(bootstrap_vars, 97.5)
-            }
+        # Resamples are drawn as one index matrix and all levels share a partition
+        return self.var_engine.bootstrap_confidence_intervals(
+            returns, portfolio_value, n_bootstrap=n_bootstrap
+        )
+    
+    def calculate_portfolio_var_batch(
+        self,
+        asset_returns: np.ndarray,
+        weights: np.ndarray,
+        portfolio_values: np.ndarray,
+        holding_period: int = 1,
+        methods: Optional[List[str]] = None
+    ) -> BatchVaRResult:
+        """
+        Calculate VaR for many client portfolios in one pass over a shared returns panel
         
-        return intervals
+        Args:
+            asset_returns: Asset returns array of shape (n_obs, n_assets)
+            weights: Portfolio weights of shape (n_portfolios, n_assets)
+            portfolio_values: Current value per portfolio
+            holding_period: Holding period in days
+            methods: Subset of VaR methods (historical, parametric, cornish_fisher,
+                garch, student_t); all by default
+            
+        Returns:
+            BatchVaRResult with VaR/CVaR arrays indexed [confidence_level, portfolio]
+        """
+        return self.var_engine.calculate_portfolio_batch(
+            asset_returns,
+            weights,
+            portfolio_values,
+            holding_period=holding_period,
+            methods=methods
+        )
     
     def _backtest_var(
         self,
@@ -6,10 +6,13 @@ from .account_optimizer import TaxAwareAccountOptimizer
 from .harvesting import TaxLossHarvestingEngine
 from .conversions import RothConversionAnalyzer
 from .rmd_calculator import RMDCalculatorService
+from .data_loader import TaxDataLoader, UserTaxData
 
 __all__ = [
     'TaxAwareAccountOptimizer',
     'TaxLossHarvestingEngine', 
     'RothConversionAnalyzer',
-    'RMDCalculatorService'
+    'RMDCalculatorService',
+    'TaxDataLoader',
+    'UserTaxData'
 ]
\ No newline at end of file
@@ -23,6 +23,7 @@ from ...models.tax_accounts import (
 )
 from ...models.user import User
 from ...models.financial_profile import FinancialProfile
+from .data_loader import TaxDataLoader, UserTaxData
 
 logger = logging.getLogger(__name__)
 
@@ -68,8 +69,9 @@ class TaxAwareAccountOptimizer:
     Comprehensive tax-aware account optimization engine
     """
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, data_loader: Optional[TaxDataLoader] = None):
         self.db = db_session
+        self.data_loader = data_loader
         self.irs_limits = IRSLimits2025()
         self.tax_utils = TaxCalculationUtils()
         
@@ -126,17 +128,26 @@ class TaxAwareAccountOptimizer:
         user_id: str,
         target_allocation: Dict[str, float],
         asset_characteristics: List[AssetCharacteristics],
-        time_horizon: int = 30
+        time_horizon: int = 30,
+        tax_data: Optional[UserTaxData] = None
     ) -> OptimizationResult:
         """
         Optimize asset allocation across all account types for maximum tax efficiency
         """
         logger.info(f"Starting account optimization for user {user_id}")
         
+        if tax_data is None and self.data_loader is not None:
+            tax_data = await self.data_loader.load_user(user_id)
+        
         # Get user's accounts and current holdings
-        accounts = self._get_user_accounts(user_id)
-        current_holdings = self._get_current_holdings(user_id)
-        user_profile = self._get_user_profile(user_id)
+        if tax_data is not None:
+            accounts = tax_data.active_accounts()
+            current_holdings = tax_data.active_holdings()
+            user_profile = tax_data.profile
+        else:
+            accounts = self._get_user_accounts(user_id)
+            current_holdings = self._get_current_holdings(user_id)
+            user_profile = self._get_user_profile(user_id)
         
         # Calculate account capacities
         account_capacities = self._calculate_account_capacities(
@@ -0,0 +1,343 @@
+"""
+Batch Roth Conversion Planner
+
+Vectorized multi-user conversion planning for year-end runs:
+- Float bracket math via binary search over bracket edges
+- Conversion amount x year x user scenario grids in one pass
+- Projected RMD income folded into each year's base income
+- Multi-year schedules solved exactly by dynamic programming over the
+  remaining convertible balance
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Any
+from dataclasses import dataclass
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def rmd_factor_table(rmd_factors: Dict[int, float], rmd_age: int) -> np.ndarray:
+    """Dense age -> factor array; ages below ``rmd_age`` map to infinity (no RMD)"""
+    table = np.full(max(rmd_factors) + 1, np.inf)
+    for age, factor in rmd_factors.items():
+        if age >= rmd_age:
+            table[age] = factor
+    return table
+
+
+def project_rmds(
+    balances: np.ndarray,
+    ages: np.ndarray,
+    n_years: int,
+    factor_table: np.ndarray,
+    growth_rate: float = 0.06
+) -> np.ndarray:
+    """
+    Projected RMDs by year, shape (users, years)
+
+    Uses the same simplified growth model as RMDCalculatorService (balances
+    grow at ``growth_rate`` and are not drawn down); ages past the end of the
+    table use its last factor.
+    """
+    balances = np.asarray(balances, dtype=float)
+    offsets = np.arange(n_years)
+    ages_by_year = np.asarray(ages, dtype=int)[:, None] + offsets[None, :]
+    factors = factor_table[np.clip(ages_by_year, 0, len(factor_table) - 1)]
+    projected = balances[:, None] * (1.0 + growth_rate) ** offsets[None, :]
+    return projected / factors
+
+
+@dataclass
+class BracketSchedule:
+    """Progressive tax schedule as arrays (bracket k starts at lower_edges[k])"""
+    lower_edges: np.ndarray
+    rates: np.ndarray
+    base_tax: np.ndarray
+
+    @classmethod
+    def from_brackets(cls, brackets: Sequence[Any]) -> 'BracketSchedule':
+        """Build from TaxBracket-like objects (min_income, rate), sorted by income"""
+        lower_edges = np.array([float(b.min_income) for b in brackets], dtype=float)
+        rates = np.array([float(b.rate) for b in brackets], dtype=float)
+        base_tax = np.concatenate([[0.0], np.cumsum(np.diff(lower_edges) * rates[:-1])])
+        return cls(lower_edges=lower_edges, rates=rates, base_tax=base_tax)
+
+    def _bracket_index(self, income: np.ndarray) -> np.ndarray:
+        # Incomes exactly on an edge belong to the lower bracket
+        index = np.searchsorted(self.lower_edges, income, side='left') - 1
+        return np.clip(index, 0, len(self.rates) - 1)
+
+    def tax(self, income: Any) -> np.ndarray:
+        """Federal tax for any array of incomes"""
+        income = np.maximum(np.asarray(income, dtype=float), 0.0)
+        index = self._bracket_index(income)
+        return self.base_tax[index] + (income - self.lower_edges[index]) * self.rates[index]
+
+    def marginal_rate(self, income: Any) -> np.ndarray:
+        """Marginal rate for any array of incomes"""
+        income = np.maximum(np.asarray(income, dtype=float), 0.0)
+        return self.rates[self._bracket_index(income)]
+
+
+@dataclass
+class ConversionPlanInputs:
+    """Per-user planning inputs (row i belongs to user_ids[i])"""
+    user_ids: List[Any]
+    incomes: np.ndarray
+    ages: np.ndarray
+    retirement_ages: np.ndarray
+    traditional_balances: np.ndarray
+    filing_statuses: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def subset(self, rows: slice) -> 'ConversionPlanInputs':
+        return ConversionPlanInputs(
+            user_ids=self.user_ids[rows],
+            incomes=self.incomes[rows],
+            ages=self.ages[rows],
+            retirement_ages=self.retirement_ages[rows],
+            traditional_balances=self.traditional_balances[rows],
+            filing_statuses=self.filing_statuses[rows]
+        )
+
+
+@dataclass
+class ConversionGrid:
+    """Scenario metrics with shape (users, years, amounts) unless noted"""
+    amounts: np.ndarray
+    base_income: np.ndarray          # (users, years)
+    marginal_rate: np.ndarray        # (users, years)
+    years_to_retirement: np.ndarray  # (users, years)
+    tax_cost: np.ndarray
+    future_tax_savings: np.ndarray
+    net_present_value: np.ndarray
+    break_even_years: np.ndarray
+    feasible: np.ndarray
+
+
+@dataclass
+class ConversionSchedule:
+    """Optimal schedule per user with shape (users, years) unless noted"""
+    user_ids: List[Any]
+    amounts: np.ndarray
+    tax_cost: np.ndarray
+    future_tax_savings: np.ndarray
+    net_present_value: np.ndarray
+    break_even_years: np.ndarray
+    marginal_rate: np.ndarray
+    total_net_present_value: np.ndarray  # (users,)
+
+    def user_rows(self) -> Dict[Any, int]:
+        return {user_id: row for row, user_id in enumerate(self.user_ids)}
+
+
+class BatchConversionPlanner:
+    """
+    Multi-user Roth conversion planner
+
+    Conversion amounts are a grid of multiples of ``amount_step``; every
+    (user, year, amount) cell is evaluated with array arithmetic, then a
+    backward DP over the remaining balance picks the schedule that maximizes
+    total NPV subject to the traditional balance.
+    """
+
+    def __init__(
+        self,
+        brackets: Dict[str, BracketSchedule],
+        default_filing_status: str = 'single',
+        income_growth_rate: float = 0.03,
+        market_growth_rate: float = 0.07,
+        discount_rate: float = 0.05,
+        retirement_tax_rate: float = 0.22,
+        amount_step: float = 5000.0,
+        max_annual_conversion: float = 200000.0,
+        max_break_even_years: int = 15,
+        rmd_factors: Optional[Dict[int, float]] = None,
+        rmd_age: int = 73,
+        rmd_growth_rate: float = 0.06,
+        chunk_size: int = 256
+    ):
+        """
+        Initialize planner
+
+        Args:
+            brackets: Filing status -> bracket schedule
+            default_filing_status: Schedule used for unknown filing statuses
+            income_growth_rate: Annual growth of non-conversion income
+            market_growth_rate: Growth of converted assets until retirement
+            discount_rate: NPV discount rate
+            retirement_tax_rate: Assumed tax rate avoided in retirement
+            amount_step: Conversion grid step (also the minimum conversion)
+            max_annual_conversion: Largest conversion considered in a year
+            max_break_even_years: Scenarios breaking even later are excluded
+            rmd_factors: Age -> Uniform Lifetime factor; enables RMD income
+            rmd_age: First age with a required distribution
+            rmd_growth_rate: Balance growth used for projected RMDs
+            chunk_size: Users per DP chunk (bounds memory)
+        """
+        if default_filing_status not in brackets:
+            raise ValueError(f"No bracket schedule for default filing status {default_filing_status}")
+        self.brackets = brackets
+        self.default_filing_status = default_filing_status
+        self.income_growth_rate = income_growth_rate
+        self.market_growth_rate = market_growth_rate
+        self.discount_rate = discount_rate
+        self.retirement_tax_rate = retirement_tax_rate
+        self.amount_step = amount_step
+        self.max_break_even_years = max_break_even_years
+        self.rmd_age = rmd_age
+        self.rmd_growth_rate = rmd_growth_rate
+        self.chunk_size = chunk_size
+
+        self.amount_steps = np.arange(int(max_annual_conversion // amount_step) + 1)
+        self.amounts = self.amount_steps * amount_step
+
+        self._rmd_factor_table = rmd_factor_table(rmd_factors, rmd_age) if rmd_factors else None
+
+    def tax(self, income: Any, filing_status: str) -> np.ndarray:
+        """Vectorized federal tax for one filing status"""
+        return self._schedule(filing_status).tax(income)
+
+    def _schedule(self, filing_status: Optional[str]) -> BracketSchedule:
+        return self.brackets.get(filing_status, self.brackets[self.default_filing_status])
+
+    def project_incomes(self, incomes: np.ndarray, n_years: int) -> np.ndarray:
+        """Non-conversion income by year, shape (users, years)"""
+        growth = (1.0 + self.income_growth_rate) ** np.arange(n_years)
+        return np.asarray(incomes, dtype=float)[:, None] * growth[None, :]
+
+    def evaluate_grid(self, inputs: ConversionPlanInputs, n_years: int) -> ConversionGrid:
+        """Evaluate every conversion amount in every year for every user"""
+        amounts = self.amounts
+        base_income = self.project_incomes(inputs.incomes, n_years)
+        if self._rmd_factor_table is not None:
+            base_income = base_income + project_rmds(
+                inputs.traditional_balances, inputs.ages, n_years,
+                self._rmd_factor_table, self.rmd_growth_rate
+            )
+
+        tax_cost = np.empty((len(inputs), n_years, len(amounts)))
+        marginal_rate = np.empty((len(inputs), n_years))
+        statuses = np.asarray(inputs.filing_statuses, dtype=object)
+        for status in set(statuses.tolist()):
+            rows = statuses == status
+            schedule = self._schedule(status)
+            income = base_income[rows]
+            tax_cost[rows] = schedule.tax(income[:, :, None] + amounts) - schedule.tax(income)[:, :, None]
+            marginal_rate[rows] = schedule.marginal_rate(income)
+
+        years_to_retirement = np.maximum(
+            1,
+            (np.asarray(inputs.retirement_ages) - np.asarray(inputs.ages))[:, None] - np.arange(n_years)[None, :]
+        )
+        growth = (1.0 + self.market_growth_rate) ** years_to_retirement
+        discount = (1.0 + self.discount_rate) ** years_to_retirement
+        future_tax_savings = amounts * growth[:, :, None] * self.retirement_tax_rate
+        net_present_value = future_tax_savings / discount[:, :, None] - tax_cost
+
+        annual_savings = amounts * self.market_growth_rate * self.retirement_tax_rate
+        with np.errstate(divide='ignore', invalid='ignore'):
+            break_even_years = np.where(annual_savings > 0, np.floor(tax_cost / annual_savings), 999)
+
+        feasible = (net_present_value > 0) & (break_even_years <= self.max_break_even_years)
+        feasible[:, :, 0] = True
+
+        return ConversionGrid(
+            amounts=amounts,
+            base_income=base_income,
+            marginal_rate=marginal_rate,
+            years_to_retirement=years_to_retirement,
+            tax_cost=tax_cost,
+            future_tax_savings=future_tax_savings,
+            net_present_value=net_present_value,
+            break_even_years=break_even_years,
+            feasible=feasible
+        )
+
+    def optimize_schedule(
+        self,
+        grid: ConversionGrid,
+        balances: np.ndarray
+    ) -> np.ndarray:
+        """
+        Choose one grid amount per year maximizing total NPV
+
+        State is the remaining balance in ``amount_step`` units, so the
+        schedule is exact for the grid (including the minimum conversion and
+        break-even cutoffs that make the problem non-convex).
+
+        Returns:
+            Amount indices into ``grid.amounts``, shape (users, years)
+        """
+        n_users, n_years, n_amounts = grid.net_present_value.shape
+        steps = self.amount_steps
+        start_state = np.minimum(
+            np.floor(np.asarray(balances, dtype=float) / self.amount_step).astype(int),
+            n_years * int(steps[-1])
+        )
+        n_states = int(start_state.max(initial=0)) + 1
+
+        value = np.where(grid.feasible, grid.net_present_value, -np.inf)
+        future = np.zeros((n_users, n_states))
+        policy = np.zeros((n_years, n_users, n_states), dtype=np.int16)
+
+        for year in range(n_years - 1, -1, -1):
+            candidates = np.full((n_users, n_states, n_amounts), -np.inf)
+            for k in range(n_amounts):
+                step = int(steps[k])
+                if step >= n_states:
+                    break
+                candidates[:, step:, k] = value[:, year, k][:, None] + future[:, :n_states - step]
+            policy[year] = np.argmax(candidates, axis=2)
+            future = np.take_along_axis(candidates, policy[year][:, :, None].astype(np.intp), axis=2)[:, :, 0]
+
+        chosen = np.zeros((n_users, n_years), dtype=int)
+        state = start_state.copy()
+        users = np.arange(n_users)
+        for year in range(n_years):
+            chosen[:, year] = policy[year][users, state]
+            state = state - steps[chosen[:, year]]
+        return chosen
+
+    def plan(self, inputs: ConversionPlanInputs, n_years: int = 5) -> ConversionSchedule:
+        """Evaluate and optimize conversion schedules for all users in chunks"""
+        parts = []
+        for start in range(0, len(inputs), self.chunk_size):
+            chunk = inputs.subset(slice(start, start + self.chunk_size))
+            grid = self.evaluate_grid(chunk, n_years)
+            chosen = self.optimize_schedule(grid, chunk.traditional_balances)
+            parts.append((grid, chosen))
+
+        def pick(attribute: str) -> np.ndarray:
+            if not parts:
+                return np.zeros((0, n_years))
+            return np.concatenate([
+                np.take_along_axis(getattr(grid, attribute), chosen[:, :, None], axis=2)[:, :, 0]
+                for grid, chosen in parts
+            ])
+
+        amounts = (
+            np.concatenate([self.amounts[chosen] for _, chosen in parts])
+            if parts else np.zeros((0, n_years))
+        )
+        net_present_value = np.where(amounts > 0, pick('net_present_value'), 0.0)
+        marginal_rate = (
+            np.concatenate([grid.marginal_rate for grid, _ in parts])
+            if parts else np.zeros((0, n_years))
+        )
+
+        logger.info(f"Planned Roth conversions for {len(inputs)} users over {n_years} years")
+
+        return ConversionSchedule(
+            user_ids=list(inputs.user_ids),
+            amounts=amounts,
+            tax_cost=pick('tax_cost'),
+            future_tax_savings=pick('future_tax_savings'),
+            net_present_value=net_present_value,
+            break_even_years=pick('break_even_years'),
+            marginal_rate=marginal_rate,
+            total_net_present_value=net_present_value.sum(axis=1)
+        )
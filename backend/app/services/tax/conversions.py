@@ -3,6 +3,7 @@ Roth Conversion Analysis and Strategy Engine
 
 Implements sophisticated Roth conversion strategies including:
 - Multi-year conversion planning
+- Batch planning across many users (see conversion_planner)
 - Tax bracket management
 - Market timing considerations
 - State tax implications
@@ -24,6 +25,11 @@ from ...models.tax_accounts import (
 )
 from ...models.user import User
 from ...models.financial_profile import FinancialProfile
+from .data_loader import TaxDataLoader, UserTaxData
+from .conversion_planner import (
+    BatchConversionPlanner, BracketSchedule, ConversionPlanInputs, ConversionSchedule
+)
+from .rmd_calculator import UNIFORM_LIFETIME_TABLE
 
 logger = logging.getLogger(__name__)
 
@@ -72,8 +78,21 @@ class RothConversionAnalyzer:
     Comprehensive Roth conversion analysis and optimization engine
     """
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, data_loader: Optional[TaxDataLoader] = None):
         self.db = db_session
+        self.data_loader = data_loader
+        
+        # Account types eligible as conversion source and destination
+        self.traditional_account_types = [
+            AccountTypeEnum.TRADITIONAL_401K,
+            AccountTypeEnum.TRADITIONAL_IRA,
+            AccountTypeEnum.SEP_IRA,
+            AccountTypeEnum.SIMPLE_IRA
+        ]
+        self.roth_account_types = [
+            AccountTypeEnum.ROTH_401K,
+            AccountTypeEnum.ROTH_IRA
+        ]
         
         # 2025 Tax Brackets (simplified - single filer)
         self.tax_brackets_single = [
@@ -106,11 +125,25 @@ class RothConversionAnalyzer:
             'medicare_surcharge_threshold': 200000  # IRMAA thresholds
         }
         
+        # Vectorized planner sharing the brackets and assumptions above
+        self.batch_planner = BatchConversionPlanner(
+            brackets={
+                'single': BracketSchedule.from_brackets(self.tax_brackets_single),
+                'married_jointly': BracketSchedule.from_brackets(self.tax_brackets_married)
+            },
+            market_growth_rate=self.standard_assumptions['market_growth_rate'],
+            discount_rate=self.standard_assumptions['discount_rate'],
+            retirement_tax_rate=self.standard_assumptions['tax_rate_in_retirement'],
+            rmd_factors=UNIFORM_LIFETIME_TABLE,
+            rmd_age=IRSLimits2025.RMD_AGE
+        )
+        
     async def analyze_conversion_opportunity(
         self,
         user_id: str,
         conversion_amount: Optional[Decimal] = None,
-        analysis_years: int = 5
+        analysis_years: int = 5,
+        tax_data: Optional[UserTaxData] = None
     ) -> MultiYearConversionPlan:
         """
         Comprehensive analysis of Roth conversion opportunities
@@ -118,9 +151,17 @@ class RothConversionAnalyzer:
         logger.info(f"Analyzing Roth conversion for user {user_id}")
         
         # Get user profile and accounts
-        user_profile = self._get_user_profile(user_id)
-        traditional_accounts = self._get_traditional_retirement_accounts(user_id)
-        roth_accounts = self._get_roth_accounts(user_id)
+        if tax_data is None and self.data_loader is not None:
+            tax_data = await self.data_loader.load_user(user_id)
+        
+        if tax_data is not None:
+            user_profile = tax_data.profile
+            traditional_accounts = tax_data.accounts_of_types(self.traditional_account_types)
+            roth_accounts = tax_data.accounts_of_types(self.roth_account_types)
+        else:
+            user_profile = self._get_user_profile(user_id)
+            traditional_accounts = self._get_traditional_retirement_accounts(user_id)
+            roth_accounts = self._get_roth_accounts(user_id)
         
         if not traditional_accounts:
             logger.warning(f"No traditional retirement accounts found for user {user_id}")
@@ -131,68 +172,179 @@ class RothConversionAnalyzer:
             account.current_balance for account in traditional_accounts
         )
         
-        # If no amount specified, analyze optimal amount
-        if not conversion_amount:
-            conversion_amount = await self._calculate_optimal_conversion_amount(
-                user_profile, total_traditional_balance
+        if conversion_amount:
+            # Fixed amount: analyze each year and pick the best years
+            conversion_scenarios = []
+            
+            for year in range(analysis_years):
+                scenario = await self._analyze_conversion_scenario(
+                    user_profile,
+                    conversion_amount,
+                    year,
+                    traditional_accounts,
+                    roth_accounts
+                )
+                
+                if scenario:
+                    conversion_scenarios.append(scenario)
+            
+            optimal_schedule = self._optimize_conversion_schedule(
+                conversion_scenarios,
+                total_traditional_balance,
+                user_profile
+            )
+        else:
+            # No amount specified: solve amounts and years jointly
+            inputs = self._build_planner_inputs([(user_id, user_profile, total_traditional_balance)])
+            schedule = self.batch_planner.plan(inputs, analysis_years)
+            optimal_schedule = self._scenarios_from_schedule(
+                schedule, 0, user_profile, total_traditional_balance
             )
         
-        # Analyze conversion scenarios for multiple years
-        conversion_scenarios = []
+        plan = self._build_conversion_plan(optimal_schedule, user_profile)
         
-        for year in range(analysis_years):
-            scenario = await self._analyze_conversion_scenario(
-                user_profile,
-                conversion_amount,
-                year,
-                traditional_accounts,
-                roth_accounts
-            )
+        # Store analysis results
+        await self._store_conversion_analysis(user_id, plan)
+        
+        logger.info(
+            f"Conversion analysis complete. Net benefit: ${plan.net_benefit}"
+        )
+        
+        return plan
+    
+    async def plan_conversions_batch(
+        self,
+        user_ids: List[str],
+        analysis_years: int = 5,
+        tax_data_by_user: Optional[Dict[str, UserTaxData]] = None
+    ) -> Dict[str, MultiYearConversionPlan]:
+        """
+        Plan Roth conversions for many users at once
+        
+        Every conversion amount x year x user scenario is evaluated in one
+        vectorized pass and each schedule is solved exactly; Decimals are
+        produced only for the returned plans. Plans are not stored.
+        
+        Args:
+            user_ids: Users to plan
+            analysis_years: Planning horizon in years
+            tax_data_by_user: Preloaded data (loaded in bulk when omitted)
             
-            if scenario:
-                conversion_scenarios.append(scenario)
+        Returns:
+            Plan per user id (empty plans for users without traditional balances)
+        """
+        if tax_data_by_user is None and self.data_loader is not None:
+            tax_data_by_user = await self.data_loader.load_users(user_ids)
+        
+        entries = []
+        for user_id in user_ids:
+            if tax_data_by_user is not None:
+                tax_data = tax_data_by_user[user_id]
+                user_profile = tax_data.profile
+                traditional_accounts = tax_data.accounts_of_types(self.traditional_account_types)
+            else:
+                user_profile = self._get_user_profile(user_id)
+                traditional_accounts = self._get_traditional_retirement_accounts(user_id)
+            
+            balance = sum(
+                (account.current_balance or Decimal('0') for account in traditional_accounts),
+                Decimal('0')
+            )
+            if user_profile is not None and balance > 0:
+                entries.append((user_id, user_profile, balance))
         
-        # Optimize conversion schedule
-        optimal_schedule = self._optimize_conversion_schedule(
-            conversion_scenarios,
-            total_traditional_balance,
-            user_profile
+        plans = {user_id: self._empty_conversion_plan() for user_id in user_ids}
+        if not entries:
+            return plans
+        
+        schedule = self.batch_planner.plan(self._build_planner_inputs(entries), analysis_years)
+        for row, (user_id, user_profile, balance) in enumerate(entries):
+            scenarios = self._scenarios_from_schedule(schedule, row, user_profile, balance)
+            if scenarios:
+                plans[user_id] = self._build_conversion_plan(scenarios, user_profile)
+        
+        logger.info(f"Batch conversion planning complete for {len(user_ids)} users")
+        
+        return plans
+    
+    def _build_planner_inputs(
+        self,
+        entries: List[Tuple[str, FinancialProfile, Decimal]]
+    ) -> ConversionPlanInputs:
+        """Columnar planner inputs from (user_id, profile, traditional balance)"""
+        return ConversionPlanInputs(
+            user_ids=[user_id for user_id, _, _ in entries],
+            incomes=np.array([float(p.annual_income or 0) for _, p, _ in entries], dtype=float),
+            ages=np.array([p.age for _, p, _ in entries], dtype=int),
+            retirement_ages=np.array([p.retirement_age for _, p, _ in entries], dtype=int),
+            traditional_balances=np.array([float(balance) for _, _, balance in entries], dtype=float),
+            filing_statuses=np.array([p.filing_status or 'single' for _, p, _ in entries], dtype=object)
         )
+    
+    def _scenarios_from_schedule(
+        self,
+        schedule: ConversionSchedule,
+        row: int,
+        user_profile: FinancialProfile,
+        traditional_balance: Decimal
+    ) -> List[ConversionScenario]:
+        """Convert one user's planned years into Decimal scenarios"""
+        
+        def to_decimal(value: float) -> Decimal:
+            return Decimal(str(round(float(value), 2)))
+        
+        scenarios = []
+        for year in np.flatnonzero(schedule.amounts[row] > 0):
+            conversion_amount = to_decimal(schedule.amounts[row, year])
+            tax_impact = to_decimal(schedule.tax_cost[row, year])
+            scenarios.append(ConversionScenario(
+                conversion_amount=conversion_amount,
+                conversion_year=int(year),
+                current_tax_impact=tax_impact,
+                future_tax_savings=to_decimal(schedule.future_tax_savings[row, year]),
+                net_present_value=to_decimal(schedule.net_present_value[row, year]),
+                break_even_years=int(schedule.break_even_years[row, year]),
+                marginal_tax_rate_at_conversion=float(schedule.marginal_rate[row, year]),
+                assumed_retirement_tax_rate=self.standard_assumptions['tax_rate_in_retirement'],
+                five_year_rule_date=date.today() + timedelta(days=365 * 5),
+                risk_factors=self._identify_conversion_risks(
+                    user_profile,
+                    conversion_amount,
+                    int(year),
+                    tax_impact,
+                    traditional_balance=traditional_balance
+                )
+            ))
+        return scenarios
+    
+    def _build_conversion_plan(
+        self,
+        optimal_schedule: List[ConversionScenario],
+        user_profile: FinancialProfile
+    ) -> MultiYearConversionPlan:
+        """Aggregate a conversion schedule into a plan"""
         
-        # Calculate total metrics
         total_tax_cost = sum(
-            scenario.current_tax_impact for scenario in optimal_schedule
+            (scenario.current_tax_impact for scenario in optimal_schedule), Decimal('0')
         )
         
         total_future_benefit = sum(
-            scenario.future_tax_savings for scenario in optimal_schedule
+            (scenario.future_tax_savings for scenario in optimal_schedule), Decimal('0')
         )
         
-        net_benefit = total_future_benefit - total_tax_cost
-        
-        # Generate contingency plans
-        contingency_plans = self._generate_contingency_plans(
-            optimal_schedule, user_profile
-        )
-        
-        plan = MultiYearConversionPlan(
-            total_amount_to_convert=sum(s.conversion_amount for s in optimal_schedule),
+        return MultiYearConversionPlan(
+            total_amount_to_convert=sum(
+                (s.conversion_amount for s in optimal_schedule), Decimal('0')
+            ),
             conversion_schedule=optimal_schedule,
             total_tax_cost=total_tax_cost,
             total_future_benefit=total_future_benefit,
-            net_benefit=net_benefit,
+            net_benefit=total_future_benefit - total_tax_cost,
             optimal_years=[s.conversion_year for s in optimal_schedule],
-            contingency_plans=contingency_plans
-        )
-        
-        # Store analysis results
-        await self._store_conversion_analysis(user_id, plan)
-        
-        logger.info(
-            f"Conversion analysis complete. Net benefit: ${net_benefit}"
+            contingency_plans=self._generate_contingency_plans(
+                optimal_schedule, user_profile
+            )
         )
-        
-        return plan
     
     def _get_user_profile(self, user_id: str) -> FinancialProfile:
         """Get user's financial profile"""
@@ -204,12 +356,7 @@ class RothConversionAnalyzer:
         """Get traditional retirement accounts eligible for conversion"""
         return self.db.query(TaxAccount).filter(
             TaxAccount.user_id == user_id,
-            TaxAccount.account_type.in_([
-                AccountTypeEnum.TRADITIONAL_401K,
-                AccountTypeEnum.TRADITIONAL_IRA,
-                AccountTypeEnum.SEP_IRA,
-                AccountTypeEnum.SIMPLE_IRA
-            ]),
+            TaxAccount.account_type.in_(self.traditional_account_types),
             TaxAccount.is_active == True
         ).all()
     
@@ -217,51 +364,10 @@ class RothConversionAnalyzer:
         """Get Roth accounts for conversion destination"""
         return self.db.query(TaxAccount).filter(
             TaxAccount.user_id == user_id,
-            TaxAccount.account_type.in_([
-                AccountTypeEnum.ROTH_401K,
-                AccountTypeEnum.ROTH_IRA
-            ]),
+            TaxAccount.account_type.in_(self.roth_account_types),
             TaxAccount.is_active == True
         ).all()
     
-    async def _calculate_optimal_conversion_amount(
-        self,
-        user_profile: FinancialProfile,
-        available_balance: Decimal
-    ) -> Decimal:
-        """Calculate optimal conversion amount to stay within tax bracket"""
-        
-        current_income = user_profile.annual_income or Decimal('0')
-        filing_status = user_profile.filing_status or 'single'
-        
-        # Get tax brackets
-        if filing_status == 'married_jointly':
-            brackets = self.tax_brackets_married
-        else:
-            brackets = self.tax_brackets_single
-        
-        # Find current tax bracket
-        current_bracket = None
-        for bracket in brackets:
-            if bracket.min_income <= current_income <= bracket.max_income:
-                current_bracket = bracket
-                break
-        
-        if not current_bracket:
-            return Decimal('0')
-        
-        # Calculate space remaining in current bracket
-        remaining_bracket_space = current_bracket.max_income - current_income
-        
-        # Convert up to bracket limit, but not more than available
-        optimal_amount = min(remaining_bracket_space, available_balance)
-        
-        # Don't convert less than $5,000 (not worth the complexity)
-        if optimal_amount < Decimal('5000'):
-            return Decimal('0')
-        
-        return optimal_amount
-    
     async def _analyze_conversion_scenario(
         self,
         user_profile: FinancialProfile,
@@ -321,7 +427,10 @@ class RothConversionAnalyzer:
             user_profile,
             conversion_amount,
             conversion_year,
-            tax_impact
+            tax_impact,
+            traditional_balance=sum(
+                acc.current_balance or Decimal('0') for acc in traditional_accounts
+            )
         )
         
         # Only recommend if NPV is positive and reasonable break-even
@@ -441,7 +550,8 @@ class RothConversionAnalyzer:
         user_profile: FinancialProfile,
         conversion_amount: Decimal,
         conversion_year: int,
-        tax_impact: Decimal
+        tax_impact: Decimal,
+        traditional_balance: Optional[Decimal] = None
     ) -> List[str]:
         """Identify potential risks with conversion"""
         
@@ -465,9 +575,10 @@ class RothConversionAnalyzer:
             risks.append("Short time horizon may not justify conversion cost")
         
         # Large conversion relative to balance
-        traditional_balance = sum(
-            acc.current_balance for acc in self._get_traditional_retirement_accounts(user_profile.user_id)
-        )
+        if traditional_balance is None:
+            traditional_balance = sum(
+                acc.current_balance for acc in self._get_traditional_retirement_accounts(user_profile.user_id)
+            )
         
         if conversion_amount > traditional_balance * Decimal('0.5'):
             risks.append("Converting large portion of traditional balance")
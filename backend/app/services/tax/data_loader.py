@@ -0,0 +1,350 @@
+"""
+Async Tax Data Loader
+
+Shared, set-based data access for the tax engines:
+- Profile, accounts, holdings and a bounded transaction window per user
+- One query per table for a whole batch of users
+- Compact numpy arrays alongside ORM objects for vectorized analysis
+- Keyset-paginated iteration over all users for nightly scans
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Iterable, AsyncIterator, Any, Set
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from collections import defaultdict
+import logging
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ...models.tax_accounts import (
+    TaxAccount, TaxAccountHolding, TaxAccountTransaction,
+    AccountTypeEnum, TaxTreatmentEnum
+)
+from ...models.financial_profile import FinancialProfile
+
+logger = logging.getLogger(__name__)
+
+
+TRANSACTION_COLUMNS = (
+    TaxAccountTransaction.id,
+    TaxAccountTransaction.account_id,
+    TaxAccountTransaction.holding_id,
+    TaxAccountTransaction.transaction_type,
+    TaxAccountTransaction.symbol,
+    TaxAccountTransaction.shares,
+    TaxAccountTransaction.price_per_share,
+    TaxAccountTransaction.total_amount,
+    TaxAccountTransaction.transaction_date,
+    TaxAccount.user_id,
+)
+
+
+@dataclass
+class HoldingArrays:
+    """Columnar view of a user's holdings (row i matches holdings[i])"""
+    symbols: np.ndarray
+    account_ids: np.ndarray
+    shares: np.ndarray
+    cost_basis_per_share: np.ndarray
+    current_price: np.ndarray
+    market_value: np.ndarray
+    acquired_dates: np.ndarray
+    taxable: np.ndarray
+
+    @classmethod
+    def from_holdings(
+        cls,
+        holdings: List[TaxAccountHolding],
+        taxable_account_ids: Set[Any]
+    ) -> 'HoldingArrays':
+        return cls(
+            symbols=np.array([h.symbol for h in holdings], dtype=object),
+            account_ids=np.array([h.account_id for h in holdings], dtype=object),
+            shares=np.array([float(h.shares or 0) for h in holdings], dtype=float),
+            cost_basis_per_share=np.array([float(h.cost_basis_per_share or 0) for h in holdings], dtype=float),
+            current_price=np.array([float(h.current_price or 0) for h in holdings], dtype=float),
+            market_value=np.array([float(h.market_value or 0) for h in holdings], dtype=float),
+            acquired_dates=np.array([h.acquired_date for h in holdings], dtype='datetime64[D]'),
+            taxable=np.array([h.account_id in taxable_account_ids for h in holdings], dtype=bool),
+        )
+
+
+@dataclass
+class TransactionArrays:
+    """Columnar view of a user's transaction window, sorted by date"""
+    symbols: np.ndarray
+    transaction_types: np.ndarray
+    dates: np.ndarray
+    shares: np.ndarray
+    amounts: np.ndarray
+    account_ids: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: List[Any]) -> 'TransactionArrays':
+        return cls(
+            symbols=np.array([r.symbol for r in rows], dtype=object),
+            transaction_types=np.array([r.transaction_type for r in rows], dtype=object),
+            dates=np.array([r.transaction_date for r in rows], dtype='datetime64[s]'),
+            shares=np.array([float(r.shares or 0) for r in rows], dtype=float),
+            amounts=np.array([float(r.total_amount or 0) for r in rows], dtype=float),
+            account_ids=np.array([r.account_id for r in rows], dtype=object),
+        )
+
+
+@dataclass
+class UserTaxData:
+    """Everything the tax engines need for one user, loaded in bulk"""
+    user_id: Any
+    profile: Optional[FinancialProfile]
+    accounts: List[TaxAccount]
+    holdings: List[TaxAccountHolding]
+    transactions: List[Any]
+    transaction_window_start: datetime
+    _holding_arrays: Optional[HoldingArrays] = field(default=None, repr=False)
+    _transaction_arrays: Optional[TransactionArrays] = field(default=None, repr=False)
+
+    @property
+    def taxable_account_ids(self) -> Set[Any]:
+        return {
+            a.id for a in self.accounts
+            if a.tax_treatment == TaxTreatmentEnum.TAXABLE and a.is_active
+        }
+
+    @property
+    def holding_arrays(self) -> HoldingArrays:
+        if self._holding_arrays is None:
+            self._holding_arrays = HoldingArrays.from_holdings(self.holdings, self.taxable_account_ids)
+        return self._holding_arrays
+
+    @property
+    def transaction_arrays(self) -> TransactionArrays:
+        if self._transaction_arrays is None:
+            self._transaction_arrays = TransactionArrays.from_rows(self.transactions)
+        return self._transaction_arrays
+
+    def active_accounts(self) -> List[TaxAccount]:
+        return [a for a in self.accounts if a.is_active]
+
+    def accounts_of_types(
+        self,
+        account_types: Iterable[AccountTypeEnum],
+        positive_balance: bool = False
+    ) -> List[TaxAccount]:
+        """Active accounts of the given types"""
+        wanted = set(account_types)
+        return [
+            a for a in self.accounts
+            if a.is_active and a.account_type in wanted
+            and (not positive_balance or (a.current_balance or 0) > 0)
+        ]
+
+    def active_holdings(self) -> List[TaxAccountHolding]:
+        active_ids = {a.id for a in self.accounts if a.is_active}
+        return [h for h in self.holdings if h.account_id in active_ids]
+
+    def taxable_holdings(self, positive_shares: bool = False) -> List[TaxAccountHolding]:
+        """Holdings in active taxable accounts"""
+        taxable_ids = self.taxable_account_ids
+        return [
+            h for h in self.holdings
+            if h.account_id in taxable_ids and (not positive_shares or (h.shares or 0) > 0)
+        ]
+
+    def transactions_since(self, start: datetime) -> List[Any]:
+        """Transactions on or after ``start`` (must be inside the loaded window)"""
+        if start < self.transaction_window_start:
+            logger.warning(
+                f"Requested transactions since {start} but window starts at "
+                f"{self.transaction_window_start}"
+            )
+        return [t for t in self.transactions if t.transaction_date >= start]
+
+
+class TaxDataLoader:
+    """
+    Async bulk loader for tax engine inputs
+
+    Four set-based queries (profiles, accounts, holdings, transactions) load
+    any number of users, so the event loop is never blocked by sync ORM calls
+    and per-user round trips disappear.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        transaction_window_days: int = 90,
+        batch_size: int = 500
+    ):
+        """
+        Initialize loader
+
+        Args:
+            session_factory: Async session maker (see app.database.base)
+            transaction_window_days: Default transaction lookback window
+            batch_size: Users per batch when iterating over the whole book
+        """
+        self.session_factory = session_factory
+        self.transaction_window_days = transaction_window_days
+        self.batch_size = batch_size
+
+    async def load_user(
+        self,
+        user_id: Any,
+        transaction_window_days: Optional[int] = None,
+        as_of: Optional[datetime] = None
+    ) -> UserTaxData:
+        """Load tax data for a single user"""
+        results = await self.load_users([user_id], transaction_window_days, as_of)
+        return results[user_id]
+
+    async def load_users(
+        self,
+        user_ids: List[Any],
+        transaction_window_days: Optional[int] = None,
+        as_of: Optional[datetime] = None
+    ) -> Dict[Any, UserTaxData]:
+        """
+        Load tax data for a batch of users in four queries
+
+        Args:
+            user_ids: Users to load
+            transaction_window_days: Lookback (and lookforward, when ``as_of``
+                is in the past) window for transactions
+            as_of: Reference date for the window (default: now)
+
+        Returns:
+            UserTaxData keyed by user id (every requested id is present)
+        """
+        window_days = transaction_window_days or self.transaction_window_days
+        as_of = as_of or datetime.utcnow()
+        window_start = as_of - timedelta(days=window_days)
+        window_end = as_of + timedelta(days=window_days)
+
+        async with self.session_factory() as session:
+            profiles = await self._load_profiles(session, user_ids)
+            accounts = await self._load_accounts(session, user_ids)
+            account_owner = {a.id: a.user_id for a in accounts}
+            holdings = await self._load_holdings(session, list(account_owner))
+            transactions = await self._load_transactions(session, user_ids, window_start, window_end)
+
+        accounts_by_user = defaultdict(list)
+        for account in accounts:
+            accounts_by_user[account.user_id].append(account)
+
+        holdings_by_user = defaultdict(list)
+        for holding in holdings:
+            holdings_by_user[account_owner[holding.account_id]].append(holding)
+
+        transactions_by_user = defaultdict(list)
+        for row in transactions:
+            transactions_by_user[row.user_id].append(row)
+
+        return {
+            user_id: UserTaxData(
+                user_id=user_id,
+                profile=profiles.get(user_id),
+                accounts=accounts_by_user.get(user_id, []),
+                holdings=holdings_by_user.get(user_id, []),
+                transactions=transactions_by_user.get(user_id, []),
+                transaction_window_start=window_start
+            )
+            for user_id in user_ids
+        }
+
+    async def iter_user_batches(
+        self,
+        taxable_only: bool = True,
+        transaction_window_days: Optional[int] = None,
+        as_of: Optional[datetime] = None
+    ) -> AsyncIterator[Dict[Any, UserTaxData]]:
+        """
+        Iterate over every user with active tax accounts in batches
+
+        Uses keyset pagination on user id, so a nightly harvesting scan holds
+        at most ``batch_size`` users in memory.
+        """
+        last_user_id = None
+        while True:
+            async with self.session_factory() as session:
+                user_ids = await self._load_user_id_page(session, taxable_only, last_user_id)
+
+            if not user_ids:
+                return
+
+            yield await self.load_users(user_ids, transaction_window_days, as_of)
+            last_user_id = user_ids[-1]
+
+    async def _load_user_id_page(
+        self,
+        session: AsyncSession,
+        taxable_only: bool,
+        last_user_id: Optional[Any]
+    ) -> List[Any]:
+        query = (
+            select(TaxAccount.user_id)
+            .where(TaxAccount.is_active == True)
+            .distinct()
+            .order_by(TaxAccount.user_id)
+            .limit(self.batch_size)
+        )
+        if taxable_only:
+            query = query.where(TaxAccount.tax_treatment == TaxTreatmentEnum.TAXABLE)
+        if last_user_id is not None:
+            query = query.where(TaxAccount.user_id > last_user_id)
+        return list((await session.execute(query)).scalars().all())
+
+    async def _load_profiles(
+        self,
+        session: AsyncSession,
+        user_ids: List[Any]
+    ) -> Dict[Any, FinancialProfile]:
+        result = await session.execute(
+            select(FinancialProfile).where(FinancialProfile.user_id.in_(user_ids))
+        )
+        return {profile.user_id: profile for profile in result.scalars().all()}
+
+    async def _load_accounts(
+        self,
+        session: AsyncSession,
+        user_ids: List[Any]
+    ) -> List[TaxAccount]:
+        result = await session.execute(
+            select(TaxAccount).where(TaxAccount.user_id.in_(user_ids))
+        )
+        return list(result.scalars().all())
+
+    async def _load_holdings(
+        self,
+        session: AsyncSession,
+        account_ids: List[Any]
+    ) -> List[TaxAccountHolding]:
+        if not account_ids:
+            return []
+        result = await session.execute(
+            select(TaxAccountHolding)
+            .where(TaxAccountHolding.account_id.in_(account_ids))
+            .order_by(TaxAccountHolding.market_value.desc())
+        )
+        return list(result.scalars().all())
+
+    async def _load_transactions(
+        self,
+        session: AsyncSession,
+        user_ids: List[Any],
+        window_start: datetime,
+        window_end: datetime
+    ) -> List[Any]:
+        # Column rows rather than ORM entities: attribute access matches the
+        # fields the engines read, without identity-map overhead
+        result = await session.execute(
+            select(*TRANSACTION_COLUMNS)
+            .join(TaxAccount, TaxAccount.id == TaxAccountTransaction.account_id)
+            .where(
+                TaxAccount.user_id.in_(user_ids),
+                TaxAccountTransaction.transaction_date >= window_start,
+                TaxAccountTransaction.transaction_date <= window_end
+            )
+            .order_by(TaxAccountTransaction.transaction_date)
+        )
+        return list(result.all())
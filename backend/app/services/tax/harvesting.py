@@ -2,7 +2,7 @@
 Tax-Loss Harvesting Engine with Wash Sale Compliance
 
 Implements sophisticated tax-loss harvesting strategies including:
-- Wash sale rule compliance (30-day rule)
+- Wash sale rule compliance (30 days before and after the sale)
 - Substitute security selection
 - Gain/loss optimization
 - Tax lot management
@@ -16,7 +16,7 @@ from decimal import Decimal
 from datetime import datetime, date, timedelta
 import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, select, insert, update
 
 from ...models.tax_accounts import (
     TaxAccount, TaxAccountHolding, TaxAccountTransaction, 
@@ -24,6 +24,10 @@ from ...models.tax_accounts import (
 )
 from ...models.user import User
 from ...models.financial_profile import FinancialProfile
+from .data_loader import TaxDataLoader, UserTaxData
+from .wash_sale_index import (
+    WashSaleIndex, identical_symbol_map, normalize_transaction_type, PURCHASE_TRANSACTION_TYPES
+)
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +52,16 @@ class WashSaleRule:
     lookback_days: int = 30
     lookforward_days: int = 30
     substantially_identical_threshold: float = 0.95  # Correlation threshold
+    identical_symbols: Dict[str, List[str]] = field(default_factory=identical_symbol_map)
+    
+    def build_index(self, transactions: List[TaxAccountTransaction]) -> WashSaleIndex:
+        """Build a purchase-date index for batch checks over many holdings"""
+        return WashSaleIndex(
+            transactions,
+            identical_symbols=self.identical_symbols,
+            lookback_days=self.lookback_days,
+            lookforward_days=self.lookforward_days
+        )
     
     def is_wash_sale_safe(
         self,
@@ -55,16 +69,22 @@ class WashSaleRule:
         sell_date: datetime,
         transactions: List[TaxAccountTransaction]
     ) -> bool:
-        """Check if selling is safe from wash sale rules"""
+        """Check if selling is safe from wash sale rules
         
-        # Check lookback period
-        lookback_start = sell_date - timedelta(days=self.lookback_days)
+        Single-holding check; use build_index for many holdings.
+        """
+        
+        # Purchases of the symbol or a substantially identical security
+        # within 30 days before or after the sale
+        window_start = sell_date - timedelta(days=self.lookback_days)
+        window_end = sell_date + timedelta(days=self.lookforward_days)
+        related = {symbol, *self.identical_symbols.get(symbol, [])}
         
         recent_purchases = [
             txn for txn in transactions
-            if (txn.symbol == symbol and 
-                txn.transaction_type == 'buy' and
-                lookback_start <= txn.transaction_date <= sell_date)
+            if (txn.symbol in related and 
+                normalize_transaction_type(txn.transaction_type) in PURCHASE_TRANSACTION_TYPES and
+                window_start <= txn.transaction_date <= window_end)
         ]
         
         return len(recent_purchases) == 0
@@ -101,8 +121,9 @@ class TaxLossHarvestingEngine:
     Advanced tax-loss harvesting engine with wash sale compliance
     """
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, data_loader: Optional[TaxDataLoader] = None):
         self.db = db_session
+        self.data_loader = data_loader
         self.wash_sale_rule = WashSaleRule()
         
         # Security replacement database (simplified - would be more extensive)
@@ -143,17 +164,34 @@ class TaxLossHarvestingEngine:
         self,
         user_id: str,
         current_market_prices: Dict[str, float],
-        tax_situation: Optional[Dict] = None
+        tax_situation: Optional[Dict] = None,
+        tax_data: Optional[UserTaxData] = None,
+        store: bool = True
     ) -> HarvestingStrategy:
         """
         Comprehensive analysis of tax-loss harvesting opportunities
+        
+        ``tax_data`` may be supplied from a TaxDataLoader batch (e.g. the
+        nightly scan); otherwise it is loaded asynchronously when a loader is
+        configured, falling back to the synchronous session. Callers that
+        persist opportunities for a whole batch pass ``store=False``.
         """
         logger.info(f"Analyzing harvesting opportunities for user {user_id}")
         
+        if tax_data is None and self.data_loader is not None:
+            tax_data = await self.data_loader.load_user(user_id)
+        
         # Get user's taxable holdings and transaction history
-        taxable_holdings = self._get_taxable_holdings(user_id)
-        transaction_history = self._get_transaction_history(user_id)
-        user_profile = self._get_user_profile(user_id)
+        if tax_data is not None:
+            taxable_holdings = tax_data.taxable_holdings()
+            transaction_history = tax_data.transactions_since(
+                datetime.utcnow() - timedelta(days=60)
+            )
+            user_profile = tax_data.profile
+        else:
+            taxable_holdings = self._get_taxable_holdings(user_id)
+            transaction_history = self._get_transaction_history(user_id)
+            user_profile = self._get_user_profile(user_id)
         
         if not taxable_holdings:
             logger.warning(f"No taxable holdings found for user {user_id}")
@@ -162,6 +200,12 @@ class TaxLossHarvestingEngine:
         # Get existing tax loss carryforwards
         carryforward_losses = self._get_tax_loss_carryforwards(user_id)
         
+        # Wash sale checks for all holdings from one index built per user
+        sell_date = datetime.utcnow()
+        wash_sale_checks = self.wash_sale_rule.build_index(transaction_history).check_batch(
+            (holding.symbol for holding in taxable_holdings), sell_date
+        )
+        
         # Analyze each holding for harvesting potential
         opportunities = []
         
@@ -174,7 +218,8 @@ class TaxLossHarvestingEngine:
                 holding,
                 current_market_prices[holding.symbol],
                 transaction_history,
-                user_profile
+                user_profile,
+                wash_sale_safe=wash_sale_checks[holding.symbol].is_safe
             )
             
             if opportunity:
@@ -215,7 +260,8 @@ class TaxLossHarvestingEngine:
         )
         
         # Store opportunities in database
-        await self._store_harvesting_opportunities(user_id, opportunities)
+        if store:
+            await self._store_harvesting_opportunities(user_id, opportunities)
         
         logger.info(
             f"Found {len(opportunities)} opportunities with total benefit ${total_tax_benefit}"
@@ -268,7 +314,8 @@ class TaxLossHarvestingEngine:
         holding: TaxAccountHolding,
         current_price: float,
         transaction_history: List[TaxAccountTransaction],
-        user_profile: FinancialProfile
+        user_profile: FinancialProfile,
+        wash_sale_safe: Optional[bool] = None
     ) -> Optional[HarvestingOpportunity]:
         """Analyze a single holding for harvesting potential"""
         
@@ -285,12 +332,13 @@ class TaxLossHarvestingEngine:
         if current_market_value < self.min_position_size:
             return None
         
-        # Check wash sale rule compliance
-        wash_sale_safe = self.wash_sale_rule.is_wash_sale_safe(
-            holding.symbol,
-            datetime.utcnow(),
-            transaction_history
-        )
+        # Check wash sale rule compliance (precomputed in batch by the caller)
+        if wash_sale_safe is None:
+            wash_sale_safe = self.wash_sale_rule.is_wash_sale_safe(
+                holding.symbol,
+                datetime.utcnow(),
+                transaction_history
+            )
         
         # Calculate tax benefit
         tax_benefit = self._calculate_tax_benefit(
@@ -662,6 +710,10 @@ class TaxLossHarvestingEngine:
     ) -> None:
         """Store opportunities in database for tracking"""
         
+        if self.data_loader is not None:
+            await self._save_opportunities({user_id: opportunities})
+            return
+        
         for opp in opportunities:
             # Check if opportunity already exists
             existing = self.db.query(TaxLossHarvestingOpportunity).filter(
@@ -672,38 +724,94 @@ class TaxLossHarvestingEngine:
             
             if existing:
                 # Update existing opportunity
-                existing.unrealized_loss = opp.unrealized_loss
-                existing.tax_benefit = opp.tax_benefit
-                existing.wash_sale_safe = opp.wash_sale_safe
+                for column, value in self._opportunity_values(opp).items():
+                    setattr(existing, column, value)
                 existing.updated_at = datetime.utcnow()
-                
-                if opp.optimal_replacement:
-                    existing.replacement_symbol = opp.optimal_replacement.symbol
-                    existing.replacement_name = opp.optimal_replacement.name
-                    existing.correlation_score = opp.optimal_replacement.correlation_with_market
             else:
                 # Create new opportunity record
-                new_opp = TaxLossHarvestingOpportunity(
-                    user_id=user_id,
-                    holding_id=opp.holding.id,
-                    symbol=opp.holding.symbol,
-                    current_price=Decimal(str(opp.holding.current_price or 0)),
-                    cost_basis=opp.holding.cost_basis_per_share or Decimal('0'),
-                    unrealized_loss=opp.unrealized_loss,
-                    tax_benefit=opp.tax_benefit,
-                    wash_sale_safe=opp.wash_sale_safe,
-                    priority_score=float(opp.confidence_score) * 100,
-                    status='identified'
-                )
-                
-                if opp.optimal_replacement:
-                    new_opp.replacement_symbol = opp.optimal_replacement.symbol
-                    new_opp.replacement_name = opp.optimal_replacement.name
-                    new_opp.correlation_score = opp.optimal_replacement.correlation_with_market
-                
-                self.db.add(new_opp)
+                self.db.add(TaxLossHarvestingOpportunity(
+                    **self._new_opportunity_values(user_id, opp)
+                ))
         
-        await self.db.commit()
+        self.db.commit()
+    
+    async def _save_opportunities(
+        self,
+        opportunities_by_user: Dict[str, List[HarvestingOpportunity]]
+    ) -> None:
+        """
+        Persist opportunities for a batch of users through the async loader session
+        
+        One query finds the open ('identified') rows for the batch's holdings;
+        those are updated and the rest inserted, each as a single bulk
+        statement in one transaction.
+        """
+        pending = [
+            (user_id, opp)
+            for user_id, opportunities in opportunities_by_user.items()
+            for opp in opportunities
+        ]
+        if not pending:
+            return
+        
+        async with self.data_loader.session_factory() as session:
+            result = await session.execute(
+                select(
+                    TaxLossHarvestingOpportunity.id,
+                    TaxLossHarvestingOpportunity.user_id,
+                    TaxLossHarvestingOpportunity.holding_id
+                ).where(
+                    TaxLossHarvestingOpportunity.user_id.in_(list(opportunities_by_user)),
+                    TaxLossHarvestingOpportunity.holding_id.in_([opp.holding.id for _, opp in pending]),
+                    TaxLossHarvestingOpportunity.status == 'identified'
+                )
+            )
+            existing = {(str(row.user_id), str(row.holding_id)): row.id for row in result.all()}
+            
+            now = datetime.utcnow()
+            updates = []
+            inserts = []
+            for user_id, opp in pending:
+                existing_id = existing.get((str(user_id), str(opp.holding.id)))
+                if existing_id is not None:
+                    updates.append({'id': existing_id, 'updated_at': now, **self._opportunity_values(opp)})
+                else:
+                    inserts.append(self._new_opportunity_values(user_id, opp))
+            
+            if updates:
+                await session.execute(update(TaxLossHarvestingOpportunity), updates)
+            if inserts:
+                await session.execute(insert(TaxLossHarvestingOpportunity), inserts)
+            await session.commit()
+    
+    def _opportunity_values(self, opp: HarvestingOpportunity) -> Dict:
+        """Columns refreshed on every scan of an open opportunity"""
+        values = {
+            'unrealized_loss': opp.unrealized_loss,
+            'tax_benefit': opp.tax_benefit,
+            'wash_sale_safe': opp.wash_sale_safe
+        }
+        if opp.optimal_replacement:
+            values['replacement_symbol'] = opp.optimal_replacement.symbol
+            values['replacement_name'] = opp.optimal_replacement.name
+            values['correlation_score'] = opp.optimal_replacement.correlation_with_market
+        return values
+    
+    def _new_opportunity_values(self, user_id: str, opp: HarvestingOpportunity) -> Dict:
+        """Columns for a newly identified opportunity"""
+        return {
+            'user_id': user_id,
+            'holding_id': opp.holding.id,
+            'symbol': opp.holding.symbol,
+            'current_price': Decimal(str(opp.holding.current_price or 0)),
+            'cost_basis': opp.holding.cost_basis_per_share or Decimal('0'),
+            'priority_score': float(opp.confidence_score) * 100,
+            'status': 'identified',
+            'replacement_symbol': None,
+            'replacement_name': None,
+            'correlation_score': None,
+            **self._opportunity_values(opp)
+        }
     
     def _empty_strategy(self) -> HarvestingStrategy:
         """Return empty strategy when no opportunities found"""
@@ -717,6 +825,57 @@ class TaxLossHarvestingEngine:
             monitoring_schedule=[]
         )
     
+    async def run_nightly_scan(
+        self,
+        current_market_prices: Dict[str, float]
+    ) -> Dict[str, Union[int, Decimal]]:
+        """
+        Scan every client with taxable accounts for harvesting opportunities
+        
+        Users are loaded in batches through the async TaxDataLoader, so each
+        batch costs four queries regardless of its size, and the batch's
+        opportunities are persisted together after it is analyzed.
+        """
+        if self.data_loader is None:
+            raise ValueError("Nightly scan requires a TaxDataLoader")
+        
+        users_scanned = 0
+        users_with_opportunities = 0
+        total_tax_benefit = Decimal('0')
+        
+        async for batch in self.data_loader.iter_user_batches(taxable_only=True):
+            batch_opportunities = {}
+            for user_id, tax_data in batch.items():
+                users_scanned += 1
+                try:
+                    strategy = await self.analyze_harvesting_opportunities(
+                        str(user_id),
+                        current_market_prices,
+                        tax_data=tax_data,
+                        store=False
+                    )
+                except Exception as e:
+                    logger.error(f"Nightly harvesting scan failed for user {user_id}: {e}")
+                    continue
+                
+                if strategy.opportunities:
+                    users_with_opportunities += 1
+                    total_tax_benefit += strategy.total_tax_benefit
+                    batch_opportunities[user_id] = strategy.opportunities
+            
+            await self._save_opportunities(batch_opportunities)
+        
+        logger.info(
+            f"Nightly harvesting scan: {users_scanned} users, "
+            f"{users_with_opportunities} with opportunities, benefit ${total_tax_benefit}"
+        )
+        
+        return {
+            'users_scanned': users_scanned,
+            'users_with_opportunities': users_with_opportunities,
+            'total_tax_benefit': total_tax_benefit
+        }
+    
     async def execute_harvesting_opportunity(
         self,
         opportunity_id: str,
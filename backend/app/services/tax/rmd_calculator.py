@@ -6,6 +6,7 @@ Implements comprehensive RMD planning including:
 - Joint life expectancy tables for spousal beneficiaries
 - Inherited IRA RMD rules (SECURE Act)
 - Multi-year RMD projections
+- Vectorized projections across many users
 - Tax optimization strategies
 """
 
@@ -25,10 +26,26 @@ from ...models.tax_accounts import (
 )
 from ...models.user import User
 from ...models.financial_profile import FinancialProfile
+from .data_loader import TaxDataLoader, UserTaxData
+from .conversion_planner import rmd_factor_table, project_rmds
 
 logger = logging.getLogger(__name__)
 
 
+# IRS Uniform Lifetime Table (2022+ version)
+UNIFORM_LIFETIME_TABLE = {
+    72: 27.4, 73: 26.5, 74: 25.5, 75: 24.6, 76: 23.7, 77: 22.9,
+    78: 22.0, 79: 21.1, 80: 20.2, 81: 19.4, 82: 18.5, 83: 17.7,
+    84: 16.8, 85: 16.0, 86: 15.2, 87: 14.4, 88: 13.7, 89: 12.9,
+    90: 12.2, 91: 11.5, 92: 10.8, 93: 10.1, 94: 9.5, 95: 8.9,
+    96: 8.4, 97: 7.8, 98: 7.3, 99: 6.8, 100: 6.4, 101: 6.0,
+    102: 5.6, 103: 5.2, 104: 4.9, 105: 4.6, 106: 4.3, 107: 4.1,
+    108: 3.9, 109: 3.7, 110: 3.5, 111: 3.4, 112: 3.3, 113: 3.1,
+    114: 3.0, 115: 2.9, 116: 2.8, 117: 2.7, 118: 2.5, 119: 2.3,
+    120: 2.0
+}
+
+
 @dataclass
 class LifeExpectancyFactor:
     """Life expectancy factor for RMD calculations"""
@@ -73,22 +90,13 @@ class RMDCalculatorService:
     Comprehensive RMD calculation and planning service
     """
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, data_loader: Optional[TaxDataLoader] = None):
         self.db = db_session
+        self.data_loader = data_loader
         self.tax_utils = TaxCalculationUtils()
         
         # IRS Uniform Lifetime Table (2022+ version)
-        self.uniform_lifetime_table = {
-            72: 27.4, 73: 26.5, 74: 25.5, 75: 24.6, 76: 23.7, 77: 22.9,
-            78: 22.0, 79: 21.1, 80: 20.2, 81: 19.4, 82: 18.5, 83: 17.7,
-            84: 16.8, 85: 16.0, 86: 15.2, 87: 14.4, 88: 13.7, 89: 12.9,
-            90: 12.2, 91: 11.5, 92: 10.8, 93: 10.1, 94: 9.5, 95: 8.9,
-            96: 8.4, 97: 7.8, 98: 7.3, 99: 6.8, 100: 6.4, 101: 6.0,
-            102: 5.6, 103: 5.2, 104: 4.9, 105: 4.6, 106: 4.3, 107: 4.1,
-            108: 3.9, 109: 3.7, 110: 3.5, 111: 3.4, 112: 3.3, 113: 3.1,
-            114: 3.0, 115: 2.9, 116: 2.8, 117: 2.7, 118: 2.5, 119: 2.3,
-            120: 2.0
-        }
+        self.uniform_lifetime_table = UNIFORM_LIFETIME_TABLE
         
         # Joint Life Expectancy Table (for spouse 10+ years younger)
         # Simplified version - full table would have all age combinations
@@ -122,7 +130,8 @@ class RMDCalculatorService:
     async def calculate_current_year_rmds(
         self,
         user_id: str,
-        calculation_year: Optional[int] = None
+        calculation_year: Optional[int] = None,
+        tax_data: Optional[UserTaxData] = None
     ) -> AggregatedRMDPlan:
         """
         Calculate RMDs for current or specified year
@@ -133,8 +142,7 @@ class RMDCalculatorService:
         logger.info(f"Calculating RMDs for user {user_id}, year {calculation_year}")
         
         # Get user profile and eligible accounts
-        user_profile = self._get_user_profile(user_id)
-        rmd_accounts = self._get_rmd_eligible_accounts(user_id)
+        user_profile, rmd_accounts = await self._load_profile_and_accounts(user_id, tax_data)
         
         if not rmd_accounts:
             logger.info(f"No RMD-eligible accounts found for user {user_id}")
@@ -209,6 +217,22 @@ class RMDCalculatorService:
         
         return plan
     
+    async def _load_profile_and_accounts(
+        self,
+        user_id: str,
+        tax_data: Optional[UserTaxData] = None
+    ) -> Tuple[FinancialProfile, List[TaxAccount]]:
+        """Profile and RMD-eligible accounts, via the async loader when available"""
+        if tax_data is None and self.data_loader is not None:
+            tax_data = await self.data_loader.load_user(user_id)
+        
+        if tax_data is not None:
+            return (
+                tax_data.profile,
+                tax_data.accounts_of_types(self.rmd_account_types, positive_balance=True)
+            )
+        return self._get_user_profile(user_id), self._get_rmd_eligible_accounts(user_id)
+    
     def _get_user_profile(self, user_id: str) -> FinancialProfile:
         """Get user's financial profile"""
         return self.db.query(FinancialProfile).filter(
@@ -617,12 +641,12 @@ class RMDCalculatorService:
     async def project_future_rmds(
         self,
         user_id: str,
-        projection_years: int = 10
+        projection_years: int = 10,
+        tax_data: Optional[UserTaxData] = None
     ) -> List[AggregatedRMDPlan]:
         """Project RMDs for multiple future years"""
         
-        user_profile = self._get_user_profile(user_id)
-        rmd_accounts = self._get_rmd_eligible_accounts(user_id)
+        user_profile, rmd_accounts = await self._load_profile_and_accounts(user_id, tax_data)
         
         projections = []
         current_year = datetime.now().year
@@ -648,24 +672,70 @@ class RMDCalculatorService:
                     projection_year,
                     user_age,
                     projected_balances,
-                    rmd_accounts
+                    rmd_accounts,
+                    user_profile
                 )
                 
                 projections.append(plan)
         
         return projections
     
+    async def project_rmd_totals_batch(
+        self,
+        user_ids: List[str],
+        projection_years: int = 10,
+        tax_data_by_user: Optional[Dict[str, UserTaxData]] = None
+    ) -> Dict[str, Dict[int, Decimal]]:
+        """
+        Project total RMDs per year for many users in one array pass
+        
+        Same growth model as project_future_rmds, using the Uniform Lifetime
+        Table for every user; years below RMD age are omitted.
+        
+        Returns:
+            Projection year -> total RMD, per user id
+        """
+        if tax_data_by_user is None and self.data_loader is not None:
+            tax_data_by_user = await self.data_loader.load_users(user_ids)
+        
+        ages = []
+        balances = []
+        for user_id in user_ids:
+            user_profile, rmd_accounts = await self._load_profile_and_accounts(
+                user_id, tax_data_by_user[user_id] if tax_data_by_user is not None else None
+            )
+            ages.append(user_profile.age if user_profile is not None else 0)
+            balances.append(sum(float(account.current_balance or 0) for account in rmd_accounts))
+        
+        rmds = project_rmds(
+            np.array(balances, dtype=float),
+            np.array(ages, dtype=int),
+            projection_years,
+            rmd_factor_table(self.uniform_lifetime_table, IRSLimits2025.RMD_AGE)
+        )
+        
+        current_year = datetime.now().year
+        return {
+            user_id: {
+                current_year + offset: Decimal(str(round(float(rmds[row, offset]), 2)))
+                for offset in range(projection_years)
+                if ages[row] + offset >= IRSLimits2025.RMD_AGE
+            }
+            for row, user_id in enumerate(user_ids)
+        }
+    
     async def _calculate_projected_year_rmds(
         self,
         user_id: str,
         projection_year: int,
         user_age: int,
         projected_balances: Dict[str, Decimal],
-        accounts: List[TaxAccount]
+        accounts: List[TaxAccount],
+        user_profile: Optional[FinancialProfile] = None
     ) -> AggregatedRMDPlan:
         """Calculate RMDs for a projected future year"""
         
-        user_profile = self._get_user_profile(user_id)
+        user_profile = user_profile or self._get_user_profile(user_id)
         account_rmds = []
         
         for account in accounts:
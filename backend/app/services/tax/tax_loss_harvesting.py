@@ -29,6 +29,8 @@ from ...models.tax_accounts import (
 )
 from ...models.user import User
 from ...models.financial_profile import FinancialProfile
+from .data_loader import TaxDataLoader, UserTaxData
+from .wash_sale_index import WashSaleIndex, SUBSTANTIALLY_IDENTICAL_GROUPS, identical_symbol_map
 
 logger = logging.getLogger(__name__)
 
@@ -109,8 +111,9 @@ class AdvancedTaxLossHarvestingEngine:
     and comprehensive wash sale compliance
     """
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, data_loader: Optional[TaxDataLoader] = None):
         self.db = db_session
+        self.data_loader = data_loader
         
         # Advanced wash sale parameters
         self.wash_sale_lookback_days = 30
@@ -222,22 +225,42 @@ class AdvancedTaxLossHarvestingEngine:
         user_id: str,
         strategy: HarvestingStrategy = HarvestingStrategy.BALANCED,
         risk_tolerance: RiskTolerance = RiskTolerance.MEDIUM,
-        current_market_prices: Optional[Dict[str, float]] = None
+        current_market_prices: Optional[Dict[str, float]] = None,
+        tax_data: Optional[UserTaxData] = None
     ) -> HarvestingPlan:
         """
         Perform comprehensive analysis of tax-loss harvesting opportunities
+        
+        ``tax_data`` may be supplied from a TaxDataLoader batch; otherwise it is
+        loaded asynchronously when a loader is configured.
         """
         logger.info(f"Analyzing comprehensive harvesting opportunities for user {user_id}")
         
         try:
+            if tax_data is None and self.data_loader is not None:
+                tax_data = await self.data_loader.load_user(user_id)
+            
             # Get user data
-            user_profile = await self._get_user_profile(user_id)
+            if tax_data is not None:
+                user_profile = tax_data.profile
+            else:
+                user_profile = await self._get_user_profile(user_id)
             if not user_profile:
                 raise ValueError(f"User profile not found for user {user_id}")
             
             # Get taxable holdings and transaction history
-            holdings = await self._get_taxable_holdings(user_id)
-            transactions = await self._get_transaction_history(user_id)
+            if tax_data is not None:
+                holdings = sorted(
+                    tax_data.taxable_holdings(positive_shares=True),
+                    key=lambda h: h.market_value or 0,
+                    reverse=True
+                )
+                transactions = list(reversed(tax_data.transactions_since(
+                    datetime.utcnow() - timedelta(days=90)
+                )))
+            else:
+                holdings = await self._get_taxable_holdings(user_id)
+                transactions = await self._get_transaction_history(user_id)
             
             if not holdings:
                 logger.warning(f"No taxable holdings found for user {user_id}")
@@ -247,12 +270,16 @@ class AdvancedTaxLossHarvestingEngine:
             if current_market_prices:
                 await self._update_holding_prices(holdings, current_market_prices)
             
+            # One purchase-date index per user serves every holding's wash sale check
+            wash_sale_index = self._build_wash_sale_index(transactions)
+            
             # Analyze each holding for tax-loss opportunities
             all_opportunities = []
             
             for holding in holdings:
                 opportunities = await self._analyze_holding_comprehensive(
-                    holding, transactions, user_profile, strategy, risk_tolerance
+                    holding, transactions, user_profile, strategy, risk_tolerance,
+                    wash_sale_index=wash_sale_index
                 )
                 all_opportunities.extend(opportunities)
             
@@ -361,7 +388,8 @@ class AdvancedTaxLossHarvestingEngine:
         transactions: List[TaxAccountTransaction],
         user_profile: FinancialProfile,
         strategy: HarvestingStrategy,
-        risk_tolerance: RiskTolerance
+        risk_tolerance: RiskTolerance,
+        wash_sale_index: Optional[WashSaleIndex] = None
     ) -> List[TaxLotOpportunity]:
         """Comprehensive analysis of individual holding for tax-loss harvesting"""
         
@@ -373,7 +401,8 @@ class AdvancedTaxLossHarvestingEngine:
         # Analyze each tax lot separately
         for lot in tax_lots:
             opportunity = await self._analyze_tax_lot(
-                lot, holding, transactions, user_profile, strategy, risk_tolerance
+                lot, holding, transactions, user_profile, strategy, risk_tolerance,
+                wash_sale_index=wash_sale_index
             )
             if opportunity:
                 opportunities.append(opportunity)
@@ -408,7 +437,8 @@ class AdvancedTaxLossHarvestingEngine:
         transactions: List[TaxAccountTransaction],
         user_profile: FinancialProfile,
         strategy: HarvestingStrategy,
-        risk_tolerance: RiskTolerance
+        risk_tolerance: RiskTolerance,
+        wash_sale_index: Optional[WashSaleIndex] = None
     ) -> Optional[TaxLotOpportunity]:
         """Analyze individual tax lot for harvesting opportunity"""
         
@@ -429,7 +459,8 @@ class AdvancedTaxLossHarvestingEngine:
         
         # Perform wash sale analysis
         wash_sale_analysis = await self._perform_wash_sale_analysis(
-            holding.symbol, transactions, purchase_date
+            holding.symbol, transactions, purchase_date,
+            wash_sale_index=wash_sale_index
         )
         
         # Calculate tax benefit
@@ -465,39 +496,44 @@ class AdvancedTaxLossHarvestingEngine:
         self,
         symbol: str,
         transactions: List[TaxAccountTransaction],
-        purchase_date: date
+        purchase_date: date,
+        wash_sale_index: Optional[WashSaleIndex] = None
     ) -> WashSaleAnalysis:
-        """Perform comprehensive wash sale rule analysis"""
+        """Perform comprehensive wash sale rule analysis
         
-        current_date = datetime.utcnow().date()
+        Covers purchases of the symbol and substantially identical securities
+        from 30 days before through 30 days after today. ``wash_sale_index``
+        must be built from ``transactions``; it is built on demand otherwise.
+        """
         
-        # Check for purchases in the wash sale window
-        related_purchases = []
+        now = datetime.utcnow()
+        current_date = now.date()
         
-        # Look back 30 days from today
-        lookback_start = current_date - timedelta(days=self.wash_sale_lookback_days)
+        if wash_sale_index is None:
+            wash_sale_index = self._build_wash_sale_index(transactions)
+        check = wash_sale_index.check(symbol, now)
         
-        for transaction in transactions:
-            if (transaction.symbol == symbol and 
-                transaction.transaction_type == 'buy' and
-                transaction.transaction_date.date() >= lookback_start):
-                
-                related_purchases.append({
-                    'date': transaction.transaction_date.date(),
-                    'shares': transaction.shares,
-                    'price': transaction.price_per_share,
-                    'days_ago': (current_date - transaction.transaction_date.date()).days
-                })
+        # Purchases in the wash sale window
+        related_purchases = []
+        for position in check.purchase_indices:
+            transaction = transactions[position]
+            related_purchases.append({
+                'symbol': transaction.symbol,
+                'date': transaction.transaction_date.date(),
+                'shares': transaction.shares,
+                'price': transaction.price_per_share,
+                'days_ago': (current_date - transaction.transaction_date.date()).days
+            })
         
         # Determine if sale is safe
-        is_safe = len(related_purchases) == 0
+        is_safe = check.is_safe
         
         # Calculate risk score
         if related_purchases:
-            most_recent_purchase = min(p['days_ago'] for p in related_purchases)
-            risk_score = max(0.0, 1.0 - (most_recent_purchase / self.wash_sale_lookback_days))
-            days_until_safe = max(0, self.wash_sale_lookback_days + 1 - most_recent_purchase)
-            safe_date = current_date + timedelta(days=days_until_safe)
+            most_recent_purchase = max(0, min(p['days_ago'] for p in related_purchases))
+            risk_score = min(1.0, max(0.0, 1.0 - (most_recent_purchase / self.wash_sale_lookback_days)))
+            safe_date = check.safe_date
+            days_until_safe = max(0, (safe_date - current_date).days)
         else:
             risk_score = 0.0
             days_until_safe = None
@@ -516,19 +552,36 @@ class AdvancedTaxLossHarvestingEngine:
             safe_date=safe_date
         )
     
+    def _build_wash_sale_index(self, transactions: List[TaxAccountTransaction]) -> WashSaleIndex:
+        """Index a user's purchases once for all wash sale checks"""
+        return WashSaleIndex(
+            transactions,
+            identical_symbols=self._identical_symbol_map(),
+            lookback_days=self.wash_sale_lookback_days,
+            lookforward_days=self.wash_sale_lookforward_days
+        )
+    
+    def _identical_symbol_map(self) -> Dict[str, List[str]]:
+        """Default identical groups plus substitutes correlated above the threshold"""
+        groups = list(SUBSTANTIALLY_IDENTICAL_GROUPS)
+        for symbol in self.substitute_universe:
+            groups.extend(
+                {symbol, substitute}
+                for substitute in self._substantially_identical_substitutes(symbol)
+            )
+        return identical_symbol_map(groups)
+    
+    def _substantially_identical_substitutes(self, symbol: str) -> List[str]:
+        """Substitutes correlated closely enough to be substantially identical"""
+        return [
+            substitute['symbol']
+            for substitute in self.substitute_universe.get(symbol, [])
+            if substitute['correlation'] >= self.substantially_identical_threshold
+        ]
+    
     async def _find_substantially_identical_securities(self, symbol: str) -> List[str]:
         """Find substantially identical securities that could trigger wash sale"""
-        
-        # Get potential substitutes
-        substitutes = self.substitute_universe.get(symbol, [])
-        
-        # Filter by correlation threshold for substantially identical determination
-        substantially_identical = []
-        for substitute in substitutes:
-            if substitute['correlation'] >= self.substantially_identical_threshold:
-                substantially_identical.append(substitute['symbol'])
-        
-        return substantially_identical
+        return self._substantially_identical_substitutes(symbol)
     
     async def _calculate_tax_benefit(
         self,
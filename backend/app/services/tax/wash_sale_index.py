@@ -0,0 +1,230 @@
+"""
+Wash Sale Index
+
+Indexed wash sale detection for tax-loss harvesting:
+- Per-symbol sorted purchase-date arrays, built once per user
+- Substantially identical securities checked alongside the sold symbol
+- Full 61-day window (30 days before through 30 days after the sale)
+- Batch checks for all holdings via binary search
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Iterable, Sequence, Any, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime, date, timedelta
+from collections import defaultdict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Funds tracking the same index and share classes of the same issuer
+SUBSTANTIALLY_IDENTICAL_GROUPS = [
+    {'SPY', 'VOO', 'IVV', 'SPLG'},        # S&P 500
+    {'QQQ', 'QQQM'},                      # Nasdaq-100
+    {'IWM', 'VTWO'},                      # Russell 2000
+    {'GOOGL', 'GOOG'},                    # Alphabet share classes
+    {'BRK.A', 'BRK.B'},                   # Berkshire share classes
+]
+
+PURCHASE_TRANSACTION_TYPES = ('buy', 'reinvest', 'dividend_reinvestment')
+
+
+def normalize_transaction_type(transaction_type: Any) -> str:
+    """Lowercase, whitespace-stripped transaction type (enum members use their value)"""
+    return str(getattr(transaction_type, 'value', transaction_type) or '').strip().lower()
+
+
+def identical_symbol_map(
+    groups: Iterable[Iterable[str]] = SUBSTANTIALLY_IDENTICAL_GROUPS
+) -> Dict[str, List[str]]:
+    """Expand substantially identical groups into a symbol -> others mapping"""
+    mapping: Dict[str, set] = defaultdict(set)
+    for group in groups:
+        members = set(group)
+        for symbol in members:
+            mapping[symbol].update(members - {symbol})
+    return {symbol: sorted(others) for symbol, others in mapping.items()}
+
+
+def _to_seconds(value: Any) -> int:
+    """Convert date/datetime/datetime64 to epoch seconds"""
+    if isinstance(value, datetime):
+        value = value.replace(tzinfo=None)
+    return int(np.datetime64(value, 's').astype(np.int64))
+
+
+@dataclass
+class WashSaleCheck:
+    """Wash sale result for one symbol and sale date"""
+    symbol: str
+    sell_date: datetime
+    is_safe: bool
+    conflicting_symbols: List[str] = field(default_factory=list)
+    purchase_indices: List[int] = field(default_factory=list)
+    most_recent_purchase: Optional[datetime] = None
+    last_purchase_in_window: Optional[datetime] = None
+
+    @property
+    def safe_date(self) -> Optional[date]:
+        """First date a sale clears every conflicting purchase in the window"""
+        if self.last_purchase_in_window is None:
+            return None
+        return (self.last_purchase_in_window + timedelta(days=31)).date()
+
+
+class WashSaleIndex:
+    """
+    Sorted purchase-date index for wash sale checks
+
+    Built once per user from their transaction window; each check is a pair
+    of binary searches per related symbol instead of a transaction scan.
+    """
+
+    def __init__(
+        self,
+        transactions: Sequence[Any] = (),
+        identical_symbols: Optional[Dict[str, Iterable[str]]] = None,
+        lookback_days: int = 30,
+        lookforward_days: int = 30,
+        purchase_types: Iterable[str] = PURCHASE_TRANSACTION_TYPES
+    ):
+        """
+        Build index
+
+        Args:
+            transactions: Objects with symbol, transaction_type and
+                transaction_date attributes (ORM rows or loader rows)
+            identical_symbols: Symbol -> substantially identical symbols
+                (defaults to SUBSTANTIALLY_IDENTICAL_GROUPS)
+            lookback_days: Days before the sale that count
+            lookforward_days: Days after the sale that count
+            purchase_types: Transaction types treated as acquisitions
+        """
+        self.lookback_seconds = lookback_days * 86400
+        self.lookforward_seconds = lookforward_days * 86400
+        self.purchase_types = {normalize_transaction_type(t) for t in purchase_types}
+        self.identical_symbols = {
+            symbol: list(others)
+            for symbol, others in (
+                identical_symbols if identical_symbols is not None else identical_symbol_map()
+            ).items()
+        }
+
+        buckets: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for position, txn in enumerate(transactions):
+            if txn.symbol and normalize_transaction_type(txn.transaction_type) in self.purchase_types:
+                buckets[txn.symbol].append((_to_seconds(txn.transaction_date), position))
+
+        self._dates: Dict[str, np.ndarray] = {}
+        self._positions: Dict[str, np.ndarray] = {}
+        for symbol, entries in buckets.items():
+            entries.sort()
+            self._dates[symbol] = np.fromiter((e[0] for e in entries), dtype=np.int64, count=len(entries))
+            self._positions[symbol] = np.fromiter((e[1] for e in entries), dtype=np.int64, count=len(entries))
+
+    @classmethod
+    def from_transaction_arrays(
+        cls,
+        arrays: Any,
+        identical_symbols: Optional[Dict[str, Iterable[str]]] = None,
+        lookback_days: int = 30,
+        lookforward_days: int = 30,
+        purchase_types: Iterable[str] = PURCHASE_TRANSACTION_TYPES
+    ) -> 'WashSaleIndex':
+        """Build from TaxDataLoader TransactionArrays without per-row objects"""
+        index = cls(
+            (),
+            identical_symbols=identical_symbols,
+            lookback_days=lookback_days,
+            lookforward_days=lookforward_days,
+            purchase_types=purchase_types
+        )
+        if len(arrays.symbols) == 0:
+            return index
+
+        types = np.char.lower(np.char.strip(arrays.transaction_types.astype(str)))
+        is_purchase = np.isin(types, list(index.purchase_types)) & np.not_equal(arrays.symbols, None)
+        positions = np.flatnonzero(is_purchase)
+        symbols = arrays.symbols[positions].astype(str)
+        seconds = arrays.dates[positions].astype('datetime64[s]').astype(np.int64)
+
+        order = np.lexsort((seconds, symbols))
+        symbols, seconds, positions = symbols[order], seconds[order], positions[order]
+        unique_symbols, starts = np.unique(symbols, return_index=True)
+        bounds = list(starts) + [len(symbols)]
+        for i, symbol in enumerate(unique_symbols):
+            index._dates[symbol] = seconds[bounds[i]:bounds[i + 1]]
+            index._positions[symbol] = positions[bounds[i]:bounds[i + 1]]
+        return index
+
+    def related_symbols(self, symbol: str) -> List[str]:
+        """The symbol itself plus its substantially identical securities"""
+        return [symbol] + self.identical_symbols.get(symbol, [])
+
+    def check(self, symbol: str, sell_date: Any) -> WashSaleCheck:
+        """Check a single prospective sale"""
+        return self._check(symbol, sell_date, _to_seconds(sell_date))
+
+    def is_wash_sale_safe(self, symbol: str, sell_date: Any) -> bool:
+        return self.check(symbol, sell_date).is_safe
+
+    def check_batch(
+        self,
+        symbols: Iterable[str],
+        sell_date: Any
+    ) -> Dict[str, WashSaleCheck]:
+        """Check many symbols for the same sale date (one result per unique symbol)"""
+        sell_seconds = _to_seconds(sell_date)
+        return {
+            symbol: self._check(symbol, sell_date, sell_seconds)
+            for symbol in dict.fromkeys(symbols)
+        }
+
+    def safe_mask(self, symbols: Sequence[str], sell_date: Any) -> np.ndarray:
+        """Boolean array aligned with ``symbols``: True where the sale is wash-sale safe"""
+        results = self.check_batch(symbols, sell_date)
+        return np.array([results[s].is_safe for s in symbols], dtype=bool)
+
+    def _check(self, symbol: str, sell_date: Any, sell_seconds: int) -> WashSaleCheck:
+        window_start = sell_seconds - self.lookback_seconds
+        window_end = sell_seconds + self.lookforward_seconds
+
+        conflicting_symbols = []
+        purchase_indices: List[int] = []
+        most_recent = None
+        last_in_window = None
+
+        for related in self.related_symbols(symbol):
+            dates = self._dates.get(related)
+            if dates is None:
+                continue
+            lo = int(np.searchsorted(dates, window_start, side='left'))
+            hi = int(np.searchsorted(dates, window_end, side='right'))
+            if lo == hi:
+                continue
+
+            conflicting_symbols.append(related)
+            purchase_indices.extend(self._positions[related][lo:hi].tolist())
+
+            last_in_window = max(last_in_window or dates[hi - 1], dates[hi - 1])
+            # Most recent purchase on or before the sale date
+            before = int(np.searchsorted(dates, sell_seconds, side='right'))
+            if before > lo:
+                most_recent = max(most_recent or dates[before - 1], dates[before - 1])
+
+        return WashSaleCheck(
+            symbol=symbol,
+            sell_date=sell_date,
+            is_safe=not conflicting_symbols,
+            conflicting_symbols=conflicting_symbols,
+            purchase_indices=sorted(purchase_indices),
+            most_recent_purchase=self._from_seconds(most_recent),
+            last_purchase_in_window=self._from_seconds(last_in_window)
+        )
+
+    @staticmethod
+    def _from_seconds(seconds: Optional[int]) -> Optional[datetime]:
+        if seconds is None:
+            return None
+        return datetime.utcfromtimestamp(int(seconds))
@@ -2,6 +2,7 @@
 Transaction import service for parsing broker CSV files
 """
 from .csv_parser import CSVParser, BrokerFormat
+from .csv_stream import StreamingCSVReader, iter_upload
 from .transaction_processor import TransactionProcessor
 
-__all__ = ["CSVParser", "BrokerFormat", "TransactionProcessor"]
\ No newline at end of file
+__all__ = ["CSVParser", "BrokerFormat", "StreamingCSVReader", "iter_upload", "TransactionProcessor"]
@@ -6,10 +6,12 @@ import io
 from decimal import Decimal
 from datetime import datetime
 from enum import Enum
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional
 from dataclasses import dataclass
 import logging
 
+from .csv_stream import StreamingCSVReader
+
 logger = logging.getLogger(__name__)
 
 
@@ -101,205 +103,256 @@ class CSVParser:
         "Amount": "amount"
     }
     
+    # Header columns that identify each format, checked in this order
+    FORMAT_SIGNATURES = [
+        (BrokerFormat.FIDELITY, {"Run Date", "Action", "Amount"}),
+        (BrokerFormat.VANGUARD, {"Trade Date", "Transaction Type", "Net Amount"}),
+        (BrokerFormat.SCHWAB, {"Date", "Action", "Fees & Comm"}),
+        (BrokerFormat.GENERIC, {"Date", "Type", "Amount"}),
+    ]
+    
+    # Parse errors kept for reporting; further errors are only counted
+    MAX_ERRORS = 1000
+    
     def __init__(self):
         self.errors: List[str] = []
+        self.error_count = 0
+        self.rows_read = 0
+        self.broker_format: Optional[BrokerFormat] = None
+        self._reader: Optional[StreamingCSVReader] = None
+        self._row_parsers = {
+            BrokerFormat.FIDELITY: self._parse_fidelity_row,
+            BrokerFormat.VANGUARD: self._parse_vanguard_row,
+            BrokerFormat.SCHWAB: self._parse_schwab_row,
+            BrokerFormat.GENERIC: self._parse_generic_row,
+        }
         
     def parse(self, csv_content: str, broker_format: BrokerFormat) -> List[ParsedTransaction]:
         """Parse CSV content based on broker format"""
-        self.errors = []
+        self._reset()
+        row_parser = self._row_parser(broker_format)
+        self.broker_format = broker_format
         
-        if broker_format == BrokerFormat.FIDELITY:
-            return self._parse_fidelity(csv_content)
-        elif broker_format == BrokerFormat.VANGUARD:
-            return self._parse_vanguard(csv_content)
-        elif broker_format == BrokerFormat.SCHWAB:
-            return self._parse_schwab(csv_content)
-        elif broker_format == BrokerFormat.GENERIC:
-            return self._parse_generic(csv_content)
-        else:
-            raise ValueError(f"Unsupported broker format: {broker_format}")
-    
-    def _parse_fidelity(self, csv_content: str) -> List[ParsedTransaction]:
-        """Parse Fidelity CSV format"""
         transactions = []
         reader = csv.DictReader(io.StringIO(csv_content))
-        
         for row_num, row in enumerate(reader, start=2):
-            try:
-                # Skip header rows and empty rows
-                if not row.get("Amount") or row.get("Amount") == "Pending":
-                    continue
-                
-                action = row.get("Action", "").upper()
-                tx_type = self._map_fidelity_action(action)
-                
-                if tx_type is None:
-                    continue
-                
-                # Parse date
-                date_str = row.get("Settlement Date") or row.get("Run Date")
-                tx_date = datetime.strptime(date_str, "%m/%d/%Y")
-                
-                # Parse amounts
-                amount = self._parse_decimal(row.get("Amount", "0"))
-                quantity = self._parse_decimal(row.get("Quantity")) if row.get("Quantity") else None
-                price = self._parse_decimal(row.get("Price")) if row.get("Price") else None
-                fees = self._parse_decimal(row.get("Fees", "0")) + self._parse_decimal(row.get("Commission", "0"))
-                
-                transaction = ParsedTransaction(
-                    date=tx_date,
-                    type=tx_type,
-                    symbol=row.get("Symbol") if row.get("Symbol") and row.get("Symbol") != "N/A" else None,
-                    quantity=quantity,
-                    price=price,
-                    amount=amount,
-                    fees=fees,
-                    description=row.get("Security Description", ""),
-                    account_number=row.get("Account")
-                )
-                
+            transaction = self._parse_row(row_parser, row_num, row)
+            if transaction is not None:
                 transactions.append(transaction)
-                
-            except Exception as e:
-                self.errors.append(f"Row {row_num}: {str(e)}")
-                logger.warning(f"Failed to parse row {row_num}: {e}")
         
         return transactions
     
-    def _parse_vanguard(self, csv_content: str) -> List[ParsedTransaction]:
-        """Parse Vanguard CSV format"""
-        transactions = []
-        reader = csv.DictReader(io.StringIO(csv_content))
+    async def parse_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        broker_format: Optional[BrokerFormat] = None,
+        batch_size: int = 1000,
+        encoding: str = "utf-8"
+    ) -> AsyncIterator[List[ParsedTransaction]]:
+        """
+        Parse an async byte stream incrementally, yielding batches of at most
+        ``batch_size`` transactions.
         
-        for row_num, row in enumerate(reader, start=2):
-            try:
-                tx_type_str = row.get("Transaction Type", "").upper()
-                tx_type = self._map_vanguard_type(tx_type_str)
-                
-                if tx_type is None:
-                    continue
-                
-                # Parse date
-                date_str = row.get("Trade Date") or row.get("Settlement Date")
-                tx_date = datetime.strptime(date_str, "%m/%d/%Y")
-                
-                # Parse amounts
-                amount = self._parse_decimal(row.get("Net Amount", "0"))
-                shares = self._parse_decimal(row.get("Shares")) if row.get("Shares") else None
-                price = self._parse_decimal(row.get("Share Price")) if row.get("Share Price") else None
-                fees = self._parse_decimal(row.get("Commission Fees", "0"))
-                
-                transaction = ParsedTransaction(
-                    date=tx_date,
-                    type=tx_type,
-                    symbol=row.get("Symbol") if row.get("Symbol") else None,
-                    quantity=shares,
-                    price=price,
-                    amount=amount,
-                    fees=fees,
-                    description=row.get("Transaction Description", ""),
-                    account_number=row.get("Account Number")
-                )
-                
-                transactions.append(transaction)
-                
-            except Exception as e:
+        The broker format is detected from the header when not given. Memory
+        use is bounded by the chunk and batch sizes, not the file size;
+        ``bytes_read`` and ``rows_read`` report progress.
+        """
+        self._reset()
+        self._reader = StreamingCSVReader(stream, encoding=encoding)
+        
+        header = await self._reader.read_header()
+        if broker_format is None:
+            broker_format = self.detect_format(header)
+            if broker_format is None:
+                raise ValueError("Unable to detect broker format from CSV header")
+        row_parser = self._row_parser(broker_format)
+        self.broker_format = broker_format
+        
+        batch: List[ParsedTransaction] = []
+        async for row_num, row in self._reader.rows():
+            transaction = self._parse_row(row_parser, row_num, row)
+            if transaction is None:
+                continue
+            batch.append(transaction)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    @property
+    def bytes_read(self) -> int:
+        """Bytes consumed by the current stream parse"""
+        return self._reader.bytes_read if self._reader else 0
+    
+    def detect_format(self, header: List[str]) -> Optional[BrokerFormat]:
+        """Detect the broker format from CSV header columns"""
+        columns = {column.strip() for column in header}
+        for broker_format, signature in self.FORMAT_SIGNATURES:
+            if signature <= columns:
+                logger.info(f"Detected {broker_format.value} CSV format")
+                return broker_format
+        return None
+    
+    def _reset(self):
+        self.errors = []
+        self.error_count = 0
+        self.rows_read = 0
+        self.broker_format = None
+        self._reader = None
+    
+    def _row_parser(self, broker_format: BrokerFormat) -> Callable[[Dict[str, Any]], Optional[ParsedTransaction]]:
+        row_parser = self._row_parsers.get(broker_format)
+        if row_parser is None:
+            raise ValueError(f"Unsupported broker format: {broker_format}")
+        return row_parser
+    
+    def _parse_row(
+        self,
+        row_parser: Callable[[Dict[str, Any]], Optional[ParsedTransaction]],
+        row_num: int,
+        row: Dict[str, Any]
+    ) -> Optional[ParsedTransaction]:
+        """Parse one row, recording an error instead of raising"""
+        self.rows_read += 1
+        try:
+            return row_parser(row)
+        except Exception as e:
+            self.error_count += 1
+            if len(self.errors) < self.MAX_ERRORS:
                 self.errors.append(f"Row {row_num}: {str(e)}")
-                logger.warning(f"Failed to parse row {row_num}: {e}")
+            logger.warning(f"Failed to parse row {row_num}: {e}")
+            return None
+    
+    def _parse_fidelity_row(self, row: Dict[str, Any]) -> Optional[ParsedTransaction]:
+        """Parse a Fidelity CSV row"""
+        # Skip header rows and empty rows
+        if not row.get("Amount") or row.get("Amount") == "Pending":
+            return None
         
-        return transactions
+        action = row.get("Action", "").upper()
+        tx_type = self._map_fidelity_action(action)
+        
+        if tx_type is None:
+            return None
+        
+        # Parse date
+        date_str = row.get("Settlement Date") or row.get("Run Date")
+        tx_date = datetime.strptime(date_str, "%m/%d/%Y")
+        
+        # Parse amounts
+        amount = self._parse_decimal(row.get("Amount", "0"))
+        quantity = self._parse_decimal(row.get("Quantity")) if row.get("Quantity") else None
+        price = self._parse_decimal(row.get("Price")) if row.get("Price") else None
+        fees = self._parse_decimal(row.get("Fees", "0")) + self._parse_decimal(row.get("Commission", "0"))
+        
+        return ParsedTransaction(
+            date=tx_date,
+            type=tx_type,
+            symbol=row.get("Symbol") if row.get("Symbol") and row.get("Symbol") != "N/A" else None,
+            quantity=quantity,
+            price=price,
+            amount=amount,
+            fees=fees,
+            description=row.get("Security Description", ""),
+            account_number=row.get("Account")
+        )
     
-    def _parse_schwab(self, csv_content: str) -> List[ParsedTransaction]:
-        """Parse Schwab CSV format"""
-        transactions = []
-        reader = csv.DictReader(io.StringIO(csv_content))
+    def _parse_vanguard_row(self, row: Dict[str, Any]) -> Optional[ParsedTransaction]:
+        """Parse a Vanguard CSV row"""
+        tx_type_str = row.get("Transaction Type", "").upper()
+        tx_type = self._map_vanguard_type(tx_type_str)
         
-        for row_num, row in enumerate(reader, start=2):
-            try:
-                # Skip totals row
-                if row.get("Date", "").startswith("Transactions Total"):
-                    continue
-                
-                action = row.get("Action", "").upper()
-                tx_type = self._map_schwab_action(action)
-                
-                if tx_type is None:
-                    continue
-                
-                # Parse date
-                date_str = row.get("Date")
-                tx_date = datetime.strptime(date_str, "%m/%d/%Y")
-                
-                # Parse amounts
-                amount = self._parse_decimal(row.get("Amount", "0"))
-                quantity = self._parse_decimal(row.get("Quantity")) if row.get("Quantity") else None
-                price = self._parse_decimal(row.get("Price")) if row.get("Price") else None
-                fees = self._parse_decimal(row.get("Fees & Comm", "0"))
-                
-                transaction = ParsedTransaction(
-                    date=tx_date,
-                    type=tx_type,
-                    symbol=row.get("Symbol") if row.get("Symbol") else None,
-                    quantity=quantity,
-                    price=price,
-                    amount=amount,
-                    fees=fees,
-                    description=row.get("Description", "")
-                )
-                
-                transactions.append(transaction)
-                
-            except Exception as e:
-                self.errors.append(f"Row {row_num}: {str(e)}")
-                logger.warning(f"Failed to parse row {row_num}: {e}")
+        if tx_type is None:
+            return None
         
-        return transactions
+        # Parse date
+        date_str = row.get("Trade Date") or row.get("Settlement Date")
+        tx_date = datetime.strptime(date_str, "%m/%d/%Y")
+        
+        # Parse amounts
+        amount = self._parse_decimal(row.get("Net Amount", "0"))
+        shares = self._parse_decimal(row.get("Shares")) if row.get("Shares") else None
+        price = self._parse_decimal(row.get("Share Price")) if row.get("Share Price") else None
+        fees = self._parse_decimal(row.get("Commission Fees", "0"))
+        
+        return ParsedTransaction(
+            date=tx_date,
+            type=tx_type,
+            symbol=row.get("Symbol") if row.get("Symbol") else None,
+            quantity=shares,
+            price=price,
+            amount=amount,
+            fees=fees,
+            description=row.get("Transaction Description", ""),
+            account_number=row.get("Account Number")
+        )
     
-    def _parse_generic(self, csv_content: str) -> List[ParsedTransaction]:
-        """Parse generic CSV format with standard columns"""
-        transactions = []
-        reader = csv.DictReader(io.StringIO(csv_content))
+    def _parse_schwab_row(self, row: Dict[str, Any]) -> Optional[ParsedTransaction]:
+        """Parse a Schwab CSV row"""
+        # Skip totals row
+        if row.get("Date", "").startswith("Transactions Total"):
+            return None
         
-        for row_num, row in enumerate(reader, start=2):
+        action = row.get("Action", "").upper()
+        tx_type = self._map_schwab_action(action)
+        
+        if tx_type is None:
+            return None
+        
+        # Parse date
+        date_str = row.get("Date")
+        tx_date = datetime.strptime(date_str, "%m/%d/%Y")
+        
+        # Parse amounts
+        amount = self._parse_decimal(row.get("Amount", "0"))
+        quantity = self._parse_decimal(row.get("Quantity")) if row.get("Quantity") else None
+        price = self._parse_decimal(row.get("Price")) if row.get("Price") else None
+        fees = self._parse_decimal(row.get("Fees & Comm", "0"))
+        
+        return ParsedTransaction(
+            date=tx_date,
+            type=tx_type,
+            symbol=row.get("Symbol") if row.get("Symbol") else None,
+            quantity=quantity,
+            price=price,
+            amount=amount,
+            fees=fees,
+            description=row.get("Description", "")
+        )
+    
+    def _parse_generic_row(self, row: Dict[str, Any]) -> Optional[ParsedTransaction]:
+        """Parse a generic CSV row with standard columns"""
+        # Generic format expects: Date, Type, Symbol, Quantity, Price, Amount, Fees
+        tx_type = TransactionType[row.get("Type", "").upper()]
+        
+        # Parse date - try multiple formats
+        date_str = row.get("Date")
+        for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"]:
             try:
-                # Generic format expects: Date, Type, Symbol, Quantity, Price, Amount, Fees
-                tx_type = TransactionType[row.get("Type", "").upper()]
-                
-                # Parse date - try multiple formats
-                date_str = row.get("Date")
-                for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"]:
-                    try:
-                        tx_date = datetime.strptime(date_str, fmt)
-                        break
-                    except:
-                        continue
-                else:
-                    raise ValueError(f"Could not parse date: {date_str}")
-                
-                # Parse amounts
-                amount = self._parse_decimal(row.get("Amount", "0"))
-                quantity = self._parse_decimal(row.get("Quantity")) if row.get("Quantity") else None
-                price = self._parse_decimal(row.get("Price")) if row.get("Price") else None
-                fees = self._parse_decimal(row.get("Fees", "0"))
-                
-                transaction = ParsedTransaction(
-                    date=tx_date,
-                    type=tx_type,
-                    symbol=row.get("Symbol") if row.get("Symbol") else None,
-                    quantity=quantity,
-                    price=price,
-                    amount=amount,
-                    fees=fees,
-                    description=row.get("Description", "")
-                )
-                
-                transactions.append(transaction)
-                
-            except Exception as e:
-                self.errors.append(f"Row {row_num}: {str(e)}")
-                logger.warning(f"Failed to parse row {row_num}: {e}")
+                tx_date = datetime.strptime(date_str, fmt)
+                break
+            except:
+                continue
+        else:
+            raise ValueError(f"Could not parse date: {date_str}")
         
-        return transactions
+        # Parse amounts
+        amount = self._parse_decimal(row.get("Amount", "0"))
+        quantity = self._parse_decimal(row.get("Quantity")) if row.get("Quantity") else None
+        price = self._parse_decimal(row.get("Price")) if row.get("Price") else None
+        fees = self._parse_decimal(row.get("Fees", "0"))
+        
+        return ParsedTransaction(
+            date=tx_date,
+            type=tx_type,
+            symbol=row.get("Symbol") if row.get("Symbol") else None,
+            quantity=quantity,
+            price=price,
+            amount=amount,
+            fees=fees,
+            description=row.get("Description", "")
+        )
     
     def _map_fidelity_action(self, action: str) -> Optional[TransactionType]:
         """Map Fidelity action to transaction type"""
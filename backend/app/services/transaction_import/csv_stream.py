@@ -0,0 +1,114 @@
+"""
+Incremental CSV reading from async byte streams
+
+Upload bodies are decoded chunk by chunk and cut at record boundaries, so
+only one chunk and the records completed in it are held in memory at a
+time, regardless of the size of the file.
+"""
+import codecs
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+async def iter_upload(upload: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield the body of an UploadFile (or any object with async read) in chunks"""
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class StreamingCSVReader:
+    """
+    DictReader-style rows from an async byte stream.
+
+    A record ends at a newline outside quotes, so quoted fields spanning
+    lines are kept intact. A UTF-8 byte order mark is dropped.
+    """
+
+    def __init__(self, stream: AsyncIterator[bytes], encoding: str = "utf-8"):
+        self.stream = stream.__aiter__()
+        self.encoding = "utf-8-sig" if encoding.lower().replace("_", "-") in ("utf-8", "utf8") else encoding
+        self.fieldnames: Optional[List[str]] = None
+        self.bytes_read = 0
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors="strict")
+        self._pending = ""
+        self._in_quotes = False
+        self._records: List[List[str]] = []
+        self._exhausted = False
+
+    async def _fill(self) -> bool:
+        """Read chunks until at least one complete record is buffered"""
+        while not self._records and not self._exhausted:
+            try:
+                chunk = await self.stream.__anext__()
+            except StopAsyncIteration:
+                self._exhausted = True
+                text = self._decoder.decode(b"", final=True)
+                self._split(text, final=True)
+                break
+            self.bytes_read += len(chunk)
+            self._split(self._decoder.decode(chunk), final=False)
+        return bool(self._records)
+
+    def _split(self, text: str, final: bool):
+        """Move the complete records of the buffered text into the record queue"""
+        cursor = len(self._pending)
+        text = self._pending + text
+        in_quotes = self._in_quotes
+        end = 0
+        while True:
+            newline = text.find("\n", cursor)
+            if newline < 0:
+                break
+            if text.count('"', cursor, newline) % 2:
+                in_quotes = not in_quotes
+            cursor = newline + 1
+            if not in_quotes:
+                end = cursor
+        if text.count('"', cursor) % 2:
+            in_quotes = not in_quotes
+
+        if final:
+            end = len(text)
+        complete, self._pending = text[:end], text[end:]
+        # The pending tail starts at a record boundary, outside quotes
+        self._in_quotes = in_quotes
+        if complete:
+            self._records.extend(csv.reader(io.StringIO(complete)))
+
+    async def read_header(self) -> List[str]:
+        """The header row; empty for an empty stream"""
+        while self.fieldnames is None:
+            if not await self._fill():
+                self.fieldnames = []
+                break
+            record = self._records.pop(0)
+            if record:
+                self.fieldnames = record
+        return self.fieldnames
+
+    async def rows(self) -> AsyncIterator[Tuple[int, Dict[str, Optional[str]]]]:
+        """(row number, row) pairs, numbered like csv.DictReader with the header as row 1"""
+        fieldnames = await self.read_header()
+        row_num = 1
+        while await self._fill():
+            records, self._records = self._records, []
+            for record in records:
+                if not record:
+                    continue
+                row_num += 1
+                row: Dict[str, Any] = dict(zip(fieldnames, record))
+                if len(record) < len(fieldnames):
+                    for name in fieldnames[len(record):]:
+                        row[name] = None
+                elif len(record) > len(fieldnames):
+                    row[None] = record[len(fieldnames):]
+                yield row_num, row
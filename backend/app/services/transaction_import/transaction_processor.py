@@ -1,107 +1,232 @@
 """
 Transaction processor with idempotency and position calculation
+
+Imports are set-based: idempotency keys are checked with one IN (...) query
+per chunk, instruments are upserted together, transactions are inserted with
+INSERT ... ON CONFLICT DO NOTHING RETURNING, and positions are recomputed
+only for the instruments an import touched.
 """
+import asyncio
 import hashlib
+import uuid
 from decimal import Decimal
-from typing import List, Dict, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Set, Tuple
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
 import logging
 
-from app.models.all_models import Transaction, Position, Lot, Account, Instrument
+from app.models.all_models import Transaction, Position, Instrument
+from app.models.base import TransactionSide, AssetClass
 from .csv_parser import ParsedTransaction, TransactionType
 
 logger = logging.getLogger(__name__)
 
+# Keys per IN (...) lookup and rows per multi-VALUES insert, well below the
+# PostgreSQL limit of 32767 bind parameters per statement
+KEY_LOOKUP_CHUNK = 5000
+INSERT_CHUNK = 1000
+
+# Imported rows echoed back in results of streamed imports
+PREVIEW_ROWS = 10
+
+# Exchange recorded on instruments created by imports; the market data
+# service fills in the real listing later
+DEFAULT_EXCHANGE = "US"
+
+TRADE_SIDES = {
+    TransactionType.BUY: TransactionSide.BUY,
+    TransactionType.SELL: TransactionSide.SELL,
+}
+
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def average_cost_positions(
+    trades: Iterable[Tuple[Any, TransactionSide, Decimal, Decimal, Decimal]]
+) -> Dict[Any, Tuple[Decimal, Decimal]]:
+    """
+    Fold date-ordered (instrument_id, side, quantity, price, fee) trades into
+    (quantity, cost basis) per instrument using average cost for sales.
+    """
+    positions: Dict[Any, Tuple[Decimal, Decimal]] = {}
+    for instrument_id, side, quantity, price, fee in trades:
+        total_quantity, total_cost = positions.get(instrument_id, (Decimal("0"), Decimal("0")))
+        if side == TransactionSide.BUY:
+            total_quantity += quantity
+            total_cost += quantity * price + (fee or Decimal("0"))
+        else:
+            if total_quantity > 0:
+                total_cost -= total_cost / total_quantity * quantity
+            total_quantity -= quantity
+        positions[instrument_id] = (total_quantity, total_cost)
+    return positions
+
 
 class TransactionProcessor:
-    """Process transactions with idempotency and FIFO cost basis tracking"""
-    
+    """Process transactions with idempotency and average cost position tracking"""
+
     def __init__(self, db: AsyncSession):
         self.db = db
         self.processed_count = 0
         self.duplicate_count = 0
         self.error_count = 0
-        
+
     async def process_transactions(
         self,
         transactions: List[ParsedTransaction],
         account_id: str,
         user_id: str
-    ) -> Dict[str, any]:
-        """Process list of transactions with idempotency"""
-        results = {
+    ) -> Dict[str, Any]:
+        """Import a list of transactions with idempotency and update positions"""
+        results = self._empty_results()
+
+        touched = await self.import_batch(transactions, account_id, results)
+        await self.recalculate_positions(account_id, touched)
+        await self.db.commit()
+        if results["processed"]:
+            await self._notify_context_write(user_id)
+
+        return results
+
+    async def import_stream(
+        self,
+        batches: AsyncIterator[List[ParsedTransaction]],
+        account_id: str,
+        user_id: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Import batches as they are parsed, yielding running results.
+
+        Each batch is committed on its own so memory and transaction size
+        stay bounded; an interrupted import can simply be re-run, as
+        committed rows are skipped as duplicates. Positions are recomputed
+        once at the end, before the final results (``complete`` set) are
+        yielded.
+        """
+        results = self._empty_results()
+        results["complete"] = False
+        touched: Set[Any] = set()
+
+        async for batch in batches:
+            touched |= await self.import_batch(batch, account_id, results)
+            await self.db.commit()
+            del results["transactions"][PREVIEW_ROWS:]
+            yield results
+
+        await self.recalculate_positions(account_id, touched)
+        await self.db.commit()
+        if results["processed"]:
+            await self._notify_context_write(user_id)
+        results["complete"] = True
+        yield results
+
+    async def process_stream(
+        self,
+        batches: AsyncIterator[List[ParsedTransaction]],
+        account_id: str,
+        user_id: str
+    ) -> Dict[str, Any]:
+        """Import a stream of batches and return the final results"""
+        results = self._empty_results()
+        async for results in self.import_stream(batches, account_id, user_id):
+            pass
+        return results
+
+    async def _notify_context_write(self, user_id: str):
+        """Invalidate cached AI context built from this user's transactions and positions"""
+        # Imported here: the AI package pulls in the LLM clients
+        from app.services.ai.context_management import notify_transaction_write
+
+        await asyncio.to_thread(notify_transaction_write, user_id)
+
+    def _empty_results(self) -> Dict[str, Any]:
+        return {
             "processed": 0,
             "duplicates": 0,
             "errors": 0,
+            "skipped": 0,
             "transactions": []
         }
-        
+
+    async def import_batch(
+        self,
+        transactions: List[ParsedTransaction],
+        account_id: str,
+        results: Dict[str, Any]
+    ) -> Set[Any]:
+        """
+        Insert new transactions from a batch without committing.
+
+        Counts are accumulated into ``results``; returns the ids of the
+        instruments that received new transactions.
+        """
+        account_uuid = uuid.UUID(str(account_id))
+
+        # Idempotency keys, de-duplicated within the batch
+        candidates: Dict[str, ParsedTransaction] = {}
         for parsed_tx in transactions:
+            if parsed_tx.type not in TRADE_SIDES or not parsed_tx.symbol:
+                # Only trades in an instrument fit the transactions table
+                results["skipped"] += 1
+                continue
             try:
-                # Generate idempotency key
                 idempotency_key = self._generate_idempotency_key(parsed_tx, account_id)
-                
-                # Check if transaction already exists
-                existing = await self._check_duplicate(idempotency_key)
-                if existing:
-                    results["duplicates"] += 1
-                    logger.info(f"Duplicate transaction skipped: {idempotency_key}")
-                    continue
-                
-                # Get or create instrument if needed
-                instrument_id = None
-                if parsed_tx.symbol:
-                    instrument = await self._get_or_create_instrument(parsed_tx.symbol)
-                    instrument_id = instrument.id
-                
-                # Create transaction
-                transaction = Transaction(
-                    account_id=account_id,
-                    instrument_id=instrument_id,
-                    type=parsed_tx.type.value,
-                    date=parsed_tx.date,
-                    quantity=parsed_tx.quantity,
-                    price=parsed_tx.price,
-                    amount=parsed_tx.amount,
-                    fees=parsed_tx.fees,
-                    description=parsed_tx.description,
-                    idempotency_key=idempotency_key,
-                    broker_transaction_id=parsed_tx.broker_transaction_id
-                )
-                
-                self.db.add(transaction)
-                
-                # Update positions for BUY/SELL transactions
-                if parsed_tx.type in [TransactionType.BUY, TransactionType.SELL]:
-                    await self._update_position(
-                        account_id=account_id,
-                        instrument_id=instrument_id,
-                        transaction=transaction,
-                        parsed_tx=parsed_tx
-                    )
-                
-                results["processed"] += 1
+            except Exception as e:
+                results["errors"] += 1
+                logger.error(f"Failed to process transaction: {e}")
+                continue
+            if idempotency_key in candidates:
+                results["duplicates"] += 1
+                continue
+            candidates[idempotency_key] = parsed_tx
+
+        existing = await self._existing_keys(list(candidates))
+        if existing:
+            results["duplicates"] += len(existing)
+            logger.info(f"Skipped {len(existing)} duplicate transactions")
+        new = {key: tx for key, tx in candidates.items() if key not in existing}
+        if not new:
+            return set()
+
+        instrument_ids = await self._upsert_instruments({tx.symbol for tx in new.values()})
+
+        rows = []
+        for idempotency_key, parsed_tx in new.items():
+            try:
+                rows.append(self._transaction_row(
+                    parsed_tx, account_uuid, instrument_ids[parsed_tx.symbol], idempotency_key
+                ))
+            except Exception as e:
+                results["errors"] += 1
+                logger.error(f"Failed to process transaction: {e}")
+
+        touched: Set[Any] = set()
+        for chunk in _chunks(rows, INSERT_CHUNK):
+            stmt = insert(Transaction).values(chunk).on_conflict_do_nothing(
+                index_elements=[Transaction.idempotency_key]
+            ).returning(Transaction.idempotency_key, Transaction.instrument_id)
+            inserted = (await self.db.execute(stmt)).all()
+
+            # Rows missing from RETURNING were inserted concurrently by another import
+            results["duplicates"] += len(chunk) - len(inserted)
+            for idempotency_key, instrument_id in inserted:
+                touched.add(instrument_id)
+                parsed_tx = new[idempotency_key]
                 results["transactions"].append({
                     "date": parsed_tx.date.isoformat(),
                     "type": parsed_tx.type.value,
                     "symbol": parsed_tx.symbol,
                     "amount": str(parsed_tx.amount)
                 })
-                
-            except Exception as e:
-                results["errors"] += 1
-                logger.error(f"Failed to process transaction: {e}")
-        
-        # Commit all transactions
-        await self.db.commit()
-        
-        # Recalculate all positions
-        await self._recalculate_positions(account_id)
-        
-        return results
-    
+            results["processed"] += len(inserted)
+
+        return touched
+
     def _generate_idempotency_key(self, tx: ParsedTransaction, account_id: str) -> str:
         """Generate unique key for transaction to prevent duplicates"""
         # Create a unique hash from transaction details
@@ -114,165 +239,136 @@ class TransactionProcessor:
             str(tx.quantity) if tx.quantity else "",
             str(tx.price) if tx.price else ""
         ]
-        
+
         key_string = "|".join(key_parts)
         return hashlib.sha256(key_string.encode()).hexdigest()
-    
-    async def _check_duplicate(self, idempotency_key: str) -> bool:
-        """Check if transaction with this key already exists"""
-        query = select(Transaction).where(
-            Transaction.idempotency_key == idempotency_key
-        )
-        result = await self.db.execute(query)
-        return result.scalar_one_or_none() is not None
-    
-    async def _get_or_create_instrument(self, symbol: str) -> Instrument:
-        """Get existing instrument or create new one"""
-        # Check if instrument exists
-        query = select(Instrument).where(Instrument.symbol == symbol)
-        result = await self.db.execute(query)
-        instrument = result.scalar_one_or_none()
-        
-        if not instrument:
-            # Create new instrument
-            instrument = Instrument(
-                symbol=symbol,
-                name=symbol,  # Will be updated by market data service
-                type="STOCK",  # Default, will be updated
-                exchange="US",  # Default
-                currency="USD",
-                is_active=True
-            )
-            self.db.add(instrument)
-            await self.db.flush()  # Get the ID without committing
-        
-        return instrument
-    
-    async def _update_position(
+
+    def _transaction_row(
         self,
-        account_id: str,
-        instrument_id: str,
-        transaction: Transaction,
-        parsed_tx: ParsedTransaction
-    ):
-        """Update position and lots using FIFO for sales"""
-        # Get or create position
-        query = select(Position).where(
-            and_(
-                Position.account_id == account_id,
-                Position.instrument_id == instrument_id
+        tx: ParsedTransaction,
+        account_id: uuid.UUID,
+        instrument_id: Any,
+        idempotency_key: str
+    ) -> Dict[str, Any]:
+        """Column values for a parsed trade; brokers sign sell quantities differently"""
+        quantity = abs(tx.quantity) if tx.quantity else None
+        if not quantity:
+            raise ValueError(f"{tx.type.value} of {tx.symbol} on {tx.date} has no quantity")
+        price = abs(tx.price) if tx.price else abs(tx.amount) / quantity
+        trade_date = tx.date.date() if isinstance(tx.date, datetime) else tx.date
+
+        return {
+            "id": uuid.uuid4(),
+            "account_id": account_id,
+            "instrument_id": instrument_id,
+            "side": TRADE_SIDES[tx.type],
+            "quantity": quantity,
+            "price": price,
+            "fee": abs(tx.fees or Decimal("0")),
+            "trade_date": trade_date,
+            "idempotency_key": idempotency_key,
+            "note": tx.description or None,
+            "meta_data": {
+                "amount": str(tx.amount),
+                "broker_transaction_id": tx.broker_transaction_id,
+                "account_number": tx.account_number
+            }
+        }
+
+    async def _existing_keys(self, keys: List[str]) -> Set[str]:
+        """Idempotency keys that are already stored"""
+        existing: Set[str] = set()
+        for chunk in _chunks(keys, KEY_LOOKUP_CHUNK):
+            result = await self.db.execute(
+                select(Transaction.idempotency_key).where(Transaction.idempotency_key.in_(chunk))
             )
-        )
-        result = await self.db.execute(query)
-        position = result.scalar_one_or_none()
-        
-        if not position:
-            position = Position(
-                account_id=account_id,
-                instrument_id=instrument_id,
-                quantity=Decimal("0"),
-                cost_basis=Decimal("0"),
-                market_value=Decimal("0"),
-                unrealized_pnl=Decimal("0"),
-                realized_pnl=Decimal("0")
+            existing.update(result.scalars())
+        return existing
+
+    async def _upsert_instruments(self, symbols: Set[str]) -> Dict[str, Any]:
+        """Instrument id per symbol, creating missing instruments in one statement"""
+        instrument_ids: Dict[str, Any] = {}
+
+        async def lookup(wanted: List[str]):
+            result = await self.db.execute(
+                select(Instrument.symbol, Instrument.id).where(Instrument.symbol.in_(wanted))
             )
-            self.db.add(position)
-        
-        if parsed_tx.type == TransactionType.BUY:
-            # Add to position
-            position.quantity += parsed_tx.quantity
-            position.cost_basis += (parsed_tx.amount + parsed_tx.fees)
-            
-            # Create new lot for FIFO tracking
-            lot = Lot(
-                position_id=position.id,
-                transaction_id=transaction.id,
-                acquisition_date=parsed_tx.date,
-                quantity=parsed_tx.quantity,
-                remaining_quantity=parsed_tx.quantity,
-                cost_per_share=parsed_tx.price,
-                total_cost=parsed_tx.amount + parsed_tx.fees
+            for symbol, instrument_id in result:
+                instrument_ids.setdefault(symbol, instrument_id)
+
+        await lookup(sorted(symbols))
+        missing = sorted(symbols - instrument_ids.keys())
+        if missing:
+            stmt = insert(Instrument).values([
+                {
+                    "id": uuid.uuid4(),
+                    "symbol": symbol,
+                    "name": symbol,  # Will be updated by market data service
+                    "exchange": DEFAULT_EXCHANGE,
+                    "asset_class": AssetClass.STOCK,
+                    "currency": "USD",
+                    "is_active": True,
+                    "meta_data": {}
+                }
+                for symbol in missing
+            ]).on_conflict_do_nothing(
+                constraint="uq_instruments_symbol_exchange"
+            ).returning(Instrument.symbol, Instrument.id)
+            for symbol, instrument_id in await self.db.execute(stmt):
+                instrument_ids[symbol] = instrument_id
+
+            # Symbols created concurrently by another import
+            raced = sorted(symbols - instrument_ids.keys())
+            if raced:
+                await lookup(raced)
+
+        return instrument_ids
+
+    async def recalculate_positions(self, account_id: str, instrument_ids: Iterable[Any]):
+        """
+        Recalculate positions for the given instruments of an account.
+
+        All trades of the touched instruments are read in one query and
+        folded in date order; the positions are then upserted in one
+        statement. Does not commit.
+        """
+        instrument_ids = list(instrument_ids)
+        if not instrument_ids:
+            return
+        account_uuid = uuid.UUID(str(account_id))
+
+        trades = await self.db.execute(
+            select(
+                Transaction.instrument_id, Transaction.side,
+                Transaction.quantity, Transaction.price, Transaction.fee
+            ).where(
+                Transaction.account_id == account_uuid,
+                Transaction.instrument_id.in_(instrument_ids)
+            ).order_by(Transaction.instrument_id, Transaction.trade_date, Transaction.created_at)
+        )
+        positions = average_cost_positions(trades)
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "account_id": account_uuid,
+                "instrument_id": instrument_id,
+                "quantity": quantity,
+                "avg_cost": cost / quantity if quantity > 0 else Decimal("0"),
+                "last_updated": now
+            }
+            for instrument_id, (quantity, cost) in positions.items()
+        ]
+        for chunk in _chunks(rows, INSERT_CHUNK):
+            stmt = insert(Position).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_positions_account_instrument",
+                set_={
+                    "quantity": stmt.excluded.quantity,
+                    "avg_cost": stmt.excluded.avg_cost,
+                    "last_updated": stmt.excluded.last_updated,
+                    "updated_at": func.now()
+                }
             )
-            self.db.add(lot)
-            
-        elif parsed_tx.type == TransactionType.SELL:
-            # Reduce position using FIFO
-            remaining_to_sell = parsed_tx.quantity
-            total_cost_basis_sold = Decimal("0")
-            
-            # Get lots ordered by acquisition date (FIFO)
-            lots_query = select(Lot).where(
-                and_(
-                    Lot.position_id == position.id,
-                    Lot.remaining_quantity > 0
-                )
-            ).order_by(Lot.acquisition_date)
-            
-            lots_result = await self.db.execute(lots_query)
-            lots = lots_result.scalars().all()
-            
-            for lot in lots:
-                if remaining_to_sell <= 0:
-                    break
-                
-                # Calculate how much to sell from this lot
-                sell_from_lot = min(remaining_to_sell, lot.remaining_quantity)
-                
-                # Calculate cost basis for this portion
-                cost_per_share = lot.total_cost / lot.quantity
-                cost_basis_sold = cost_per_share * sell_from_lot
-                total_cost_basis_sold += cost_basis_sold
-                
-                # Update lot
-                lot.remaining_quantity -= sell_from_lot
-                remaining_to_sell -= sell_from_lot
-            
-            # Update position
-            position.quantity -= parsed_tx.quantity
-            position.cost_basis -= total_cost_basis_sold
-            
-            # Calculate realized P&L
-            sale_proceeds = parsed_tx.amount - parsed_tx.fees
-            realized_pnl = sale_proceeds - total_cost_basis_sold
-            position.realized_pnl += realized_pnl
-    
-    async def _recalculate_positions(self, account_id: str):
-        """Recalculate all positions for an account"""
-        # Get all positions for the account
-        query = select(Position).where(Position.account_id == account_id)
-        result = await self.db.execute(query)
-        positions = result.scalars().all()
-        
-        for position in positions:
-            # Get all transactions for this position
-            tx_query = select(Transaction).where(
-                and_(
-                    Transaction.account_id == account_id,
-                    Transaction.instrument_id == position.instrument_id
-                )
-            ).order_by(Transaction.date)
-            
-            tx_result = await self.db.execute(tx_query)
-            transactions = tx_result.scalars().all()
-            
-            # Recalculate from scratch
-            total_quantity = Decimal("0")
-            total_cost = Decimal("0")
-            
-            for tx in transactions:
-                if tx.type == "BUY":
-                    total_quantity += tx.quantity
-                    total_cost += (tx.amount + tx.fees)
-                elif tx.type == "SELL":
-                    # For simplicity, using average cost for now
-                    # Production would use proper FIFO from lots
-                    if total_quantity > 0:
-                        avg_cost = total_cost / total_quantity
-                        cost_sold = avg_cost * tx.quantity
-                        total_cost -= cost_sold
-                    total_quantity -= tx.quantity
-            
-            position.quantity = total_quantity
-            position.cost_basis = total_cost
-        
-        await self.db.commit()
\ No newline at end of file
+            await self.db.execute(stmt)
@@ -0,0 +1,583 @@
+"""
+Local Provider Simulator
+
+Serves deterministic Plaid, Yodlee, Polygon.io and Yahoo Finance responses
+from a local aiohttp server so banking syncs, webhooks and market data can be
+benchmarked without live services.
+
+Features:
+- Synthetic responses seeded per item, account and symbol
+- Recorded responses replayed in order from a JSON file
+- Configurable latency, jitter, error rate and rate limit per provider
+- Plaid payloads carry every field the pinned plaid-python SDK models require
+
+Each provider is mounted under its own prefix (/plaid, /yodlee, /polygon,
+/yahoo). Point the services at it with PLAID_ENVIRONMENT and YODLEE_BASE_URL
+set to the prefixed URL, or by overriding a market data provider's base URL.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import zlib
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Deque, Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("plaid", "yodlee", "polygon", "yahoo")
+
+MERCHANTS = (
+    ("Whole Foods", ["Shops", "Supermarkets and Groceries"]),
+    ("Shell", ["Travel", "Gas Stations"]),
+    ("Netflix", ["Service", "Subscription"]),
+    ("Starbucks", ["Food and Drink", "Restaurants", "Coffee Shop"]),
+    ("Uber", ["Travel", "Taxi"]),
+    ("Amazon", ["Shops", "Digital Purchase"]),
+    ("Con Edison", ["Service", "Utilities"]),
+    ("Payroll", ["Transfer", "Payroll"]),
+)
+
+
+@dataclass
+class FaultProfile:
+    """Latency and failure behaviour for one simulated provider"""
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    rate_limit_per_minute: Optional[int] = None
+
+
+@dataclass
+class SimulatorConfig:
+    """Simulator configuration"""
+    seed: int = 42
+    profiles: Dict[str, FaultProfile] = field(
+        default_factory=lambda: {provider: FaultProfile() for provider in PROVIDERS}
+    )
+    accounts_per_item: int = 2
+    transactions_per_page: int = 100
+    pages_per_sync: int = 3
+    recordings_path: Optional[str] = None
+
+
+@dataclass
+class ProviderStats:
+    """Request counters for one provider"""
+    requests: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+
+
+def _stable_seed(*parts: Any) -> int:
+    """Seed that is stable across processes, unlike hash()"""
+    return zlib.crc32("|".join(str(part) for part in parts).encode("utf-8"))
+
+
+class ProviderSimulator:
+    """
+    Deterministic local stand-in for the external banking and market data APIs.
+
+    Responses depend only on the seed and the request (item, cursor, account,
+    symbol and per-symbol request count), so two runs with the same traffic
+    see the same payloads. Latency and injected errors draw from a seeded
+    generator per provider.
+    """
+
+    def __init__(self, config: Optional[SimulatorConfig] = None):
+        self.config = config or SimulatorConfig()
+        self.stats: Dict[str, ProviderStats] = {provider: ProviderStats() for provider in PROVIDERS}
+        self._rngs = {
+            provider: random.Random(_stable_seed(self.config.seed, provider)) for provider in PROVIDERS
+        }
+        self._request_times: Dict[str, Deque[float]] = defaultdict(deque)
+        self._symbol_ticks: Dict[str, int] = defaultdict(int)
+        self._symbol_prices: Dict[str, float] = {}
+        self._recordings = self._load_recordings(self.config.recordings_path)
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url: Optional[str] = None
+
+    def _load_recordings(self, path: Optional[str]) -> Dict[str, Deque[Dict[str, Any]]]:
+        """
+        Load recorded responses
+
+        The file maps "<provider> <METHOD> <path>" to a list of responses,
+        each {"status": int, "body": ...}. Responses for a route are replayed
+        in order and the last one repeats once the list is exhausted.
+        """
+        if not path:
+            return {}
+
+        with open(path, "r", encoding="utf-8") as handle:
+            recorded = json.load(handle)
+        return {route: deque(responses) for route, responses in recorded.items()}
+
+    def url(self, provider: str) -> str:
+        """Base URL for a provider once the simulator is running"""
+        if not self.base_url:
+            raise RuntimeError("Simulator is not running")
+        return f"{self.base_url}/{provider}"
+
+    def create_app(self) -> web.Application:
+        """Build the aiohttp application with every provider route"""
+        app = web.Application(middlewares=[self._fault_middleware])
+        app.add_routes([
+            web.post("/plaid/transactions/sync", self._plaid_transactions_sync),
+            web.post("/plaid/accounts/get", self._plaid_accounts),
+            web.post("/plaid/accounts/balance/get", self._plaid_accounts),
+            web.post("/yodlee/auth/token", self._yodlee_token),
+            web.get("/yodlee/accounts", self._yodlee_accounts),
+            web.get("/yodlee/transactions", self._yodlee_transactions),
+            web.get("/polygon/v2/last/trade/{symbol}", self._polygon_last_trade),
+            web.get("/polygon/v2/last/nbbo/{symbol}", self._polygon_last_quote),
+            web.get("/yahoo/v8/finance/chart/{symbols}", self._yahoo_chart),
+            web.get("/stats", self._stats),
+        ])
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Start serving
+
+        Args:
+            host: Interface to bind
+            port: Port to bind, 0 for any free port
+
+        Returns:
+            Base URL of the running simulator
+        """
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+
+        bound_port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{bound_port}"
+        logger.info(f"Provider simulator listening on {self.base_url}")
+        return self.base_url
+
+    async def stop(self):
+        """Stop serving"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+            self.base_url = None
+
+    async def __aenter__(self) -> "ProviderSimulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    # Fault injection
+
+    @web.middleware
+    async def _fault_middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        """Apply latency, rate limits, injected errors and recordings per provider"""
+        provider = request.path.strip("/").split("/", 1)[0]
+        if provider not in self.stats:
+            return await handler(request)
+
+        profile = self.config.profiles.get(provider, FaultProfile())
+        stats = self.stats[provider]
+        rng = self._rngs[provider]
+        stats.requests += 1
+
+        delay = max(0.0, profile.latency_ms + rng.uniform(-profile.jitter_ms, profile.jitter_ms))
+        fail = rng.random() < profile.error_rate
+        await asyncio.sleep(delay / 1000.0)
+
+        if self._is_rate_limited(provider, profile):
+            stats.rate_limited += 1
+            return self._rate_limit_response(provider)
+
+        if fail:
+            stats.errors += 1
+            return self._error_response(provider)
+
+        recorded = self._next_recording(provider, request)
+        if recorded is not None:
+            return web.json_response(recorded.get("body"), status=recorded.get("status", 200))
+
+        return await handler(request)
+
+    def _is_rate_limited(self, provider: str, profile: FaultProfile) -> bool:
+        """Sliding one-minute window per provider"""
+        if not profile.rate_limit_per_minute:
+            return False
+
+        now = time.monotonic()
+        window = self._request_times[provider]
+        while window and now - window[0] >= 60:
+            window.popleft()
+
+        if len(window) >= profile.rate_limit_per_minute:
+            return True
+        window.append(now)
+        return False
+
+    def _next_recording(self, provider: str, request: web.Request) -> Optional[Dict[str, Any]]:
+        route = f"{request.method} {request.path[len(provider) + 1:]}"
+        responses = self._recordings.get(f"{provider} {route}")
+        if not responses:
+            return None
+        return responses.popleft() if len(responses) > 1 else responses[0]
+
+    def _rate_limit_response(self, provider: str) -> web.Response:
+        if provider == "plaid":
+            return web.json_response({
+                "error_type": "RATE_LIMIT_EXCEEDED",
+                "error_code": "TRANSACTIONS_SYNC_LIMIT",
+                "error_message": "rate limit exceeded for attempts to access this item",
+                "display_message": None,
+                "request_id": self._request_id(provider)
+            }, status=429)
+        if provider == "yodlee":
+            return web.json_response({
+                "errorCode": "Y902",
+                "errorMessage": "Oops some issue at our end",
+                "referenceCode": self._request_id(provider)
+            }, status=429)
+        if provider == "polygon":
+            return web.json_response({
+                "status": "ERROR",
+                "request_id": self._request_id(provider),
+                "error": "You've exceeded the maximum requests per minute"
+            }, status=429)
+        return web.Response(text="Too Many Requests", status=429)
+
+    def _error_response(self, provider: str) -> web.Response:
+        if provider == "plaid":
+            return web.json_response({
+                "error_type": "API_ERROR",
+                "error_code": "INTERNAL_SERVER_ERROR",
+                "error_message": "an unexpected error occurred",
+                "display_message": None,
+                "request_id": self._request_id(provider)
+            }, status=500)
+        if provider == "yodlee":
+            return web.json_response({
+                "errorCode": "Y007",
+                "errorMessage": "Service unavailable",
+                "referenceCode": self._request_id(provider)
+            }, status=503)
+        return web.json_response({"status": "ERROR", "error": "upstream unavailable"}, status=502)
+
+    def _request_id(self, provider: str) -> str:
+        return f"sim-{provider}-{self.stats[provider].requests}"
+
+    # Plaid
+
+    def _plaid_account_ids(self, access_token: str) -> List[str]:
+        return [
+            f"acc-{_stable_seed(self.config.seed, access_token, i):08x}"
+            for i in range(self.config.accounts_per_item)
+        ]
+
+    def _plaid_transaction(self, rng: random.Random, account_id: str, txn_id: str, day: date) -> Dict[str, Any]:
+        merchant, category = MERCHANTS[rng.randrange(len(MERCHANTS))]
+        amount = -round(rng.uniform(1500, 4000), 2) if merchant == "Payroll" else round(rng.lognormvariate(3.3, 0.9), 2)
+        return {
+            "transaction_id": txn_id,
+            "account_id": account_id,
+            "amount": amount,
+            "iso_currency_code": "USD",
+            "unofficial_currency_code": None,
+            "date": day.isoformat(),
+            "authorized_date": day.isoformat(),
+            "authorized_datetime": None,
+            "datetime": None,
+            "name": merchant.upper(),
+            "merchant_name": merchant,
+            "category": category,
+            "pending": rng.random() < 0.05,
+            "payment_channel": "in store",
+            "transaction_code": None,
+            "location": {
+                "address": None, "city": "New York", "region": "NY", "postal_code": None,
+                "country": "US", "lat": None, "lon": None, "store_number": None,
+            },
+        }
+
+    def _plaid_accounts_for(self, access_token: str) -> List[Dict[str, Any]]:
+        accounts = []
+        for i, account_id in enumerate(self._plaid_account_ids(access_token)):
+            rng = random.Random(_stable_seed(self.config.seed, account_id))
+            current = round(rng.uniform(50, 15000), 2)
+            accounts.append({
+                "account_id": account_id,
+                "balances": {
+                    "available": current,
+                    "current": current,
+                    "limit": None,
+                    "iso_currency_code": "USD",
+                    "unofficial_currency_code": None,
+                },
+                "mask": f"{rng.randrange(10000):04d}",
+                "name": "Checking" if i == 0 else f"Savings {i}",
+                "official_name": None,
+                "type": "depository",
+                "subtype": "checking" if i == 0 else "savings",
+            })
+        return accounts
+
+    async def _plaid_transactions_sync(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        access_token = body.get("access_token", "")
+        count = int(body.get("count") or self.config.transactions_per_page)
+        cursor = body.get("cursor") or ""
+
+        # Cursors look like "<generation>:<page>"; each full sync advances a generation
+        generation, page = (int(part) for part in cursor.split(":")) if cursor else (0, 0)
+        rng = random.Random(_stable_seed(self.config.seed, access_token, generation, page))
+        accounts = self._plaid_account_ids(access_token)
+
+        today = date.today()
+        added = [
+            self._plaid_transaction(
+                rng, accounts[i % len(accounts)],
+                f"txn-{_stable_seed(access_token, generation, page, i):08x}",
+                today - timedelta(days=rng.randrange(30 if generation else 90))
+            )
+            for i in range(count)
+        ]
+        has_more = page + 1 < self.config.pages_per_sync
+        next_cursor = f"{generation}:{page + 1}" if has_more else f"{generation + 1}:0"
+
+        return web.json_response({
+            "transactions_update_status": "HISTORICAL_UPDATE_COMPLETE",
+            "accounts": self._plaid_accounts_for(access_token),
+            "added": added,
+            "modified": [],
+            "removed": [],
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+            "request_id": self._request_id("plaid"),
+        })
+
+    async def _plaid_accounts(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        access_token = body.get("access_token", "")
+        return web.json_response({
+            "accounts": self._plaid_accounts_for(access_token),
+            "item": {
+                "item_id": f"item-{_stable_seed(access_token):08x}",
+                "institution_id": "ins_sim",
+                "webhook": None,
+                "error": None,
+                "available_products": [],
+                "billed_products": ["transactions"],
+                "consent_expiration_time": None,
+                "update_type": "background",
+            },
+            "request_id": self._request_id("plaid"),
+        })
+
+    # Yodlee
+
+    async def _yodlee_token(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "token": {"accessToken": f"sim-token-{self.stats['yodlee'].requests}", "expiresIn": 1800}
+        }, status=201)
+
+    async def _yodlee_accounts(self, request: web.Request) -> web.Response:
+        provider_account_id = request.query.get("providerAccountId", "0")
+        accounts = []
+        for i in range(self.config.accounts_per_item):
+            account_id = _stable_seed(self.config.seed, provider_account_id, i) % 10_000_000
+            rng = random.Random(account_id)
+            accounts.append({
+                "id": account_id,
+                "providerAccountId": provider_account_id,
+                "accountName": "Checking" if i == 0 else f"Savings {i}",
+                "accountType": "CHECKING" if i == 0 else "SAVINGS",
+                "CONTAINER": "bank",
+                "accountStatus": "ACTIVE",
+                "balance": {"amount": round(rng.uniform(50, 15000), 2), "currency": "USD"},
+                "availableBalance": {"amount": round(rng.uniform(50, 15000), 2), "currency": "USD"},
+                "accountNumber": f"xxxx{rng.randrange(10000):04d}",
+            })
+        return web.json_response({"account": accounts})
+
+    async def _yodlee_transactions(self, request: web.Request) -> web.Response:
+        account_id = request.query.get("accountId", "0")
+        from_date = date.fromisoformat(request.query.get("fromDate", (date.today() - timedelta(days=30)).isoformat()))
+        to_date = date.fromisoformat(request.query.get("toDate", date.today().isoformat()))
+        span = max((to_date - from_date).days, 1)
+        rng = random.Random(_stable_seed(self.config.seed, account_id, from_date, to_date))
+
+        transactions = []
+        for i in range(self.config.transactions_per_page):
+            merchant, category = MERCHANTS[rng.randrange(len(MERCHANTS))]
+            day = from_date + timedelta(days=rng.randrange(span))
+            credit = merchant == "Payroll"
+            transactions.append({
+                "id": _stable_seed(account_id, from_date, i) % 1_000_000_000,
+                "accountId": account_id,
+                "amount": {
+                    "amount": round(rng.uniform(1500, 4000) if credit else rng.lognormvariate(3.3, 0.9), 2),
+                    "currency": "USD"
+                },
+                "baseType": "CREDIT" if credit else "DEBIT",
+                "category": category[-1],
+                "date": day.isoformat(),
+                "postDate": day.isoformat(),
+                "description": {"original": merchant.upper(), "simple": merchant},
+                "merchant": {"name": merchant},
+                "status": "PENDING" if rng.random() < 0.05 else "POSTED",
+            })
+        return web.json_response({"transaction": transactions})
+
+    # Market data
+
+    def _price(self, symbol: str) -> Dict[str, float]:
+        """Deterministic random walk per symbol, one step per request"""
+        tick = self._symbol_ticks[symbol]
+        self._symbol_ticks[symbol] += 1
+        rng = random.Random(_stable_seed(self.config.seed, symbol))
+        previous_close = round(rng.uniform(20, 500), 2)
+        last = self._symbol_prices.get(symbol, previous_close)
+        step_rng = random.Random(_stable_seed(self.config.seed, symbol, tick))
+        price = round(last * (1 + step_rng.gauss(0, 0.002)), 2)
+        self._symbol_prices[symbol] = price
+        return {
+            "price": price,
+            "previous_close": previous_close,
+            "open": round(previous_close * (1 + rng.gauss(0, 0.005)), 2),
+            "high": round(max(price, previous_close) * 1.01, 2),
+            "low": round(min(price, previous_close) * 0.99, 2),
+            "volume": int(rng.uniform(1e5, 5e7)),
+            "size": step_rng.randrange(1, 500),
+        }
+
+    async def _polygon_last_trade(self, request: web.Request) -> web.Response:
+        symbol = request.match_info["symbol"].upper()
+        quote = self._price(symbol)
+        return web.json_response({
+            "status": "OK",
+            "request_id": self._request_id("polygon"),
+            "results": {
+                "T": symbol,
+                "p": quote["price"],
+                "s": quote["size"],
+                "t": int(time.time() * 1000),
+                "x": 4,
+            }
+        })
+
+    async def _polygon_last_quote(self, request: web.Request) -> web.Response:
+        symbol = request.match_info["symbol"].upper()
+        quote = self._price(symbol)
+        return web.json_response({
+            "status": "OK",
+            "request_id": self._request_id("polygon"),
+            "results": {
+                "T": symbol,
+                "p": round(quote["price"] - 0.01, 2),
+                "P": round(quote["price"] + 0.01, 2),
+                "s": quote["size"],
+                "S": quote["size"],
+                "t": int(time.time() * 1000),
+            }
+        })
+
+    async def _yahoo_chart(self, request: web.Request) -> web.Response:
+        results = []
+        now = int(time.time())
+        for symbol in request.match_info["symbols"].split(","):
+            symbol = symbol.upper()
+            quote = self._price(symbol)
+            results.append({
+                "meta": {
+                    "symbol": symbol,
+                    "currency": "USD",
+                    "exchangeName": "NMS",
+                    "timezone": "EST",
+                    "regularMarketPrice": quote["price"],
+                    "previousClose": quote["previous_close"],
+                    "regularMarketOpen": quote["open"],
+                    "regularMarketDayHigh": quote["high"],
+                    "regularMarketDayLow": quote["low"],
+                    "regularMarketVolume": quote["volume"],
+                },
+                "timestamp": [now - 60, now],
+                "indicators": {"quote": [{
+                    "open": [quote["open"], quote["open"]],
+                    "high": [quote["high"], quote["high"]],
+                    "low": [quote["low"], quote["low"]],
+                    "close": [quote["previous_close"], quote["price"]],
+                    "volume": [quote["volume"] // 2, quote["volume"]],
+                }]},
+            })
+        return web.json_response({"chart": {"result": results, "error": None}})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            provider: vars(stats) for provider, stats in self.stats.items()
+        })
+
+
+def parse_profile(value: str) -> Dict[str, FaultProfile]:
+    """
+    Parse a fault profile option
+
+    Format: provider:latency_ms:jitter_ms:error_rate[:rate_limit_per_minute],
+    e.g. "plaid:120:40:0.02:600".
+    """
+    parts = value.split(":")
+    if len(parts) not in (4, 5) or parts[0] not in PROVIDERS:
+        raise argparse.ArgumentTypeError(f"Invalid profile: {value}")
+
+    return {parts[0]: FaultProfile(
+        latency_ms=float(parts[1]),
+        jitter_ms=float(parts[2]),
+        error_rate=float(parts[3]),
+        rate_limit_per_minute=int(parts[4]) if len(parts) == 5 else None
+    )}
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local Plaid/Yodlee/Polygon/Yahoo simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--recordings", help="JSON file of recorded responses")
+    parser.add_argument(
+        "--profile", action="append", type=parse_profile, default=[],
+        help="provider:latency_ms:jitter_ms:error_rate[:rate_limit_per_minute]"
+    )
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> SimulatorConfig:
+    config = SimulatorConfig(seed=args.seed, recordings_path=args.recordings)
+    for profile in args.profile:
+        config.profiles.update(profile)
+    return config
+
+
+async def _serve(args: argparse.Namespace):
+    simulator = ProviderSimulator(config_from_args(args))
+    await simulator.start(args.host, args.port)
+    for provider in PROVIDERS:
+        print(f"{provider:8s} {simulator.url(provider)}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_serve(build_arg_parser().parse_args()))
+    except KeyboardInterrupt:
+        pass
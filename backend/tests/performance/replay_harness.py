@@ -0,0 +1,353 @@
+"""
+Banking and Market Data Replay Harness
+
+Drives banking webhooks and quote traffic at a fixed target rate and reports
+throughput and tail latency, so the sync and aggregation pipelines can be
+benchmarked offline against the local provider simulator.
+
+Features:
+- Open-loop pacing: requests start on schedule whether or not earlier ones
+  finished, and latency is measured from the scheduled start so queueing
+  delay is not hidden
+- Signed Plaid and Yodlee webhooks with a configurable duplicate ratio;
+  pass --item-ids with items linked in the app's database so webhooks
+  resolve to users and trigger syncs against the simulator
+- Quote traffic through the market data provider clients
+- JSON reports with p50/p90/p95/p99 latency and error breakdowns
+
+Example:
+    python tests/performance/replay_harness.py --simulator \\
+        --webhook-url http://localhost:8000/api/v1/banking/webhooks/plaid \\
+        --webhook-secret "$PLAID_WEBHOOK_URL" --rate 200 --duration 60
+
+The app verifies Plaid webhook signatures with its PLAID_WEBHOOK_URL
+setting as the HMAC key, so --webhook-secret must be that value.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+import numpy as np
+
+# Allow running as a script from the backend directory
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from provider_simulator import ProviderSimulator, build_arg_parser as simulator_arg_parser, config_from_args
+
+logger = logging.getLogger(__name__)
+
+Operation = Callable[[int], Awaitable[Any]]
+
+
+@dataclass
+class ReplayReport:
+    """Throughput and latency for one replayed workload"""
+    workload: str
+    target_rate: float
+    duration_seconds: float
+    scheduled: int
+    completed: int
+    failed: int
+    throughput: float
+    achieved_rate: float
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def summarize_latencies(latencies: Sequence[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds"""
+    if not len(latencies):
+        return {}
+
+    values = np.asarray(latencies, dtype=np.float64) * 1000.0
+    p50, p90, p95, p99 = np.percentile(values, [50, 90, 95, 99])
+    return {
+        "min": round(float(values.min()), 3),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+class ReplayHarness:
+    """
+    Runs an operation at a target rate for a fixed duration.
+
+    Operation i is scheduled at start + i / rate. At most max_in_flight
+    operations run at once; when that bound is hit, later operations start
+    late and the wait counts towards their latency.
+    """
+
+    def __init__(self, rate: float, duration: float, max_in_flight: int = 1000):
+        if rate <= 0 or duration <= 0:
+            raise ValueError("rate and duration must be positive")
+        self.rate = rate
+        self.duration = duration
+        self.max_in_flight = max_in_flight
+
+    async def run(self, workload: str, operation: Operation) -> ReplayReport:
+        """
+        Replay one workload
+
+        Args:
+            workload: Name used in the report
+            operation: Coroutine function called with the operation index;
+                raising marks the operation as failed
+
+        Returns:
+            Report for the run
+        """
+        total = int(self.rate * self.duration)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        latencies: List[float] = []
+        errors: Counter = Counter()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def execute(index: int, scheduled_at: float):
+            try:
+                await operation(index)
+                latencies.append(loop.time() - scheduled_at)
+            except Exception as e:
+                errors[type(e).__name__ if not str(e) else f"{type(e).__name__}: {str(e)[:80]}"] += 1
+            finally:
+                slots.release()
+
+        tasks = []
+        for index in range(total):
+            scheduled_at = start + index / self.rate
+            delay = scheduled_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await slots.acquire()
+            tasks.append(asyncio.create_task(execute(index, scheduled_at)))
+
+        issued = loop.time() - start
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+
+        report = ReplayReport(
+            workload=workload,
+            target_rate=self.rate,
+            duration_seconds=round(elapsed, 3),
+            scheduled=total,
+            completed=len(latencies),
+            failed=sum(errors.values()),
+            throughput=round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+            achieved_rate=round(total / issued, 3) if issued else 0.0,
+            latency_ms=summarize_latencies(latencies),
+            errors=dict(errors)
+        )
+        logger.info(
+            f"{workload}: {report.completed}/{report.scheduled} ok, "
+            f"{report.throughput:.1f}/s, p99 {report.latency_ms.get('p99', 0):.1f}ms"
+        )
+        return report
+
+
+class WebhookReplay:
+    """
+    Builds signed Plaid or Yodlee webhooks and posts them to the app.
+
+    Each webhook carries a unique id except for a seeded fraction that reuses
+    an earlier id, which exercises webhook deduplication the way provider
+    retries do.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        provider: str = "plaid",
+        item_ids: Sequence[str] = ("item-sim",),
+        secret: Optional[str] = None,
+        duplicate_ratio: float = 0.0,
+        seed: int = 42,
+        run_id: Optional[str] = None
+    ):
+        self.client = client
+        self.url = url
+        self.provider = provider
+        self.item_ids = list(item_ids)
+        self.secret = secret
+        self.duplicate_ratio = duplicate_ratio
+        self.run_id = run_id or f"{int(time.time())}"
+        self._rng = random.Random(seed)
+
+    def payload(self, index: int) -> Dict[str, Any]:
+        """Webhook body for operation index"""
+        event_index = index
+        if index and self._rng.random() < self.duplicate_ratio:
+            event_index = self._rng.randrange(index)
+        item_id = self.item_ids[event_index % len(self.item_ids)]
+        event_id = f"replay-{self.run_id}-{event_index}"
+
+        if self.provider == "yodlee":
+            return {
+                "id": event_id,
+                "event": "DATA_UPDATES",
+                "providerAccountId": item_id,
+                "data": {"providerAccountId": item_id, "dataset": [{"name": "BASIC_AGG_DATA"}]},
+            }
+        return {
+            "webhook_id": event_id,
+            "webhook_type": "TRANSACTIONS",
+            "webhook_code": "SYNC_UPDATES_AVAILABLE",
+            "item_id": item_id,
+            "initial_update_complete": True,
+            "historical_update_complete": True,
+            "environment": "sandbox",
+        }
+
+    def sign(self, body: bytes) -> Dict[str, str]:
+        """Headers the webhook handler verifies"""
+        headers = {"Content-Type": "application/json"}
+        if self.provider == "plaid" and self.secret:
+            headers["Plaid-Verification"] = hmac.new(
+                self.secret.encode("utf-8"), body, hashlib.sha256
+            ).hexdigest()
+        return headers
+
+    async def __call__(self, index: int) -> None:
+        body = json.dumps(self.payload(index)).encode("utf-8")
+        response = await self.client.post(self.url, content=body, headers=self.sign(body))
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+
+class QuoteReplay:
+    """Requests quotes through a market data provider client, cycling symbols"""
+
+    def __init__(self, provider: Any, symbols: Sequence[str], batch_size: int = 1):
+        self.provider = provider
+        self.symbols = list(symbols)
+        self.batch_size = batch_size
+
+    async def __call__(self, index: int) -> None:
+        if self.batch_size > 1:
+            start = (index * self.batch_size) % len(self.symbols)
+            batch = [self.symbols[(start + i) % len(self.symbols)] for i in range(self.batch_size)]
+            quotes = await self.provider.get_multiple_quotes(batch)
+            if not quotes:
+                raise RuntimeError("empty batch")
+            return
+
+        symbol = self.symbols[index % len(self.symbols)]
+        if await self.provider.get_quote(symbol) is None:
+            raise RuntimeError("no quote")
+
+
+def point_yahoo_at(provider: Any, simulator_url: str) -> Any:
+    """Send a YahooFinanceProvider's quote requests to the simulator"""
+    provider.quote_url = f"{simulator_url}/v8/finance/chart/"
+    # The simulator enforces its own limits; the client limiter would cap the target rate
+    provider.rate_limiter.requests_per_minute = sys.maxsize
+    return provider
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Replay banking webhooks and quote traffic at a target rate",
+        parents=[simulator_arg_parser()],
+        conflict_handler="resolve"
+    )
+    parser.add_argument("--simulator", action="store_true", help="Run the provider simulator in-process")
+    parser.add_argument("--port", type=int, default=0, help="Simulator port (0 picks a free port)")
+    parser.add_argument("--rate", type=float, default=50.0, help="Target operations per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per workload")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--webhook-url", help="App webhook endpoint to drive")
+    parser.add_argument("--webhook-provider", choices=("plaid", "yodlee"), default="plaid")
+    parser.add_argument(
+        "--webhook-secret",
+        help="HMAC key for Plaid webhooks; the app verifies against its PLAID_WEBHOOK_URL setting"
+    )
+    parser.add_argument("--items", type=int, default=100, help="Distinct synthetic items to spread webhooks over")
+    parser.add_argument("--item-ids", help="File with one linked item id per line, instead of synthetic ids")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0)
+    parser.add_argument("--quotes", action="store_true", help="Replay Yahoo quote traffic against the simulator")
+    parser.add_argument("--symbols", default="AAPL,MSFT,GOOGL,AMZN,NVDA,META,TSLA,SPY,QQQ,VTI")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser
+
+
+async def run_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    harness = ReplayHarness(args.rate, args.duration, args.max_in_flight)
+    simulator = ProviderSimulator(config_from_args(args)) if args.simulator else None
+    reports: List[ReplayReport] = []
+
+    if simulator:
+        await simulator.start(args.host, args.port)
+
+    try:
+        if args.webhook_url:
+            limits = httpx.Limits(max_connections=args.max_in_flight)
+            async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+                if args.item_ids:
+                    item_ids = Path(args.item_ids).read_text().split()
+                else:
+                    item_ids = [f"item-{i:05d}" for i in range(args.items)]
+                replay = WebhookReplay(
+                    client, args.webhook_url, args.webhook_provider,
+                    item_ids=item_ids,
+                    secret=args.webhook_secret,
+                    duplicate_ratio=args.duplicate_ratio,
+                    seed=args.seed
+                )
+                reports.append(await harness.run(f"{args.webhook_provider}_webhooks", replay))
+
+        if args.quotes:
+            if not simulator:
+                raise SystemExit("--quotes replays against the simulator; add --simulator")
+            from app.services.market_data.providers.yahoo_finance import YahooFinanceProvider
+
+            async with YahooFinanceProvider() as provider:
+                point_yahoo_at(provider, simulator.url("yahoo"))
+                replay = QuoteReplay(provider, args.symbols.split(","), args.batch_size)
+                reports.append(await harness.run("yahoo_quotes", replay))
+
+        return {
+            "reports": [report.to_dict() for report in reports],
+            "simulator": {
+                provider: asdict(stats) for provider, stats in simulator.stats.items()
+            } if simulator else None,
+        }
+
+    finally:
+        if simulator:
+            await simulator.stop()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = build_arg_parser().parse_args()
+    result = asyncio.run(run_from_args(args))
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
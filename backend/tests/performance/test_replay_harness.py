@@ -0,0 +1,130 @@
+"""
+Tests for the local provider simulator and replay harness.
+
+This test suite covers:
+- Deterministic synthetic responses and Plaid sync pagination
+- Plaid SDK models deserializing the simulated responses
+- Injected errors and rate limits per provider
+- Open-loop replay reports for quote and webhook traffic
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+from datetime import date
+
+import httpx
+import pytest
+from plaid.api import plaid_api
+from plaid.api_client import ApiClient
+from plaid.configuration import Configuration
+from plaid.model.accounts_get_request import AccountsGetRequest
+from plaid.model.transactions_sync_request import TransactionsSyncRequest
+
+from provider_simulator import FaultProfile, ProviderSimulator, SimulatorConfig
+from replay_harness import QuoteReplay, ReplayHarness, WebhookReplay, point_yahoo_at
+
+
+def _config(**profiles) -> SimulatorConfig:
+    config = SimulatorConfig(transactions_per_page=5, pages_per_sync=2)
+    for provider in config.profiles:
+        config.profiles[provider] = profiles.get(provider, FaultProfile(latency_ms=0, jitter_ms=0))
+    return config
+
+
+class TestProviderSimulator:
+    """Test suite for ProviderSimulator."""
+
+    @pytest.mark.asyncio
+    async def test_plaid_sync_is_deterministic_and_paginated(self):
+        """Same seed and cursor give the same page; the last page advances the generation."""
+        pages = []
+        for _ in range(2):
+            async with ProviderSimulator(_config()) as simulator, httpx.AsyncClient() as client:
+                url = f"{simulator.url('plaid')}/transactions/sync"
+                first = (await client.post(url, json={"access_token": "tok", "cursor": ""})).json()
+                second = (await client.post(url, json={"access_token": "tok", "cursor": first["next_cursor"]})).json()
+                pages.append((first, second))
+
+        (first, second), (replayed, _) = pages
+        assert [t["transaction_id"] for t in first["added"]] == [t["transaction_id"] for t in replayed["added"]]
+        assert (first["has_more"], first["next_cursor"]) == (True, "0:1")
+        assert (second["has_more"], second["next_cursor"]) == (False, "1:0")
+        assert len(first["added"]) == 5
+
+    @pytest.mark.asyncio
+    async def test_plaid_sdk_against_simulator(self):
+        """The pinned Plaid SDK pages through a sync and reads balances from the simulator."""
+        async with ProviderSimulator(_config()) as simulator:
+            client = plaid_api.PlaidApi(ApiClient(Configuration(
+                host=simulator.url("plaid"), api_key={"clientId": "sim", "secret": "sim"}
+            )))
+            first = await asyncio.to_thread(client.transactions_sync, TransactionsSyncRequest(access_token="tok"))
+            second = await asyncio.to_thread(
+                client.transactions_sync, TransactionsSyncRequest(access_token="tok", cursor=first.next_cursor)
+            )
+            accounts = await asyncio.to_thread(client.accounts_get, AccountsGetRequest(access_token="tok"))
+
+        assert (first.has_more, second.has_more, second.next_cursor) == (True, False, "1:0")
+        assert len(first.added) == 5 and isinstance(first.added[0].date, date)
+        assert first.added[0].merchant_name and first.added[0].location.city == "New York"
+        assert [a.account_id for a in accounts.accounts] == [a.account_id for a in first.accounts]
+        assert accounts.accounts[0].balances.iso_currency_code == "USD"
+
+    @pytest.mark.asyncio
+    async def test_errors_and_rate_limits(self):
+        """Error rate 1 always fails; requests beyond the per-minute limit get 429."""
+        config = _config(
+            yodlee=FaultProfile(latency_ms=0, jitter_ms=0, error_rate=1.0),
+            polygon=FaultProfile(latency_ms=0, jitter_ms=0, rate_limit_per_minute=3),
+        )
+        async with ProviderSimulator(config) as simulator, httpx.AsyncClient() as client:
+            yodlee = await client.get(f"{simulator.url('yodlee')}/accounts")
+            statuses = [
+                (await client.get(f"{simulator.url('polygon')}/v2/last/trade/AAPL")).status_code
+                for _ in range(5)
+            ]
+
+            assert yodlee.status_code == 503 and yodlee.json()["errorCode"] == "Y007"
+            assert statuses == [200, 200, 200, 429, 429]
+            assert simulator.stats["polygon"].rate_limited == 2
+
+
+class TestReplayHarness:
+    """Test suite for ReplayHarness."""
+
+    @pytest.mark.asyncio
+    async def test_quote_replay_through_provider_client(self):
+        """Yahoo quotes parse from the simulator and the report covers every request."""
+        from app.services.market_data.providers.yahoo_finance import YahooFinanceProvider
+
+        async with ProviderSimulator(_config()) as simulator:
+            async with YahooFinanceProvider() as provider:
+                point_yahoo_at(provider, simulator.url("yahoo"))
+                report = await ReplayHarness(rate=200, duration=0.25).run(
+                    "yahoo_quotes", QuoteReplay(provider, ["AAPL", "MSFT"])
+                )
+
+        assert (report.scheduled, report.completed, report.failed) == (50, 50, 0)
+        assert report.latency_ms["p50"] <= report.latency_ms["p99"] <= report.latency_ms["max"]
+        assert simulator.stats["yahoo"].requests == 50
+
+    @pytest.mark.asyncio
+    async def test_webhook_replay_signs_and_counts_failures(self):
+        """Plaid webhooks carry a valid signature; rejected posts are reported as failures."""
+        received = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            expected = hmac.new(b"secret", request.content, hashlib.sha256).hexdigest()
+            assert request.headers["Plaid-Verification"] == expected
+            received.append(json.loads(request.content))
+            return httpx.Response(500 if len(received) % 10 == 0 else 200)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            replay = WebhookReplay(client, "http://app/webhooks/plaid", item_ids=["a", "b"], secret="secret")
+            report = await ReplayHarness(rate=400, duration=0.1).run("plaid_webhooks", replay)
+
+        assert (report.completed, report.failed) == (36, 4)
+        assert report.errors == {"RuntimeError: HTTP 500": 4}
+        assert len({body["webhook_id"] for body in received}) == 40
+        assert {body["item_id"] for body in received} == {"a", "b"}
@@ -0,0 +1,126 @@
+"""
+Unit tests for balance alert evaluation.
+
+This test suite covers:
+- Skipping accounts and users whose balance is unchanged
+- Projected overdraft versus projected low balance alerts
+- Debounced notifications for repeated alerts
+- Immediate checks reporting breached levels without touching the loop state
+"""
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.banking.balance_monitor import (
+    AccountSnapshot, AlertType, BalanceMonitor, BalanceThreshold
+)
+from app.services.banking.threshold_index import RecurringFlow
+
+
+def _snapshot(account_id: str, balance: float) -> AccountSnapshot:
+    return AccountSnapshot(
+        account_id=account_id, snapshot_time=datetime.utcnow(), current_balance=balance,
+        available_balance=balance, pending_transactions=0, last_transaction_date=None,
+        balance_change_24h=0.0, balance_change_7d=0.0, provider='plaid'
+    )
+
+
+def _threshold(user_id: str, alert_type: AlertType, value: float) -> BalanceThreshold:
+    now = datetime.utcnow()
+    return BalanceThreshold(
+        user_id=user_id, account_id='*', threshold_type=alert_type, threshold_value=value,
+        enabled=True, notification_methods=['in_app'], created_at=now, updated_at=now
+    )
+
+
+class TestBalanceMonitor:
+    """Test suite for BalanceMonitor."""
+
+    @pytest.fixture
+    def monitor(self):
+        """Monitor with a $250 low balance level, a negative level and no recurring flows."""
+        monitor = BalanceMonitor()
+        monitor.forecast_days = 30
+        for user_id in ('user', 'other'):
+            monitor._custom_thresholds[user_id] = [
+                _threshold(user_id, AlertType.LOW_BALANCE, 250.0),
+                _threshold(user_id, AlertType.NEGATIVE_BALANCE, 0.0),
+            ]
+        monitor._get_recurring_flows = AsyncMock(return_value=[])
+        monitor._send_alert_notifications = AsyncMock()
+        return monitor
+
+    @pytest.mark.asyncio
+    async def test_unchanged_balances_are_skipped(self, monitor):
+        """Only changed accounts are evaluated and only their users' thresholds are loaded."""
+        loaded = AsyncMock(side_effect=monitor._get_monitoring_thresholds)
+        with patch.object(monitor, '_get_monitoring_thresholds', loaded):
+            first = await monitor.evaluate_sync_cycle(
+                {'user': [_snapshot('acc-1', 100.0)], 'other': [_snapshot('acc-2', 900.0)]}, None
+            )
+            assert [a.alert_type for a in first['user']] == [AlertType.LOW_BALANCE]
+            assert 'other' not in first
+            assert loaded.await_count == 2
+
+            loaded.reset_mock()
+            repeat = await monitor.evaluate_sync_cycle(
+                {'user': [_snapshot('acc-1', 100.0)], 'other': [_snapshot('acc-2', 900.0)]}, None
+            )
+            assert repeat == {}
+            assert loaded.await_count == 0
+
+            moved = await monitor.evaluate_sync_cycle(
+                {'user': [_snapshot('acc-1', 100.0)], 'other': [_snapshot('acc-2', -5.0)]}, None
+            )
+            assert 'user' not in moved
+            assert {a.alert_type for a in moved['other']} == {
+                AlertType.LOW_BALANCE, AlertType.NEGATIVE_BALANCE
+            }
+            assert [call.args[0] for call in loaded.await_args_list] == ['other']
+
+    @pytest.mark.asyncio
+    async def test_projected_overdraft_and_low_balance(self, monitor):
+        """Upcoming payments raise an overdraft below zero and a low balance alert above it."""
+        due = date.today() + timedelta(days=3)
+        monitor._get_recurring_flows.return_value = [
+            RecurringFlow('acc-low', 300.0, due, 30, 'rent'),
+            RecurringFlow('acc-over', 500.0, due, 30, 'rent'),
+        ]
+
+        alerts = await monitor.evaluate_sync_cycle(
+            {'user': [_snapshot('acc-low', 400.0), _snapshot('acc-over', 400.0)]}, None
+        )
+
+        projected = {
+            a.account_id: a for a in alerts['user'] if a.metadata and a.metadata.get('projected')
+        }
+        assert projected['acc-low'].alert_type == AlertType.LOW_BALANCE
+        assert projected['acc-low'].metadata['projected_balance'] == pytest.approx(100.0)
+        assert projected['acc-over'].alert_type == AlertType.ACCOUNT_OVERDRAFT
+        assert projected['acc-over'].metadata['projected_balance'] == pytest.approx(-100.0)
+        assert projected['acc-over'].metadata['projected_date'] == due.isoformat()
+        assert len(alerts['user']) == 2
+
+    @pytest.mark.asyncio
+    async def test_repeated_alerts_are_debounced(self, monitor):
+        """An alert that already notified is stored again but not re-sent within the window."""
+        await monitor.evaluate_sync_cycle({'user': [_snapshot('acc-1', 100.0)]}, None)
+        await monitor.evaluate_sync_cycle({'user': [_snapshot('acc-1', 300.0)]}, None)
+        alerts = await monitor.evaluate_sync_cycle({'user': [_snapshot('acc-1', 100.0)]}, None)
+
+        assert [a.alert_type for a in alerts['user']] == [AlertType.LOW_BALANCE]
+        assert monitor._send_alert_notifications.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_immediate_check_reports_breached_levels(self, monitor):
+        """An on-demand check reports levels the loop already evaluated and leaves its state alone."""
+        snapshots = {'acc-1': _snapshot('acc-1', -20.0)}
+        monitor._get_account_snapshots = AsyncMock(return_value=snapshots)
+        await monitor.evaluate_sync_cycle({'user': list(snapshots.values())}, None)
+        assert monitor._last_balances == {'acc-1': -20.0}
+
+        alerts = await monitor.check_immediate_alerts('user', ['cred'], None)
+
+        assert sorted(a.alert_type.value for a in alerts) == ['low_balance', 'negative_balance']
+        assert monitor._last_balances == {'acc-1': -20.0}
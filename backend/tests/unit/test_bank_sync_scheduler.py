@@ -0,0 +1,197 @@
+"""
+Unit tests for the bank transaction sync scheduler.
+
+This test suite covers:
+- Coalescing webhook bursts for one item into a single sync
+- One sync at a time per item, with a follow-up for requests during a sync
+- Bounded concurrency per provider and retries of failed syncs
+- Bulk transaction rows keeping the latest version of each transaction
+- Plaid SDK calls running off the event loop
+- Synced changes folded into spending aggregates with categorizer predictions
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.banking import plaid_service, webhook_handler
+from app.services.banking.plaid_service import PlaidService, Transaction, TransactionChanges
+from app.services.banking.spending_pattern_detector import SpendingPatternDetector
+from app.services.banking.sync_scheduler import BankSyncScheduler, BankTransactionWriter, SyncRequest
+from app.services.banking.transaction_categorizer import CategoryPrediction
+
+
+@asynccontextmanager
+async def _session():
+    yield MagicMock()
+
+
+class RecordingSync:
+    """Sync callback that records calls and tracks concurrency."""
+
+    def __init__(self, duration: float = 0.0, failures: int = 0):
+        self.duration = duration
+        self.failures = failures
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, request, db):
+        self.calls.append((request.item_id, request.coalesced))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.duration)
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError('provider unavailable')
+            return {}
+        finally:
+            self.running -= 1
+
+
+def _txn(txn_id: str, account: str = 'acc-1', amount: float = 4.5, pending: bool = False) -> Transaction:
+    return Transaction(
+        transaction_id=txn_id, account_id=account, amount=amount, date=datetime(2026, 5, 1),
+        name='Coffee', merchant_name=None, category=['Food', 'Coffee'], subcategory='Coffee',
+        pending=pending, currency='USD', location=None
+    )
+
+
+def _scheduler(sync, **kwargs) -> BankSyncScheduler:
+    kwargs.setdefault('coalesce_window', 0.01)
+    return BankSyncScheduler(sync, session_factory=_session, **kwargs)
+
+
+class TestBankSyncScheduler:
+    """Test suite for BankSyncScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_burst_is_coalesced(self):
+        """Requests inside the window merge into one sync per item."""
+        sync = RecordingSync()
+        scheduler = _scheduler(sync)
+
+        queued = [scheduler.enqueue('plaid', 'item-1', 'user') for _ in range(5)]
+        scheduler.enqueue('plaid', 'item-2', 'user')
+        await scheduler.drain()
+
+        assert queued == [True, False, False, False, False]
+        assert sorted(sync.calls) == [('item-1', 4), ('item-2', 0)]
+
+    @pytest.mark.asyncio
+    async def test_request_during_sync_runs_once_after(self):
+        """An item never syncs twice at once; requests during a sync get one follow-up."""
+        sync = RecordingSync(duration=0.05)
+        scheduler = _scheduler(sync)
+
+        scheduler.enqueue('plaid', 'item-1', 'user')
+        await asyncio.sleep(0.02)
+        for _ in range(3):
+            scheduler.enqueue('plaid', 'item-1', 'user')
+        await scheduler.drain()
+
+        assert sync.calls == [('item-1', 0), ('item-1', 2)]
+        assert sync.max_running == 1 and scheduler.pending_count == 0
+
+    @pytest.mark.asyncio
+    async def test_provider_concurrency_and_retries(self):
+        """Concurrent syncs stay within the provider limit; failures are retried."""
+        sync = RecordingSync(duration=0.01, failures=1)
+        scheduler = _scheduler(sync, concurrency={'yodlee': 2}, retry_delay=0.01)
+
+        for item in range(6):
+            scheduler.enqueue('yodlee', f'item-{item}', 'user')
+        await scheduler.drain()
+
+        assert sync.max_running == 2
+        assert len(sync.calls) == 7
+
+
+class TestBankTransactionWriter:
+    """Test suite for BankTransactionWriter."""
+
+    @pytest.mark.asyncio
+    async def test_rows_keep_latest_version(self):
+        """Transactions for unlinked accounts are skipped and repeats are written once."""
+        db = MagicMock()
+        accounts = MagicMock()
+        accounts.all.return_value = [('acc-1', 'pk-1')]
+        db.execute = AsyncMock(side_effect=[accounts, MagicMock(), MagicMock()])
+
+        changes = TransactionChanges(
+            added=[_txn('t1', 'acc-1', 4.5, True), _txn('t2', 'acc-9', 1.0, False)],
+            modified=[_txn('t1', 'acc-1', 4.75, False)],
+            next_cursor='cursor-2'
+        )
+        counts = await BankTransactionWriter().write(db, 'cred', changes)
+
+        assert counts == {"upserted": 1, "removed": 0, "skipped": 1}
+        upsert = db.execute.await_args_list[1].args[0]
+        row = upsert.compile().params
+        assert (row['transaction_id_m0'], str(row['amount_m0']), row['pending_m0']) == ('t1', '4.75', False)
+
+
+class TestTransactionSync:
+    """Test suite for the webhook handler's scheduled sync."""
+
+    @pytest.mark.asyncio
+    async def test_changes_reach_aggregates_with_predictions(self):
+        """Added and modified rows carry the categorizer's predictions; removals are passed through."""
+        changes = TransactionChanges(added=[_txn('t1')], modified=[_txn('t2', amount=6.0)], removed=['t0'])
+        service = MagicMock(sync_transactions=AsyncMock(return_value=changes))
+        handler = webhook_handler.BankingWebhookHandler.__new__(webhook_handler.BankingWebhookHandler)
+        handler._sync_services = {'plaid': (service, AsyncMock(return_value='cred'))}
+        handler.transaction_writer = MagicMock(
+            load_cursor=AsyncMock(return_value=None), write=AsyncMock(return_value={'upserted': 2})
+        )
+
+        predictions = [CategoryPrediction('food_dining', 'coffee', 0.9, 'merchant'),
+                       CategoryPrediction('food_dining', 'coffee', 0.9, 'merchant')]
+        categorizer = MagicMock(categorize_transactions_batch=AsyncMock(return_value=predictions))
+        detector = SpendingPatternDetector.__new__(SpendingPatternDetector)
+        detector.aggregate_store = MagicMock(apply=AsyncMock(return_value=[]))
+        db = MagicMock(commit=AsyncMock())
+
+        with patch.multiple(webhook_handler, transaction_categorizer=categorizer,
+                            spending_pattern_detector=detector, balance_monitor=MagicMock(
+                                check_immediate_alerts=AsyncMock())):
+            counts = await handler._run_transaction_sync(SyncRequest('plaid', 'item-1', 'user'), db)
+
+        assert counts == {'upserted': 2, 'anomalies': 0}
+        categorizer.categorize_transactions_batch.assert_awaited_once_with(changes.added + changes.modified, 'user')
+        detector.aggregate_store.apply.assert_awaited_once_with(
+            db, 'user', changes.added + changes.modified, predictions, ['t0']
+        )
+
+
+class TestPlaidService:
+    """Test suite for PlaidService provider calls."""
+
+    @pytest.mark.asyncio
+    async def test_sync_pages_run_off_the_event_loop(self):
+        """The loop keeps serving other work while a Plaid page request is in flight."""
+        released = threading.Event()
+
+        def transactions_sync(request):
+            # Only returns if the loop is free to set the event
+            assert released.wait(timeout=2)
+            return {'added': [], 'modified': [], 'removed': [{'transaction_id': 'gone'}],
+                    'next_cursor': 'cursor-1', 'has_more': False}
+
+        async def release():
+            await asyncio.sleep(0.01)
+            released.set()
+
+        service = PlaidService.__new__(PlaidService)
+        service.client = MagicMock(transactions_sync=transactions_sync)
+        service._retry_attempts, service._retry_delay = 1, 0
+        vault = MagicMock(retrieve_credentials=AsyncMock(return_value={'credentials': {'access_token': 'tok'}}))
+
+        with patch.object(plaid_service, 'credential_vault', vault):
+            changes, _ = await asyncio.gather(service.sync_transactions('cred', 'user', MagicMock()), release())
+
+        assert (changes.removed, changes.next_cursor) == (['gone'], 'cursor-1')
@@ -0,0 +1,75 @@
+"""
+Unit tests for the cohort spending analytics job.
+
+This test suite covers:
+- Per-user cash flow, pattern and anomaly metrics from one frame
+- Partitioning users across workers without changing results
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.banking.cohort_analytics import CohortSpendingJob, compute_user_metrics, partition_frame
+
+AS_OF = date(2026, 6, 30)
+
+
+def _cohort(users: int = 6) -> pd.DataFrame:
+    """Monthly salary plus daily groceries; user 0 has one outsized purchase."""
+    rng = np.random.default_rng(7)
+    rows = []
+    for user in range(users):
+        for month in range(1, 7):
+            rows.append((f'user-{user}', pd.Timestamp(2026, month, 1), -3000.0 - 100 * user, 'income', 'Employer'))
+        for day in range(120):
+            when = pd.Timestamp(AS_OF) - pd.Timedelta(days=day)
+            rows.append((f'user-{user}', when, float(rng.normal(40, 4)), 'groceries', 'Grocer'))
+    rows.append(('user-0', pd.Timestamp(2026, 6, 20), 900.0, 'groceries', 'Grocer'))
+    frame = pd.DataFrame(rows, columns=['user_id', 'date', 'amount', 'category', 'merchant'])
+    for column in ('user_id', 'category', 'merchant'):
+        frame[column] = frame[column].astype('category')
+    return frame
+
+
+class TestComputeUserMetrics:
+    """Test suite for compute_user_metrics."""
+
+    def test_metrics_match_per_user_arithmetic(self):
+        """Cash flow totals and anomalies agree with a direct per-user computation."""
+        frame = _cohort()
+        metrics = compute_user_metrics(frame, AS_OF).set_index('user_id')
+
+        user = frame[frame['user_id'] == 'user-1']
+        income = -user.loc[user['amount'] < 0, 'amount'].sum()
+        expenses = user.loc[user['amount'] > 0, 'amount'].sum()
+        row = metrics.loc['user-1']
+        assert row['total_income'] == pytest.approx(income)
+        assert row['total_expenses'] == pytest.approx(expenses)
+        assert row['savings_rate'] == pytest.approx((income - expenses) / income)
+        assert row['top_category'] == 'groceries' and row['top_merchant'] == 'Grocer'
+
+        assert metrics.loc['user-0', 'amount_anomalies'] >= 1
+        assert metrics.loc['user-0', 'max_amount_zscore'] > 5
+        assert metrics['weekly_patterns'].tolist() == [1] * 6
+
+    @pytest.mark.asyncio
+    async def test_partitioning_preserves_results(self):
+        """Users never straddle partitions, so worker processes give the same metrics."""
+        frame = _cohort()
+        parts = partition_frame(frame, 3)
+        assert sum(len(part) for part in parts) == len(frame)
+        assert all(
+            set(a['user_id'].unique()).isdisjoint(b['user_id'].unique())
+            for i, a in enumerate(parts) for b in parts[i + 1:]
+        )
+
+        serial = await CohortSpendingJob(workers=1).compute(frame, AS_OF)
+        parallel = await CohortSpendingJob(workers=3).compute(frame, AS_OF)
+
+        pd.testing.assert_frame_equal(
+            serial.set_index('user_id').sort_index(),
+            parallel.set_index('user_id').sort_index(),
+            check_categorical=False
+        )
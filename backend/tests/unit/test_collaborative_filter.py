@@ -0,0 +1,82 @@
+"""
+Unit tests for incremental collaborative filter training.
+
+This test suite covers:
+- Folding changed users into the feature store without a full rebuild
+- Evicting users deleted since the last training run
+"""
+from contextlib import nullcontext
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.neighbors import NearestNeighbors
+
+from app.ml.recommendations import collaborative_filter as cf_module
+from app.ml.recommendations.collaborative_filter import CollaborativeFilter
+
+
+def _peer_rows(count: int, offset: int = 0) -> pd.DataFrame:
+    """Raw peer rows shaped like query_peer_rows output."""
+    rng = np.random.default_rng(offset)
+    ids = [f"user-{offset + i}" for i in range(count)]
+    rows = pd.DataFrame({
+        'date_of_birth': [date(1960 + i % 40, 1 + i % 12, 1) for i in range(count)],
+        'annual_income': rng.uniform(30000, 200000, count),
+        'monthly_expenses': rng.uniform(1000, 6000, count),
+        'dependents': rng.integers(0, 4, count),
+        'marital_status': rng.choice(['single', 'married'], count),
+        'risk_tolerance': rng.choice(['conservative', 'moderate', 'aggressive'], count),
+        'investment_experience': rng.choice(['beginner', 'advanced'], count),
+        'employment_status': rng.choice(['employed', 'retired'], count),
+        'liquid_assets': rng.uniform(0, 50000, count),
+        'retirement_accounts': rng.uniform(0, 200000, count),
+        'real_estate_value': 0.0, 'other_investments': 0.0, 'personal_property_value': 0.0,
+        'mortgage_balance': 0.0, 'credit_card_debt': rng.uniform(0, 10000, count),
+        'student_loans': 0.0, 'auto_loans': 0.0, 'other_debts': 0.0,
+        'num_goals': rng.integers(0, 4, count), 'avg_goal_timeline': rng.uniform(6, 120, count),
+        'total_goal_amount': rng.uniform(1000, 90000, count), 'goal_diversity': rng.integers(0, 3, count),
+        'completed_goals': 0, 'avg_goal_progress': rng.uniform(0, 100, count),
+        'num_investments': rng.integers(0, 5, count), 'portfolio_value': rng.uniform(0, 90000, count)
+    }, index=ids)
+    return rows
+
+
+class TestCollaborativeFilterTraining:
+    """Test suite for CollaborativeFilter training."""
+
+    @pytest.fixture
+    def trained(self, tmp_path):
+        """Filter trained on 100 users, with the database queries patched."""
+        rows = _peer_rows(100)
+        # Current scikit-learn rejects cosine distance for ball trees
+        brute_neighbors = lambda **params: NearestNeighbors(**{**params, 'algorithm': 'brute'})
+        with patch.object(cf_module, 'SessionLocal', nullcontext), \
+             patch.object(cf_module, 'query_peer_rows', return_value=rows), \
+             patch.object(cf_module, 'NearestNeighbors', brute_neighbors):
+            model = CollaborativeFilter(str(tmp_path / "collaborative"))
+            model.train_collaborative_models(retrain=True)
+        return model, rows
+
+    def test_incremental_run_evicts_deleted_users(self, trained):
+        """Users no longer in the database are dropped; changed users are upserted."""
+        model, rows = trained
+        changed = _peer_rows(3, offset=100)
+        remaining = [user_id for user_id in rows.index if user_id not in ('user-4', 'user-9')]
+
+        with patch.object(cf_module, 'SessionLocal', nullcontext), \
+             patch.object(cf_module, 'query_peer_rows', return_value=changed), \
+             patch.object(cf_module, 'query_peer_user_ids', return_value=remaining + list(changed.index)):
+            metrics = model.train_collaborative_models(incremental=True)
+
+        assert metrics['mode'] == 'incremental'
+        assert metrics['num_users'] == 3 and metrics['num_evicted'] == 2
+        assert 'user-4' not in model.feature_store and 'user-9' not in model.feature_store
+        assert 'user-101' in model.feature_store
+        assert sorted(model.feature_store.user_ids()) == sorted(remaining + list(changed.index))
+
+        reloaded = CollaborativeFilter(model.model_path)
+        assert len(reloaded.feature_store) == 101
+        assert 'user-4' not in reloaded.feature_store
@@ -0,0 +1,135 @@
+"""
+Unit tests for tiered AI context caching.
+
+This test suite covers:
+- Components assigned by type when only some types are requested
+- One shared market state build across users and concurrent turns
+- Invalidation through the shared generation counters
+- Write-path hooks used by the import processors
+"""
+import asyncio
+from collections import defaultdict
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.ai import context_management
+from app.services.ai.context_management import ContextManager, ContextType
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def hincrby(self, key, field, amount):
+        self.commands.append((key, field, amount))
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        for key, field, amount in self.commands:
+            self.redis.hashes[key][field] += amount
+
+
+class FakeRedis:
+    """The hash commands the generation counters use, shared by every manager"""
+
+    def __init__(self):
+        self.hashes = defaultdict(lambda: defaultdict(int))
+
+    def hgetall(self, key):
+        return {field.encode(): str(value).encode() for field, value in self.hashes[key].items()}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+def _manager(redis_client):
+    """ContextManager whose builders return tagged values and count calls."""
+    with patch.object(context_management.redis.Redis, 'from_url', return_value=redis_client):
+        manager = ContextManager({})
+
+    async def market():
+        await asyncio.sleep(0.01)
+        return {'component': 'market'}
+
+    manager._build_market_context = AsyncMock(side_effect=market)
+    manager._build_portfolio_context = AsyncMock(
+        side_effect=lambda user_id, db: {'component': 'portfolio', 'user_id': user_id}
+    )
+    manager._build_tax_context = AsyncMock(side_effect=lambda user_id, db: {'component': 'tax', 'user_id': user_id})
+    manager._build_goal_context = AsyncMock(side_effect=lambda user_id, db: {'component': 'goals'})
+    return manager
+
+
+class TestContextManager:
+    """Test suite for ContextManager component caching."""
+
+    @pytest.mark.asyncio
+    async def test_subset_assigns_components_by_type(self, redis_client):
+        """Requested components land on their own fields; nothing else is built."""
+        manager = _manager(redis_client)
+
+        context = await manager.build_comprehensive_context(
+            'u1', 's1', include_types=[ContextType.TAX_SITUATION, ContextType.MARKET_STATE]
+        )
+
+        assert context.tax == {'component': 'tax', 'user_id': 'u1'}
+        assert context.market == {'component': 'market'}
+        assert context.portfolio is None and context.goals is None and context.conversation is None
+        manager._build_portfolio_context.assert_not_called()
+        manager._build_goal_context.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_market_state_built_once_across_users(self, redis_client):
+        """Concurrent turns for different users share one market build and its cache entry."""
+        manager = _manager(redis_client)
+        include = [ContextType.MARKET_STATE, ContextType.PORTFOLIO_STATE]
+
+        contexts = await asyncio.gather(*(
+            manager.build_comprehensive_context(f'u{i}', f's{i}', include_types=include)
+            for i in range(5)
+        ))
+        later = await manager.build_comprehensive_context('u9', 's9', include_types=include)
+
+        assert manager._build_market_context.await_count == 1
+        assert all(c.market is contexts[0].market for c in contexts + [later])
+        assert [c.portfolio['user_id'] for c in contexts] == [f'u{i}' for i in range(5)]
+        assert manager._build_portfolio_context.await_count == 6
+
+    @pytest.mark.asyncio
+    async def test_write_hook_invalidates_other_processes(self, redis_client):
+        """A portfolio write seen through the generation counters rebuilds only the affected types."""
+        reader, writer = _manager(redis_client), _manager(redis_client)
+        include = [ContextType.PORTFOLIO_STATE, ContextType.GOAL_STATE]
+
+        await reader.build_comprehensive_context('u1', 's1', include_types=include)
+        await reader.build_comprehensive_context('u1', 's1', include_types=include)
+        assert reader._build_portfolio_context.await_count == 1
+
+        writer.on_portfolio_write('u1')
+        await reader.build_comprehensive_context('u1', 's1', include_types=include)
+        await reader.build_comprehensive_context('u2', 's2', include_types=include)
+
+        assert reader._build_portfolio_context.await_count == 3
+        assert reader._build_goal_context.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_module_hook_used_by_write_paths(self, redis_client):
+        """notify_transaction_write bumps the same counters without a ContextManager."""
+        manager = _manager(redis_client)
+        include = [ContextType.TAX_SITUATION]
+        await manager.build_comprehensive_context('u1', 's1', include_types=include)
+
+        with patch.object(context_management, '_write_hook_redis', redis_client):
+            context_management.notify_transaction_write('u1')
+        await manager.build_comprehensive_context('u1', 's1', include_types=include)
+
+        assert manager._build_tax_context.await_count == 2
@@ -0,0 +1,82 @@
+"""
+Unit tests for streaming CSV import.
+
+This test suite covers:
+- Incremental reading that matches csv.DictReader for any chunking
+- Broker format detection from the header
+- Batched stream parsing that matches whole-file parsing
+"""
+import csv
+import io
+
+import pytest
+
+from app.services.transaction_import import BrokerFormat, CSVParser, StreamingCSVReader
+
+SCHWAB_CSV = (
+    'Date,Action,Symbol,Description,Quantity,Price,Fees & Comm,Amount\r\n'
+    '03/01/2026,Buy,AAPL,"APPLE INC, ""COMMON""",10,$190.00,$1.00,"-$1,901.00"\r\n'
+    '03/02/2026,Sell,MSFT,"MICROSOFT\nCORP",-2,$400.00,$0.50,$799.50\r\n'
+    '\r\n'
+    'not a date,Buy,AAPL,bad row,1,1,0,-1\r\n'
+    '03/03/2026,Cash Dividend,AAPL,DIVIDEND,,,,$2.40\r\n'
+    'Transactions Total,,,,,,,"$-1,099.10"\r\n'
+)
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+class TestStreamingCSVReader:
+    """Test suite for StreamingCSVReader."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 4096])
+    async def test_matches_dict_reader(self, chunk_size):
+        """Rows, row numbers and quoted multi-line fields match csv.DictReader."""
+        data = ('\ufeff' + SCHWAB_CSV + 'short,row').encode('utf-8')
+        expected = list(enumerate(csv.DictReader(io.StringIO(SCHWAB_CSV + 'short,row')), start=2))
+
+        reader = StreamingCSVReader(_chunks(data, chunk_size))
+        rows = [item async for item in reader.rows()]
+
+        assert reader.fieldnames[0] == 'Date'
+        assert rows == expected
+        assert reader.bytes_read == len(data)
+
+
+class TestParseStream:
+    """Test suite for CSVParser.parse_stream."""
+
+    def test_detect_format(self):
+        """Headers identify each supported format; unknown headers give None."""
+        parser = CSVParser()
+
+        assert parser.detect_format(SCHWAB_CSV.split('\r\n')[0].split(',')) == BrokerFormat.SCHWAB
+        assert parser.detect_format(['Run Date', 'Action', 'Symbol', 'Amount']) == BrokerFormat.FIDELITY
+        assert parser.detect_format(['Trade Date', 'Transaction Type', 'Net Amount']) == BrokerFormat.VANGUARD
+        assert parser.detect_format(['Date', 'Type', 'Symbol', 'Amount']) == BrokerFormat.GENERIC
+        assert parser.detect_format(['When', 'What']) is None
+
+    @pytest.mark.asyncio
+    async def test_batches_match_parse(self):
+        """Streaming with detection yields the same transactions and errors in batches."""
+        expected_parser = CSVParser()
+        expected = expected_parser.parse(SCHWAB_CSV, BrokerFormat.SCHWAB)
+
+        parser = CSVParser()
+        batches = [batch async for batch in parser.parse_stream(_chunks(SCHWAB_CSV.encode(), 5), batch_size=2)]
+
+        assert [len(batch) for batch in batches] == [2, 1]
+        assert [tx for batch in batches for tx in batch] == expected
+        assert parser.broker_format == BrokerFormat.SCHWAB
+        assert parser.errors == expected_parser.errors and parser.error_count == 1
+
+    @pytest.mark.asyncio
+    async def test_undetectable_format(self):
+        """An unknown header without an explicit format is rejected."""
+        with pytest.raises(ValueError):
+            async for _ in CSVParser().parse_stream(_chunks(b'When,What\n1,2\n', 4)):
+                pass
@@ -0,0 +1,90 @@
+"""
+Unit tests for vectorized recommendation features.
+
+This test suite covers:
+- Goal and investment aggregates in the user frame
+- Risk features, including users without goals or investments
+- Life-stage readiness scores
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.ml.recommendations.feature_frames import (
+    LIFE_STAGE_FEATURE_COLUMNS, RISK_FEATURE_COLUMNS,
+    build_user_frame, life_stage_feature_frame, risk_feature_frame
+)
+
+NOW = datetime(2026, 6, 1)
+
+
+def make_profile(**overrides):
+    values = dict(
+        age=30, annual_income=120000, monthly_expenses=5000, liquid_assets=30000,
+        net_worth=150000, debt_to_income_ratio=0.2, dependents=0, retirement_age_target=None,
+        life_insurance_coverage=0, risk_tolerance='aggressive', investment_experience='advanced',
+        marital_status='single', job_stability='stable', income_stability='variable',
+        employment_status='employed'
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class TestFeatureFrames:
+    """Test suite for feature frame builders."""
+
+    @pytest.fixture
+    def users(self):
+        """One user with goals and investments and one with neither."""
+        goals = [
+            SimpleNamespace(goal_type='home_purchase', months_remaining=24, is_flexible_timeline=True),
+            SimpleNamespace(goal_type='retirement', months_remaining=360, is_flexible_timeline=False),
+            SimpleNamespace(goal_type='home_purchase', months_remaining=36, is_flexible_timeline=False)
+        ]
+        investments = [
+            SimpleNamespace(current_value=30000, updated_at=NOW - timedelta(days=10)),
+            SimpleNamespace(current_value=10000, updated_at=NOW - timedelta(days=200)),
+            SimpleNamespace(current_value=None, updated_at=None)
+        ]
+        return [
+            {'profile': make_profile(), 'goals': goals, 'investments': investments},
+            {'profile': make_profile(age=50, monthly_expenses=0, dependents=2, marital_status='married',
+                                     retirement_age_target=60, risk_tolerance=None, job_stability=None)}
+        ]
+
+    def test_risk_features(self, users):
+        """Aggregates and encodings match the per-user definitions."""
+        features = risk_feature_frame(build_user_frame(users, index=['a', 'b'], now=NOW))
+
+        assert list(features.columns) == RISK_FEATURE_COLUMNS
+        a, b = features.loc['a'], features.loc['b']
+        assert a['num_goals'] == 3 and a['goal_diversity'] == 2
+        assert a['avg_goal_timeline'] == pytest.approx(140)
+        assert a['flexible_goals_ratio'] == pytest.approx(1 / 3)
+        assert a['portfolio_concentration'] == pytest.approx(0.75 ** 2 + 0.25 ** 2)
+        assert a['investment_frequency'] == pytest.approx(1 / 3)
+        assert a['savings_rate'] == pytest.approx(0.5)
+        assert a['emergency_fund_ratio'] == pytest.approx(1.0)
+        assert a['retirement_horizon'] == 35 and a['family_stage'] == 1
+        assert a['stated_risk_tolerance'] == 2 and a['income_stability_score'] == 0.6
+
+        assert b['num_goals'] == 0 and b['portfolio_concentration'] == 0
+        assert b['emergency_fund_ratio'] == 0 and b['savings_rate'] == 1.0
+        assert b['retirement_horizon'] == 10 and b['family_stage'] == 3
+        assert b['stated_risk_tolerance'] == 1 and b['job_stability_score'] == 0.5
+
+    def test_life_stage_features(self, users):
+        """Readiness scores average the same factors as the scalar helpers."""
+        features = life_stage_feature_frame(build_user_frame(users, index=['a', 'b'], now=NOW))
+
+        assert list(features.columns) == LIFE_STAGE_FEATURE_COLUMNS
+        a = features.loc['a']
+        assert a['has_home_goal'] == 1 and a['has_education_goal'] == 0
+        assert a['family_oriented_goals'] == 2
+        assert a['urban_lifestyle_indicator'] == 1
+        assert a['marriage_financial_readiness'] == pytest.approx(np.mean([0.5, 1.0, 0.8, 1.0]))
+        assert a['home_purchase_readiness'] == pytest.approx(np.mean([0.375, 1.0, 1 - 0.2 / 0.43, 1.0]))
+        assert a['family_financial_readiness'] == pytest.approx(np.mean([1.0, 1.0, 0.3, 1.0]))
+        assert features.loc['b', 'marital_status_married'] == 1
@@ -0,0 +1,77 @@
+"""
+Unit tests for the persisted user feature store.
+
+This test suite covers:
+- Cosine k-nearest-neighbour search against a brute-force reference
+- Memory-mapped reload of a built store
+- Incremental upserts, removals and compaction
+"""
+import pytest
+import numpy as np
+
+from app.ml.recommendations.feature_store import UserFeatureStore
+
+
+METRIC_COLUMNS = ['savings_rate', 'num_goals']
+LABEL_COLUMNS = ['risk_tolerance']
+
+
+class TestUserFeatureStore:
+    """Test suite for UserFeatureStore."""
+
+    @pytest.fixture
+    def features(self):
+        """Scaled features for 500 users."""
+        return np.random.default_rng(11).normal(size=(500, 8)).astype(np.float32)
+
+    @pytest.fixture
+    def store(self, tmp_path, features):
+        """Store built from the sample features."""
+        store = UserFeatureStore(str(tmp_path / "store"), METRIC_COLUMNS, LABEL_COLUMNS)
+        store.build(
+            [f"user-{i}" for i in range(len(features))],
+            features,
+            np.column_stack([np.linspace(0, 0.5, len(features)), np.arange(len(features)) % 4]),
+            [{'risk_tolerance': 'moderate'} for _ in range(len(features))]
+        )
+        return store
+
+    def test_nearest_matches_brute_force(self, store, features):
+        """Top-k equals a full cosine ranking, excluding the query user."""
+        normalized = features / np.linalg.norm(features, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ normalized[3]))[1:11]
+
+        result = store.nearest(features[3], 10, exclude=["user-3"])
+
+        assert [user_id for user_id, _ in result] == [f"user-{i}" for i in expected]
+        assert result[0][1] == pytest.approx(float(normalized[expected[0]] @ normalized[3]), rel=1e-5)
+
+    def test_reload_is_memory_mapped(self, store, features):
+        """A fresh store maps the persisted matrix and returns stored records."""
+        reloaded = UserFeatureStore(str(store.store_path), METRIC_COLUMNS, LABEL_COLUMNS)
+
+        assert reloaded.load()
+        assert isinstance(reloaded._features, np.memmap)
+        assert len(reloaded) == 500
+        np.testing.assert_array_equal(reloaded.get_vector("user-7"), features[7])
+        assert reloaded.get_record("user-7") == {
+            'savings_rate': pytest.approx(0.5 * 7 / 499), 'num_goals': 3.0, 'risk_tolerance': 'moderate'
+        }
+
+    def test_upsert_and_compact(self, store, features):
+        """Upserts replace stale rows immediately and survive compaction."""
+        store.upsert("user-0", features[42], [0.3, 1], {'risk_tolerance': 'aggressive'})
+        store.upsert("user-new", -features[42], [0.1, 0], {'risk_tolerance': 'conservative'})
+        store.remove("user-5")
+
+        assert len(store) == 500
+        assert "user-5" not in store
+        assert {u for u, _ in store.nearest(features[42], 2)} == {"user-0", "user-42"}
+
+        store.compact()
+        reloaded = UserFeatureStore(str(store.store_path), METRIC_COLUMNS, LABEL_COLUMNS)
+        reloaded.load()
+
+        assert len(reloaded) == 500
+        assert reloaded.get_record("user-0")['risk_tolerance'] == 'aggressive'
+        assert reloaded.nearest(-features[42], 1)[0][0] == "user-new"
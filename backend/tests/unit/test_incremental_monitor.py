@@ -0,0 +1,176 @@
+"""
+Unit tests for the event-driven incremental risk monitor.
+
+This test suite covers:
+- Ring buffer running statistics
+- Incremental portfolio value, concentration and drawdown
+- Closed positions dropped from the liquid set
+- Rule evaluation restricted to changed metrics
+- Tick consumption on the running event loop
+- Position updates and ticks handed over from other threads
+- RealTimeRiskMonitor cycles running off the event loop
+"""
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+import numpy as np
+
+from app.services.risk.incremental_monitor import (
+    IncrementalRiskMonitor,
+    MarketTick,
+    RollingWindow
+)
+from app.services.risk.real_time_monitor import (
+    AlertSeverity,
+    MonitoringMetric,
+    MonitoringRule,
+    RealTimeRiskMonitor
+)
+
+
+class TestRollingWindow:
+    """Test suite for RollingWindow."""
+
+    def test_running_stats_match_numpy(self):
+        """Running mean/std and quantiles match numpy over the retained window."""
+        window = RollingWindow(capacity=50)
+        values = np.random.default_rng(3).normal(0, 0.02, 137)
+        for value in values:
+            window.append(value)
+
+        retained = values[-50:]
+        assert len(window) == 50
+        assert window.mean == pytest.approx(retained.mean())
+        assert window.std == pytest.approx(retained.std())
+        np.testing.assert_allclose(window.quantiles([0.05, 0.01]), np.quantile(retained, [0.05, 0.01]))
+
+
+class TestIncrementalRiskMonitor:
+    """Test suite for IncrementalRiskMonitor."""
+
+    @pytest.fixture
+    def monitor(self):
+        """Monitor with a single drawdown rule."""
+        return IncrementalRiskMonitor(monitoring_rules=[
+            MonitoringRule(
+                rule_id="DRAWDOWN_CRITICAL",
+                metric=MonitoringMetric.CURRENT_DRAWDOWN,
+                condition="less_than",
+                threshold=-0.20,
+                severity=AlertSeverity.CRITICAL
+            )
+        ])
+
+    def test_position_update_metrics(self, monitor):
+        """Value, concentration and leverage come from incremental aggregates."""
+        monitor.update_positions('p1', {
+            'AAPL': {'quantity': 10, 'price': 100.0},
+            'MSFT': {'quantity': 10, 'price': 300.0},
+            'account_equity': 2000
+        })
+        metrics = monitor.get_portfolio_metrics('p1')
+
+        assert metrics['portfolio_value'] == pytest.approx(4000.0)
+        assert metrics['concentration'] == pytest.approx(0.25 ** 2 + 0.75 ** 2)
+        assert metrics['leverage'] == pytest.approx(2.0)
+
+    def test_closed_position_is_not_liquid(self, monitor):
+        """A position re-marked to zero leaves the liquid set and liquid value."""
+        monitor.update_positions('p1', {
+            'AAPL': {'quantity': 10, 'price': 100.0},
+            'MSFT': {'quantity': 10, 'price': 300.0}
+        })
+        monitor.process_ticks([MarketTick('AAPL', 100.0, volume=1e6), MarketTick('MSFT', 300.0, volume=1e6)])
+        state = monitor.portfolios['p1']
+        assert state.liquid_positions == {'AAPL', 'MSFT'}
+
+        monitor.update_positions('p1', {
+            'AAPL': {'quantity': 0, 'price': 100.0},
+            'MSFT': {'quantity': 10, 'price': 300.0}
+        })
+
+        assert state.liquid_positions == {'MSFT'}
+        assert state.liquid_value == pytest.approx(3000.0)
+        assert monitor.get_portfolio_metrics('p1')['liquidity'] == pytest.approx(1.0)
+
+    def test_ticks_only_touch_holding_portfolios(self, monitor):
+        """A tick re-marks only portfolios that hold the symbol."""
+        monitor.update_positions('p1', {'AAPL': {'quantity': 10, 'price': 100.0}})
+        monitor.update_positions('p2', {'MSFT': {'quantity': 10, 'price': 300.0}})
+
+        monitor.process_ticks([MarketTick('AAPL', 110.0)])
+
+        assert monitor.get_portfolio_metrics('p1')['portfolio_value'] == pytest.approx(1100.0)
+        assert monitor.get_portfolio_metrics('p2')['portfolio_value'] == pytest.approx(3000.0)
+
+    def test_drawdown_alert_from_running_peak(self, monitor):
+        """Drawdown uses the running peak and raises once per cooldown."""
+        monitor.update_positions('p1', {'AAPL': {'quantity': 10, 'price': 100.0}})
+
+        assert monitor.process_ticks([MarketTick('AAPL', 120.0)]) == []
+        alerts = monitor.process_ticks([MarketTick('AAPL', 90.0)])
+
+        assert [(pid, alert.metric) for pid, alert in alerts] == [('p1', MonitoringMetric.CURRENT_DRAWDOWN)]
+        assert monitor.get_portfolio_metrics('p1')['current_drawdown'] == pytest.approx(-0.25)
+        assert monitor.process_ticks([MarketTick('AAPL', 85.0)]) == []
+
+    @pytest.mark.asyncio
+    async def test_consumes_ticks_on_event_loop(self, monitor):
+        """Published ticks are processed by the consumer task."""
+        received = []
+        monitor.add_alert_handler(lambda pid, alert: received.append(pid))
+        monitor.update_positions('p1', {'AAPL': {'quantity': 10, 'price': 100.0}})
+
+        await monitor.start_monitoring()
+        monitor.publish_tick('AAPL', 70.0)
+        await asyncio.sleep(0.01)
+        await monitor.stop_monitoring()
+
+        assert received == ['p1']
+        assert monitor.ticks_processed == 1
+
+    @pytest.mark.asyncio
+    async def test_updates_from_other_threads_run_on_loop(self, monitor):
+        """Worker-thread position updates and ticks are applied on the monitor's loop."""
+        received = []
+        monitor.add_alert_handler(lambda pid, alert: received.append((pid, threading.get_ident())))
+        loop_thread = threading.get_ident()
+
+        await monitor.start_monitoring()
+        alerts = await asyncio.to_thread(
+            monitor.update_positions, 'p1', {'AAPL': {'quantity': 10, 'price': 100.0}}
+        )
+        for price in (120.0, 70.0):
+            await asyncio.to_thread(monitor.publish_tick, 'AAPL', price)
+            await asyncio.sleep(0.01)
+        await monitor.stop_monitoring()
+
+        assert alerts == []
+        assert monitor.get_portfolio_metrics('p1')['portfolio_value'] == pytest.approx(700.0)
+        assert received == [('p1', loop_thread)]
+        assert monitor.ticks_processed == 2
+
+
+class TestRealTimeRiskMonitor:
+    """Test suite for RealTimeRiskMonitor's loops."""
+
+    @pytest.mark.asyncio
+    async def test_cycles_run_on_executor(self):
+        """Monitoring and calculation cycles never run on the event loop thread."""
+        monitor = RealTimeRiskMonitor()
+        monitor.monitoring_interval = monitor.calculation_interval = 0.01
+        threads = []
+
+        def record():
+            threads.append(threading.get_ident())
+
+        with patch.object(monitor, '_run_monitoring_cycle', side_effect=record), \
+                patch.object(monitor, '_run_calculation_cycle', side_effect=record):
+            await monitor.start_monitoring()
+            await asyncio.sleep(0.05)
+            await monitor.stop_monitoring()
+        monitor.executor.shutdown(wait=True)
+
+        assert threads and threading.get_ident() not in threads
@@ -0,0 +1,136 @@
+"""
+Unit tests for the persistent BM25 keyword index.
+
+This test suite covers:
+- Scores against a brute-force BM25 reference
+- Source filtering
+- Incremental upserts and removals before and after compaction
+- Reload from disk
+- Journaled saves that only rewrite the matrix once the journal fills
+"""
+import math
+from collections import Counter
+
+import pytest
+
+from app.services.ai.keyword_index import KeywordIndex, tokenize
+
+
+WORDS = ['roth', 'ira', 'tax', 'bracket', 'conversion', 'dividend', 'etf',
+         'bond', 'rebalancing', 'harvesting', 'loss', 'estate', 'trust', 'rmd']
+
+
+def reference_scores(docs, query, k1=1.5, b=0.75):
+    """Brute-force BM25 over every document."""
+    tokenized = {doc_id: Counter(tokenize(content)) for doc_id, content in docs.items()}
+    n_docs = len(tokenized)
+    avg_length = sum(sum(c.values()) for c in tokenized.values()) / n_docs
+    scores = {}
+    for doc_id, counts in tokenized.items():
+        length = sum(counts.values())
+        score = 0.0
+        for term, query_tf in Counter(tokenize(query)).items():
+            df = sum(1 for c in tokenized.values() if term in c)
+            if df == 0 or term not in counts:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            tf = counts[term]
+            score += query_tf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        if score > 0:
+            scores[doc_id] = score
+    return scores
+
+
+class TestKeywordIndex:
+    """Test suite for KeywordIndex."""
+
+    @pytest.fixture
+    def docs(self):
+        """Sample documents with deterministic word mixes."""
+        return {
+            f"doc-{i}": " ".join(WORDS[(i * j + j) % len(WORDS)] for j in range(5 + i % 7))
+            for i in range(60)
+        }
+
+    @pytest.fixture
+    def index(self, tmp_path, docs):
+        """Index over the sample documents, split between sources."""
+        index = KeywordIndex(str(tmp_path / "keyword_index"), max_delta=25)
+        for i, (doc_id, content) in enumerate(docs.items()):
+            index.upsert(doc_id, content, 'tax_code' if i % 2 else 'regulatory')
+        return index
+
+    def test_scores_match_reference(self, index, docs):
+        """Results equal a brute-force BM25 ranking across matrix and delta."""
+        query = "roth conversion tax bracket"
+        expected = reference_scores(docs, query)
+
+        results = index.search(query, top_k=len(docs))
+
+        assert {r['id'] for r in results} == set(expected)
+        for result in results:
+            assert result['score'] == pytest.approx(expected[result['id']], rel=1e-5)
+        assert [r['score'] for r in results] == sorted((r['score'] for r in results), reverse=True)
+
+    def test_source_filter(self, index):
+        """Only documents from the requested sources are returned."""
+        results = index.search("estate trust", sources=['tax_code'], top_k=100)
+
+        assert results
+        assert all(int(r['id'].split('-')[1]) % 2 == 1 for r in results)
+
+    def test_incremental_updates_and_reload(self, index, docs, tmp_path):
+        """Upserts and removals match a rebuilt reference, before and after reload."""
+        docs = dict(docs)
+        docs['doc-3'] = "municipal bond ladder bond"
+        docs['doc-99'] = "qualified charitable distribution rmd"
+        del docs['doc-4']
+        index.upsert('doc-3', docs['doc-3'], 'tax_code')
+        index.upsert('doc-99', docs['doc-99'], 'regulatory')
+        index.remove('doc-4')
+
+        query = "bond rmd distribution"
+        expected = reference_scores(docs, query)
+        results = {r['id']: r['score'] for r in index.search(query, top_k=100)}
+        assert results == pytest.approx(expected, rel=1e-5)
+
+        index.save()
+        reloaded = KeywordIndex(str(tmp_path / "keyword_index"))
+        assert reloaded.load()
+        assert len(reloaded) == len(docs)
+        results = {r['id']: r['score'] for r in reloaded.search(query, top_k=100)}
+        assert results == pytest.approx(expected, rel=1e-5)
+
+    def test_saves_append_to_journal(self, index, docs, tmp_path):
+        """Small saves append to the journal, replay on load and fold into a snapshot when full."""
+        path = tmp_path / "keyword_index"
+        index.save()
+        matrix_mtime = (path / KeywordIndex.MATRIX_FILE).stat().st_mtime_ns
+        assert not (path / KeywordIndex.JOURNAL_FILE).exists()
+
+        docs = dict(docs)
+        docs['doc-99'] = "qualified charitable distribution rmd"
+        del docs['doc-4']
+        index.upsert('doc-99', docs['doc-99'], 'regulatory')
+        index.remove('doc-4')
+        index.save()
+
+        assert (path / KeywordIndex.MATRIX_FILE).stat().st_mtime_ns == matrix_mtime
+        assert len((path / KeywordIndex.JOURNAL_FILE).read_text().splitlines()) == 2
+
+        query = "bond rmd distribution"
+        expected = reference_scores(docs, query)
+        reloaded = KeywordIndex(str(path), max_delta=25)
+        assert reloaded.load()
+        assert len(reloaded) == len(docs)
+        results = {r['id']: r['score'] for r in reloaded.search(query, top_k=100)}
+        assert results == pytest.approx(expected, rel=1e-5)
+
+        for i in range(30):
+            reloaded.upsert(f'doc-new-{i}', "estate trust bond", 'regulatory')
+        reloaded.save()
+
+        assert not (path / KeywordIndex.JOURNAL_FILE).exists()
+        rebuilt = KeywordIndex(str(path))
+        assert rebuilt.load()
+        assert len(rebuilt) == len(docs) + 30
@@ -0,0 +1,62 @@
+"""
+Unit tests for the LLM client manager.
+
+This test suite covers:
+- Repeated prompts served from the gateway cache
+- Template fallbacks and callers opting out of caching bypassing the cache
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.ai.config import AIConfig, LLMProvider
+from app.ai.llm_client import LLMClientManager, LLMResponse
+
+
+def _response(provider: LLMProvider, tokens: int = 40) -> LLMResponse:
+    return LLMResponse(content="narrative", provider=provider, model="model", tokens_used=tokens)
+
+
+def _manager() -> LLMClientManager:
+    """Manager without Redis whose API key checks always pass; needs a running loop."""
+    with patch.object(LLMClientManager, '_init_redis', AsyncMock()):
+        manager = LLMClientManager(
+            AIConfig(openai_api_key="test", anthropic_api_key="test", enable_ab_testing=False),
+            MagicMock()
+        )
+    manager._is_provider_available = AsyncMock(return_value=True)
+    return manager
+
+
+class TestLLMClientManager:
+    """Test suite for LLMClientManager."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_prompts_hit_gateway_cache(self):
+        """A second identical request is answered without calling the provider."""
+        manager = _manager()
+        client = manager.clients[LLMProvider.OPENAI]
+        client.generate = AsyncMock(return_value=_response(LLMProvider.OPENAI))
+
+        first = await manager.generate("Summarize", provider=LLMProvider.OPENAI)
+        second = await manager.generate("Summarize", provider=LLMProvider.OPENAI)
+
+        assert first == second
+        assert client.generate.await_count == 1
+        assert manager.gateway.stats['cache_hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_fallbacks_and_opt_outs_are_not_cached(self):
+        """Template fallbacks are regenerated, as are requests with use_cache=False."""
+        manager = _manager()
+        fallback = manager.clients[LLMProvider.FALLBACK]
+        fallback.generate = AsyncMock(return_value=_response(LLMProvider.FALLBACK, tokens=0))
+        await manager.generate("Summarize", provider=LLMProvider.FALLBACK)
+        await manager.generate("Summarize", provider=LLMProvider.FALLBACK)
+        assert fallback.generate.await_count == 2
+
+        client = manager.clients[LLMProvider.OPENAI]
+        client.generate = AsyncMock(return_value=_response(LLMProvider.OPENAI))
+        await manager.generate("Explain", provider=LLMProvider.OPENAI, use_cache=False)
+        await manager.generate("Explain", provider=LLMProvider.OPENAI, use_cache=False)
+        assert client.generate.await_count == 2
@@ -0,0 +1,90 @@
+"""
+Unit tests for the LLM gateway.
+
+This test suite covers:
+- Coalescing of identical in-flight requests
+- Semantic cache keys over bucketed template data
+- Per-provider concurrency limits and latency histograms
+"""
+import asyncio
+
+import pytest
+
+from app.ai.llm_gateway import LLMGateway, LatencyHistogram, ProviderLimits
+
+
+class TestLLMGateway:
+    """Test suite for LLMGateway."""
+
+    @pytest.fixture
+    def gateway(self):
+        """Gateway with tight concurrency for one provider."""
+        return LLMGateway(
+            limits={"openai": ProviderLimits(max_concurrency=2, tokens_per_minute=10 ** 6, requests_per_minute=10 ** 4)},
+            bucket_precision=0.005
+        )
+
+    @pytest.mark.asyncio
+    async def test_coalesces_identical_requests(self, gateway):
+        """Concurrent identical requests share one call and later ones hit the cache."""
+        calls = 0
+
+        async def factory():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "narrative", True
+
+        results = await asyncio.gather(*(gateway.coalesce("key", factory) for _ in range(10)))
+        cached = await gateway.coalesce("key", factory)
+
+        assert calls == 1
+        assert sorted(source for _, source in results) == ["coalesced"] * 9 + ["origin"]
+        assert cached == ("narrative", "cache")
+
+    def test_semantic_key_buckets_numbers(self, gateway):
+        """Values within the bucket precision share a key; larger changes do not."""
+        base = {"success_probability": 0.8512, "median_balance": 1250000, "years": 30, "name": "Plan  A"}
+        near = {**base, "median_balance": 1250900, "name": "Plan A"}
+        far = {**base, "median_balance": 1300000}
+
+        key = gateway.semantic_key("simulation_summary", base)
+
+        assert gateway.semantic_key("simulation_summary", near) == key
+        assert gateway.semantic_key("simulation_summary", far) != key
+        assert gateway.semantic_key("simulation_summary", base, language="es") != key
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_and_histogram(self, gateway):
+        """No more than max_concurrency calls run at once and each is timed."""
+        running = peak = 0
+
+        async def call():
+            nonlocal running, peak
+            async with gateway.limit("openai", estimated_tokens=100) as limiter:
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+                limiter.reconcile(100, 80)
+
+        await asyncio.gather(*(call() for _ in range(8)))
+
+        snapshot = gateway.metrics()["providers"]["openai"]
+        assert peak == 2
+        assert snapshot["latency"]["count"] == 8
+        assert snapshot["tokens_used"] == 640
+
+
+class TestLatencyHistogram:
+    """Test suite for LatencyHistogram."""
+
+    def test_percentiles(self):
+        """Percentiles report the upper bound of the containing bucket."""
+        histogram = LatencyHistogram([100, 500, 1000])
+        for latency in [50] * 90 + [400] * 9 + [5000]:
+            histogram.observe(latency)
+
+        assert histogram.percentile(50) == 100
+        assert histogram.percentile(95) == 500
+        assert histogram.percentile(100) == 5000
@@ -0,0 +1,98 @@
+"""
+Unit tests for the in-memory tax lot engine.
+
+This test suite covers:
+- FIFO, LIFO, HIFO and specific-ID lot selection
+- Realized gains with pro-rata fees and holding periods
+- Change tracking and positions for touched instruments only
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.services.portfolio.lot_engine import LotEngine, OpenLot, Trade
+from app.services.tax_optimization import TaxLotMethod
+
+ACCOUNT = 'acct'
+
+
+def _lot(lot_id: str, opened: date, quantity: str, cost: str, instrument: str = 'AAPL', closed: str = '0') -> OpenLot:
+    return OpenLot(
+        lot_id=lot_id, transaction_id=f'tx-{lot_id}', account_id=ACCOUNT, instrument_id=instrument,
+        open_date=opened, quantity_open=Decimal(quantity), cost_basis=Decimal(cost),
+        quantity_closed=Decimal(closed)
+    )
+
+
+def _sell(quantity: str, price: str, on: date, fee: str = '0', lot_ids=None) -> Trade:
+    return Trade(
+        transaction_id='sell', account_id=ACCOUNT, instrument_id='AAPL', side='sell',
+        quantity=Decimal(quantity), price=Decimal(price), trade_date=on, fee=Decimal(fee), lot_ids=lot_ids
+    )
+
+
+class TestLotEngine:
+    """Test suite for LotEngine."""
+
+    @pytest.fixture
+    def lots(self):
+        """Three AAPL lots (the first partly sold already) and one untouched MSFT lot."""
+        return [
+            _lot('a', date(2024, 1, 10), '10', '100', closed='4'),
+            _lot('b', date(2025, 6, 1), '10', '150'),
+            _lot('c', date(2025, 9, 1), '10', '120'),
+            _lot('m', date(2025, 1, 1), '5', '300', instrument='MSFT'),
+        ]
+
+    @pytest.mark.parametrize('method, expected', [
+        (TaxLotMethod.FIFO, [('a', '6'), ('b', '4')]),
+        (TaxLotMethod.LIFO, [('c', '10')]),
+        (TaxLotMethod.HIFO, [('b', '10')]),
+    ])
+    def test_lot_selection(self, lots, method, expected):
+        """Each method closes lots in its own order."""
+        engine = LotEngine(method)
+        engine.load(lots)
+
+        realized = engine.apply([_sell('10', '130', date(2026, 1, 5))])
+
+        assert [(gain.lot_id, str(gain.quantity)) for gain in realized] == expected
+
+    def test_specific_id_and_gains(self, lots):
+        """Listed lots close first; proceeds carry a pro-rata share of the fee."""
+        engine = LotEngine(TaxLotMethod.SPECIFIC_ID)
+        engine.load(lots)
+
+        realized = engine.apply([_sell('8', '130', date(2025, 12, 1), fee='8', lot_ids=['c', 'a'])])
+
+        assert [(gain.lot_id, gain.quantity) for gain in realized] == [('c', 8)]
+        gain = realized[0]
+        assert gain.cost_basis == Decimal('960') and gain.proceeds == Decimal('1032')
+        assert gain.gain == Decimal('72') and not gain.is_long_term
+
+    def test_changes_and_positions(self, lots):
+        """Only new and closed lots are reported; positions cover touched instruments."""
+        engine = LotEngine()
+        engine.load(lots)
+        buy = Trade(transaction_id='buy', account_id=ACCOUNT, instrument_id='AAPL', side='buy',
+                    quantity=Decimal('5'), price=Decimal('110'), trade_date=date(2026, 2, 1), fee=Decimal('5'))
+
+        realized = engine.apply([buy, _sell('6', '140', date(2026, 1, 5))])
+        new, updated = engine.changed_lots()
+
+        assert realized[0].is_long_term and realized[0].gain == Decimal('240')
+        assert [lot.cost_basis for lot in new] == [Decimal('111')]
+        assert [(lot.lot_id, lot.close_date) for lot in updated] == [('a', date(2026, 1, 5))]
+        quantity, average_cost = engine.positions()[(ACCOUNT, 'AAPL')]
+        assert quantity == Decimal('25')
+        assert average_cost == (Decimal('1500') + Decimal('1200') + Decimal('555')) / 25
+        assert list(engine.positions()) == [(ACCOUNT, 'AAPL')]
+
+    def test_unloaded_instrument(self):
+        """Trades for keys that were not loaded are rejected rather than treated as empty."""
+        engine = LotEngine()
+        engine.load([], keys=[(ACCOUNT, 'MSFT')])
+
+        with pytest.raises(KeyError):
+            engine.apply([_sell('1', '1', date(2026, 1, 1))])
@@ -0,0 +1,35 @@
+"""
+Unit tests for the multi-pattern merchant matcher.
+
+This test suite covers:
+- Matches against brute-force substring search, including overlapping patterns
+- Lowest-id priority for first-match lookups
+"""
+import random
+
+from app.services.banking.merchant_matcher import PatternMatcher
+
+
+class TestPatternMatcher:
+    """Test suite for PatternMatcher."""
+
+    def test_matches_brute_force(self):
+        """Every pattern found equals a substring check per pattern."""
+        rng = random.Random(5)
+        patterns = [''.join(rng.choice('abc ') for _ in range(rng.randint(1, 5))) for _ in range(200)]
+        matcher = PatternMatcher(patterns)
+
+        for _ in range(300):
+            text = ''.join(rng.choice('abcd ') for _ in range(rng.randint(0, 40)))
+            expected = {i for i, pattern in enumerate(patterns) if pattern in text}
+            assert matcher.find(text) == expected
+
+    def test_first_prefers_lowest_id(self):
+        """Overlapping and nested patterns resolve to the earliest listed one."""
+        matcher = PatternMatcher(['whole foods', 'foods', 'hole', 'amazon'])
+
+        assert matcher.find('whole foods market') == {0, 1, 2}
+        assert matcher.first('whole foods market') == 0
+        assert matcher.first('amazon fresh foods') == 1
+        assert matcher.first('walmart') is None
+        assert PatternMatcher([]).first('anything') is None
@@ -0,0 +1,98 @@
+"""
+Unit tests for the model monitoring metrics store.
+
+This test suite covers:
+- Buffered appends and latest-N history per metric
+- Vectorized trends against scipy's linear regression
+- Retention-based compaction
+- All-or-nothing, run-once imports
+"""
+from datetime import datetime, timedelta
+
+import pytest
+import numpy as np
+from scipy import stats
+
+from app.ml.recommendations.metrics_store import MetricsStore
+
+
+class TestMetricsStore:
+    """Test suite for MetricsStore."""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        """Store that only flushes on read or every 50 rows."""
+        store = MetricsStore(str(tmp_path / "history.db"), batch_size=50, flush_interval_seconds=3600)
+        yield store
+        store.close()
+
+    def test_buffered_appends_and_history(self, store, tmp_path):
+        """Rows are batched in memory and the latest N per metric come back oldest first."""
+        start = datetime.now() - timedelta(days=1)
+        for i in range(20):
+            store.append_metrics('risk_predictor', {'accuracy': 0.8 + i / 100, 'auc': 0.9},
+                                 {'batch': i}, start + timedelta(minutes=i))
+
+        other = MetricsStore(str(tmp_path / "history.db"))
+        assert not other.has_history('risk_predictor')
+        other.close()
+
+        history = store.metric_history('risk_predictor', limit_per_metric=5)
+        assert [entry['value'] for entry in history['accuracy']] == pytest.approx([0.95, 0.96, 0.97, 0.98, 0.99])
+        assert history['accuracy'][-1]['metadata'] == {'batch': 19}
+        assert len(history['auc']) == 5
+
+        latest, last_timestamp = store.latest_metrics('risk_predictor')
+        assert latest['accuracy'] == pytest.approx(0.99)
+        assert datetime.fromisoformat(last_timestamp) == start + timedelta(minutes=19)
+
+    def test_trends_match_linregress(self, store):
+        """Per-metric slopes equal scipy's slope over point position."""
+        rng = np.random.default_rng(3)
+        series = {'rmse': rng.normal(size=30), 'mae': rng.normal(size=12), 'r2': rng.normal(size=1)}
+        start = datetime.now() - timedelta(days=5)
+        for name, values in series.items():
+            for i, value in enumerate(values):
+                store.append_metrics('goal_optimizer', {name: value}, timestamp=start + timedelta(hours=i))
+
+        trends = store.metric_trends('goal_optimizer', since=start - timedelta(days=1))
+
+        assert set(trends) == {'rmse', 'mae'}
+        for name in ('rmse', 'mae'):
+            slope = stats.linregress(np.arange(len(series[name])), series[name]).slope
+            assert trends[name]['trend_magnitude'] == pytest.approx(abs(slope))
+            assert trends[name]['latest_value'] == pytest.approx(series[name][-1])
+            assert trends[name]['max_value'] == pytest.approx(series[name].max())
+
+    def test_compaction_and_alerts(self, store):
+        """Rows older than the retention window are removed; recent alerts come newest first."""
+        now = datetime.now()
+        store.append_metrics('savings_strategist', {'adoption_rate': 0.3}, timestamp=now - timedelta(days=400))
+        store.append_metrics('savings_strategist', {'adoption_rate': 0.4}, timestamp=now)
+        for days_ago in (400, 2, 1):
+            store.append_alert({'timestamp': (now - timedelta(days=days_ago)).isoformat(),
+                                'model_name': 'savings_strategist', 'severity': 'info', 'days_ago': days_ago})
+
+        removed = store.compact(retention_days=365)
+
+        assert removed['metrics'] == 1 and removed['alerts'] == 1
+        assert [a['days_ago'] for a in store.recent_alerts(10, 'savings_strategist')] == [1, 2]
+        assert store.recent_alerts(10, 'goal_optimizer') == []
+
+    def test_migration_is_atomic_and_runs_once(self, store):
+        """A failed import writes nothing; a completed one is skipped when repeated."""
+        with pytest.raises(ValueError):
+            with store.migration('performance/legacy.json') as pending:
+                assert pending
+                for i in range(120):
+                    store.append_metrics('goal_optimizer', {'accuracy': i / 120})
+                raise ValueError("corrupt legacy file")
+        assert not store.has_history('goal_optimizer')
+
+        for _ in range(2):
+            with store.migration('performance/legacy.json') as pending:
+                if pending:
+                    for i in range(120):
+                        store.append_metrics('goal_optimizer', {'accuracy': i / 120})
+
+        assert len(store.metric_history('goal_optimizer')['accuracy']) == 120
@@ -0,0 +1,95 @@
+"""
+Unit tests for ModelMonitor drift wiring.
+
+This test suite covers:
+- Training data persisted as the drift reference through the predictor hook
+- Live inference inputs scored against that reference
+- Legacy JSON history imported once, even when a retry follows a failed rename
+"""
+import functools
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.ml.recommendations.model_monitor import ModelMonitor
+from app.ml.recommendations.risk_predictor import RiskTolerancePredictor
+
+
+def _users(count, income_scale=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    tolerances = ['conservative', 'moderate', 'aggressive']
+    return [
+        {
+            'profile': SimpleNamespace(
+                age=int(rng.integers(25, 65)), annual_income=float(rng.normal(90000, 20000)) * income_scale,
+                monthly_expenses=float(rng.normal(4000, 800)), liquid_assets=float(rng.uniform(5000, 80000)),
+                net_worth=float(rng.uniform(10000, 500000)), debt_to_income_ratio=float(rng.uniform(0, 0.5)),
+                dependents=int(rng.integers(0, 3)), retirement_age_target=65, life_insurance_coverage=0,
+                risk_tolerance=tolerances[i % 3], investment_experience='intermediate', marital_status='single',
+                job_stability='stable', income_stability='stable', employment_status='employed'
+            ),
+            'goals': [],
+            'investments': []
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    monitor = ModelMonitor(models_path=str(tmp_path / 'models'), monitoring_path=str(tmp_path / 'monitoring'))
+    monitor.monitoring_config['live_drift_min_rows'] = 100
+    monitor.drift_engine.sample_rate = 1.0
+    yield monitor
+    monitor.metrics_store.close()
+
+
+class TestModelMonitorDrift:
+    """Test suite for ModelMonitor live drift."""
+
+    def test_trained_model_to_drift_reading(self, monitor, tmp_path):
+        """Training writes the reference; shifted live inputs then read as drift."""
+        predictor = RiskTolerancePredictor(model_path=str(tmp_path / 'risk'))
+        predictor.add_training_observer(functools.partial(monitor.save_reference_data, 'risk_predictor'))
+        predictor.risk_batcher.add_observer(functools.partial(monitor.record_inference_inputs, 'risk_predictor'))
+
+        with patch.object(predictor, '_load_training_data', return_value=_users(300)):
+            assert predictor.train_risk_prediction_model()['training_samples'] == 300
+        assert monitor._get_reference_profile('risk_predictor') is not None
+
+        live = {f'u{i}': SimpleNamespace(financial_profile=data['profile'], goals=[], investments=[])
+                for i, data in enumerate(_users(200, income_scale=3.0, seed=1))}
+        predictor.predict_risk_tolerance_batch(live)
+        drift = monitor.check_live_drift('risk_predictor')
+
+        assert drift['source'] == 'live' and drift['rows_analyzed'] == 200
+        assert drift['feature_drift_scores']['income_log']['drift_detected']
+        assert drift['drift_detected']
+
+
+class TestModelMonitorMigration:
+    """Test suite for ModelMonitor legacy history migration."""
+
+    def test_retried_migration_does_not_duplicate(self, tmp_path):
+        """Files imported before a failed rename are not imported again on the next start."""
+        performance = tmp_path / 'monitoring' / 'performance'
+        performance.mkdir(parents=True)
+        (performance / 'risk_predictor_metrics.json').write_text(json.dumps({
+            'accuracy': [{'timestamp': f'2026-01-0{day}T00:00:00', 'value': 0.8 + day / 100} for day in range(1, 8)]
+        }))
+
+        with patch.object(Path, 'rename', side_effect=OSError("read-only")):
+            first = ModelMonitor(models_path=str(tmp_path / 'models'), monitoring_path=str(tmp_path / 'monitoring'))
+        first.metrics_store.close()
+        assert (performance / 'risk_predictor_metrics.json').exists()
+
+        monitor = ModelMonitor(models_path=str(tmp_path / 'models'), monitoring_path=str(tmp_path / 'monitoring'))
+        history = monitor.metrics_store.metric_history('risk_predictor')
+        monitor.metrics_store.close()
+
+        assert len(history['accuracy']) == 7
+        assert (performance / 'risk_predictor_metrics.json.migrated').exists()
@@ -0,0 +1,120 @@
+"""
+Unit tests for recommendation model serving.
+
+This test suite covers:
+- Loading a model bundle once and reloading it when a file changes
+- Optional files and missing required files
+- Watched data files counting towards the bundle version
+- Micro-batching concurrent predictions into one model call
+"""
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.recommendations.model_server import MicroBatcher, ModelRegistry
+
+
+class TestModelRegistry:
+    """Test suite for ModelRegistry."""
+
+    @pytest.fixture
+    def model_dir(self, tmp_path):
+        """Directory with a required model and scaler."""
+        joblib.dump({'weights': [1, 2]}, tmp_path / "model.pkl")
+        joblib.dump({'mean': 0.5}, tmp_path / "scaler.pkl")
+        return tmp_path
+
+    def test_loads_once_and_reloads_on_change(self, model_dir):
+        """The same objects are served until a file's version changes."""
+        registry = ModelRegistry(check_interval_seconds=0)
+        files = {'model': 'model.pkl', 'scaler': 'scaler.pkl'}
+
+        first = registry.load_bundle(str(model_dir), files)
+        assert registry.load_bundle(str(model_dir), files) is first
+        assert first.get('model') == {'weights': [1, 2]}
+
+        joblib.dump({'weights': [3, 4, 5]}, model_dir / "model.pkl")
+        stat = os.stat(model_dir / "model.pkl")
+        os.utime(model_dir / "model.pkl", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        reloaded = registry.load_bundle(str(model_dir), files)
+        assert reloaded is not first
+        assert reloaded.get('model') == {'weights': [3, 4, 5]}
+
+    def test_optional_and_missing_files(self, model_dir):
+        """Missing optional files are skipped; a missing required file yields no bundle."""
+        registry = ModelRegistry(check_interval_seconds=0)
+
+        bundle = registry.load_bundle(str(model_dir), {'model': 'model.pkl'}, {'extra': 'extra.pkl'})
+        assert bundle.get('extra') is None
+        assert registry.load_bundle(str(model_dir), {'model': 'absent.pkl'}) is None
+
+    def test_watched_file_changes_bump_version(self, model_dir):
+        """Watched files are not loaded but a change to one yields a new bundle."""
+        registry = ModelRegistry(check_interval_seconds=0)
+        files = {'model': 'model.pkl'}
+        store = model_dir / "store"
+        store.mkdir()
+        (store / "meta.json").write_text('{"rows": 1}')
+
+        first = registry.load_bundle(str(model_dir), files, watched=("store/meta.json",))
+        assert set(first.objects) == {'model'}
+
+        (store / "meta.json").write_text('{"rows": 12}')
+        reloaded = registry.load_bundle(str(model_dir), files, watched=("store/meta.json",))
+        assert reloaded is not first and reloaded.version != first.version
+
+
+class TestMicroBatcher:
+    """Test suite for MicroBatcher."""
+
+    def test_concurrent_calls_share_one_predict(self):
+        """Threads arriving within the wait window are scored in a single call."""
+        calls = []
+
+        def predict(frame):
+            calls.append(len(frame))
+            return frame['x'].to_numpy() * 2
+
+        batcher = MicroBatcher(predict, max_batch_size=100, max_wait_ms=200)
+        results = {}
+        barrier = threading.Barrier(8)
+
+        def worker(i):
+            barrier.wait()
+            results[i] = batcher.predict(pd.DataFrame({'x': [i, i + 100]}))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [16]
+        for i in range(8):
+            assert results[i].tolist() == [2 * i, 2 * (i + 100)]
+
+    def test_full_batch_runs_without_waiting(self):
+        """A frame at the batch size limit is scored immediately."""
+        batcher = MicroBatcher(lambda frame: np.zeros(len(frame)), max_batch_size=10, max_wait_ms=5000)
+
+        start = time.monotonic()
+        batcher.predict(pd.DataFrame({'x': range(10)}))
+
+        assert time.monotonic() - start < 1
+        assert batcher.stats()['predict_calls'] == 1
+
+    def test_errors_reach_every_caller(self):
+        """A failing model call raises in each caller of the batch."""
+        def predict(frame):
+            raise ValueError("model failed")
+
+        batcher = MicroBatcher(predict, max_wait_ms=1)
+
+        with pytest.raises(ValueError, match="model failed"):
+            batcher.predict(pd.DataFrame({'x': [1]}))
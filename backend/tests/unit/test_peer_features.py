@@ -0,0 +1,76 @@
+"""
+Unit tests for set-based peer features.
+
+This test suite covers:
+- Age, net worth and debt ratios derived from raw peer rows
+- Similarity features and label encoding, including users without goals
+- Peer metrics and labels for the feature store
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from app.ml.recommendations.peer_features import (
+    ENCODED_COLUMNS, PEER_FEATURE_COLUMNS, PEER_LABEL_COLUMNS, PEER_METRIC_COLUMNS,
+    peer_feature_frame, peer_metric_frame, prepare_peer_frame
+)
+
+TODAY = date(2026, 6, 1)
+
+
+class TestPeerFeatures:
+    """Test suite for peer feature frames."""
+
+    @pytest.fixture
+    def frame(self):
+        """One user with goals and investments and one with neither."""
+        rows = pd.DataFrame({
+            'date_of_birth': [date(1990, 6, 2), date(1980, 1, 1)],
+            'annual_income': [120000, 40000], 'monthly_expenses': [5000, 0], 'dependents': [0, 2],
+            'marital_status': ['single', 'married'], 'risk_tolerance': ['aggressive', None],
+            'investment_experience': ['advanced', 'beginner'], 'employment_status': ['employed', 'retired'],
+            'liquid_assets': [30000, None], 'retirement_accounts': [50000, 0], 'real_estate_value': [0, 0],
+            'other_investments': [0, 0], 'personal_property_value': [0, 0],
+            'mortgage_balance': [0, 10000], 'credit_card_debt': [12000, 0], 'student_loans': [0, 0],
+            'auto_loans': [0, 0], 'other_debts': [0, 0],
+            'num_goals': [2, 0], 'avg_goal_timeline': [30.0, None], 'total_goal_amount': [60000, None],
+            'goal_diversity': [2, 0], 'completed_goals': [1, 0], 'avg_goal_progress': [50, None],
+            'num_investments': [1, 0], 'portfolio_value': [30000, 0]
+        }, index=['a', 'b'])
+        return prepare_peer_frame(rows, today=TODAY)
+
+    def test_derived_profile_columns(self, frame):
+        """Age respects birthdays; net worth and debt ratio sum the balance columns."""
+        assert frame['age'].tolist() == [35, 46]
+        assert frame['net_worth'].tolist() == [68000, -10000]
+        assert frame['debt_to_income_ratio'].tolist() == pytest.approx([0.1, 0.0])
+
+    def test_similarity_features(self, frame):
+        """Features follow the per-user definitions; unseen labels encode to -1."""
+        encoders = {column: LabelEncoder().fit(['single', 'married', 'aggressive', 'advanced', 'employed'])
+                    for column in ENCODED_COLUMNS}
+        features = peer_feature_frame(frame, encoders)
+
+        assert list(features.columns) == PEER_FEATURE_COLUMNS
+        a, b = features.loc['a'], features.loc['b']
+        assert a['income_bracket'] == 4 and b['income_bracket'] == 1
+        assert a['net_worth_log'] == pytest.approx(np.log1p(68000)) and b['net_worth_log'] == 0
+        assert a['savings_rate'] == pytest.approx(0.5) and b['savings_rate'] == 1.0
+        assert a['total_goal_amount_ratio'] == pytest.approx(0.5) and b['avg_goal_timeline'] == 0
+        assert a['goal_completion_rate'] == pytest.approx(0.5)
+        assert a['financial_health_score'] == pytest.approx(np.mean([1.0, 0.9, 0.5, 0.5]))
+        assert b['financial_health_score'] == pytest.approx(np.mean([0.0, 1.0, 1.0]))
+        assert b['risk_tolerance_encoded'] == -1 and b['employment_status_encoded'] == -1
+        assert (peer_feature_frame(frame, {})[[f'{c}_encoded' for c in ENCODED_COLUMNS]] == -1).all().all()
+
+    def test_peer_metrics(self, frame):
+        """Store metrics are numeric and missing labels become None."""
+        metrics = peer_metric_frame(frame)
+
+        assert list(metrics.columns) == PEER_METRIC_COLUMNS + PEER_LABEL_COLUMNS
+        assert metrics.loc['a', 'emergency_fund_months'] == pytest.approx(6.0)
+        assert metrics.loc['b', 'net_worth_to_income'] == pytest.approx(-0.25)
+        assert metrics[PEER_LABEL_COLUMNS].to_dict('records')[1] == {'marital_status': 'married', 'risk_tolerance': None}
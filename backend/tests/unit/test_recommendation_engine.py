@@ -0,0 +1,137 @@
+"""
+Unit tests for the recommendation engine orchestration.
+
+This test suite covers:
+- One shared snapshot fanned out to concurrently running category generators
+- Batch refreshes scoring goal, risk and life event models once per batch
+- Per-user fallback when a batch model call fails
+"""
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.ml.recommendations import recommendation_engine as engine_module
+from app.ml.recommendations.user_snapshot import UserSnapshot
+
+MODULE_CLASSES = (
+    'GoalOptimizer', 'PortfolioRebalancer', 'RiskTolerancePredictor', 'BehavioralPatternAnalyzer',
+    'CollaborativeFilter', 'SavingsStrategist', 'LifeEventPredictor', 'ModelMonitor'
+)
+
+
+def _snapshot(user_id: str) -> UserSnapshot:
+    return UserSnapshot(id=user_id, financial_profile=MagicMock(), goals=[], investments=[])
+
+
+@pytest.fixture
+def engine():
+    """Engine whose ML modules record the snapshot each call receives."""
+    with patch.multiple(engine_module, **{name: MagicMock() for name in MODULE_CLASSES}):
+        engine = engine_module.RecommendationEngine(max_workers=8)
+
+    engine.seen = []
+
+    def recorder(name):
+        def call(user_id, *args):
+            engine.seen.append((name, user_id, args[-1] if args else None))
+            return {'user_id': user_id, 'source': name}
+        return call
+
+    engine.goal_optimizer.optimize_goals.side_effect = recorder('goal')
+    engine.portfolio_rebalancer.generate_rebalancing_plan.side_effect = recorder('portfolio')
+    engine.risk_predictor.predict_actual_risk_tolerance.side_effect = recorder('risk')
+    engine.risk_predictor.analyze_risk_capacity_vs_tolerance.return_value = {'capacity': 'high'}
+    engine.behavioral_analyzer.analyze_spending_patterns.side_effect = recorder('behavior')
+    engine.behavioral_analyzer.predict_future_spending.return_value = {'months': 6}
+    engine.collaborative_filter.find_similar_users.side_effect = lambda user_id: {'similar': []}
+    engine.collaborative_filter.get_peer_benchmarks.return_value = {}
+    engine.savings_strategist.generate_savings_strategy.side_effect = recorder('savings')
+    engine.life_event_predictor.predict_life_events.side_effect = recorder('life')
+
+    def batch(name):
+        def call(users):
+            engine.seen.append((f'{name}_batch', tuple(users), None))
+            return {user_id: {'user_id': user_id, 'source': name} for user_id in users}
+        return call
+
+    engine.goal_optimizer.optimize_goals_batch.side_effect = batch('goal')
+    engine.risk_predictor.predict_risk_tolerance_batch.side_effect = batch('risk')
+    engine.life_event_predictor.predict_life_events_batch.side_effect = batch('life')
+    yield engine
+    engine.executor.shutdown(wait=False)
+
+
+class TestRecommendationEngine:
+    """Test suite for RecommendationEngine fan-out."""
+
+    @pytest.mark.asyncio
+    async def test_generators_share_snapshot_and_run_concurrently(self, engine):
+        """Every generator gets the caller's snapshot and model calls overlap on the pool."""
+        snapshot = _snapshot('u1')
+        barrier = threading.Barrier(2, timeout=5)
+
+        def goal(user_id, snap):
+            barrier.wait()
+            return {'user_id': user_id, 'goal_snapshot': snap}
+
+        def savings(user_id, snap):
+            barrier.wait()
+            return {'user_id': user_id, 'savings_snapshot': snap}
+
+        engine.goal_optimizer.optimize_goals.side_effect = goal
+        engine.savings_strategist.generate_savings_strategy.side_effect = savings
+
+        with patch.object(engine_module, 'load_user_snapshot') as loader:
+            response = await engine.generate_comprehensive_recommendations('u1', snapshot=snapshot)
+
+        loader.assert_not_called()
+        recommendations = response['recommendations']
+        assert set(recommendations) == set(engine.recommendation_categories)
+        assert recommendations['goal_optimization']['goal_snapshot'] is snapshot
+        assert recommendations['savings_strategy']['savings_snapshot'] is snapshot
+        assert engine.seen and all(entry[2] is snapshot for entry in engine.seen)
+        assert recommendations['risk_assessment']['risk_capacity_analysis'] == {'capacity': 'high'}
+
+    @pytest.mark.asyncio
+    async def test_batch_scores_models_once_per_batch(self, engine):
+        """Batch models see every user in one call; other categories reuse the loaded snapshots."""
+        snapshots = {'u1': _snapshot('u1'), 'u2': _snapshot('u2')}
+
+        with patch.object(engine_module, 'load_user_snapshots', return_value=snapshots) as loader:
+            responses = await engine.generate_batch_recommendations(
+                ['u1', 'u2', 'missing'], ['goal_optimization', 'risk_assessment', 'savings_strategy']
+            )
+
+        loader.assert_called_once_with(['u1', 'u2', 'missing'])
+        assert list(responses) == ['u1', 'u2', 'missing']
+        assert responses['missing'] == {'error': 'User or financial profile not found'}
+
+        batch_calls = sorted(entry[:2] for entry in engine.seen if entry[0].endswith('_batch'))
+        assert batch_calls == [('goal_batch', ('u1', 'u2')), ('risk_batch', ('u1', 'u2'))]
+        assert sorted((user_id, snap) for name, user_id, snap in engine.seen if name == 'savings') == [
+            ('u1', snapshots['u1']), ('u2', snapshots['u2'])
+        ]
+        for user_id in ('u1', 'u2'):
+            risk = responses[user_id]['recommendations']['risk_assessment']
+            assert risk['category'] == 'risk_assessment'
+            assert risk['risk_capacity_analysis'] == {'capacity': 'high'}
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_per_user(self, engine):
+        """A failing batch call is retried one user at a time, isolating the bad user."""
+        def flaky(users):
+            if len(users) > 1 or 'u2' in users:
+                raise ValueError('bad features')
+            return {user_id: {'user_id': user_id} for user_id in users}
+
+        engine.goal_optimizer.optimize_goals_batch.side_effect = flaky
+        snapshots = {'u1': _snapshot('u1'), 'u2': _snapshot('u2')}
+
+        with patch.object(engine_module, 'load_user_snapshots', return_value=snapshots):
+            responses = await engine.generate_batch_recommendations(['u1', 'u2'], ['goal_optimization'])
+
+        assert responses['u1']['recommendations']['goal_optimization']['category'] == 'goal_optimization'
+        assert responses['u2']['recommendations']['goal_optimization'] == {
+            'error': 'bad features', 'category': 'goal_optimization'
+        }
@@ -0,0 +1,123 @@
+"""
+Unit tests for incremental spending aggregates.
+
+This test suite covers:
+- Welford running statistics against the statistics module
+- Folding only new, posted spending and scoring it against prior history
+- Retracting removed and modified transactions to match a fresh rebuild
+- Ignoring transactions older than the remembered window
+- Compact round trips and pattern summaries from the aggregates
+"""
+import json
+import statistics
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.services.banking.plaid_service import Transaction
+from app.services.banking.spending_aggregates import (
+    RunningStats, SpendingAggregates, SpendingAggregator
+)
+
+START = datetime(2026, 3, 2)
+
+
+def _txn(txn_id: str, day: int, amount: float, merchant: str = 'Grocer', pending: bool = False) -> Transaction:
+    return Transaction(
+        transaction_id=txn_id, account_id='acc', amount=amount, date=START + timedelta(days=day),
+        name=merchant, merchant_name=merchant, category=['Groceries'], subcategory=None,
+        pending=pending, currency='USD', location=None
+    )
+
+
+class TestSpendingAggregator:
+    """Test suite for SpendingAggregator."""
+
+    @pytest.fixture
+    def history(self):
+        """Eight weeks of weekly grocery spending around $50."""
+        return [_txn(f't{week}', week * 7, 45.0 + (week % 3) * 5) for week in range(8)]
+
+    def test_running_stats(self):
+        """Welford mean and sample deviation match a two-pass computation."""
+        values = [12.5, 40.0, 3.25, 18.0, 99.9, 7.0]
+        running = RunningStats()
+        for value in values:
+            running.add(value)
+
+        assert running.mean == pytest.approx(statistics.mean(values))
+        assert running.std == pytest.approx(statistics.stdev(values))
+
+        for value in values[3:]:
+            running.remove(value)
+        assert running.count == 3
+        assert running.mean == pytest.approx(statistics.mean(values[:3]))
+        assert running.std == pytest.approx(statistics.stdev(values[:3]))
+
+    def test_only_new_transactions_are_scored(self, history):
+        """Seen, pending and refund rows are skipped; outliers are scored against prior history."""
+        aggregator = SpendingAggregator()
+        aggregates = SpendingAggregates(user_id='user')
+        assert aggregator.update(aggregates, history) == []
+
+        anomalies = aggregator.update(aggregates, history[:2] + [
+            _txn('big', 60, 400.0),
+            _txn('pending', 61, 900.0, pending=True),
+            _txn('refund', 62, -20.0),
+        ])
+
+        assert [(a['transaction_id'], a['anomaly_type'], a['severity']) for a in anomalies] == [
+            ('big', 'amount', 'critical')
+        ]
+        assert aggregates.amount_stats['groceries'].count == 9
+        assert set(aggregates.seen) == {f't{week}' for week in range(8)} | {'big'}
+
+    def test_round_trip_and_summary(self, history):
+        """Aggregates survive JSON and yield weekly and merchant patterns."""
+        aggregator = SpendingAggregator()
+        aggregates = SpendingAggregates(user_id='user')
+        aggregator.update(aggregates, history)
+
+        restored = SpendingAggregates.from_dict('user', json.loads(json.dumps(aggregates.to_dict())))
+        summary = aggregator.summarize(restored, lookback_days=90)
+
+        assert restored.seen == aggregates.seen
+
+        assert summary['analysis_period']['transactions_analyzed'] == 8
+        assert summary['category_totals'] == {'groceries': sum(t.amount for t in history)}
+        weekly = summary['spending_patterns']['weekly'][0]
+        assert weekly['average_amount'] == pytest.approx(statistics.mean(t.amount for t in history), abs=0.01)
+        assert [p['typical_times'] for p in summary['spending_patterns']['daily']] == [['Monday']]
+        assert summary['spending_patterns']['merchant'][0]['typical_merchants'] == ['Grocer']
+        assert restored.last_transaction_date == date(2026, 4, 20)
+
+    def test_removed_and_modified_transactions_are_retracted(self, history):
+        """Removes and changed re-reports leave the same aggregates as folding the final state."""
+        aggregator = SpendingAggregator()
+        aggregates = SpendingAggregates(user_id='user')
+        aggregator.update(aggregates, history + [_txn('big', 60, 400.0), _txn('extra', 61, 48.0)])
+        assert [a['transaction_id'] for a in aggregates.anomalies] == ['big']
+
+        final = history[:6] + [_txn('t6', 43, 52.0), _txn('t7', 49, 50.0, pending=True), _txn('extra', 61, 48.0)]
+        aggregator.update(aggregates, [final[6], final[7], final[8]], removed=['big', 'unknown'])
+
+        rebuilt = SpendingAggregates(user_id='user')
+        aggregator.update(rebuilt, final)
+        retracted, expected = aggregates.to_dict(), rebuilt.to_dict()
+        assert retracted.pop('anomalies') == expected.pop('anomalies') == []
+        retracted.pop('last'), expected.pop('last')
+        assert retracted == expected
+        assert set(aggregates.seen) == {f't{week}' for week in range(7)} | {'extra'}
+
+    def test_transactions_before_retention_are_ignored(self, history):
+        """Once a transaction is no longer remembered, re-reports of it are not counted again."""
+        aggregator = SpendingAggregator()
+        aggregates = SpendingAggregates(user_id='user')
+        aggregator.update(aggregates, history + [_txn('late', 200, 50.0)])
+        assert 't0' not in aggregates.seen
+        before = aggregates.to_dict()
+
+        aggregator.update(aggregates, [_txn('t0', 0, 45.0), _txn('t1', 7, 90.0), _txn('backdated', 20, 60.0)])
+
+        assert aggregates.to_dict() == before
+        assert aggregates.amount_stats['groceries'].count == 9
@@ -0,0 +1,194 @@
+"""
+Unit tests for the async tax data loader and the nightly harvesting scan.
+
+This test suite covers:
+- Batch loads grouping profiles, accounts, holdings and transactions by user
+- Keyset pagination over every user with active accounts
+- Nightly scan counts and bulk persistence of each batch's opportunities
+"""
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.models.tax_accounts import AccountTypeEnum, TaxTreatmentEnum
+from app.services.tax.data_loader import TaxDataLoader
+from app.services.tax.harvesting import TaxLossHarvestingEngine
+
+
+NOW = datetime.utcnow()
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return list(self.rows)
+
+
+class FakeSession:
+    """Records the scan's writes; reads go through InMemoryTaxDataLoader"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def __aenter__(self):
+        self.db.sessions += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        if statement.is_insert or statement.is_update:
+            self.db.writes.append(('insert' if statement.is_insert else 'update', params))
+            return FakeResult([])
+        # Existing open opportunities lookup
+        return FakeResult(self.db.opportunities)
+
+    async def commit(self):
+        self.db.commits += 1
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.profiles = []
+        self.accounts = []
+        self.holdings = []
+        self.transactions = []
+        self.opportunities = []
+        self.writes = []
+        self.sessions = 0
+        self.queries = 0
+        self.commits = 0
+
+    def __call__(self):
+        return FakeSession(self)
+
+    def add_user(self, user_id, holdings, treatment=TaxTreatmentEnum.TAXABLE, marginal_tax_rate=0.24):
+        account_id = f'{user_id}-acct'
+        self.profiles.append(SimpleNamespace(user_id=user_id, marginal_tax_rate=marginal_tax_rate))
+        self.accounts.append(SimpleNamespace(
+            id=account_id, user_id=user_id, tax_treatment=treatment, is_active=True,
+            account_type=AccountTypeEnum.BROKERAGE, current_balance=Decimal('10000')
+        ))
+        for symbol, shares, basis, price in holdings:
+            self.holdings.append(SimpleNamespace(
+                id=f'{user_id}-{symbol}', account_id=account_id, symbol=symbol,
+                shares=Decimal(shares), cost_basis_per_share=Decimal(basis),
+                current_price=Decimal(price), market_value=Decimal(shares) * Decimal(price),
+                acquired_date=NOW.date() - timedelta(days=400), asset_class='equity',
+                unrealized_gain_loss=None, dividend_yield=None, last_sale_date=None
+            ))
+
+
+class InMemoryTaxDataLoader(TaxDataLoader):
+    """TaxDataLoader whose per-table queries read FakeDatabase rows"""
+
+    async def _load_user_id_page(self, session, taxable_only, last_user_id):
+        session.db.queries += 1
+        user_ids = sorted({
+            a.user_id for a in session.db.accounts
+            if a.is_active
+            and (not taxable_only or a.tax_treatment == TaxTreatmentEnum.TAXABLE)
+            and (last_user_id is None or a.user_id > last_user_id)
+        })
+        return user_ids[:self.batch_size]
+
+    async def _load_profiles(self, session, user_ids):
+        session.db.queries += 1
+        return {p.user_id: p for p in session.db.profiles if p.user_id in user_ids}
+
+    async def _load_accounts(self, session, user_ids):
+        session.db.queries += 1
+        return [a for a in session.db.accounts if a.user_id in user_ids]
+
+    async def _load_holdings(self, session, account_ids):
+        session.db.queries += 1
+        return [h for h in session.db.holdings if h.account_id in account_ids]
+
+    async def _load_transactions(self, session, user_ids, window_start, window_end):
+        session.db.queries += 1
+        return [
+            t for t in session.db.transactions
+            if t.user_id in user_ids and window_start <= t.transaction_date <= window_end
+        ]
+
+
+@pytest.fixture
+def db():
+    """Three taxable users (two holding losses, one a gain) and one IRA-only user."""
+    db = FakeDatabase()
+    db.add_user('u1', [('SPY', '100', '500', '400')])
+    db.add_user('u2', [('VTI', '50', '200', '250')])
+    db.add_user('u3', [('BND', '200', '80', '70')])
+    db.add_user('u4', [('QQQ', '10', '500', '300')], treatment=TaxTreatmentEnum.TAX_DEFERRED)
+    db.transactions.append(SimpleNamespace(
+        user_id='u1', account_id='u1-acct', symbol='VTI', transaction_type='buy',
+        transaction_date=NOW - timedelta(days=5), shares=Decimal('1'), total_amount=Decimal('250')
+    ))
+    return db
+
+
+class TestTaxDataLoader:
+    """Test suite for TaxDataLoader."""
+
+    @pytest.mark.asyncio
+    async def test_load_users_groups_rows_by_user(self, db):
+        """One session and four queries load every requested user; unknown users come back empty."""
+        loader = InMemoryTaxDataLoader(db)
+
+        data = await loader.load_users(['u1', 'u2', 'missing'])
+
+        assert (db.sessions, db.queries) == (1, 4)
+        assert list(data) == ['u1', 'u2', 'missing']
+        assert [h.symbol for h in data['u1'].taxable_holdings()] == ['SPY']
+        assert [t.symbol for t in data['u1'].transactions_since(NOW - timedelta(days=30))] == ['VTI']
+        assert data['u2'].profile.user_id == 'u2' and data['u2'].transactions == []
+        assert data['missing'].profile is None and data['missing'].holdings == []
+        assert data['u1'].holding_arrays.market_value.tolist() == [40000.0]
+
+    @pytest.mark.asyncio
+    async def test_iter_user_batches_pages_by_user_id(self, db):
+        """Taxable users are yielded in id order, at most batch_size at a time."""
+        loader = InMemoryTaxDataLoader(db, batch_size=2)
+
+        batches = [list(batch) async for batch in loader.iter_user_batches()]
+
+        assert batches == [['u1', 'u2'], ['u3']]
+        assert [list(batch) async for batch in loader.iter_user_batches(taxable_only=False)][-1] == ['u3', 'u4']
+
+
+class TestNightlyScan:
+    """Test suite for TaxLossHarvestingEngine.run_nightly_scan."""
+
+    @pytest.mark.asyncio
+    async def test_scan_counts_and_persists_each_batch(self, db):
+        """Losses are counted per user and each batch is written with one update and one insert."""
+        db.opportunities.append(SimpleNamespace(id='opp-1', user_id='u1', holding_id='u1-SPY'))
+        engine = TaxLossHarvestingEngine(db_session=None, data_loader=InMemoryTaxDataLoader(db, batch_size=2))
+
+        summary = await engine.run_nightly_scan({'SPY': 400.0, 'VTI': 250.0, 'BND': 70.0})
+
+        assert summary == {
+            'users_scanned': 3,
+            'users_with_opportunities': 2,
+            'total_tax_benefit': Decimal('1800')
+        }
+        assert db.commits == 2
+        (update_kind, updates), (insert_kind, inserts) = db.writes
+        assert (update_kind, [row['id'] for row in updates]) == ('update', ['opp-1'])
+        assert updates[0]['unrealized_loss'] == Decimal('10000')
+        assert insert_kind == 'insert'
+        assert [(row['user_id'], row['holding_id'], row['status']) for row in inserts] == [
+            ('u3', 'u3-BND', 'identified')
+        ]
+
+    @pytest.mark.asyncio
+    async def test_scan_requires_loader(self):
+        """The whole-book scan only runs over the async loader."""
+        engine = TaxLossHarvestingEngine(db_session=None)
+
+        with pytest.raises(ValueError):
+            await engine.run_nightly_scan({})
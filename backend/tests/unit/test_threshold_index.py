@@ -0,0 +1,119 @@
+"""
+Unit tests for the balance threshold index.
+
+This test suite covers:
+- Only levels crossed since the previous balance are reported
+- Withdrawal and deposit thresholds against balance changes
+- Vectorized projected balances from recurring transactions
+- Debounced notifications for repeated alert keys
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.banking.threshold_index import (
+    DEPOSIT, LEVEL, WITHDRAWAL, AlertDebouncer, IndexedThreshold, RecurringFlow,
+    ThresholdIndex, detect_recurring_flows, project_balances
+)
+
+AS_OF = date(2026, 6, 1)
+
+
+class TestThresholdIndex:
+    """Test suite for ThresholdIndex."""
+
+    @pytest.fixture
+    def index(self):
+        """Wildcard and per-account levels plus change thresholds."""
+        return ThresholdIndex([
+            IndexedThreshold('*', LEVEL, 0.0, 'negative'),
+            IndexedThreshold('*', LEVEL, 100.0, 'low-100'),
+            IndexedThreshold('acc-1', LEVEL, 500.0, 'low-500'),
+            IndexedThreshold('acc-1', LEVEL, 250.0, 'low-250'),
+            IndexedThreshold('*', WITHDRAWAL, 1000.0, 'withdrawal-1000'),
+            IndexedThreshold('acc-1', WITHDRAWAL, 200.0, 'withdrawal-200'),
+            IndexedThreshold('*', DEPOSIT, 5000.0, 'deposit-5000'),
+        ])
+
+    def test_crossed_levels(self, index):
+        """A new account reports every breached level; later moves only new crossings."""
+        assert sorted(index.crossed_levels('acc-1', 150.0)) == ['low-250', 'low-500']
+        assert index.crossed_levels('acc-1', 150.0, 150.0) == []
+        assert index.crossed_levels('acc-1', 90.0, 150.0) == ['low-100']
+        assert sorted(index.crossed_levels('acc-1', -5.0, 600.0)) == sorted(['low-250', 'low-500', 'negative', 'low-100'])
+        assert index.crossed_levels('acc-2', 200.0) == []
+        assert index.crossed_levels('acc-1', 600.0, 90.0) == []
+
+    def test_exceeded_changes(self, index):
+        """Changes match thresholds strictly smaller than their magnitude."""
+        assert index.exceeded_changes('acc-1', -500.0) == ['withdrawal-200']
+        assert sorted(index.exceeded_changes('acc-1', -1500.0)) == ['withdrawal-1000', 'withdrawal-200']
+        assert index.exceeded_changes('acc-2', -500.0) == []
+        assert index.exceeded_changes('acc-2', 5000.0) == []
+        assert index.exceeded_changes('acc-2', 5000.01) == ['deposit-5000']
+
+
+class TestForecast:
+    """Test suite for recurring detection and projected balances."""
+
+    def test_detect_monthly_and_weekly_flows(self):
+        """Regular payees become flows; irregular ones are ignored."""
+        rows = []
+        for month in range(1, 6):
+            rows.append(('acc-1', 'Landlord', 1200.0, date(2026, month, 3)))
+        for week in range(6):
+            rows.append(('acc-1', 'Gym', 15.0, AS_OF - timedelta(days=7 * week + 2)))
+        rows += [('acc-1', 'Bakery', 8.0, date(2026, 5, day)) for day in (1, 2, 19)]
+
+        flows = {flow.description: flow for flow in detect_recurring_flows(rows, AS_OF)}
+
+        assert set(flows) == {'landlord', 'gym'}
+        assert flows['landlord'].interval_days in (29, 30, 31)
+        assert flows['gym'].interval_days == 7
+        assert flows['gym'].next_date == AS_OF + timedelta(days=5)
+
+    def test_project_balances_matches_day_by_day(self):
+        """The vectorized projection agrees with a day-by-day simulation."""
+        flows = [
+            RecurringFlow('acc-1', 1200.0, AS_OF + timedelta(days=2), 30),
+            RecurringFlow('acc-1', 15.0, AS_OF - timedelta(days=3), 7),
+            RecurringFlow('acc-1', -2000.0, AS_OF + timedelta(days=10), 14),
+            RecurringFlow('acc-2', 50.0, AS_OF, 7),
+            RecurringFlow('other', 999.0, AS_OF, 1),
+        ]
+        balances = [1000.0, 500.0, 80.0]
+        lowest, lowest_day = project_balances(['acc-1', 'acc-2', 'acc-3'], balances, flows, AS_OF, 14)
+
+        for row, account_id in enumerate(['acc-1', 'acc-2', 'acc-3']):
+            balance, path = balances[row], []
+            for day in range(14):
+                today = AS_OF + timedelta(days=day)
+                for flow in flows:
+                    offset = (today - flow.next_date).days
+                    if flow.account_id == account_id and offset % flow.interval_days == 0:
+                        balance -= flow.amount
+                path.append(balance)
+            assert lowest[row] == pytest.approx(min([balances[row]] + path))
+            if min(path) < balances[row]:
+                assert lowest_day[row] == int(np.argmin(path))
+
+        assert lowest[0] == pytest.approx(1000.0 - 1200.0 - 15.0)
+
+
+class TestAlertDebouncer:
+    """Test suite for AlertDebouncer."""
+
+    def test_window_and_eviction(self):
+        """Keys re-notify only after the window, and old keys are evicted."""
+        now = [0.0]
+        debouncer = AlertDebouncer(60.0, max_keys=2, clock=lambda: now[0])
+
+        assert debouncer.allow('a') is True
+        assert debouncer.allow('a') is False
+        now[0] = 61.0
+        assert debouncer.allow('a') is True
+
+        debouncer.allow('b')
+        debouncer.allow('c')
+        assert debouncer.allow('a') is True
@@ -0,0 +1,136 @@
+"""
+Unit tests for transaction categorization.
+
+This test suite covers:
+- Pinned predictions for income, transfer, fee, merchant, keyword and fallback paths
+- Custom rules as category ids or dicts, with the first listed rule winning
+- Built-in rules taking precedence over custom rules
+- Batch predictions matching one-at-a-time predictions
+"""
+from datetime import datetime
+
+import pytest
+
+from app.services.banking.plaid_service import Transaction
+from app.services.banking.transaction_categorizer import TransactionCategorizer
+
+# (description, merchant, amount) -> (category, subcategory, confidence, reasoning)
+PINNED = [
+    (('PAYROLL ACME CORP', None, -2500.0),
+     ('income', 'salary', 0.9, 'Rule-based: Income keywords detected')),
+    (('INTEREST PAYMENT', None, -3.2),
+     ('income', 'other', 0.9, 'Rule-based: Income keywords detected')),
+    (('ONLINE TRANSFER TO SAVINGS', None, 200.0),
+     ('financial', 'transfers', 0.8, 'Rule-based: Transfer keywords detected')),
+    (('ATM WITHDRAWAL FEE', None, 3.0),
+     ('financial', 'bank_fees', 0.85, 'Rule-based: ATM or fee keywords detected')),
+    (('STARBUCKS STORE 1234', 'Starbucks', 5.75),
+     ('food_dining', 'coffee_shops', 0.95, 'Merchant mapping: starbucks')),
+    (('WHOLEFDS MKT', 'Whole Foods Market', 84.1),
+     ('food_dining', 'groceries', 0.95, 'Merchant mapping: whole foods')),
+    (('NETFLIX.COM', None, 15.49),
+     ('other', 'uncategorized', 0.1, 'No confident classification found')),
+    (('MISC CHARGE', None, 700.0),
+     ('other', 'uncategorized', 0.1, 'No confident classification found')),
+]
+
+# Fuzzy merchant and keyword predictions only clear a lowered threshold
+PINNED_LOW_THRESHOLD = [
+    (('POS 99', 'Starbrite Dry Cleaning', 22.0),
+     ('food_dining', 'coffee_shops', 0.75, 'Fuzzy merchant matching: starbucks')),
+    (('POS 77', 'Amaz Outlet', 300.0),
+     ('shopping', 'general', 0.75, 'Fuzzy merchant matching: amazon')),
+    (('RESTAURANT DINNER CAFE', None, 48.0),
+     ('food_dining', 'restaurants', 0.485714, 'ML classification: keyword matching')),
+    (('PHARMACY DOCTOR CLINIC', None, 400.0),
+     ('healthcare', 'doctor', 0.5, 'ML classification: keyword matching')),
+    (('CITY WATER UTILITY', None, 250.0),
+     ('other', 'uncategorized', 0.1, 'No confident classification found')),
+]
+
+CUSTOM_RULES = {
+    'venmo': {'category': 'financial', 'subcategory': 'p2p', 'confidence': 0.95},
+    'gym': 'health_fitness',
+    'corner': {'category': 'food_dining', 'subcategory': 'coffee_shops'},
+}
+
+
+def _txn(description: str, merchant: str = None, amount: float = 10.0) -> Transaction:
+    return Transaction(
+        transaction_id=description, account_id='acc', amount=amount, date=datetime(2026, 3, 4, 10),
+        name=description, merchant_name=merchant, category=[], subcategory=None,
+        pending=False, currency='USD', location=None
+    )
+
+
+def _summary(prediction):
+    return (prediction.category, prediction.subcategory,
+            round(prediction.confidence, 6), prediction.reasoning)
+
+
+class TestTransactionCategorizer:
+    """Test suite for TransactionCategorizer."""
+
+    @pytest.fixture
+    def categorizer(self):
+        """Categorizer at the default 0.8 confidence threshold."""
+        categorizer = TransactionCategorizer()
+        categorizer.confidence_threshold = 0.8
+        return categorizer
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('threshold, pinned', [(0.8, PINNED), (0.3, PINNED_LOW_THRESHOLD)])
+    async def test_pinned_predictions(self, categorizer, threshold, pinned):
+        """Fixed inputs keep the category, subcategory, confidence and reasoning they had."""
+        categorizer.confidence_threshold = threshold
+        predictions = await categorizer.categorize_transactions_batch(
+            [_txn(*inputs) for inputs, _ in pinned]
+        )
+
+        assert [_summary(p) for p in predictions] == [expected for _, expected in pinned]
+
+    @pytest.mark.asyncio
+    async def test_custom_rules(self, categorizer):
+        """String and dict rules match the description or merchant, first listed rule first."""
+        transactions = [
+            _txn('VENMO *JANE'),
+            _txn('PLANET GYM MONTHLY'),
+            _txn('POS 4411', 'Corner Cafe'),
+            _txn('VENMO GYM'),
+        ]
+
+        predictions = await categorizer.categorize_transactions_batch(
+            transactions, custom_rules=CUSTOM_RULES
+        )
+
+        assert [_summary(p) for p in predictions] == [
+            ('financial', 'p2p', 0.95, 'Custom rule: venmo'),
+            ('health_fitness', None, 0.9, 'Custom rule: gym'),
+            ('food_dining', 'coffee_shops', 0.9, 'Custom rule: corner'),
+            ('financial', 'p2p', 0.95, 'Custom rule: venmo'),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_builtin_rules_precede_custom_rules(self, categorizer):
+        """Transfer keywords win over a custom rule; unmatched rules leave merchants alone."""
+        predictions = await categorizer.categorize_transactions_batch(
+            [_txn('VENMO TRANSFER'), _txn('STARBUCKS', 'Starbucks', 5.0)], custom_rules=CUSTOM_RULES
+        )
+
+        assert [_summary(p) for p in predictions] == [
+            ('financial', 'transfers', 0.8, 'Rule-based: Transfer keywords detected'),
+            ('food_dining', 'coffee_shops', 0.95, 'Merchant mapping: starbucks'),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_single_predictions(self, categorizer):
+        """Categorizing a batch gives the same predictions as one transaction at a time."""
+        transactions = [_txn(*inputs) for inputs, _ in PINNED] + [_txn('PLANET GYM MONTHLY')]
+
+        batch = await categorizer.categorize_transactions_batch(transactions, custom_rules=CUSTOM_RULES)
+        single = [
+            await categorizer.categorize_transaction(transaction, custom_rules=CUSTOM_RULES)
+            for transaction in transactions
+        ]
+
+        assert [_summary(p) for p in batch] == [_summary(p) for p in single]
@@ -0,0 +1,159 @@
+"""
+Unit tests for the set-based transaction import.
+
+This test suite covers:
+- Average cost positions folded from date-ordered trades
+- Batch de-duplication against the batch itself, stored keys and concurrent imports
+- Mapping broker rows onto transaction columns
+- AI context invalidation once an import is committed
+"""
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.base import TransactionSide
+from app.services.transaction_import.csv_parser import ParsedTransaction, TransactionType
+from app.services.transaction_import.transaction_processor import (
+    TransactionProcessor, average_cost_positions
+)
+
+ACCOUNT_ID = str(uuid.uuid4())
+
+
+def _trade(day: int, tx_type: TransactionType, symbol: str, quantity: str, price: str) -> ParsedTransaction:
+    amount = Decimal(quantity) * Decimal(price)
+    return ParsedTransaction(
+        date=datetime(2026, 3, day), type=tx_type, symbol=symbol,
+        quantity=Decimal(quantity), price=Decimal(price),
+        amount=-amount if tx_type == TransactionType.BUY else amount
+    )
+
+
+class TestAverageCostPositions:
+    """Test suite for the position fold."""
+
+    def test_sales_keep_average_cost(self):
+        """Sales remove cost at the running average; a closed position restarts."""
+        buy, sell = TransactionSide.BUY, TransactionSide.SELL
+        positions = average_cost_positions([
+            ('a', buy, Decimal('10'), Decimal('10'), Decimal('1')),
+            ('a', buy, Decimal('10'), Decimal('20'), Decimal('1')),
+            ('a', sell, Decimal('5'), Decimal('30'), Decimal('0')),
+            ('b', buy, Decimal('4'), Decimal('5'), Decimal('0')),
+            ('b', sell, Decimal('4'), Decimal('6'), Decimal('0')),
+            ('b', buy, Decimal('2'), Decimal('7'), Decimal('0')),
+        ])
+
+        assert positions['a'] == (Decimal('15'), Decimal('226.5'))
+        assert positions['b'] == (Decimal('2'), Decimal('14'))
+
+
+class TestImportBatch:
+    """Test suite for TransactionProcessor.import_batch."""
+
+    @pytest.fixture
+    def processor(self):
+        """Processor whose session returns every inserted row except one raced key."""
+        processor = TransactionProcessor(MagicMock())
+        processor.raced = set()
+
+        async def execute(stmt):
+            params = stmt.compile(dialect=postgresql.dialect()).params
+            returned = [
+                (params[name], params[name.replace('idempotency_key', 'instrument_id')])
+                for name in params
+                if name.startswith('idempotency_key') and params[name] not in processor.raced
+            ]
+            result = MagicMock()
+            result.all.return_value = returned
+            return result
+
+        processor.db.execute = AsyncMock(side_effect=execute)
+        processor._upsert_instruments = AsyncMock(return_value={'AAPL': uuid.uuid4(), 'MSFT': uuid.uuid4()})
+        return processor
+
+    @pytest.mark.asyncio
+    async def test_duplicates_are_filtered(self, processor):
+        """Repeats within the batch, stored keys and raced inserts all count as duplicates."""
+        stored = _trade(2, TransactionType.BUY, 'MSFT', '3', '400')
+        raced = _trade(3, TransactionType.SELL, 'AAPL', '-1', '200')
+        batch = [
+            _trade(1, TransactionType.BUY, 'AAPL', '2', '190'),
+            _trade(1, TransactionType.BUY, 'AAPL', '2', '190'),
+            stored, raced,
+            ParsedTransaction(date=datetime(2026, 3, 4), type=TransactionType.DIVIDEND, symbol='AAPL',
+                              quantity=None, price=None, amount=Decimal('5'))
+        ]
+        processor._existing_keys = AsyncMock(
+            return_value={processor._generate_idempotency_key(stored, ACCOUNT_ID)}
+        )
+        processor.raced.add(processor._generate_idempotency_key(raced, ACCOUNT_ID))
+        results = {"processed": 0, "duplicates": 0, "errors": 0, "skipped": 0, "transactions": []}
+
+        touched = await processor.import_batch(batch, ACCOUNT_ID, results)
+
+        assert (results["processed"], results["duplicates"], results["skipped"]) == (1, 3, 1)
+        assert touched == {processor._upsert_instruments.return_value['AAPL']}
+        assert processor._upsert_instruments.await_args.args[0] == {'AAPL'}
+
+    def test_transaction_row(self, processor):
+        """Signed broker quantities are normalised and a missing price comes from the amount."""
+        sell = ParsedTransaction(
+            date=datetime(2026, 3, 5), type=TransactionType.SELL, symbol='AAPL',
+            quantity=Decimal('-4'), price=None, amount=Decimal('800'), fees=Decimal('1')
+        )
+        row = processor._transaction_row(sell, uuid.UUID(ACCOUNT_ID), 'i', 'key')
+
+        assert row['side'] == TransactionSide.SELL
+        assert (row['quantity'], row['price'], row['fee']) == (Decimal('4'), Decimal('200'), Decimal('1'))
+        assert row['trade_date'] == datetime(2026, 3, 5).date()
+        with pytest.raises(ValueError):
+            processor._transaction_row(_trade(5, TransactionType.BUY, 'AAPL', '0', '1'), uuid.UUID(ACCOUNT_ID), 'i', 'k')
+
+
+class TestImportStream:
+    """Test suite for TransactionProcessor.import_stream."""
+
+    @pytest.fixture
+    def processor(self):
+        """Processor whose batches report one processed row each and record commit order."""
+        processor = TransactionProcessor(MagicMock())
+        processor.events = []
+        processor.db.commit = AsyncMock(side_effect=lambda: processor.events.append('commit'))
+
+        async def import_batch(batch, account_id, results):
+            results["processed"] += len(batch)
+            return set()
+
+        processor.import_batch = import_batch
+        processor.recalculate_positions = AsyncMock()
+        processor._notify_context_write = AsyncMock(
+            side_effect=lambda user_id: processor.events.append(('notify', user_id))
+        )
+        return processor
+
+    @staticmethod
+    async def _batches(*batches):
+        for batch in batches:
+            yield batch
+
+    @pytest.mark.asyncio
+    async def test_context_invalidated_after_final_commit(self, processor):
+        """The user's cached AI context is invalidated once, after positions are committed."""
+        trade = _trade(1, TransactionType.BUY, 'AAPL', '2', '190')
+
+        results = await processor.process_stream(self._batches([trade], [trade]), ACCOUNT_ID, 'user-1')
+
+        assert results["complete"] and results["processed"] == 2
+        assert processor.events == ['commit', 'commit', 'commit', ('notify', 'user-1')]
+
+    @pytest.mark.asyncio
+    async def test_no_invalidation_without_new_rows(self, processor):
+        """An import of only duplicates leaves cached context alone."""
+        await processor.process_stream(self._batches([]), ACCOUNT_ID, 'user-1')
+
+        processor._notify_context_write.assert_not_called()
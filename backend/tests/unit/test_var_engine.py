@@ -0,0 +1,79 @@
+"""
+Unit tests for the batched VaR engine.
+
+This test suite covers:
+- Single-partition quantiles against numpy
+- Shared moments against scipy
+- Vectorized bootstrap confidence intervals
+- Portfolio-batch VaR consistency with single-portfolio calculations
+"""
+import pytest
+import numpy as np
+from scipy.stats import skew, kurtosis
+
+from app.services.risk.var_engine import BatchVaREngine, partition_quantiles, BATCH_VAR_METHODS
+
+
+class TestBatchVaREngine:
+    """Test suite for BatchVaREngine."""
+
+    @pytest.fixture
+    def engine(self):
+        """Create engine with a fixed seed."""
+        return BatchVaREngine(confidence_levels=[0.95, 0.99], seed=7)
+
+    @pytest.fixture
+    def asset_returns(self):
+        """Daily returns for four assets over one year."""
+        rng = np.random.default_rng(42)
+        return rng.standard_t(df=5, size=(252, 4)) * 0.01 + 0.0004
+
+    def test_partition_quantiles_match_numpy(self, asset_returns):
+        """Quantiles from one partition equal numpy's linear interpolation."""
+        probs = [0.01, 0.05, 0.5, 0.975]
+        expected = np.quantile(asset_returns, probs, axis=0)
+        np.testing.assert_allclose(partition_quantiles(asset_returns, probs), expected)
+
+    def test_moments_match_scipy(self, engine, asset_returns):
+        """Shared moments match numpy/scipy defaults."""
+        moments = engine.compute_moments(asset_returns)
+        np.testing.assert_allclose(moments.mean, asset_returns.mean(axis=0))
+        np.testing.assert_allclose(moments.std, asset_returns.std(axis=0))
+        np.testing.assert_allclose(moments.skewness, skew(asset_returns, axis=0))
+        np.testing.assert_allclose(moments.excess_kurtosis, kurtosis(asset_returns, axis=0))
+
+    def test_bootstrap_intervals_bracket_point_estimate(self, engine, asset_returns):
+        """Bootstrap interval contains the historical VaR estimate."""
+        series = asset_returns[:, 0]
+        intervals = engine.bootstrap_confidence_intervals(series, 100000, n_bootstrap=500)
+
+        assert set(intervals) == {0.95, 0.99}
+        var_95 = abs(np.percentile(series, 5)) * 100000
+        assert intervals[0.95]['lower'] <= var_95 <= intervals[0.95]['upper']
+
+    def test_portfolio_batch_matches_single_portfolio(self, engine, asset_returns):
+        """Batch results equal per-portfolio calculations on each column."""
+        weights = np.array([[0.25, 0.25, 0.25, 0.25], [0.6, 0.4, 0.0, 0.0], [0.0, 0.0, 0.5, 0.5]])
+        values = np.array([100000.0, 250000.0, 50000.0])
+
+        result = engine.calculate_portfolio_batch(asset_returns, weights, values)
+
+        assert set(result.var) == set(BATCH_VAR_METHODS)
+        assert result.var['historical'].shape == (2, 3)
+        for i in range(3):
+            series = asset_returns @ weights[i]
+            expected = abs(np.percentile(series, 5)) * values[i]
+            assert result.var['historical'][engine.level_index(0.95), i] == pytest.approx(expected)
+            tail = series[series <= np.percentile(series, 1)].mean()
+            assert result.cvar['historical'][1, i] == pytest.approx(abs(tail) * values[i])
+
+    def test_cvar_exceeds_var(self, engine, asset_returns):
+        """Expected shortfall is at least as large as VaR for tail methods."""
+        result = engine.calculate_batch(asset_returns, np.full(4, 1000.0))
+        for method in ('historical', 'parametric', 'garch', 'student_t'):
+            assert np.all(result.cvar[method] >= result.var[method] - 1e-9)
+
+    def test_unknown_method_rejected(self, engine, asset_returns):
+        """Unknown methods raise ValueError."""
+        with pytest.raises(ValueError):
+            engine.calculate_batch(asset_returns, np.ones(4), methods=['delta_gamma'])
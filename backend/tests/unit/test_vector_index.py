@@ -0,0 +1,98 @@
+"""
+Unit tests for the local vector index and query-embedding cache.
+
+This test suite covers:
+- Exact top-k against a brute-force cosine ranking
+- IVF recall on a clustered corpus
+- Document replacement, source filtering and reload from disk
+- LRU eviction keyed by normalized query text
+"""
+import pytest
+import numpy as np
+
+from app.services.ai.vector_index import EmbeddingCache, LocalVectorIndex
+
+
+def chunk_payloads(doc_id, count, source='tax_code'):
+    return [
+        {'content': f"{doc_id} chunk {i}", 'source': source, 'metadata': {'chunk_index': i}}
+        for i in range(count)
+    ]
+
+
+class TestLocalVectorIndex:
+    """Test suite for LocalVectorIndex."""
+
+    @pytest.fixture
+    def vectors(self):
+        """200 documents with 3 chunk vectors each."""
+        return np.random.default_rng(5).normal(size=(200, 3, 32)).astype(np.float32)
+
+    @pytest.fixture
+    def index(self, tmp_path, vectors):
+        """Exact index over the sample vectors, alternating sources."""
+        index = LocalVectorIndex(str(tmp_path / "vectors"))
+        for i, doc_vectors in enumerate(vectors):
+            index.add_document(f"doc-{i}", doc_vectors, chunk_payloads(f"doc-{i}", 3, 'tax_code' if i % 2 else 'regulatory'))
+        return index
+
+    def test_exact_search_matches_brute_force(self, index, vectors):
+        """Top-k scores equal a full cosine ranking."""
+        flat = vectors.reshape(-1, 32)
+        query = np.random.default_rng(6).normal(size=32)
+        expected = np.sort(flat @ query / (np.linalg.norm(flat, axis=1) * np.linalg.norm(query)))[::-1][:10]
+
+        results = index.search(query, top_k=10)
+
+        assert [r['score'] for r in results] == pytest.approx(expected.tolist(), abs=1e-5)
+
+    def test_replace_filter_and_reload(self, index, tmp_path):
+        """Replaced and removed documents disappear, before and after reload."""
+        target = np.zeros(32, dtype=np.float32)
+        target[0] = 1.0
+        index.add_document("doc-1", [target], chunk_payloads("doc-1", 1))
+        index.remove_document("doc-2")
+
+        assert index.search(target, top_k=1)[0]['doc_id'] == "doc-1"
+        assert len(index) == 199 * 3 - 2
+        assert all(r['source'] == 'regulatory' for r in index.search(target, top_k=20, sources=['regulatory']))
+
+        index.save()
+        reloaded = LocalVectorIndex(str(tmp_path / "vectors"))
+        assert reloaded.load()
+        assert len(reloaded) == len(index)
+        assert reloaded.search(target, top_k=1)[0]['doc_id'] == "doc-1"
+        assert not any(r['doc_id'] == "doc-2" for r in reloaded.search(target, top_k=len(reloaded)))
+
+    def test_ivf_recall(self):
+        """IVF probing finds the exact neighbours on a clustered corpus."""
+        rng = np.random.default_rng(7)
+        centers = rng.normal(size=(20, 16))
+        index = LocalVectorIndex(ivf_threshold=1000, n_probe=4)
+        for i in range(100):
+            points = centers[i % 20] + 0.05 * rng.normal(size=(20, 16))
+            index.add_document(f"doc-{i}", points, chunk_payloads(f"doc-{i}", 20))
+        assert index.uses_ivf
+
+        query = centers[3] + 0.05 * rng.normal(size=16)
+        results = index.search(query, top_k=10)
+
+        assert len(results) == 10
+        assert all(int(r['doc_id'].split('-')[1]) % 20 == 3 for r in results)
+
+
+class TestEmbeddingCache:
+    """Test suite for EmbeddingCache."""
+
+    def test_normalized_keys_and_lru_eviction(self):
+        """Whitespace and case variants share an entry; the oldest entry is evicted."""
+        cache = EmbeddingCache(max_size=2)
+        cache.put("Roth  conversion", np.ones(3))
+        cache.put("rmd", np.zeros(3))
+
+        assert cache.get("  roth conversion ") is not None
+        cache.put("wash sale", np.ones(3))
+
+        assert cache.get("rmd") is None
+        assert cache.get("ROTH CONVERSION") is not None
+        assert cache.stats()['hits'] == 2
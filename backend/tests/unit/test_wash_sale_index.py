@@ -0,0 +1,95 @@
+"""
+Unit tests for the indexed wash sale detector.
+
+This test suite covers:
+- Purchases before and after the sale within the 61-day window
+- Substantially identical securities
+- Non-purchase transactions ignored, with transaction types matched case-insensitively
+- Correlated substitutes from the harvesting engine indexed as identical
+- Batch checks and safe dates
+"""
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.services.tax.tax_loss_harvesting import AdvancedTaxLossHarvestingEngine
+from app.services.tax.wash_sale_index import WashSaleIndex
+
+
+SALE_DATE = datetime(2024, 6, 15, 12, 0)
+
+
+def _txn(symbol, days_from_sale, transaction_type='buy'):
+    return SimpleNamespace(
+        symbol=symbol,
+        transaction_type=transaction_type,
+        transaction_date=SALE_DATE + timedelta(days=days_from_sale)
+    )
+
+
+class TestWashSaleIndex:
+    """Test suite for WashSaleIndex."""
+
+    @pytest.fixture
+    def transactions(self):
+        """Purchases around the sale date across several symbols."""
+        return [
+            _txn('AAPL', -45),
+            _txn('MSFT', -10),
+            _txn('VOO', 12),
+            _txn('TSLA', -5, transaction_type='sell'),
+            _txn('NVDA', 31),
+            _txn('AMZN', -3, transaction_type='reinvest'),
+        ]
+
+    @pytest.fixture
+    def index(self, transactions):
+        """Index with the default substantially identical groups."""
+        return WashSaleIndex(transactions)
+
+    def test_lookback_and_lookforward(self, index):
+        """Purchases inside 30 days either side conflict; older or later ones do not."""
+        assert index.is_wash_sale_safe('AAPL', SALE_DATE)
+        assert not index.is_wash_sale_safe('MSFT', SALE_DATE)
+        assert index.is_wash_sale_safe('NVDA', SALE_DATE)
+
+    def test_substantially_identical_purchase_conflicts(self, index, transactions):
+        """Buying VOO after the sale washes a loss on SPY."""
+        check = index.check('SPY', SALE_DATE)
+
+        assert not check.is_safe
+        assert check.conflicting_symbols == ['VOO']
+        assert [transactions[i].symbol for i in check.purchase_indices] == ['VOO']
+        assert check.safe_date == (SALE_DATE + timedelta(days=12 + 31)).date()
+
+    def test_only_acquisitions_count(self, index):
+        """Sells are ignored while dividend reinvestments count as purchases."""
+        assert index.is_wash_sale_safe('TSLA', SALE_DATE)
+        assert not index.is_wash_sale_safe('AMZN', SALE_DATE)
+
+    def test_transaction_types_are_case_insensitive(self):
+        """Purchase types match regardless of case and surrounding whitespace."""
+        index = WashSaleIndex([_txn('AAPL', -2, 'BUY'), _txn('MSFT', 4, ' Reinvest ')])
+
+        assert not index.is_wash_sale_safe('AAPL', SALE_DATE)
+        assert not index.is_wash_sale_safe('MSFT', SALE_DATE)
+
+    def test_engine_indexes_correlated_substitutes(self):
+        """Substitutes above the engine's correlation threshold conflict in both directions."""
+        engine = AdvancedTaxLossHarvestingEngine(db_session=None)
+        index = engine._build_wash_sale_index([_txn('IEFA', 5), _txn('IEMG', -8)])
+
+        assert index.check('VEA', SALE_DATE).conflicting_symbols == ['IEFA']
+        assert index.check('VWO', SALE_DATE).conflicting_symbols == ['IEMG']
+        assert not index.is_wash_sale_safe('SCHE', SALE_DATE)
+        assert index.is_wash_sale_safe('AAPL', SALE_DATE)
+
+    def test_batch_matches_single_checks(self, index):
+        """Batch results agree with individual checks."""
+        symbols = ['AAPL', 'MSFT', 'SPY', 'NVDA', 'MSFT']
+        results = index.check_batch(symbols, SALE_DATE)
+
+        assert list(results) == ['AAPL', 'MSFT', 'SPY', 'NVDA']
+        for symbol, check in results.items():
+            assert check.is_safe == index.is_wash_sale_safe(symbol, SALE_DATE)
+        assert index.safe_mask(symbols, SALE_DATE).tolist() == [True, False, False, True, False]
@@ -0,0 +1,102 @@
+"""
+Unit tests for webhook deduplication.
+
+This test suite covers:
+- TTL expiry and the size cap of the in-memory store
+- Burst claims with repeats inside the burst
+- Pipelined Redis claims and the local fallback when Redis fails
+"""
+import asyncio
+
+import pytest
+
+from app.services.banking.webhook_dedup import InMemoryWebhookDeduplicator, RedisWebhookDeduplicator
+
+
+class FakePipeline:
+    """Pipeline recording SET NX calls against a shared dict."""
+
+    def __init__(self, client):
+        self.client = client
+        self.keys = []
+
+    def set(self, key, value, nx=False, ex=None):
+        self.keys.append(key)
+
+    async def execute(self):
+        if self.client.fail:
+            raise ConnectionError("redis down")
+        self.client.executions.append(len(self.keys))
+        results = [key not in self.client.store for key in self.keys]
+        self.client.store.update(self.keys)
+        return results
+
+
+class FakeRedis:
+    """Redis client double exposing only pipelines."""
+
+    def __init__(self):
+        self.store = set()
+        self.executions = []
+        self.fail = False
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class TestInMemoryWebhookDeduplicator:
+    """Test suite for InMemoryWebhookDeduplicator."""
+
+    @pytest.fixture
+    def clock(self):
+        """Manually advanced clock."""
+        now = [0.0]
+        return now
+
+    @pytest.mark.asyncio
+    async def test_expiry(self, clock):
+        """Keys are duplicates within the TTL and new again after it."""
+        store = InMemoryWebhookDeduplicator(ttl_seconds=60, clock=lambda: clock[0])
+
+        assert await store.claim('plaid_a') is True
+        clock[0] = 59
+        assert await store.claim('plaid_a') is False
+        assert await store.claim('plaid_b') is True
+        clock[0] = 61
+        assert await store.claim('plaid_a') is True
+        assert len(store) == 2
+
+    @pytest.mark.asyncio
+    async def test_burst_and_cap(self, clock):
+        """Repeats inside a burst are duplicates and the oldest keys give way at the cap."""
+        store = InMemoryWebhookDeduplicator(ttl_seconds=60, max_entries=3, clock=lambda: clock[0])
+
+        assert await store.claim_many(['a', 'b', 'a', 'c']) == [True, True, False, True]
+        assert await store.claim('d') is True
+        assert len(store) == 3
+        assert await store.claim('a') is True
+
+
+class TestRedisWebhookDeduplicator:
+    """Test suite for RedisWebhookDeduplicator."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_claims_share_a_pipeline(self):
+        """Claims made together go out as one pipeline and only the first claim of a key wins."""
+        client = FakeRedis()
+        store = RedisWebhookDeduplicator(client, max_batch=1000)
+
+        results = await asyncio.gather(*(store.claim(f'k{i % 50}') for i in range(100)))
+
+        assert client.executions == [50]
+        assert results == [True] * 50 + [False] * 50
+        assert await store.claim('k1') is False
+
+    @pytest.mark.asyncio
+    async def test_fallback_when_redis_fails(self):
+        """A failing Redis degrades to local deduplication instead of raising."""
+        client = FakeRedis()
+        client.fail = True
+        store = RedisWebhookDeduplicator(client, max_batch=2)
+
+        assert await asyncio.gather(store.claim('a'), store.claim('b'), store.claim('a')) == [True, True, False]